@@ -1,4 +1,8 @@
+import hashlib
 import re
+import shlex
+import uuid
+from pathlib import PurePath
 from typing import TYPE_CHECKING, Optional, Tuple, Type
 from urllib.parse import urlparse
 
@@ -10,6 +14,8 @@ from lisa.tools.mkdir import Mkdir
 from lisa.tools.powershell import PowerShell
 from lisa.tools.rm import Rm
 from lisa.util import LisaException, is_valid_url
+from lisa.util.artifact_proxy import ArtifactProxy, get_artifact_proxy
+from lisa.util.perf_timer import create_timer
 
 if TYPE_CHECKING:
     from lisa.operating_system import Posix
@@ -20,6 +26,15 @@ class Wget(Tool):
         r"([\w\W]*?)(-|File) (‘|')(?P<path>.+?)(’|') (saved|already there)"
     )
 
+    # The cached files are under the global tool path, so they are shared by
+    # all runs on the node. The least recently used files are evicted, when
+    # the total size is over the limit.
+    CACHE_FOLDER = "cache"
+    CACHE_SIZE_LIMIT = 4 * 1024 * 1024 * 1024
+    # it's written by sha256sum, and used to check integrity of cached files.
+    _CHECKSUM_FILE = ".sha256"
+    _NOT_CACHED_EXIT_CODE = 3
+
     @property
     def command(self) -> str:
         return "wget"
@@ -44,11 +59,45 @@ class Wget(Tool):
         sudo: bool = False,
         force_run: bool = False,
         timeout: int = 600,
+        cache: bool = False,
+        sha256: str = "",
     ) -> str:
+        """
+        cache: download the url to the node cache once, and link it to the
+            file_path. Use it for urls with fixed content, like versioned
+            source packages.
+        sha256: the expected checksum of the file. It implies cache, and the
+            cache is keyed by it, so the same file from mirrors is shared.
+        """
         is_valid_url(url)
 
         file_path, download_path = self._ensure_download_path(file_path, filename)
 
+        proxy = get_artifact_proxy(url, self.node)
+        if proxy:
+            return self._get_by_proxy(
+                proxy=proxy,
+                url=url,
+                file_path=file_path,
+                download_path=download_path if filename else "",
+                sha256=sha256.lower(),
+                overwrite=overwrite,
+                executable=executable,
+                sudo=sudo,
+            )
+
+        if (cache or sha256) and self.node.is_posix:
+            return self._get_cached(
+                url=url,
+                file_path=file_path,
+                download_path=download_path if filename else "",
+                sha256=sha256.lower(),
+                overwrite=overwrite,
+                executable=executable,
+                sudo=sudo,
+                timeout=timeout,
+            )
+
         # remove existing file and dir to download again.
         download_pure_path = self.node.get_pure_path(download_path)
         if overwrite and self.node.shell.exists(download_pure_path):
@@ -104,6 +153,177 @@ class Wget(Tool):
     def _windows_tool(cls) -> Optional[Type[Tool]]:
         return WindowsWget
 
+    def _get_cached(
+        self,
+        url: str,
+        file_path: str,
+        download_path: str,
+        sha256: str,
+        overwrite: bool,
+        executable: bool,
+        sudo: bool,
+        timeout: int,
+    ) -> str:
+        """
+        The cache entry is a folder named by the sha256 of file, or sha256 of url
+        if the checksum is not provided. It contains the downloaded file and a
+        checksum file.
+        """
+        cache_root = self.get_tool_path(use_global=True) / self.CACHE_FOLDER
+        key = sha256 or hashlib.sha256(url.encode("utf-8")).hexdigest()
+        entry_path = cache_root / key
+
+        timer = create_timer()
+        name = self._find_cached_file(entry_path, sha256)
+        if name:
+            self._log.debug(f"found '{url}' in cache {entry_path}")
+        else:
+            name = self._download_to_cache(url, cache_root, key, sha256, timeout)
+            self._evict_cache(cache_root)
+
+        target_path = download_path or f"{file_path}/{name}"
+        self._link_file(entry_path / name, target_path, overwrite, executable, sudo)
+        self._log.debug(f"got '{url}' to '{target_path}' in {timer}")
+        return target_path
+
+    def _get_by_proxy(
+        self,
+        proxy: ArtifactProxy,
+        url: str,
+        file_path: str,
+        download_path: str,
+        sha256: str,
+        overwrite: bool,
+        executable: bool,
+        sudo: bool,
+    ) -> str:
+        timer = create_timer()
+        source_path = proxy.push_file(self.node, url)
+        # files are pushed to folders named by their sha256.
+        if sha256 and source_path.parent.name != sha256:
+            raise LisaException(
+                f"checksum mismatch of '{url}' from artifact proxy, "
+                f"expected: {sha256}, actual: {source_path.parent.name}"
+            )
+        target_path = download_path or f"{file_path}/{source_path.name}"
+        self._link_file(source_path, target_path, overwrite, executable, sudo)
+        self._log.debug(f"got '{url}' from artifact proxy in {timer}")
+        return target_path
+
+    def _link_file(
+        self,
+        source_path: PurePath,
+        target_path: str,
+        overwrite: bool,
+        executable: bool,
+        sudo: bool,
+    ) -> None:
+        """
+        Materialize a cached file by hard link, and copy it if the link is not
+        possible, like across file systems.
+        """
+        if not overwrite and self.node.shell.exists(
+            self.node.get_pure_path(target_path)
+        ):
+            self._log.debug(f"'{target_path}' exists and not overwrite.")
+            return
+        quoted_source = shlex.quote(str(source_path))
+        quoted_target = shlex.quote(target_path)
+        self.node.execute(
+            f"rm -rf {quoted_target} && "
+            f"(ln {quoted_source} {quoted_target} 2>/dev/null || "
+            f"cp --reflink=auto {quoted_source} {quoted_target})",
+            shell=True,
+            sudo=sudo,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=(
+                f"failed to link cached file to {target_path}"
+            ),
+        )
+        if executable:
+            self.node.execute(f"chmod +x {quoted_target}", sudo=sudo)
+
+    def _find_cached_file(self, entry_path: PurePath, sha256: str) -> str:
+        """
+        Return the file name in cache, or empty if it's not cached. A broken
+        entry is removed, so it's downloaded again.
+        """
+        quoted_entry = shlex.quote(str(entry_path))
+        # verify the file and touch the entry to mark it's recently used.
+        result = self.node.execute(
+            f"cd {quoted_entry} 2>/dev/null || exit {self._NOT_CACHED_EXIT_CODE}; "
+            f"sha256sum --status -c {self._CHECKSUM_FILE} "
+            f"&& touch . && cat {self._CHECKSUM_FILE}",
+            shell=True,
+        )
+        if result.exit_code == self._NOT_CACHED_EXIT_CODE:
+            return ""
+        if result.exit_code == 0:
+            checksum, _, name = result.stdout.partition(" ")
+            # sha256sum writes two spaces, or a space and a star in binary mode.
+            name = name.strip().lstrip("*")
+            if name and (not sha256 or checksum == sha256):
+                return name
+        self._log.debug(f"removing broken cache entry {entry_path}")
+        self.node.execute(f"rm -rf {quoted_entry}", shell=True)
+        return ""
+
+    def _download_to_cache(
+        self, url: str, cache_root: PurePath, key: str, sha256: str, timeout: int
+    ) -> str:
+        # download to a temp folder and move it, so concurrent downloads on the
+        # same node don't see partial files.
+        temp_path = cache_root / f".{key}.{uuid.uuid4().hex[:8]}.tmp"
+        quoted_temp = shlex.quote(str(temp_path))
+        self.node.execute(f"rm -rf {quoted_temp} && mkdir -p {quoted_temp}", shell=True)
+        command = f"'{url}' --no-check-certificate -P {quoted_temp}"
+        command_result = self.run(
+            command, no_error_log=True, shell=True, force_run=True, timeout=timeout
+        )
+        matched_result = self.__pattern_path.match(command_result.stdout)
+        if not matched_result:
+            self.node.execute(f"rm -rf {quoted_temp}", shell=True)
+            raise LisaException(
+                f"cannot find file path in stdout of '{command}', it may be caused "
+                " due to failed download or pattern mismatch."
+                f" stdout: {command_result.stdout}"
+            )
+        name = PurePath(matched_result.group("path")).name
+
+        result = self.node.execute(
+            f"cd {quoted_temp} && sha256sum {shlex.quote(name)} "
+            f"> {self._CHECKSUM_FILE} && cat {self._CHECKSUM_FILE}",
+            shell=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=f"failed to compute sha256 of {url}",
+        )
+        checksum = result.stdout.split(" ", 1)[0]
+        if sha256 and checksum != sha256:
+            self.node.execute(f"rm -rf {quoted_temp}", shell=True)
+            raise LisaException(
+                f"checksum mismatch of '{url}', expected: {sha256}, actual: {checksum}"
+            )
+
+        # if another download completes first, its entry is used.
+        entry_path = shlex.quote(str(cache_root / key))
+        self.node.execute(
+            f"mv -T {quoted_temp} {entry_path} 2>/dev/null || rm -rf {quoted_temp}",
+            shell=True,
+        )
+        return name
+
+    def _evict_cache(self, cache_root: PurePath) -> None:
+        # keep the most recently used entries within the size limit.
+        quoted_root = shlex.quote(str(cache_root))
+        self.node.execute(
+            f"cd {quoted_root} && total=0 && "
+            "for entry in $(ls -1t); do "
+            'size=$(du -sb "$entry" | cut -f1); total=$((total + size)); '
+            f'if [ $total -gt {self.CACHE_SIZE_LIMIT} ]; then rm -rf "$entry"; fi; '
+            "done",
+            shell=True,
+        )
+
     def _ensure_download_path(self, path: str, filename: str) -> Tuple[str, str]:
         # combine download file path
         # TODO: support current lisa folder in pathlib.
@@ -11,7 +11,14 @@ from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.runner import RootRunner
 from lisa.testselector import select_testcases
 from lisa.testsuite import TestCaseRuntimeData
-from lisa.util import LisaException, constants, hookspec, plugin_manager
+from lisa.util import (
+    LisaException,
+    constants,
+    hookspec,
+    perf_store,
+    plugin_manager,
+    profiler,
+)
 from lisa.util.logger import enable_console_timestamp, get_logger
 from lisa.util.perf_timer import create_timer
 
@@ -20,7 +27,8 @@ _get_init_logger = functools.partial(get_logger, "init")
 
 def run(args: Namespace) -> int:
     enable_console_timestamp()
-    builder = RunbookBuilder.from_path(args.runbook, args.variables)
+    with profiler.phase(profiler.PHASE_RUNBOOK):
+        builder = RunbookBuilder.from_path(args.runbook, args.variables)
 
     notifier_data = builder.partial_resolve(constants.NOTIFIER)
     if notifier_data:
@@ -50,7 +58,8 @@ def run(args: Namespace) -> int:
         run_message.elapsed = run_timer.elapsed()
         run_message.message = run_error_message
         notifier.notify(run_message)
-        notifier.finalize()
+        with profiler.phase(profiler.PHASE_NOTIFIER):
+            notifier.finalize()
         run_finalize()
 
     return runner.exit_code
@@ -66,12 +75,14 @@ def run_finalize() -> None:
 
 # check runbook
 def check(args: Namespace) -> int:
-    RunbookBuilder.from_path(args.runbook, args.variables)
+    with profiler.phase(profiler.PHASE_RUNBOOK):
+        RunbookBuilder.from_path(args.runbook, args.variables)
     return 0
 
 
 def list_start(args: Namespace) -> int:
-    builder = RunbookBuilder.from_path(args.runbook, args.variables)
+    with profiler.phase(profiler.PHASE_RUNBOOK):
+        builder = RunbookBuilder.from_path(args.runbook, args.variables)
     list_all = cast(Optional[bool], args.list_all)
     log = _get_init_logger("list")
     if args.type == constants.LIST_CASE:
@@ -95,6 +106,55 @@ def list_start(args: Namespace) -> int:
     return 0
 
 
+def perf_compare(args: Namespace) -> int:
+    """
+    Compare perf results of the target with the baseline in the perf store. It
+    returns 1, if any regression is found, so it can be a gate in pipelines.
+    """
+    log = _get_init_logger("perf")
+    store_path = args.store if args.store else perf_store.get_default_store_path()
+    if not store_path.exists():
+        raise LisaException(f"perf store is not found: {store_path}")
+    store = perf_store.PerfStore(store_path)
+    try:
+        baseline = perf_store.parse_selector(args.baseline)
+        if args.target:
+            target = perf_store.parse_selector(args.target)
+        else:
+            target = {perf_store.RUN_ID_COLUMN: store.get_latest_run_id()}
+        for raw_filter in args.filters or []:
+            filters = perf_store.parse_selector(raw_filter)
+            baseline.update(filters)
+            target.update(filters)
+        log.info(f"baseline: {baseline}, target: {target}")
+        comparisons = store.compare(
+            baseline, target, alpha=args.alpha, threshold=args.threshold
+        )
+    finally:
+        store.close()
+
+    regressions = 0
+    for item in comparisons:
+        if item.is_regression:
+            regressions += 1
+            flag = "REGRESSION"
+        elif item.is_improvement:
+            flag = "improvement"
+        elif not args.list_all:
+            continue
+        else:
+            flag = ""
+        p_value = "n/a" if item.p_value is None else f"{item.p_value:.4f}"
+        log.info(
+            f"{flag:<11} {item.table}: {item.label}, {item.metric}: "
+            f"{item.baseline_mean:.4g}±{item.baseline_stdev:.2g} "
+            f"(n={item.baseline_count}) -> {item.target_mean:.4g} "
+            f"(n={item.target_count}), {item.change:+.2f}%, p={p_value}"
+        )
+    log.info(f"compared {len(comparisons)} metrics, found {regressions} regressions.")
+    return 1 if regressions else 0
+
+
 class CommandHookSpec:
     @hookspec
     def on_run_finalize(self) -> None:
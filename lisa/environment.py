@@ -10,12 +10,13 @@ from enum import Enum
 from functools import partial
 from pathlib import Path
 from threading import Lock
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, cast
 
 from dataclasses_json import dataclass_json
 from marshmallow import validate
 
 from lisa import notifier, schema, search_space
+from lisa.executable import Tool
 from lisa.node import Node, Nodes
 from lisa.notifier import MessageBase
 from lisa.util import (
@@ -30,7 +31,9 @@ from lisa.util import (
     is_unittest,
     plugin_manager,
 )
-from lisa.util.logger import create_file_handler, get_logger, remove_handler
+from lisa.util.logger import Logger, create_file_handler, get_logger, remove_handler
+from lisa.util.parallel import run_in_parallel
+from lisa.util.perf_timer import create_timer
 
 if TYPE_CHECKING:
     from lisa.platform_ import Platform
@@ -362,6 +365,22 @@ class Environment(ContextMixin, InitializableMixin):
         self._information_cache = temp_information
         return self._information_cache
 
+    def ensure_tools(
+        self,
+        tool_types: List[Type[Tool]],
+        nodes: Optional[List[Node]] = None,
+    ) -> Dict[str, float]:
+        """
+        Install tools on nodes concurrently. It returns elapsed seconds by node
+        names.
+
+        nodes: nodes of the environment by default. Other nodes, like nested
+            VMs, can be specified too.
+        """
+        if nodes is None:
+            nodes = list(self.nodes.list())
+        return ensure_tools(tool_types, nodes, log=self.log)
+
     def mark_dirty(self) -> None:
         self.log.debug("mark environment to dirty")
         self._is_dirty = True
@@ -540,6 +559,70 @@ def load_environments(
     return environments
 
 
+def ensure_tools(
+    tool_types: List[Type[Tool]],
+    nodes: List[Node],
+    log: Optional[Logger] = None,
+) -> Dict[str, float]:
+    """
+    Install tools on nodes concurrently. The tools are installed in order on
+    each node, and dependencies are resolved by node.tools. If any node fails, a
+    LisaException with errors of all failed nodes is raised, after all nodes are
+    done. If all errors are subclasses of LisaException, like
+    SkippedException or UnsupportedDistroException, the first one is raised
+    as it is, so test cases can be skipped by it. It returns elapsed seconds by
+    node names. The nodes don't need to be in an environment, like nested VMs
+    created by tests.
+    """
+    if log is None:
+        log = _get_init_logger()
+    tool_names = [x.__name__ for x in tool_types]
+
+    def _ensure_tools_on_node(
+        node: Node,
+    ) -> Tuple[Node, float, Optional[Exception]]:
+        timer = create_timer()
+        try:
+            for tool_type in tool_types:
+                node.tools.get(tool_type)
+        except Exception as identifier:
+            return node, timer.elapsed(), identifier
+        return node, timer.elapsed(), None
+
+    results = run_in_parallel(
+        [partial(_ensure_tools_on_node, node) for node in nodes], log=log
+    )
+
+    elapsed_by_nodes: Dict[str, float] = {}
+    errors: List[str] = []
+    exceptions: List[Exception] = []
+    for node, elapsed, error in results:
+        node_name = node.name or f"node-{node.index}"
+        elapsed_by_nodes[node_name] = elapsed
+        if error:
+            errors.append(f"[{node_name}] {error}")
+            exceptions.append(error)
+            log.info(
+                f"failed to prepare tools {tool_names} on [{node_name}] "
+                f"in {elapsed:.3f} sec: {error}"
+            )
+        else:
+            log.info(
+                f"prepared tools {tool_names} on [{node_name}] in {elapsed:.3f} sec"
+            )
+    if exceptions and all(
+        isinstance(x, LisaException) and type(x) is not LisaException
+        for x in exceptions
+    ):
+        raise exceptions[0]
+    if errors:
+        raise LisaException(
+            f"failed to prepare tools {tool_names} on "
+            f"{len(errors)} of {len(nodes)} nodes: " + "; ".join(errors)
+        )
+    return elapsed_by_nodes
+
+
 class EnvironmentHookSpec:
     @hookspec
     def get_environment_information(self, environment: Environment) -> Dict[str, str]:
@@ -4,6 +4,7 @@
 from __future__ import annotations
 
 import pathlib
+import shlex
 from hashlib import sha256
 from typing import (
     TYPE_CHECKING,
@@ -19,17 +20,30 @@ from typing import (
 )
 
 from lisa.util import InitializableMixin, LisaException, constants
-from lisa.util.logger import get_logger
+from lisa.util.logger import Logger, get_logger
 from lisa.util.perf_timer import create_timer
 from lisa.util.process import ExecutableResult, Process
+from lisa.util.tool_manifest import (
+    METHOD_INSTALLED,
+    METHOD_PRESENT,
+    ToolManifest,
+    ToolRecord,
+    get_paths_checksum,
+)
 
 if TYPE_CHECKING:
     from lisa.node import Node
+    from lisa.operating_system import Posix
 
 
 T = TypeVar("T")
 
 
+def _is_command_tool(tool: Tool) -> bool:
+    # the existence of these tools is decided by their commands only.
+    return type(tool)._check_exists is Tool._check_exists
+
+
 class Tool(InitializableMixin):
     """
     The base class, which wraps an executable, package, or scripts on a node. A
@@ -124,6 +138,16 @@ class Tool(InitializableMixin):
         """
         return self.command
 
+    @property
+    def batch_packages(self) -> List[str]:
+        """
+        Packages, which can be installed together with packages of other tools,
+        before the tool is installed. If the tool exists after packages
+        installed, the _install is skipped. Return packages only if the tool is
+        installed by these packages completely.
+        """
+        return []
+
     @property
     def dependencies(self) -> List[Type[Tool]]:
         """
@@ -244,10 +268,12 @@ class Tool(InitializableMixin):
         # node uses for guest nodes.
         node: Optional["Node"] = None,
         encoding: str = "",
+        start_at: Optional[float] = None,
     ) -> Process:
         """
         Run a command async and return the Process. The process is used for async, or
-        kill directly.
+        kill directly. If start_at is set, the command waits on the node until the
+        timestamp of the node clock.
         """
         if parameters:
             command = f"{self.command} {parameters}"
@@ -257,7 +283,7 @@ class Tool(InitializableMixin):
         # If the command exists in sbin, use the root permission, even the sudo
         # is not specified.
         sudo = sudo or self._use_sudo
-        command_key = f"{command}|{shell}|{sudo}|{cwd}"
+        command_key = f"{command}|{shell}|{sudo}|{cwd}|{start_at}"
         process = self.__cached_results.get(command_key, None)
         if node is None:
             node = self.node
@@ -272,7 +298,9 @@ class Tool(InitializableMixin):
                 cwd=cwd,
                 update_envs=update_envs,
                 encoding=encoding,
+                start_at=start_at,
             )
+            process.tool_name = self.name
             self.__cached_results[command_key] = process
         else:
             self._log.debug(f"loaded cached result for command: [{command}]")
@@ -293,6 +321,7 @@ class Tool(InitializableMixin):
         timeout: int = 600,
         expected_exit_code: Optional[int] = None,
         expected_exit_code_failure_message: str = "",
+        start_at: Optional[float] = None,
     ) -> ExecutableResult:
         """
         Run a process and wait for result.
@@ -308,6 +337,7 @@ class Tool(InitializableMixin):
             cwd=cwd,
             update_envs=update_envs,
             encoding=encoding,
+            start_at=start_at,
         )
         return process.wait_result(
             timeout=timeout,
@@ -392,6 +422,7 @@ class CustomScript(Tool):
         update_envs: Optional[Dict[str, str]] = None,
         node: Optional["Node"] = None,
         encoding: str = "",
+        start_at: Optional[float] = None,
     ) -> Process:
         if cwd is not None:
             raise LisaException("don't set cwd for script")
@@ -408,6 +439,7 @@ class CustomScript(Tool):
             update_envs=update_envs,
             node=node,
             encoding=encoding,
+            start_at=start_at,
         )
 
     @property
@@ -518,6 +550,14 @@ class Tools:
     def __init__(self, node: Node) -> None:
         self._node = node
         self._cache: Dict[str, Tool] = {}
+        # tools created and checked by prefetch, they are not installed yet.
+        self._prefetched: Dict[str, Tool] = {}
+        # tools recorded by the manifest of image, and validated on the node.
+        self._manifest: Optional[ToolManifest] = None
+        self._seeds: Dict[str, ToolRecord] = {}
+        # all records of the manifest, tools installed by lisa are recorded
+        # again only if they are changed.
+        self._records: Dict[str, ToolRecord] = {}
 
     def __getattr__(self, key: str) -> Tool:
         """
@@ -544,6 +584,44 @@ class Tools:
             del self._cache[tool_key]
         return self.get(tool_type, *args, **kwargs)
 
+    def prefetch(self, tool_types: List[Type[Tool]]) -> None:
+        """
+        Check existence of tools together, so it doesn't need a round trip per
+        tool. The commands are checked in one call, and the missing commands
+        are checked with sudo in one more call. The results are cached in tool
+        objects, which are used by get later. Tools, which override
+        _check_exists, are checked in get as usual.
+        """
+        if not self._node.is_posix:
+            return
+        self._load_manifest()
+
+        probing_tools: List[Tool] = []
+        for tool_type in tool_types:
+            tool_key = self._get_tool_key(tool_type)
+            if tool_key in self._cache or tool_key in self._prefetched:
+                continue
+            tool = tool_type.create(self._node)
+            tool.initialize()
+            self._prefetched[tool_key] = tool
+            if not self._apply_seed(tool_key, tool) and _is_command_tool(tool):
+                probing_tools.append(tool)
+        if not probing_tools:
+            return
+
+        timer = create_timer()
+        commands = list({x.command: None for x in probing_tools}.keys())
+        found = self._resolve_commands(commands, sudo=False)
+        missing = [x for x in commands if x not in found]
+        found_in_sudo = self._resolve_commands(missing, sudo=True) if missing else {}
+        for tool in probing_tools:
+            tool._use_sudo = tool.command in found_in_sudo
+            tool._exists = tool.command in found or tool._use_sudo
+        self._node.log.debug(
+            f"checked {len(commands)} commands in {timer}, "
+            f"found: {len(found)}, found in sudo: {len(found_in_sudo)}"
+        )
+
     def get(
         self,
         tool_type: Union[Type[T], Type[Tool], CustomScriptBuilder, str],
@@ -564,6 +642,7 @@ class Tools:
         tool_key = self._get_tool_key(tool_type)
         tool = self._cache.get(tool_key)
         if tool is None:
+            self._load_manifest()
             # the Tool is not installed on current node, try to install it.
             tool_log = get_logger("tool", tool_key, self._node.log)
             tool_log.debug(f"initializing tool [{tool_key}]")
@@ -575,24 +654,33 @@ class Tools:
                     f"{tool_type} cannot be found. "
                     f"short usage need to get with type before get with name."
                 )
+            elif tool_key in self._prefetched and not args and not kwargs:
+                tool = self._prefetched.pop(tool_key)
             else:
                 cast_tool_type = cast(Type[Tool], tool_type)
                 tool = cast_tool_type.create(self._node, *args, **kwargs)
 
             tool.initialize()
+            self._apply_seed(tool_key, tool)
 
+            method = METHOD_PRESENT
             if not tool.exists:
                 tool_log.debug(f"'{tool.name}' not installed")
                 if tool.can_install:
                     tool_log.debug(f"{tool.name} is installing")
                     timer = create_timer()
-                    is_success = tool.install()
+                    is_success = self._install_packages_together(
+                        tool_key, tool, tool_log
+                    )
+                    if not is_success:
+                        is_success = tool.install()
                     if not is_success:
                         raise LisaException(
                             f"install '{tool.name}' failed. After installed, "
                             f"it cannot be detected."
                         )
                     tool_log.debug(f"installed in {timer}")
+                    method = METHOD_INSTALLED
                 else:
                     raise LisaException(
                         f"cannot find [{tool.name}] on [{self._node.name}], "
@@ -602,9 +690,212 @@ class Tools:
                     )
             else:
                 tool_log.debug("installed already")
+            self._record_tool(tool_key, tool, method)
             self._cache[tool_key] = tool
         return cast(T, tool)
 
+    def _install_packages_together(
+        self, tool_key: str, tool: Tool, log: Logger
+    ) -> bool:
+        """
+        Install batch packages of the tool and its missing dependencies in one
+        transaction, so the package manager runs once instead of once per tool.
+        It returns True, if the tool exists after that. Otherwise, the tool
+        continues to install by itself.
+        """
+        if not self._node.is_posix:
+            return False
+
+        missing_tools: Dict[str, Tool] = {}
+        self._collect_missing_tools(tool_key, tool, missing_tools)
+        requests = {
+            key: x.batch_packages
+            for key, x in missing_tools.items()
+            if x.batch_packages
+        }
+        # nothing to save, if there is one requester only.
+        if len(requests) < 2:
+            return False
+
+        log.debug(f"installing packages of {list(requests.keys())} together")
+        posix_os = cast("Posix", self._node.os)
+        failures = posix_os.install_packages_together(requests)
+        for key, failure in failures.items():
+            log.debug(f"failed to install packages of [{key}]: {failure}")
+
+        for key, missing_tool in missing_tools.items():
+            if key not in requests:
+                continue
+            # check again, the result may be changed by installed packages.
+            missing_tool._exists = None
+            if key != tool_key and missing_tool.exists:
+                self._record_tool(key, missing_tool, METHOD_INSTALLED)
+                self._cache[key] = missing_tool
+        return tool.exists
+
+    def _collect_missing_tools(
+        self, tool_key: str, tool: Tool, missing_tools: Dict[str, Tool]
+    ) -> None:
+        missing_tools[tool_key] = tool
+        for dependency in tool.dependencies:
+            key = self._get_tool_key(dependency)
+            if key in self._cache or key in missing_tools:
+                continue
+            dependency_tool = self._prefetched.pop(key, None)
+            if not dependency_tool:
+                dependency_tool = dependency.create(self._node)
+            dependency_tool.initialize()
+            self._apply_seed(key, dependency_tool)
+            if dependency_tool.exists:
+                self._record_tool(key, dependency_tool, METHOD_PRESENT)
+                self._cache[key] = dependency_tool
+            else:
+                self._collect_missing_tools(key, dependency_tool, missing_tools)
+
+    def _load_manifest(self) -> None:
+        # it's loaded once, and it's set before loading to prevent reentrance,
+        # because getting the identity may use tools.
+        if self._manifest is not None:
+            return
+        self._manifest = ToolManifest(self._node)
+        if not self._manifest.is_enabled:
+            return
+        try:
+            records = self._manifest.load()
+            if records:
+                self._records = records
+                self._seeds = self._validate_records(records)
+        except Exception as identifier:
+            self._node.log.debug(f"failed to load tool manifest: {identifier}")
+
+    def _validate_records(
+        self, records: Dict[str, ToolRecord]
+    ) -> Dict[str, ToolRecord]:
+        """
+        Resolve recorded commands on the node, and return records, which are not
+        changed.
+        """
+        paths: Dict[str, str] = {}
+        for sudo in [False, True]:
+            commands = list(
+                {x.command: None for x in records.values() if x.use_sudo == sudo}
+            )
+            if commands:
+                paths.update(self._resolve_commands(commands, sudo=sudo))
+        # tools installed by lisa are missing on new nodes, it's expected, so
+        # they are not compared. Other tools are compared by the checksum.
+        expected_records = {
+            key: x
+            for key, x in records.items()
+            if x.method == METHOD_PRESENT or x.command in paths
+        }
+        current_records = {
+            key: ToolRecord(
+                command=x.command,
+                path=paths.get(x.command, ""),
+                method=x.method,
+                use_sudo=x.use_sudo,
+            )
+            for key, x in expected_records.items()
+        }
+        if get_paths_checksum(current_records) == get_paths_checksum(expected_records):
+            self._node.log.debug(
+                f"{len(expected_records)} tools are seeded by manifest"
+            )
+            return expected_records
+
+        changed_keys = [
+            key
+            for key, x in expected_records.items()
+            if x.path != current_records[key].path
+        ]
+        # if tools in the image are changed, the image may be updated.
+        drifted_keys = [
+            key for key in changed_keys if records[key].method == METHOD_PRESENT
+        ]
+        if drifted_keys:
+            self._node.log.debug(f"tools are changed in the image: {drifted_keys}")
+            assert self._manifest
+            self._manifest.remove(drifted_keys)
+        # changed tools are recorded again, when they are used.
+        for key in changed_keys:
+            self._records.pop(key, None)
+        seeds = {
+            key: x for key, x in expected_records.items() if key not in changed_keys
+        }
+        self._node.log.debug(
+            f"{len(seeds)} tools are seeded by manifest, "
+            f"{len(changed_keys)} tools need to be checked"
+        )
+        return seeds
+
+    def _apply_seed(self, tool_key: str, tool: Tool) -> bool:
+        seed = self._seeds.get(tool_key)
+        if (
+            seed
+            and tool._exists is None
+            and _is_command_tool(tool)
+            and tool.command == seed.command
+        ):
+            tool._exists = True
+            tool._use_sudo = seed.use_sudo
+            return True
+        return False
+
+    def _record_tool(self, tool_key: str, tool: Tool, method: str) -> None:
+        if not self._manifest or not self._manifest.is_enabled:
+            return
+        if not _is_command_tool(tool):
+            return
+        seed = self._seeds.get(tool_key)
+        if seed and seed.command == tool.command and seed.use_sudo == tool._use_sudo:
+            return
+        # tools installed by lisa are missing on new nodes, but they are
+        # installed to the same path, so the record is reused.
+        known_record = self._records.get(tool_key)
+        if (
+            known_record
+            and known_record.method == method
+            and known_record.command == tool.command
+            and known_record.use_sudo == tool._use_sudo
+        ):
+            self._seeds[tool_key] = known_record
+            return
+        try:
+            paths = self._resolve_commands([tool.command], sudo=tool._use_sudo)
+            if tool.command not in paths:
+                return
+            record = ToolRecord(
+                command=tool.command,
+                path=paths[tool.command],
+                method=method,
+                use_sudo=tool._use_sudo,
+            )
+            self._manifest.record(tool_key, record)
+            self._seeds[tool_key] = record
+            self._records[tool_key] = record
+        except Exception as identifier:
+            self._node.log.debug(f"failed to record tool {tool_key}: {identifier}")
+
+    def _resolve_commands(self, commands: List[str], sudo: bool) -> Dict[str, str]:
+        """
+        Return paths of found commands by one call.
+        """
+        script = "; ".join(
+            f"p=$(command -v {shlex.quote(command)} 2>/dev/null) && "
+            f'echo "{index} $p"'
+            for index, command in enumerate(commands)
+        )
+        result = self._node.execute(
+            f"{script}; true", shell=True, sudo=sudo, no_info_log=True
+        )
+        paths: Dict[str, str] = {}
+        for line in result.stdout.splitlines():
+            index, _, path = line.strip().partition(" ")
+            if index.isdigit() and int(index) < len(commands) and path:
+                paths[commands[int(index)]] = path
+        return paths
+
     def _get_tool_key(self, tool_type: Union[type, CustomScriptBuilder, str]) -> str:
         if isinstance(tool_type, CustomScriptBuilder):
             tool_key = tool_type.name
@@ -376,6 +376,7 @@ class Infiniband(Feature):
                 filename=tarball_name,
                 overwrite=False,
                 sudo=True,
+                cache=True,
             )
         except LisaException as identifier:
             if "404: Not Found." in str(identifier):
@@ -462,6 +463,7 @@ class Infiniband(Feature):
             executable=True,
             overwrite=False,
             sudo=True,
+            cache=True,
         )
         tar = node.tools[Tar]
         tar.extract(tar_file_path, self.resource_disk_path, gzip=True, sudo=True)
@@ -537,6 +539,7 @@ class Infiniband(Feature):
             file_path=self.resource_disk_path,
             overwrite=False,
             sudo=True,
+            cache=True,
         )
         tar = node.tools[Tar]
         tar.extract(tar_file_path, self.resource_disk_path, gzip=True, sudo=True)
@@ -15,7 +15,7 @@ from retry import retry
 # force to import all modules for reflection use
 import lisa.mixin_modules  # noqa: F401
 from lisa.parameter_parser.argparser import parse_args
-from lisa.util import constants, get_datetime_path
+from lisa.util import constants, get_datetime_path, profiler
 from lisa.util.logger import (
     Logger,
     create_file_handler,
@@ -108,12 +108,17 @@ def main() -> int:
     log = get_logger()
     exit_code: int = 0
     file_handler: Optional[FileHandler] = None
+    is_profiling = False
 
     try:
         args = parse_args()
 
         initialize_runtime_folder(args.log_path, args.working_path, args.run_id)
 
+        if args.profile:
+            profiler.start()
+            is_profiling = True
+
         log_level = DEBUG if (args.debug) else INFO
         set_level(log_level)
 
@@ -139,6 +144,11 @@ def main() -> int:
         exit_code = args.func(args)
         assert isinstance(exit_code, int), f"actual: {type(exit_code)}"
     finally:
+        if is_profiling:
+            try:
+                profiler.stop(constants.RUN_LOCAL_LOG_PATH / "profile")
+            except Exception as identifier:
+                log.info(f"failed to save profile results: {identifier}")
         log.info(f"completed in {total_timer}")
         if file_handler:
             remove_handler(log_handler=file_handler, logger=log)
@@ -124,6 +124,24 @@ class PerfMessage(MessageBase):
     test_date: datetime = datetime.utcnow()
     role: str = ""
     test_result_id: str = ""
+    # the count of windows and the relative confidence interval of the mean, if
+    # the result is measured by adaptive sampling.
+    sample_count: int = 0
+    confidence_interval_percent: Decimal = Decimal(0)
+    # summary of node metrics, which are sampled during the test.
+    node_cpu_usage_percent: Decimal = Decimal(0)
+    node_cpu_iowait_percent: Decimal = Decimal(0)
+    node_cpu_softirq_percent: Decimal = Decimal(0)
+    node_cpu_steal_percent: Decimal = Decimal(0)
+    node_interrupts_per_sec: Decimal = Decimal(0)
+    node_interrupts_max_cpu_percent: Decimal = Decimal(0)
+    node_net_rx_softirqs_per_sec: Decimal = Decimal(0)
+    node_net_rx_mbps: Decimal = Decimal(0)
+    node_net_tx_mbps: Decimal = Decimal(0)
+    node_disk_read_iops: Decimal = Decimal(0)
+    node_disk_write_iops: Decimal = Decimal(0)
+    node_disk_max_util_percent: Decimal = Decimal(0)
+    node_memory_available_min_mb: Decimal = Decimal(0)
 
 
 T = TypeVar("T", bound=PerfMessage)
@@ -167,6 +185,62 @@ class DiskPerformanceMessage(PerfMessage):
     write_lat_usec: Decimal = Decimal(0)
     randwrite_iops: Decimal = Decimal(0)
     randwrite_lat_usec: Decimal = Decimal(0)
+    read_bw_kibps: Decimal = Decimal(0)
+    read_lat_p50_usec: Decimal = Decimal(0)
+    read_lat_p90_usec: Decimal = Decimal(0)
+    read_lat_p99_usec: Decimal = Decimal(0)
+    read_lat_p99_9_usec: Decimal = Decimal(0)
+    read_lat_p99_99_usec: Decimal = Decimal(0)
+    randread_bw_kibps: Decimal = Decimal(0)
+    randread_lat_p50_usec: Decimal = Decimal(0)
+    randread_lat_p90_usec: Decimal = Decimal(0)
+    randread_lat_p99_usec: Decimal = Decimal(0)
+    randread_lat_p99_9_usec: Decimal = Decimal(0)
+    randread_lat_p99_99_usec: Decimal = Decimal(0)
+    write_bw_kibps: Decimal = Decimal(0)
+    write_lat_p50_usec: Decimal = Decimal(0)
+    write_lat_p90_usec: Decimal = Decimal(0)
+    write_lat_p99_usec: Decimal = Decimal(0)
+    write_lat_p99_9_usec: Decimal = Decimal(0)
+    write_lat_p99_99_usec: Decimal = Decimal(0)
+    randwrite_bw_kibps: Decimal = Decimal(0)
+    randwrite_lat_p50_usec: Decimal = Decimal(0)
+    randwrite_lat_p90_usec: Decimal = Decimal(0)
+    randwrite_lat_p99_usec: Decimal = Decimal(0)
+    randwrite_lat_p99_9_usec: Decimal = Decimal(0)
+    randwrite_lat_p99_99_usec: Decimal = Decimal(0)
+    # the target of a concurrent sweep, like "node-0:/dev/sdc1", or "total" for
+    # the sum of all targets. It's empty, if fio runs on one target.
+    target: str = ""
+
+
+# noisy neighbor metrics of a step, when fio runs on many disks or nodes at the
+# same time. The victim is the first target, and the isolated values are
+# measured when it runs alone.
+@dataclass
+class DiskInterferencePerformanceMessage(PerfMessage):
+    disk_setup_type: DiskSetupType = DiskSetupType.raw
+    disk_type: DiskType = DiskType.nvme
+    block_size: int = 0
+    mode: str = ""
+    qdepth: int = 0
+    iodepth: int = 0
+    numjob: int = 0
+    node_count: int = 0
+    target_count: int = 0
+    total_iops: Decimal = Decimal(0)
+    total_bw_kibps: Decimal = Decimal(0)
+    min_target_iops: Decimal = Decimal(0)
+    max_target_iops: Decimal = Decimal(0)
+    iops_stdev_percent: Decimal = Decimal(0)
+    # Jain's fairness index of target iops, 1 means all targets are equal.
+    fairness_index: Decimal = Decimal(0)
+    isolated_iops: Decimal = Decimal(0)
+    victim_iops: Decimal = Decimal(0)
+    iops_interference_percent: Decimal = Decimal(0)
+    isolated_lat_p99_usec: Decimal = Decimal(0)
+    victim_lat_p99_usec: Decimal = Decimal(0)
+    lat_p99_interference_percent: Decimal = Decimal(0)
 
 
 @dataclass
@@ -176,6 +250,11 @@ class NetworkLatencyPerformanceMessage(PerfMessage):
     min_latency_us: Decimal = Decimal(0)
     latency95_percentile_us: Decimal = Decimal(0)
     latency99_percentile_us: Decimal = Decimal(0)
+    latency50_percentile_us: Decimal = Decimal(0)
+    latency90_percentile_us: Decimal = Decimal(0)
+    latency99_9_percentile_us: Decimal = Decimal(0)
+    latency99_99_percentile_us: Decimal = Decimal(0)
+    latency_stdev_us: Decimal = Decimal(0)
     interval_us: int = 0
     frequency: int = 0
 
@@ -192,6 +271,16 @@ class NetworkPPSPerformanceMessage(PerfMessage):
     rx_tx_pps_minimum: Decimal = Decimal(0)
     rx_tx_pps_average: Decimal = Decimal(0)
     rx_tx_pps_maximum: Decimal = Decimal(0)
+    # the distribution of samples, the 5th percentile shows drops in the test.
+    rx_pps_median: Decimal = Decimal(0)
+    rx_pps_percentile5: Decimal = Decimal(0)
+    rx_pps_stdev: Decimal = Decimal(0)
+    tx_pps_median: Decimal = Decimal(0)
+    tx_pps_percentile5: Decimal = Decimal(0)
+    tx_pps_stdev: Decimal = Decimal(0)
+    rx_tx_pps_median: Decimal = Decimal(0)
+    rx_tx_pps_percentile5: Decimal = Decimal(0)
+    rx_tx_pps_stdev: Decimal = Decimal(0)
     fwd_pps_maximum: Decimal = Decimal(0)
     fwd_pps_average: Decimal = Decimal(0)
     fwd_pps_minimum: Decimal = Decimal(0)
@@ -218,6 +307,11 @@ class NetworkTCPPerformanceMessage(PerfMessage):
     rx_throughput_in_gbps: Decimal = Decimal(0)
     retransmitted_segments: Decimal = Decimal(0)
     congestion_windowsize_kb: Decimal = Decimal(0)
+    # variance of iperf intervals and streams
+    tx_throughput_min_gbps: Decimal = Decimal(0)
+    tx_throughput_max_gbps: Decimal = Decimal(0)
+    tx_throughput_stdev_gbps: Decimal = Decimal(0)
+    stream_throughput_stdev_gbps: Decimal = Decimal(0)
 
 
 @dataclass
@@ -232,6 +326,11 @@ class NetworkUDPPerformanceMessage(PerfMessage):
     rx_throughput_in_gbps: Decimal = Decimal(0)
     data_loss: Decimal = Decimal(0)
     packet_size_kbytes: Decimal = Decimal(0)
+    # variance of iperf intervals and streams
+    tx_throughput_min_gbps: Decimal = Decimal(0)
+    tx_throughput_max_gbps: Decimal = Decimal(0)
+    tx_throughput_stdev_gbps: Decimal = Decimal(0)
+    stream_throughput_stdev_gbps: Decimal = Decimal(0)
 
 
 @dataclass
@@ -1,73 +1,117 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-# The file imports all the mix-in types that can be initialized
-# using reflection.
+# The file registers all the mix-in types that can be initialized using
+# reflection. The modules are imported when a runbook references their types,
+# so the startup doesn't import unused platforms, notifiers, transformers and
+# heavy packages like Azure SDK, boto3 or libvirt.
 
-import platform
+from lisa.util.subclasses import add_lazy_types
 
-import lisa.combinators.batch_combinator  # noqa: F401
-import lisa.combinators.csv_combinator  # noqa: F401
-import lisa.combinators.git_bisect_combinator  # noqa: F401
-import lisa.combinators.grid_combinator  # noqa: F401
-import lisa.notifiers.console  # noqa: F401
-import lisa.notifiers.env_stats  # noqa: F401
-import lisa.notifiers.file  # noqa: F401
-import lisa.notifiers.html  # noqa: F401
-import lisa.notifiers.junit  # noqa: F401
-import lisa.notifiers.text_result  # noqa: F401
-import lisa.runners.lisa_runner  # noqa: F401
-import lisa.sut_orchestrator.ready  # noqa: F401
+add_lazy_types(
+    "lisa.combinator.Combinator",
+    {
+        "batch": "lisa.combinators.batch_combinator",
+        "csv": "lisa.combinators.csv_combinator",
+        "git_bisect": "lisa.combinators.git_bisect_combinator",
+        "grid": "lisa.combinators.grid_combinator",
+    },
+)
 
-try:
-    import lisa.runners.legacy_runner  # noqa: F401
-except ModuleNotFoundError as e:
-    print(f"win32 package is not installed, legacy runner is not supported. [{e}]")
+add_lazy_types(
+    "lisa.notifier.Notifier",
+    {
+        "command_stats": "lisa.notifiers.command_stats",
+        "console": "lisa.notifiers.console",
+        "env_stats": "lisa.notifiers.env_stats",
+        "file": "lisa.notifiers.file",
+        "git_bisect_result": "lisa.combinators.git_bisect_combinator",
+        "html": "lisa.notifiers.html",
+        "junit": "lisa.notifiers.junit",
+        "perf_store": "lisa.notifiers.perf_store",
+        "text_result": "lisa.notifiers.text_result",
+    },
+)
 
-# Azure modules
-try:
-    import lisa.sut_orchestrator.azure.hooks  # noqa: F401
-    import lisa.sut_orchestrator.azure.transformers  # noqa: F401
-except ModuleNotFoundError as e:
-    print(f"azure package is not installed. [{e}]")
+add_lazy_types(
+    "lisa.runner.BaseRunner",
+    {
+        # legacy runner needs win32 package, which is available on Windows only.
+        "legacy": "lisa.runners.legacy_runner",
+        "lisa": "lisa.runners.lisa_runner",
+    },
+)
 
-# Baremetal modules
-try:
-    import lisa.sut_orchestrator.baremetal.build  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.cluster.cluster  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.cluster.idrac  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.cluster.rackmanager  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.ip_getter  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.platform_  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.readychecker  # noqa: F401
-    import lisa.sut_orchestrator.baremetal.source  # noqa: F401
-except ModuleNotFoundError as e:
-    print(f"baremetal package is not installed. [{e}]")
+add_lazy_types(
+    "lisa.platform_.Platform",
+    {
+        "aws": "lisa.sut_orchestrator.aws.platform_",
+        "azure": "lisa.sut_orchestrator.azure.platform_",
+        "baremetal": "lisa.sut_orchestrator.baremetal.platform_",
+        "cloud-hypervisor": "lisa.sut_orchestrator.libvirt.ch_platform",
+        "qemu": "lisa.sut_orchestrator.libvirt.qemu_platform",
+        "ready": "lisa.sut_orchestrator.ready",
+    },
+)
 
-# Aws modules
-try:
-    import lisa.sut_orchestrator.aws.platform_  # noqa: F401
-except ModuleNotFoundError as e:
-    print(f"aws package is not installed. [{e}]")
+add_lazy_types(
+    "lisa.transformer.Transformer",
+    {
+        "azure_delete": "lisa.sut_orchestrator.azure.transformers",
+        "azure_deploy": "lisa.sut_orchestrator.azure.transformers",
+        "azure_golden_image": "lisa.sut_orchestrator.azure.transformers",
+        "azure_sig": "lisa.sut_orchestrator.azure.transformers",
+        "azure_vhd": "lisa.sut_orchestrator.azure.transformers",
+        "cloudhypervisor_installer": "lisa.sut_orchestrator.libvirt.transformers",
+        "dump_variables": "lisa.transformers.dump_variables",
+        "file_uploader": "lisa.transformers.file_uploader",
+        "kernel_installer": "lisa.transformers.kernel_installer",
+        "package_installer": "lisa.transformers.package_installer",
+        "qemu_installer": "lisa.sut_orchestrator.libvirt.transformers",
+        "rpm_package_installer": "lisa.transformers.package_installer",
+        "script": "lisa.transformers.script_transformer",
+        "to_list": "lisa.transformers.to_list",
+        "upgrade": "lisa.transformers.upgrade_packages",
+    },
+)
 
-if platform.system() == "Linux":
-    # libvirt modules
-    try:
-        import lisa.sut_orchestrator.libvirt.ch_platform  # noqa: F401
-        import lisa.sut_orchestrator.libvirt.context  # noqa: F401
-        import lisa.sut_orchestrator.libvirt.platform  # noqa: F401
-        import lisa.sut_orchestrator.libvirt.qemu_platform  # noqa: F401
-        import lisa.sut_orchestrator.libvirt.schema  # noqa: F401
-        import lisa.sut_orchestrator.libvirt.transformers  # noqa: F401
-    except ModuleNotFoundError as e:
-        print(f"libvirt package is not installed. [{e}]")
+add_lazy_types(
+    "lisa.transformers.kernel_installer.BaseInstaller",
+    {
+        "dom0": "lisa.transformers.dom0_kernel_installer",
+        "dom0_binaries": "lisa.transformers.dom0_kernel_installer",
+        "rpm": "lisa.transformers.rpm_kernel_installer",
+        "source": "lisa.transformers.kernel_source_installer",
+    },
+)
 
-import lisa.transformers.dom0_kernel_installer  # noqa: F401
-import lisa.transformers.dump_variables  # noqa: F401
-import lisa.transformers.file_uploader  # noqa: F401
-import lisa.transformers.kernel_source_installer  # noqa: F401
-import lisa.transformers.package_installer  # noqa: F401
-import lisa.transformers.rpm_kernel_installer  # noqa: F401
-import lisa.transformers.script_transformer  # noqa: F401
-import lisa.transformers.to_list  # noqa: F401
-import lisa.transformers.upgrade_packages  # noqa: F401
+add_lazy_types(
+    "lisa.sut_orchestrator.baremetal.build.Build",
+    {"smb": "lisa.sut_orchestrator.baremetal.build"},
+)
+
+add_lazy_types(
+    "lisa.sut_orchestrator.baremetal.cluster.cluster.Cluster",
+    {
+        "idrac": "lisa.sut_orchestrator.baremetal.cluster.idrac",
+        "rackmanager": "lisa.sut_orchestrator.baremetal.cluster.rackmanager",
+    },
+)
+
+add_lazy_types(
+    "lisa.sut_orchestrator.baremetal.ip_getter.IpGetterChecker",
+    {"file_single": "lisa.sut_orchestrator.baremetal.ip_getter"},
+)
+
+add_lazy_types(
+    "lisa.sut_orchestrator.baremetal.readychecker.ReadyChecker",
+    {
+        "file_single": "lisa.sut_orchestrator.baremetal.readychecker",
+        "ssh": "lisa.sut_orchestrator.baremetal.readychecker",
+    },
+)
+
+add_lazy_types(
+    "lisa.sut_orchestrator.baremetal.source.Source",
+    {"ado": "lisa.sut_orchestrator.baremetal.source"},
+)
@@ -40,6 +40,7 @@ from lisa.util import (
     plugin_manager,
     subclasses,
 )
+from lisa.util.clock_sync import get_wait_until_command
 from lisa.util.constants import PATH_REMOTE_ROOT
 from lisa.util.logger import Logger, create_file_handler, get_logger, remove_handler
 from lisa.util.parallel import run_in_parallel
@@ -256,6 +257,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         encoding: str = "",
         expected_exit_code: Optional[int] = None,
         expected_exit_code_failure_message: str = "",
+        start_at: Optional[float] = None,
     ) -> ExecutableResult:
         process = self.execute_async(
             cmd,
@@ -268,6 +270,7 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
             cwd=cwd,
             update_envs=update_envs,
             encoding=encoding,
+            start_at=start_at,
         )
         return process.wait_result(
             timeout=timeout,
@@ -287,11 +290,23 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         cwd: Optional[PurePath] = None,
         update_envs: Optional[Dict[str, str]] = None,
         encoding: str = "",
+        start_at: Optional[float] = None,
     ) -> Process:
+        """
+        start_at: a timestamp of the node clock, the command waits on the node
+            until the time. It's used to start commands on nodes together,
+            refer to lisa.util.clock_sync.ClockSync.
+        """
         self.initialize()
         if isinstance(self, RemoteNode):
             self._check_bash_prompt()
 
+        if start_at is not None:
+            if not self.is_posix:
+                raise LisaException("scheduled start is supported on posix only")
+            cmd = f"{get_wait_until_command(start_at)}; {cmd}"
+            shell = True
+
         return self._execute(
             cmd,
             shell=shell,
@@ -534,7 +549,12 @@ class Node(subclasses.BaseClassWithRunbookMixin, ContextMixin, InitializableMixi
         cmd_id = str(randint(0, 10000))
         if not encoding:
             encoding = self._encoding
-        process = Process(cmd_id, self.shell, parent_logger=self.log)
+        process = Process(
+            cmd_id,
+            self.shell,
+            parent_logger=self.log,
+            node_name=self.name or f"node-{self.index}",
+        )
         process.start(
             cmd,
             shell=shell,
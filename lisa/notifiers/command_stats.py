@@ -0,0 +1,97 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from dataclasses import dataclass
+from typing import Any, List, TextIO, Type, cast
+
+from dataclasses_json import dataclass_json
+
+from lisa import messages, notifier, schema, secret
+from lisa.util import command_stats, constants
+
+
+@dataclass_json()
+@dataclass
+class CommandStatsSchema(schema.Notifier):
+    file_name: str = "command_stats.log"
+    # how many commands are listed in the slowest and most frequent sections.
+    top_count: int = 20
+
+
+class CommandStats(notifier.Notifier):
+    """
+    It writes latency statistics of commands, which are run on nodes. The
+    report lists latency percentiles by tool, and the slowest and most frequent
+    commands by node. It helps to find which tool calls are worth to batch or
+    cache.
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "command_stats"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return CommandStatsSchema
+
+    def finalize(self) -> None:
+        runbook = cast(CommandStatsSchema, self.runbook)
+        file_path = constants.RUN_LOCAL_LOG_PATH / runbook.file_name
+        statistics = command_stats.get_statistics()
+        with open(file_path, "w") as f:
+            for node_stats in sorted(statistics, key=lambda x: x.node_name):
+                self._dump_node(f, node_stats, runbook.top_count)
+        self._log.info(f"command statistics is saved to {file_path}")
+
+    def _received_message(self, message: messages.MessageBase) -> None:
+        # the statistics are collected by processes, not messages.
+        ...
+
+    def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
+        return []
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        # drop commands, which may be recorded before the notifier is created.
+        command_stats.reset()
+
+    def _dump_node(
+        self, f: TextIO, node_stats: command_stats.NodeStatistics, top_count: int
+    ) -> None:
+        f.write(f"node: {node_stats.node_name}\n\n")
+
+        f.write(
+            f"{'tool':<30} {'count':>8} {'total(s)':>10} {'p50(s)':>9} "
+            f"{'p95(s)':>9} {'p99(s)':>9} {'max(s)':>9} {'output(B)':>12}\n"
+        )
+        for tool_name, histogram in command_stats.get_tool_summary(node_stats):
+            f.write(
+                f"{tool_name:<30} {histogram.count:>8} {histogram.total:>10.3f} "
+                f"{histogram.percentile(50):>9.3f} {histogram.percentile(95):>9.3f} "
+                f"{histogram.percentile(99):>9.3f} {histogram.max:>9.3f} "
+                f"{histogram.output_bytes:>12}\n"
+            )
+        f.write("\n")
+
+        f.write("slowest commands:\n")
+        self._dump_commands(
+            f, command_stats.get_slowest_commands(node_stats, top_count)
+        )
+        f.write("most frequent commands:\n")
+        self._dump_commands(
+            f, command_stats.get_frequent_commands(node_stats, top_count)
+        )
+
+    def _dump_commands(
+        self, f: TextIO, commands: List[command_stats.CommandStatistics]
+    ) -> None:
+        f.write(
+            f"{'count':>8} {'total(s)':>10} {'avg(s)':>9} {'max(s)':>9} "
+            f"{'timeout':>7} {'tool':<20} command\n"
+        )
+        for item in commands:
+            f.write(
+                f"{item.count:>8} {item.total:>10.3f} {item.average:>9.3f} "
+                f"{item.max:>9.3f} {item.timeout_count:>7} {item.tool_name:<20} "
+                f"{secret.mask(item.command)}\n"
+            )
+        f.write("\n")
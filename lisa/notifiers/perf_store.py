@@ -0,0 +1,54 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Type, cast
+
+from dataclasses_json import dataclass_json
+
+from lisa import messages, notifier, schema
+from lisa.util import perf_store
+
+
+@dataclass_json()
+@dataclass
+class PerfStoreSchema(schema.Notifier):
+    # the path of the SQLite database. It's shared by runs, so the default path
+    # is in the runtime folder, instead of the log folder of a run.
+    path: str = ""
+
+
+class PerfStore(notifier.Notifier):
+    """
+    It appends performance messages into a local SQLite database, so results of
+    runs can be queried and compared by "lisa perf compare".
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "perf_store"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return PerfStoreSchema
+
+    def finalize(self) -> None:
+        self._store.close()
+        self._log.info(f"perf results are saved to {self._path}")
+
+    def _received_message(self, message: messages.MessageBase) -> None:
+        assert isinstance(message, messages.PerfMessage), f"actual: {type(message)}"
+        self._store.save(message)
+
+    def _subscribed_message_type(self) -> List[Type[messages.MessageBase]]:
+        return [messages.PerfMessage]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        runbook = cast(PerfStoreSchema, self.runbook)
+        self._path = (
+            Path(runbook.path).absolute()
+            if runbook.path
+            else perf_store.get_default_store_path()
+        )
+        self._store = perf_store.PerfStore(self._path)
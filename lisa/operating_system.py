@@ -1,11 +1,14 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import re
+import shlex
+import shutil
+import tempfile
 import time
 from dataclasses import dataclass
 from enum import Enum
 from functools import partial
-from pathlib import Path
+from pathlib import Path, PurePath
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -50,6 +53,7 @@ from lisa.util import (
 from lisa.util.logger import get_logger
 from lisa.util.perf_timer import create_timer
 from lisa.util.process import ExecutableResult
+from lisa.util.shell import SshShell
 from lisa.util.subclasses import Factory
 
 if TYPE_CHECKING:
@@ -359,6 +363,45 @@ class Posix(OperatingSystem, BaseClassMixin):
         package_names = self._get_package_list(packages)
         self._install_packages(package_names, signed, timeout, extra_args)
 
+    def install_packages_together(
+        self, requests: Dict[str, List[str]], timeout: int = 1200
+    ) -> Dict[str, Exception]:
+        """
+        Install packages of multiple requesters, like tools, in one transaction of
+        the package manager, so the package index and dependencies are resolved
+        once. If the transaction fails, packages of each requester are installed
+        separately, so a failure is attributed to the requester. It returns
+        failures by requester.
+        """
+        all_packages: List[str] = []
+        for packages in requests.values():
+            all_packages.extend(x for x in packages if x not in all_packages)
+        if not all_packages:
+            return {}
+
+        timer = create_timer()
+        try:
+            self.install_packages(all_packages, timeout=timeout)
+            self._log.debug(
+                f"installed {all_packages} for {list(requests.keys())} in {timer}"
+            )
+            return {}
+        except Exception as identifier:
+            self._log.debug(
+                f"failed to install packages together, "
+                f"install them by requesters: {identifier}"
+            )
+
+        failures: Dict[str, Exception] = {}
+        for requester, packages in requests.items():
+            if not packages:
+                continue
+            try:
+                self.install_packages(packages, timeout=timeout)
+            except Exception as identifier:
+                failures[requester] = identifier
+        return failures
+
     def uninstall_packages(
         self,
         packages: Union[
@@ -428,17 +471,20 @@ class Posix(OperatingSystem, BaseClassMixin):
             if self._node.capture_azure_information:
                 from lisa.tools import Chmod, Find
 
-                find_tool = self._node.tools[Find]
-                file_list = find_tool.find_files(
-                    self._node.get_pure_path("/var/log/azure/"),
-                    file_type="f",
-                    sudo=True,
-                    ignore_not_exist=True,
-                )
-                if len(file_list) > 0:
-                    self._node.tools[Chmod].update_folder(
-                        "/var/log/azure/", "a+rwX", sudo=True
+                if not self._capture_folder_by_tar(
+                    self._node.get_pure_path("/var/log/azure/"), saved_path
+                ):
+                    find_tool = self._node.tools[Find]
+                    file_list = find_tool.find_files(
+                        self._node.get_pure_path("/var/log/azure/"),
+                        file_type="f",
+                        sudo=True,
+                        ignore_not_exist=True,
                     )
+                    if len(file_list) > 0:
+                        self._node.tools[Chmod].update_folder(
+                            "/var/log/azure/", "a+rwX", sudo=True
+                        )
                 file_list.append("/var/log/waagent.log")
 
             file_list.append("/etc/os-release")
@@ -459,6 +505,27 @@ class Posix(OperatingSystem, BaseClassMixin):
                         "Please check if the file exists"
                     )
 
+    def _capture_folder_by_tar(self, node_path: PurePath, saved_path: Path) -> bool:
+        """
+        Copy back files of a folder in one tar stream by sudo. The files are saved
+        flat with .txt suffix like copying them one by one. It returns False, if
+        the node doesn't support it, so the caller can copy files one by one.
+        """
+        shell = self._node.shell
+        if not isinstance(shell, SshShell) or shell.is_sudo_required_password:
+            return False
+        with tempfile.TemporaryDirectory(dir=saved_path) as temp_dir:
+            try:
+                statistics = shell.copy_tree_back(node_path, Path(temp_dir), sudo=True)
+            except Exception as identifier:
+                self._log.debug(f"failed to copy back {node_path} by tar: {identifier}")
+                return False
+            for file in sorted(Path(temp_dir).rglob("*")):
+                if file.is_file():
+                    shutil.move(str(file), saved_path / f"{file.name}.txt")
+        self._log.debug(f"copied back {node_path}: {statistics}")
+        return True
+
     def get_package_information(
         self, package_name: str, use_cached: bool = True
     ) -> VersionInfo:
@@ -771,6 +838,12 @@ class Debian(Linux):
     end_of_life_releases: List[str] = []
     # The following signatures couldn't be verified because the public key is not available: NO_PUBKEY 0E98404D386FA1D9 NO_PUBKEY 6ED0E7B82643E131 # noqa: E501
     _key_not_available_pattern = re.compile(r"NO_PUBKEY (?P<key>[0-9A-F]{16})", re.M)
+    # E: Unable to fetch some archives, maybe run apt-get update or try with --fix-missing? # noqa: E501
+    _fetch_archives_failed_pattern = re.compile("Unable to fetch some archives", re.M)
+    # apt-get update is skipped, if it's done in the ttl, and apt sources are not
+    # changed after it. The stamp is shared by runs on the same node.
+    _package_index_ttl_minutes = 60
+    _package_index_stamp_name = "apt_update.stamp"
 
     @classmethod
     def name_pattern(cls) -> Pattern[str]:
@@ -928,12 +1001,18 @@ class Debian(Linux):
     def is_end_of_life_release(self) -> bool:
         return self.information.full_version in self.end_of_life_releases
 
+    def _initialize_package_installation(self, force: bool = False) -> None:
+        if not force and self._is_package_index_fresh():
+            self._log.debug("package index is updated recently, skip apt-get update")
+            return
+        self._update_package_index()
+
     @retry_without_exceptions(
         tries=10,
         delay=5,
         skipped_exceptions=[ReleaseEndOfLifeException, RepoNotExistException],
     )
-    def _initialize_package_installation(self) -> None:
+    def _update_package_index(self) -> None:
         # wait running system package process.
         self.wait_running_package_process()
         result = self._node.execute("apt-get update", sudo=True, timeout=1800)
@@ -955,6 +1034,28 @@ class Debian(Linux):
                 else:
                     raise RepoNotExistException(self._node.os)
         result.assert_exit_code(message="\n".join(self.get_apt_error(result.stdout)))
+        self._node.execute(
+            f"touch {self._get_package_index_stamp()}", shell=True, sudo=True
+        )
+
+    def _is_package_index_fresh(self) -> bool:
+        stamp = self._get_package_index_stamp()
+        result = self._node.execute(
+            f"find {stamp} -mmin -{self._package_index_ttl_minutes} | grep -q . && "
+            "! find /etc/apt/sources.list /etc/apt/sources.list.d "
+            f"-newer {stamp} 2>/dev/null | grep -q .",
+            shell=True,
+            no_error_log=True,
+        )
+        return result.exit_code == 0
+
+    def _get_package_index_stamp(self) -> str:
+        return shlex.quote(
+            str(
+                self._node.get_working_path().parent.parent
+                / self._package_index_stamp_name
+            )
+        )
 
     @retry_without_exceptions(
         tries=10,
@@ -989,11 +1090,17 @@ class Debian(Linux):
                 f"dpkg -i {' '.join(file_packages)}", sudo=True, timeout=timeout
             )
             # after install package, need update the repo
-            self._initialize_package_installation()
+            self._initialize_package_installation(force=True)
 
         install_result = self._node.execute(
             command, shell=True, sudo=True, timeout=timeout
         )
+        if (
+            install_result.exit_code != 0
+            and self._fetch_archives_failed_pattern.search(install_result.stdout)
+        ):
+            # the package index may be outdated, update it before next retry.
+            self._initialize_package_installation(force=True)
         # get error lines.
         install_result.assert_exit_code(
             0,
@@ -1298,9 +1405,9 @@ class Ubuntu(Debian):
         cat = self._node.tools[Cat]
         cat.run("/etc/default/grub")
 
-    def _initialize_package_installation(self) -> None:
+    def _initialize_package_installation(self, force: bool = False) -> None:
         self.wait_cloud_init_finish()
-        super()._initialize_package_installation()
+        super()._initialize_package_installation(force=force)
 
 
 @dataclass
@@ -32,6 +32,17 @@ def support_debug(parser: ArgumentParser) -> None:
     )
 
 
+def support_profile(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="Run a sampling profiler on LISA itself. The collapsed stacks and a "
+        "summary of the hottest functions are saved by phase in the 'profile' folder "
+        "of the run log path.",
+    )
+
+
 def support_variable(parser: ArgumentParser) -> None:
     parser.add_argument(
         "--variable",
@@ -77,10 +88,64 @@ def support_id(parser: ArgumentParser) -> None:
     )
 
 
+def support_perf_compare(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--baseline",
+        "-b",
+        dest="baseline",
+        required=True,
+        help="The run id of the baseline, or pairs of column names and values, "
+        "like `kernel_version=5.15.0-1051-azure,vmsize=Standard_D8s_v5`.",
+    )
+    parser.add_argument(
+        "--target",
+        "-t",
+        dest="target",
+        help="The run id or pairs like the baseline. The default is the latest run "
+        "in the store.",
+    )
+    parser.add_argument(
+        "--filter",
+        "-f",
+        dest="filters",
+        action="append",
+        help="Pairs of column names and values, which are applied on both the "
+        "baseline and the target, like `tool=fio`.",
+    )
+    parser.add_argument(
+        "--store",
+        "-s",
+        type=Path,
+        dest="store",
+        help="The path of the perf store. The default is the one of the perf_store "
+        "notifier.",
+    )
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.05,
+        help="The significance level of the t-test.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=5,
+        help="The minimum change in percentage to flag a regression.",
+    )
+    parser.add_argument(
+        "--all",
+        "-a",
+        dest="list_all",
+        action="store_true",
+        help="Display all compared metrics, not only flagged ones.",
+    )
+
+
 def parse_args() -> Namespace:
     """This wraps Python's 'ArgumentParser' to setup our CLI."""
     parser = ArgumentParser(prog="lisa")
     support_debug(parser)
+    support_profile(parser)
     support_runbook(parser, required=False)
     support_variable(parser)
     support_log_path(parser)
@@ -122,5 +187,14 @@ def parse_args() -> Namespace:
         support_runbook(sub_parser)
         support_variable(sub_parser)
         support_debug(sub_parser)
+        support_profile(sub_parser)
+
+    # Entry point for 'perf', it doesn't need a runbook.
+    perf_parser = subparsers.add_parser("perf")
+    perf_subparsers = perf_parser.add_subparsers(dest="perf_cmd", required=True)
+    compare_parser = perf_subparsers.add_parser("compare")
+    compare_parser.set_defaults(func=commands.perf_compare)
+    support_perf_compare(compare_parser)
+    support_debug(compare_parser)
 
     return parser.parse_args()
@@ -156,10 +156,18 @@ class RunbookBuilder:
                 constants.RUNBOOK_PATH, self.raw_data, self.variables
             )
             extensions = schema.Extension.from_raw(raw_extensions)
+            # the cache path is not set, if the runbook is not loaded by a run.
+            index_path: Optional[Path] = None
+            if hasattr(constants, "CACHE_PATH"):
+                index_path = constants.CACHE_PATH / "case_index"
             for index, extension in enumerate(extensions):
                 if not extension.name:
                     extension.name = f"lisa_ext_{index}"
-                import_package(Path(extension.path), extension.name)
+                import_package(
+                    Path(extension.path),
+                    extension.name,
+                    cache_path=index_path if extension.lazy_import else None,
+                )
 
             del self._raw_data[constants.EXTENSION]
 
@@ -30,9 +30,11 @@ from lisa.util import (
     KernelPanicException,
     LisaException,
     NotMeetRequirementException,
+    artifact_proxy,
     constants,
     deep_update_dict,
     is_unittest,
+    profiler,
 )
 from lisa.util.parallel import Task, check_cancelled
 from lisa.variable import VariableEntry
@@ -62,6 +64,7 @@ class LisaRunner(BaseRunner):
 
         # load development settings
         development.load_development_settings(self._runbook.dev)
+        artifact_proxy.load_artifact_proxy_settings(self._runbook.artifact_proxy)
 
         # set flag to enable guest nodes.
         self._guest_enabled = self.platform.runbook.guest_enabled
@@ -289,6 +292,12 @@ class LisaRunner(BaseRunner):
 
     def _deploy_environment_task(
         self, environment: Environment, test_results: List[TestResult]
+    ) -> None:
+        with profiler.phase(profiler.PHASE_DEPLOY):
+            self._deploy_environment(environment, test_results)
+
+    def _deploy_environment(
+        self, environment: Environment, test_results: List[TestResult]
     ) -> None:
         try:
             try:
@@ -321,7 +330,8 @@ class LisaRunner(BaseRunner):
         self._log.debug(f"start initializing task on '{environment.name}'")
         assert test_results
         try:
-            environment.initialize()
+            with profiler.phase(profiler.PHASE_DEPLOY):
+                environment.initialize()
             assert (
                 environment.status == EnvironmentStatus.Connected
             ), f"actual: {environment.status}"
@@ -343,6 +353,15 @@ class LisaRunner(BaseRunner):
         environment: Environment,
         test_results: List[TestResult],
         case_variables: Dict[str, VariableEntry],
+    ) -> None:
+        with profiler.phase(profiler.PHASE_TEST):
+            self._run_test(environment, test_results, case_variables)
+
+    def _run_test(
+        self,
+        environment: Environment,
+        test_results: List[TestResult],
+        case_variables: Dict[str, VariableEntry],
     ) -> None:
         self._log.debug(
             f"start running cases on '{environment.name}', "
@@ -455,7 +474,8 @@ class LisaRunner(BaseRunner):
         success = True
         try:
             try:
-                self.platform.prepare_environment(environment)
+                with profiler.phase(profiler.PHASE_PREPARE):
+                    self.platform.prepare_environment(environment)
                 self._reset_awaitable_timer("prepare")
             except ResourceAwaitableException as identifier:
                 # if timed out, raise the exception and skip the test case. If
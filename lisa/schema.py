@@ -266,6 +266,9 @@ class Include:
 class Extension:
     path: str
     name: Optional[str] = None
+    # import modules of test suites, when they are selected. The test cases are
+    # selected by an index, which is parsed from source code.
+    lazy_import: bool = True
 
     @classmethod
     def from_raw(cls, raw_data: Any) -> List["Extension"]:
@@ -1552,6 +1555,20 @@ class Development:
     jump_boxes: List[ProxyConnectionInfo] = field(default_factory=list)
 
 
+@dataclass_json()
+@dataclass
+class ArtifactProxy:
+    enabled: bool = True
+    # the folder of cached artifacts. The default is in the cache folder.
+    path: str = ""
+    # don't access internet, artifacts must be in the cache folder already.
+    offline: bool = False
+    # fetch updates of cached git repos, before pushing them to nodes.
+    update_git: bool = True
+    # url prefixes to serve. If it's empty, all http and https urls are served.
+    include: List[str] = field(default_factory=list)
+
+
 @dataclass_json()
 @dataclass
 class Runbook:
@@ -1577,6 +1594,7 @@ class Runbook:
         default_factory=list, metadata=field_metadata(data_key=constants.TESTCASE)
     )
     dev: Optional[Development] = field(default=None)
+    artifact_proxy: Optional[ArtifactProxy] = field(default=None)
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         if not self.platform:
@@ -83,6 +83,7 @@ from lisa.util.perf_timer import create_timer
 from lisa.util.shell import wait_tcp_port_ready
 
 from .. import AZURE
+from . import hooks  # noqa: F401
 from . import features
 from .common import (
     AZURE_SHARED_RG_NAME,
@@ -1,7 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-from dataclasses import dataclass, field
+import importlib
+from dataclasses import dataclass, field, fields
 from pathlib import PurePosixPath
 from typing import Any, Dict, List, Type, cast
 
@@ -11,9 +12,11 @@ from marshmallow import validate
 from retry import retry
 
 from lisa import schema
-from lisa.environment import Environments, EnvironmentSpace
+from lisa.environment import Environment, Environments, EnvironmentSpace
+from lisa.executable import Tool
 from lisa.features import StartStop
 from lisa.node import Node, RemoteNode
+from lisa.operating_system import Posix
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.platform_ import load_platform_from_builder
 from lisa.transformer import Transformer
@@ -292,15 +295,7 @@ class DeployTransformer(Transformer):
         platform = _load_platform(self._runbook_builder, self.type_name())
         runbook: DeployTransformerSchema = self.runbook
 
-        envs = Environments()
-        environment_requirement = EnvironmentSpace()
-        environment_requirement.nodes.append(runbook.requirement)
-        environment = envs.from_requirement(environment_requirement)
-        assert environment
-
-        platform.prepare_environment(environment=environment)
-
-        platform.deploy_environment(environment)
+        environment = _deploy_environment(platform, runbook.requirement)
 
         resource_group_name = get_environment_context(environment).resource_group_name
 
@@ -351,6 +346,22 @@ class DeleteTransformer(Transformer):
         return {}
 
 
+def _deploy_environment(
+    platform: AzurePlatform, requirement: schema.Capability
+) -> Environment:
+    envs = Environments()
+    environment_requirement = EnvironmentSpace()
+    environment_requirement.nodes.append(requirement)
+    environment = envs.from_requirement(environment_requirement)
+    assert environment
+
+    platform.prepare_environment(environment=environment)
+
+    platform.deploy_environment(environment)
+
+    return environment
+
+
 def _load_platform(
     runbook_builder: RunbookBuilder, transformer_name: str
 ) -> AzurePlatform:
@@ -581,3 +592,143 @@ class SharedGalleryImageTransformer(Transformer):
 
         self._log.info(f"SIG Url: {sig_url}")
         return {self.__sig_name: sig_url}
+
+
+@dataclass_json
+@dataclass
+class GoldenImageTransformerSchema(SigTransformerSchema):
+    """
+    transformer:
+        - type: azure_golden_image
+            requirement:
+              azure:
+                marketplace: canonical 0001-com-ubuntu-server-jammy 22_04-lts latest
+                location: westus3
+            packages:
+              - build-essential
+            tools:
+              - Fio
+              - Ntttcp
+              - Lagscope
+            gallery_image_location:
+              - westus3
+            gallery_image_name: perf_image
+            gallery_image_fullname: Microsoft Ubuntu perf 0.0.1
+            rename:
+              azure_golden_image_url: shared_gallery
+    """
+
+    # the vhd is exported from the deployed VM, so it's not required.
+    vhd: str = ""
+    requirement: schema.Capability = field(default_factory=schema.Capability)
+    # distro packages, which are installed before tools.
+    packages: List[str] = field(default_factory=list)
+    # tool class names in lisa.tools, or full names like
+    # "microsoft.testsuites.dpdk.dpdktestpmd.DpdkTestpmd".
+    tools: List[str] = field(default_factory=list)
+    # keep the deployed VM for troubleshooting. It's deprovisioned and stopped
+    # already, so it cannot be used to run tests.
+    keep_environment: bool = False
+
+
+class GoldenImageTransformer(Transformer):
+    """
+    deploy a VM, install tools on it, and publish it as a shared gallery image.
+    So test runs can deploy VMs with tools installed already.
+    """
+
+    __sig_name = "url"
+    __vhd_name = "vhd"
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "azure_golden_image"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return GoldenImageTransformerSchema
+
+    @property
+    def _output_names(self) -> List[str]:
+        return [self.__sig_name, self.__vhd_name]
+
+    def _internal_run(self) -> Dict[str, Any]:
+        runbook: GoldenImageTransformerSchema = self.runbook
+        # resolve tools before deployment, so typos fail fast.
+        tool_types = [_get_tool_type(x) for x in runbook.tools]
+        platform = _load_platform(self._runbook_builder, self.type_name())
+
+        environment = _deploy_environment(platform, runbook.requirement)
+        try:
+            resource_group_name = get_environment_context(
+                environment
+            ).resource_group_name
+            node = cast(RemoteNode, environment.default_node)
+            self._preload(environment, node, tool_types)
+
+            vhd_runbook = VhdTransformerSchema(
+                type=VhdTransformer.type_name(),
+                name=f"{self.name}_vhd",
+                extended_schemas=runbook.extended_schemas,
+                resource_group_name=resource_group_name,
+                vm_name=node.name,
+                file_name_part=runbook.gallery_image_name,
+            )
+            vhd_url = VhdTransformer(
+                vhd_runbook, self._runbook_builder
+            )._internal_run()["url"]
+
+            # copy settings of gallery to the runbook of sig transformer.
+            sig_values = {
+                x.name: getattr(runbook, x.name)
+                for x in fields(SigTransformerSchema)
+                if x.name not in [y.name for y in fields(schema.Transformer)]
+            }
+            sig_values["vhd"] = vhd_url
+            sig_runbook = SigTransformerSchema(
+                type=SharedGalleryImageTransformer.type_name(),
+                name=f"{self.name}_sig",
+                extended_schemas=runbook.extended_schemas,
+                **sig_values,
+            )
+            sig_url = SharedGalleryImageTransformer(
+                sig_runbook, self._runbook_builder
+            )._internal_run()["url"]
+        finally:
+            if not runbook.keep_environment:
+                platform.delete_environment(environment)
+
+        return {self.__sig_name: sig_url, self.__vhd_name: vhd_url}
+
+    def _preload(
+        self, environment: Environment, node: RemoteNode, tool_types: List[Type[Tool]]
+    ) -> None:
+        runbook: GoldenImageTransformerSchema = self.runbook
+        if runbook.packages:
+            if not isinstance(node.os, Posix):
+                raise LisaException(
+                    f"packages are supported on Linux only, but it's {node.os.name}"
+                )
+            node.os.install_packages(runbook.packages)
+        if tool_types:
+            environment.ensure_tools(tool_types, nodes=[node])
+
+        # remove files of the run, like source code of tools. Installed tools are
+        # kept in system paths.
+        node.execute(
+            f"rm -rf {node.working_path}", shell=True, sudo=True, no_error_log=True
+        )
+
+
+def _get_tool_type(name: str) -> Type[Tool]:
+    if "." in name:
+        module_name, _, class_name = name.rpartition(".")
+    else:
+        module_name, class_name = "lisa.tools", name
+    try:
+        tool_type = getattr(importlib.import_module(module_name), class_name, None)
+    except ImportError as identifier:
+        raise LisaException(f"cannot import tool '{name}': {identifier}")
+    if not (isinstance(tool_type, type) and issubclass(tool_type, Tool)):
+        raise LisaException(f"cannot find tool '{name}'")
+    return tool_type
@@ -3,15 +3,113 @@
 
 import re
 from functools import partial
-from typing import Callable, Dict, List, Mapping, Optional, Pattern, Set, Union, cast
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
 from lisa import schema
 from lisa.testsuite import TestCaseMetadata, TestCaseRuntimeData, get_cases_metadata
-from lisa.util import LisaException, constants, set_filtered_fields
+from lisa.util import LisaException, constants, package, set_filtered_fields
+from lisa.util.case_index import iter_cases
 from lisa.util.logger import get_logger
 
 _get_logger = partial(get_logger, "init", "selector")
 
+# the criteria are matched by regular expression.
+_STRING_CRITERIA = [
+    constants.NAME,
+    constants.TESTCASE_CRITERIA_AREA,
+    constants.TESTCASE_CRITERIA_CATEGORY,
+]
+# the criteria are matched by one of values.
+_VALUE_CRITERIA = [
+    constants.TESTCASE_CRITERIA_PRIORITY,
+    constants.TESTCASE_CRITERIA_TAGS,
+]
+
+
+class _CaseTable:
+    """
+    The indexes of cases by values of criteria fields. A filter looks up cases
+    by distinct values, instead of matching every case. The regular expression
+    results are cached, so the same pattern in many filters is matched once.
+    """
+
+    def __init__(self, cases: Mapping[str, Any]) -> None:
+        self.all = set(cases.keys())
+        self._positions = {name: index for index, name in enumerate(cases.keys())}
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {
+            key: {} for key in _STRING_CRITERIA + _VALUE_CRITERIA
+        }
+        for name, case in cases.items():
+            for key in _STRING_CRITERIA + [constants.TESTCASE_CRITERIA_PRIORITY]:
+                self._indexes[key].setdefault(getattr(case, key), set()).add(name)
+            for tag in case.tags:
+                self._indexes[constants.TESTCASE_CRITERIA_TAGS].setdefault(
+                    tag, set()
+                ).add(name)
+        self._string_cache: Dict[Tuple[str, str], Set[str]] = {}
+
+    def match_string(self, key: str, pattern: str) -> Set[str]:
+        cache_key = (key, pattern)
+        matched = self._string_cache.get(cache_key)
+        if matched is None:
+            expression = re.compile(pattern)
+            matched = set()
+            for value, names in self._indexes[key].items():
+                if expression.fullmatch(value):
+                    matched.update(names)
+            self._string_cache[cache_key] = matched
+        return matched
+
+    def match_values(self, key: str, values: List[Any]) -> Set[str]:
+        index = self._indexes[key]
+        matched: Set[str] = set()
+        for value in values:
+            matched.update(index.get(value, set()))
+        return matched
+
+    def sort(self, names: Iterable[str]) -> List[str]:
+        # keep the order of cases in the full list.
+        return sorted(names, key=self._positions.__getitem__)
+
+
+class _CompiledFilter:
+    """
+    A filter, which criteria are validated and normalized once. All criteria are
+    AND condition, so cases are intersected from the smallest matched set.
+    """
+
+    def __init__(self, case_runbook: schema.TestCase) -> None:
+        self.runbook = case_runbook
+        self.criteria: List[Tuple[str, Any]] = []
+        criteria_runbook = case_runbook.criteria
+        assert criteria_runbook, "test case criteria cannot be None"
+        for runbook_key, runbook_value in criteria_runbook.__dict__.items():
+            # the value may be 0 in priority, it shouldn't be skipped.
+            if runbook_value is None or runbook_value == "":
+                continue
+            if runbook_key in _STRING_CRITERIA:
+                # compile it to raise errors earlier.
+                re.compile(runbook_value)
+                self.criteria.append((runbook_key, runbook_value))
+            elif runbook_key in _VALUE_CRITERIA:
+                if not isinstance(runbook_value, list):
+                    runbook_value = [runbook_value]
+                self.criteria.append((runbook_key, runbook_value))
+            else:
+                raise LisaException(f"unknown criteria key: {runbook_key}")
+
+    def match(self, table: _CaseTable) -> Set[str]:
+        matched_sets: List[Set[str]] = []
+        for key, value in self.criteria:
+            if key in _STRING_CRITERIA:
+                matched_sets.append(table.match_string(key, value))
+            else:
+                matched_sets.append(table.match_values(key, value))
+        if not matched_sets:
+            return set(table.all)
+        matched_sets.sort(key=len)
+        return matched_sets[0].intersection(*matched_sets[1:])
+
 
 def select_testcases(
     filters: Optional[List[schema.TestCase]] = None,
@@ -26,14 +124,23 @@ def select_testcases(
         for item in init_cases:
             full_list[item.full_name] = item
     else:
+        _import_selected_modules(filters)
         full_list = get_cases_metadata()
     if filters:
+        # compile all filters before selecting, so invalid filters fail early.
+        compiled_filters = [_CompiledFilter(filter_) for filter_ in filters]
+        table = _CaseTable(full_list)
         selected: Dict[str, TestCaseRuntimeData] = {}
         force_included: Set[str] = set()
         force_excluded: Set[str] = set()
-        for filter_ in filters:
+        for compiled_filter in compiled_filters:
             selected = _apply_filter(
-                filter_, selected, force_included, force_excluded, full_list
+                compiled_filter,
+                table,
+                selected,
+                force_included,
+                force_excluded,
+                full_list,
             )
         results: List[TestCaseRuntimeData] = []
         for case in selected.values():
@@ -61,55 +168,37 @@ def select_testcases(
     return results
 
 
-def _match_string(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata],
-    pattern: Pattern[str],
-    attr_name: str,
-) -> bool:
-    content = cast(str, getattr(case, attr_name))
-    match = pattern.fullmatch(content)
-    return match is not None
-
-
-def _match_priority(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata], pattern: Union[int, List[int]]
-) -> bool:
-    priority = case.priority
-    is_matched: bool = False
-    if isinstance(pattern, int):
-        is_matched = priority == pattern
-    else:
-        is_matched = any(x == priority for x in pattern)
-    return is_matched
-
-
-def _match_tags(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata],
-    criteria_tags: Union[str, List[str]],
-) -> bool:
-    case_tags = case.tags
-    is_matched: bool = False
-    if isinstance(criteria_tags, str):
-        is_matched = criteria_tags in case_tags
-    else:
-        is_matched = any(x in case_tags for x in criteria_tags)
-    return is_matched
-
+def _import_selected_modules(filters: Optional[List[schema.TestCase]]) -> None:
+    """
+    Import deferred modules of extensions, which have cases may be included by
+    filters. Only include actions add cases from the full list, so other actions
+    don't need more modules.
+    """
+    pending_modules = package.get_pending_modules()
+    if not pending_modules:
+        return
+    if not filters:
+        package.import_pending_modules()
+        return
 
-def _match_cases(
-    candidates: Mapping[str, Union[TestCaseRuntimeData, TestCaseMetadata]],
-    patterns: List[Callable[[Union[TestCaseRuntimeData, TestCaseMetadata]], bool]],
-) -> Dict[str, TestCaseRuntimeData]:
-    changed_cases: Dict[str, TestCaseRuntimeData] = {}
+    cases = {f"{x.module}:{x.full_name}": x for x in iter_cases(pending_modules)}
+    table = _CaseTable(cases)
+    modules: Set[str] = set()
+    for filter_ in filters:
+        if filter_.select_action in [
+            constants.TESTCASE_SELECT_ACTION_INCLUDE,
+            constants.TESTCASE_SELECT_ACTION_FORCE_INCLUDE,
+        ]:
+            matched = _CompiledFilter(filter_).match(table)
+            modules.update(cases[name].module for name in matched)
 
-    for candidate_name in candidates:
-        candidate = candidates[candidate_name]
-        is_matched = all(pattern(candidate) for pattern in patterns)
-        if is_matched:
-            if isinstance(candidate, TestCaseMetadata):
-                candidate = TestCaseRuntimeData(candidate)
-            changed_cases[candidate_name] = candidate
-    return changed_cases
+    log = _get_logger()
+    log.debug(
+        f"importing {len(modules)} of {len(pending_modules)} deferred modules "
+        f"by index: {sorted(modules)}"
+    )
+    # keep the order of modules, so cases are registered in the same order.
+    package.import_pending_modules(x for x in pending_modules if x in modules)
 
 
 def _apply_settings(
@@ -135,62 +224,29 @@ def _force_check(
     is_force: bool,
     force_expected_set: Set[str],
     force_exclusive_set: Set[str],
-    temp_force_exclusive_set: Set[str],
     case_runbook: schema.TestCase,
 ) -> bool:
     is_skip = False
     if name in force_exclusive_set:
         if is_force:
             raise LisaException(f"case {name} has force conflict on {case_runbook}")
-        else:
-            temp_force_exclusive_set.add(name)
         is_skip = True
     if not is_skip and is_force:
         force_expected_set.add(name)
     return is_skip
 
 
-def _apply_filter(  # noqa: C901
-    case_runbook: schema.TestCase,
+def _apply_filter(
+    compiled_filter: _CompiledFilter,
+    table: _CaseTable,
     current_selected: Dict[str, TestCaseRuntimeData],
     force_included: Set[str],
     force_excluded: Set[str],
     full_list: Dict[str, TestCaseMetadata],
 ) -> Dict[str, TestCaseRuntimeData]:
-    # TODO: Reduce this function's complexity and remove the disabled warning.
-
     log = _get_logger()
-    # initialize criteria
-    patterns: List[Callable[[Union[TestCaseRuntimeData, TestCaseMetadata]], bool]] = []
-    criteria_runbook = case_runbook.criteria
-    assert criteria_runbook, "test case criteria cannot be None"
-    criteria_runbook_dict = criteria_runbook.__dict__
-    for runbook_key, runbook_value in criteria_runbook_dict.items():
-        # the value may be 0 in priority, it shouldn't be skipped.
-        if runbook_value is None or runbook_value == "":
-            continue
-        if runbook_key in [
-            constants.NAME,
-            constants.TESTCASE_CRITERIA_AREA,
-            constants.TESTCASE_CRITERIA_CATEGORY,
-        ]:
-            pattern = cast(str, criteria_runbook_dict[runbook_key])
-            expression = re.compile(pattern)
-            patterns.append(
-                partial(_match_string, pattern=expression, attr_name=runbook_key)
-            )
-        elif runbook_key == constants.TESTCASE_CRITERIA_PRIORITY:
-            priority_pattern = cast(
-                Union[int, List[int]], criteria_runbook_dict[runbook_key]
-            )
-            patterns.append(partial(_match_priority, pattern=priority_pattern))
-        elif runbook_key == constants.TESTCASE_CRITERIA_TAGS:
-            tag_pattern = cast(
-                Union[str, List[str]], criteria_runbook_dict[runbook_key]
-            )
-            patterns.append(partial(_match_tags, criteria_tags=tag_pattern))
-        else:
-            raise LisaException(f"unknown criteria key: {runbook_key}")
+    case_runbook = compiled_filter.runbook
+    matched = compiled_filter.match(table)
 
     # match by select Action:
     changed_cases: Dict[str, TestCaseRuntimeData] = {}
@@ -203,55 +259,43 @@ def _apply_filter(  # noqa: C901
         constants.TESTCASE_SELECT_ACTION_INCLUDE,
         constants.TESTCASE_SELECT_ACTION_FORCE_INCLUDE,
     ]
-    temp_force_set: Set[str] = set()
     if case_runbook.select_action == constants.TESTCASE_SELECT_ACTION_NONE:
         # Just apply settings on test cases
-        changed_cases = _match_cases(current_selected, patterns)
+        changed_cases = {
+            name: case for name, case in current_selected.items() if name in matched
+        }
     elif case_runbook.select_action in [
         constants.TESTCASE_SELECT_ACTION_INCLUDE,
         constants.TESTCASE_SELECT_ACTION_FORCE_INCLUDE,
     ]:
         # to include cases
-        changed_cases = _match_cases(full_list, patterns)
-        for name, new_case_data in changed_cases.items():
+        for name in table.sort(matched):
             is_skip = _force_check(
-                name,
-                is_force,
-                force_included,
-                force_excluded,
-                temp_force_set,
-                case_runbook,
+                name, is_force, force_included, force_excluded, case_runbook
             )
             if is_skip:
                 continue
 
             # reuse original test cases
-            case_data = current_selected.get(name, new_case_data)
-            current_selected[name] = case_data
+            case_data = current_selected.get(name)
+            if case_data is None:
+                case_data = TestCaseRuntimeData(full_list[name])
+                current_selected[name] = case_data
             changed_cases[name] = case_data
     elif case_runbook.select_action in [
         constants.TESTCASE_SELECT_ACTION_EXCLUDE,
         constants.TESTCASE_SELECT_ACTION_FORCE_EXCLUDE,
     ]:
-        changed_cases = _match_cases(current_selected, patterns)
-        for name in changed_cases:
+        for name in [x for x in current_selected if x in matched]:
             is_skip = _force_check(
-                name,
-                is_force,
-                force_excluded,
-                force_included,
-                temp_force_set,
-                case_runbook,
+                name, is_force, force_excluded, force_included, case_runbook
             )
             if is_skip:
                 continue
-            del current_selected[name]
+            changed_cases[name] = current_selected.pop(name)
     else:
         raise LisaException(f"unknown selectAction: '{case_runbook.select_action}'")
 
-    # changed set cannot be operated in it's for loop, so update it here.
-    for name in temp_force_set:
-        del changed_cases[name]
     if is_update_setting:
         for case_data in changed_cases.values():
             _apply_settings(case_data, case_runbook, case_runbook.select_action)
@@ -259,7 +303,8 @@ def _apply_filter(  # noqa: C901
     log.debug(
         f"applying action: [{case_runbook.select_action}] on "
         f"case [{changed_cases.keys()}], "
-        f"data: {case_runbook}, loaded criteria count: {len(patterns)}"
+        f"data: {case_runbook}, loaded criteria count: "
+        f"{len(compiled_filter.criteria)}"
     )
 
     return current_selected
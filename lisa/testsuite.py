@@ -17,6 +17,7 @@ from retry.api import retry_call
 
 from lisa import notifier, schema, search_space
 from lisa.environment import Environment, EnvironmentSpace, EnvironmentStatus
+from lisa.executable import Tool
 from lisa.feature import Feature
 from lisa.features import SerialConsole
 from lisa.messages import TestResultMessage, TestStatus, _is_completed_status
@@ -437,7 +438,12 @@ class TestSuiteMetadata:
         requirement: TestCaseRequirement = DEFAULT_REQUIREMENT,
         owner: str = "Microsoft",
         full_name: str = "",
+        tools: Optional[List[Type[Tool]]] = None,
     ) -> None:
+        """
+        tools: tools used by test cases. Their existence is checked together on
+            nodes, before test cases run.
+        """
         self.name = name
         self.full_name = full_name
         self.cases: List[TestCaseMetadata] = []
@@ -452,6 +458,7 @@ class TestSuiteMetadata:
         self.description = description
         self.requirement = requirement
         self.owner = owner
+        self.tools: List[Type[Tool]] = tools if tools else []
 
     def __call__(self, test_class: Type[TestSuite]) -> Callable[..., object]:
         self.test_class = test_class
@@ -606,6 +613,8 @@ class TestSuite:
             raise LisaException("before_suite is not supported. Please use before_case")
         if hasattr(self, "after_suite"):
             raise LisaException("after_suite is not supported. Please use after_case")
+        if self._metadata.tools:
+            self.__prefetch_tools(environment)
         #  replace to case's logger temporarily
         for case_result in case_results:
             case_name = case_result.runtime_data.name
@@ -684,6 +693,16 @@ class TestSuite:
     def stop(self) -> None:
         self._should_stop = True
 
+    def __prefetch_tools(self, environment: Environment) -> None:
+        # it saves time only, so failures don't block test cases.
+        for node in environment.nodes.list():
+            try:
+                node.tools.prefetch(self._metadata.tools)
+            except Exception as identifier:
+                self.__log.debug(
+                    f"failed to prefetch tools on node '{node.name}': {identifier}"
+                )
+
     def __save_serial_log(self, environment: Environment, log_path: Path) -> None:
         nodes = environment.nodes
         for node in nodes.list():
@@ -48,7 +48,7 @@ from .hwclock import Hwclock
 from .hyperv import HyperV
 from .interrupt_inspector import InterruptInspector
 from .ip import Ip, IpInfo
-from .iperf3 import Iperf3
+from .iperf3 import Iperf3, Iperf3Result
 from .journalctl import Journalctl
 from .kdump import KdumpBase
 from .kernel_config import KernelConfig
@@ -74,6 +74,7 @@ from .netperf import Netperf
 from .nfs_client import NFSClient
 from .nfs_server import NFSServer
 from .nm import Nm
+from .node_metrics import NodeMetrics, NodeMetricsResult
 from .nproc import Nproc
 from .ntp import Ntp
 from .ntpstat import Ntpstat
@@ -155,6 +156,7 @@ __all__ = [
     "Ip",
     "IpInfo",
     "Iperf3",
+    "Iperf3Result",
     "HibernationSetup",
     "Hostname",
     "Hwclock",
@@ -191,6 +193,8 @@ __all__ = [
     "NFSClient",
     "NFSServer",
     "Nm",
+    "NodeMetrics",
+    "NodeMetricsResult",
     "Nproc",
     "Ntp",
     "Ntpstat",
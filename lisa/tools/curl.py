@@ -1,6 +1,7 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 import re
+import shlex
 from pathlib import PurePath
 from typing import Optional, cast
 
@@ -9,6 +10,7 @@ from semver import VersionInfo
 from lisa.executable import Tool
 from lisa.operating_system import Posix
 from lisa.util import LisaException
+from lisa.util.artifact_proxy import get_artifact_proxy
 from lisa.util.process import ExecutableResult
 
 
@@ -17,6 +19,12 @@ class Curl(Tool):
     _version_pattern = re.compile(
         r"curl (?P<major>\d+).(?P<minor>(\d+)).(?P<patch>(\d+)) ", re.M
     )
+    # the requests with these arguments are not simple downloads, so they are
+    # not served by the artifact proxy.
+    _not_proxy_arguments = re.compile(
+        r"^(-[a-zA-Z]*[dXTFHIu][a-zA-Z]*|"
+        r"--(data.*|request|upload-file|form|header|head|user))$"
+    )
 
     @property
     def command(self) -> str:
@@ -44,6 +52,7 @@ class Curl(Tool):
         cwd: Optional[PurePath] = None,
     ) -> ExecutableResult:
         err_msg = "curl fetch failed"
+        url = self._get_proxy_url(url, arg)
         cmd_arg = f" {arg} {url}"
         if execute_arg:
             cmd_arg = f"{cmd_arg} | sh {execute_arg}"
@@ -57,6 +66,15 @@ class Curl(Tool):
         )
         return result
 
+    def _get_proxy_url(self, url: str, arg: str) -> str:
+        proxy = get_artifact_proxy(url, self.node)
+        if not proxy or any(
+            self._not_proxy_arguments.match(x) for x in shlex.split(arg)
+        ):
+            return url
+        node_path = proxy.push_file(self.node, url)
+        return f"file://{node_path}"
+
     def get_version(
         self,
         sudo: bool = False,
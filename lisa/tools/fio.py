@@ -1,30 +1,61 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import bisect
+import itertools
+import json
 import pathlib
 import re
+import statistics
+from dataclasses import dataclass, field
 from decimal import Decimal
 from enum import Enum
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, cast
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, cast
 
 from lisa.executable import Tool
-from lisa.messages import DiskPerformanceMessage, create_perf_message
+from lisa.messages import (
+    DiskInterferencePerformanceMessage,
+    DiskPerformanceMessage,
+    create_perf_message,
+)
 from lisa.operating_system import BSD, CBLMariner, CentOs, Debian, Posix, Redhat, Suse
 from lisa.util import LisaException, RepoNotExistException, constants
+from lisa.util.build_cache import BuildCache
+from lisa.util.perf_parser import to_decimal
 from lisa.util.process import Process
 
+from .echo import Echo
 from .git import Git
 
 if TYPE_CHECKING:
     from lisa.testsuite import TestResult
 
 
+@dataclass
 class FIOResult:
     qdepth: int = 0
     mode: str = ""
     iops: Decimal = Decimal(0)
     latency: Decimal = Decimal(0)
     iodepth: int = 0
+    # below fields are filled by json+ output only.
+    # KiB/s
+    bandwidth: Decimal = Decimal(0)
+    # completion latency percentiles in usec, like {"99.9": Decimal(210.5)}
+    latency_percentiles: Dict[str, Decimal] = field(default_factory=dict)
+    # completion latency histogram, the key is the bin in nsec, the value is
+    # the count of IOs.
+    latency_histogram: Dict[int, int] = field(default_factory=dict)
+
 
+# the percentiles are reported by json+ output, and the key is the name in
+# performance messages.
+FIO_PERCENTILES: Dict[str, str] = {
+    "50": "p50",
+    "90": "p90",
+    "99": "p99",
+    "99.9": "p99_9",
+    "99.99": "p99_99",
+}
 
 FIOMODES = Enum(
     "FIOMODES",
@@ -37,6 +68,77 @@ FIOMODES = Enum(
 )
 
 
+def get_histogram_percentiles(
+    histogram: Dict[int, int], percentiles: Iterable[str]
+) -> Dict[str, Decimal]:
+    """
+    Percentiles in usec from the latency histogram of json+ output, which is
+    in nsec.
+    """
+    bins = sorted(histogram.items())
+    cumulative = list(itertools.accumulate(count for _, count in bins))
+    result: Dict[str, Decimal] = {}
+    if not cumulative or not cumulative[-1]:
+        return result
+    for percentile in percentiles:
+        rank = float(percentile) / 100 * cumulative[-1]
+        index = min(bisect.bisect_left(cumulative, rank), len(bins) - 1)
+        result[percentile] = Decimal(bins[index][0]) / 1000
+    return result
+
+
+def get_aggregated_results(results_list: List[List[FIOResult]]) -> List[FIOResult]:
+    """
+    Aggregate results of targets, which run the same steps at the same time.
+    Results are matched by mode and qdepth. IOPS and bandwidth are summed, and
+    the mean latency is weighted by IOPS. Percentiles are from the merged
+    histogram, or they are the max of targets, if there is no histogram.
+    """
+    steps: Dict[Tuple[str, int], List[FIOResult]] = {}
+    for results in results_list:
+        for result in results:
+            steps.setdefault((result.mode, result.qdepth), []).append(result)
+
+    aggregated_results: List[FIOResult] = []
+    for items in steps.values():
+        fio_result = FIOResult()
+        fio_result.mode = items[0].mode
+        fio_result.qdepth = items[0].qdepth
+        fio_result.iodepth = items[0].iodepth
+        fio_result.iops = sum((x.iops for x in items), Decimal(0))
+        fio_result.bandwidth = sum((x.bandwidth for x in items), Decimal(0))
+        if fio_result.iops:
+            fio_result.latency = (
+                sum((x.latency * x.iops for x in items), Decimal(0)) / fio_result.iops
+            )
+        histogram: Dict[int, int] = {}
+        for item in items:
+            for key, value in item.latency_histogram.items():
+                histogram[key] = histogram.get(key, 0) + value
+        fio_result.latency_histogram = histogram
+        if all(x.latency_histogram for x in items):
+            fio_result.latency_percentiles = get_histogram_percentiles(
+                histogram, FIO_PERCENTILES.keys()
+            )
+        else:
+            fio_result.latency_percentiles = {
+                key: max(x.latency_percentiles.get(key, Decimal(0)) for x in items)
+                for key in FIO_PERCENTILES.keys()
+                if any(key in x.latency_percentiles for x in items)
+            }
+        aggregated_results.append(fio_result)
+    return aggregated_results
+
+
+def get_fairness_index(values: List[float]) -> float:
+    # Jain's fairness index, it's 1 if all values are equal, and 1/n if one
+    # value takes all.
+    square_sum = sum(x * x for x in values)
+    if not square_sum:
+        return 0
+    return sum(values) ** 2 / (len(values) * square_sum)
+
+
 class Fio(Tool):
     fio_repo = "https://github.com/axboe/fio/"
     branch = "fio-3.29"
@@ -50,6 +152,11 @@ class Fio(Tool):
         r"([\w\W]*?)IOPS=(?P<iops>.+?),([\w\W]*?).* lat.*avg=(?P<latency>.+?),",
         re.M | re.IGNORECASE,
     )
+    # fio may print notes before json, like
+    # note: both iodepth >= 1 and synchronous I/O engine are selected, ...
+    # {
+    #   "fio version" : "fio-3.29",
+    _json_pattern = re.compile(r"^[^{]*(?P<json>{[\w\W]*})[^}]*$")
 
     @property
     def command(self) -> str:
@@ -187,6 +294,161 @@ class Fio(Tool):
 
         return process
 
+    def launch_sweep(
+        self,
+        name: str,
+        filename: str,
+        modes: List[str],
+        iodepths: List[int],
+        numjobs: Optional[List[int]] = None,
+        numjob: int = 0,
+        time: int = 120,
+        ssh_timeout: int = 6400,
+        block_size: str = "4K",
+        size_gb: int = 0,
+        direct: bool = True,
+        overwrite: bool = False,
+        time_based: bool = False,
+        cwd: Optional[pathlib.PurePath] = None,
+    ) -> List[FIOResult]:
+        """
+        Run all modes and iodepths by one fio process. Each step is a section
+        in a job file, and sections are separated by stonewall, so they run
+        one by one like separated fio processes. The results are parsed from
+        json+ output, which includes bandwidth, latency percentiles and
+        histograms.
+
+        numjobs: the numjob of each iodepth. If it's not set, numjob is used
+            for all iodepths.
+        """
+        job_file, jobs = self.write_sweep_job_file(
+            name=name,
+            filename=filename,
+            modes=modes,
+            iodepths=iodepths,
+            numjobs=numjobs,
+            numjob=numjob,
+            time=time,
+            block_size=block_size,
+            size_gb=size_gb,
+            direct=direct,
+            overwrite=overwrite,
+            time_based=time_based,
+        )
+        # the timeout is for each step in fio.launch, so it's scaled.
+        result = self.run(
+            f"--output-format=json+ {job_file}",
+            force_run=True,
+            sudo=True,
+            cwd=cwd,
+            timeout=max(ssh_timeout, len(jobs) * (time + 60)),
+        )
+        if result.exit_code != 0:
+            raise LisaException(f"fail to run fio sweep with {result.stdout}")
+
+        return self.get_results_from_json(result.stdout, jobs)
+
+    def write_sweep_job_file(
+        self,
+        name: str,
+        filename: str,
+        modes: List[str],
+        iodepths: List[int],
+        numjobs: Optional[List[int]] = None,
+        numjob: int = 0,
+        time: int = 120,
+        block_size: str = "4K",
+        size_gb: int = 0,
+        direct: bool = True,
+        overwrite: bool = False,
+        time_based: bool = False,
+    ) -> Tuple[pathlib.PurePath, Dict[str, Tuple[int, int]]]:
+        """
+        Write the job file of a sweep, so it can be launched later, like at a
+        scheduled time. It returns the path of the job file, and the iodepth
+        and numjob by job names, which are used to parse results.
+        """
+        if numjobs and len(numjobs) < len(iodepths):
+            raise LisaException(
+                f"numjobs {numjobs} doesn't cover all iodepths {iodepths}"
+            )
+        steps: List[Tuple[str, str, int, int]] = []
+        for mode in modes:
+            for index, iodepth in enumerate(iodepths):
+                step_numjob = numjobs[index] if numjobs else numjob
+                steps.append((f"{name}{len(steps)}", mode, iodepth, step_numjob))
+
+        job_file = self.node.working_path / f"{name}.fio"
+        self.node.tools[Echo].write_to_file(
+            self._get_job_file(
+                steps=steps,
+                filename=filename,
+                time=time,
+                block_size=block_size,
+                size_gb=size_gb,
+                direct=direct,
+                overwrite=overwrite,
+                time_based=time_based,
+            ),
+            job_file,
+            ignore_error=False,
+        )
+        jobs = {step_name: (iodepth, numjob) for step_name, _, iodepth, numjob in steps}
+        return job_file, jobs
+
+    def launch_job_file_async(
+        self,
+        job_file: pathlib.PurePath,
+        cwd: Optional[pathlib.PurePath] = None,
+        start_at: Optional[float] = None,
+    ) -> Process:
+        return self.run_async(
+            f"--output-format=json+ {job_file}",
+            force_run=True,
+            sudo=True,
+            cwd=cwd,
+            start_at=start_at,
+        )
+
+    def get_results_from_json(
+        self, output: str, jobs: Optional[Dict[str, Tuple[int, int]]] = None
+    ) -> List[FIOResult]:
+        """
+        Parse json or json+ output. There is one result for each job and each
+        direction with IO, so a rw job returns both read and write results.
+
+        jobs: the iodepth and numjob by job names. If a job is not in it, the
+            values are read from the job options.
+        """
+        matched = self._json_pattern.match(output)
+        assert matched, "not found json from fio results."
+        raw_results = json.loads(matched.group("json"))
+        global_options: Dict[str, str] = raw_results.get("global options", {})
+
+        fio_results: List[FIOResult] = []
+        for job in raw_results["jobs"]:
+            job_name = job["jobname"]
+            options = dict(global_options)
+            options.update(job.get("job options", {}))
+            if jobs and job_name in jobs:
+                iodepth, numjob = jobs[job_name]
+            else:
+                iodepth = int(options.get("iodepth", 1))
+                numjob = int(options.get("numjobs", 1))
+            mode = options.get("rw", options.get("readwrite", "read"))
+            for direction in ["read", "write"]:
+                raw_result = job.get(direction)
+                if not raw_result or not raw_result.get("total_ios"):
+                    continue
+                fio_result = self._create_result_from_json(raw_result)
+                # the mode of mixed jobs is split into directions, so they are
+                # reported like separated jobs.
+                fio_result.mode = f"rand{direction}" if "rand" in mode else direction
+                fio_result.iodepth = iodepth
+                fio_result.qdepth = iodepth * max(numjob, 1)
+                fio_results.append(fio_result)
+        return fio_results
+
     def get_result_from_raw_output(
         self, mode: str, output: str, iodepth: int, numjob: int
     ) -> FIOResult:
@@ -228,6 +490,12 @@ class Fio(Tool):
                 temp = mode_iops_latency[fio_result.qdepth]
             temp[f"{fio_result.mode}_iops"] = fio_result.iops
             temp[f"{fio_result.mode}_lat_usec"] = fio_result.latency
+            if fio_result.bandwidth:
+                temp[f"{fio_result.mode}_bw_kibps"] = fio_result.bandwidth
+            for percentile, value in fio_result.latency_percentiles.items():
+                if percentile in FIO_PERCENTILES:
+                    field = FIO_PERCENTILES[percentile]
+                    temp[f"{fio_result.mode}_lat_{field}_usec"] = value
             temp["iodepth"] = fio_result.iodepth
             temp["qdepth"] = fio_result.qdepth
             temp["numjob"] = int(fio_result.qdepth / fio_result.iodepth)
@@ -244,6 +512,84 @@ class Fio(Tool):
             fio_message.append(fio_result_message)
         return fio_message
 
+    def create_interference_messages(
+        self,
+        target_results: List[List[FIOResult]],
+        isolated_results: List[FIOResult],
+        test_name: str,
+        test_result: "TestResult",
+        node_count: int = 1,
+        other_fields: Optional[Dict[str, Any]] = None,
+    ) -> List[DiskInterferencePerformanceMessage]:
+        """
+        target_results: results of targets, which run at the same time. The
+            first target is the victim.
+        isolated_results: results of the first target, when it runs alone. If
+            it's empty, the interference isn't calculated.
+        """
+        steps: List[Dict[Tuple[str, int], FIOResult]] = [
+            {(x.mode, x.qdepth): x for x in results} for results in target_results
+        ]
+        isolated = {(x.mode, x.qdepth): x for x in isolated_results}
+        messages: List[DiskInterferencePerformanceMessage] = []
+        for key, victim in steps[0].items():
+            items = [x[key] for x in steps if key in x]
+            iops = [float(x.iops) for x in items]
+            mean = statistics.mean(iops)
+            fields: Dict[str, Any] = {
+                "tool": constants.DISK_PERFORMANCE_TOOL_FIO,
+                "mode": victim.mode,
+                "qdepth": victim.qdepth,
+                "iodepth": victim.iodepth,
+                "numjob": int(victim.qdepth / victim.iodepth),
+                "node_count": node_count,
+                "target_count": len(items),
+                "total_iops": to_decimal(sum(iops), 2),
+                "total_bw_kibps": sum((x.bandwidth for x in items), Decimal(0)),
+                "min_target_iops": to_decimal(min(iops), 2),
+                "max_target_iops": to_decimal(max(iops), 2),
+                "iops_stdev_percent": to_decimal(
+                    statistics.pstdev(iops) / mean * 100 if mean else 0, 2
+                ),
+                "fairness_index": to_decimal(get_fairness_index(iops), 4),
+                "victim_iops": victim.iops,
+                "victim_lat_p99_usec": victim.latency_percentiles.get("99", Decimal(0)),
+            }
+            isolated_result = isolated.get(key)
+            if isolated_result:
+                victim_lat_p99 = victim.latency_percentiles.get("99", Decimal(0))
+                isolated_lat_p99 = isolated_result.latency_percentiles.get(
+                    "99", Decimal(0)
+                )
+                fields["isolated_iops"] = isolated_result.iops
+                fields["isolated_lat_p99_usec"] = isolated_lat_p99
+                if isolated_result.iops:
+                    fields["iops_interference_percent"] = to_decimal(
+                        float(isolated_result.iops - victim.iops)
+                        / float(isolated_result.iops)
+                        * 100,
+                        2,
+                    )
+                if isolated_lat_p99:
+                    fields["lat_p99_interference_percent"] = to_decimal(
+                        float(victim_lat_p99 - isolated_lat_p99)
+                        / float(isolated_lat_p99)
+                        * 100,
+                        2,
+                    )
+            if other_fields:
+                fields.update(other_fields)
+            messages.append(
+                create_perf_message(
+                    DiskInterferencePerformanceMessage,
+                    self.node,
+                    test_result,
+                    test_name,
+                    fields,
+                )
+            )
+        return messages
+
     def _get_command(
         self,
         name: str,
@@ -303,6 +649,73 @@ class Fio(Tool):
 
         return cmd
 
+    def _get_job_file(
+        self,
+        steps: List[Tuple[str, str, int, int]],
+        filename: str,
+        time: int,
+        block_size: str,
+        size_gb: int,
+        direct: bool,
+        overwrite: bool,
+        time_based: bool,
+    ) -> str:
+        ioengine = "posixaio" if isinstance(self.node.os, BSD) else "libaio"
+        lines = [
+            "[global]",
+            f"ioengine={ioengine}",
+            f"filename={filename}",
+            "group_reporting",
+            f"percentile_list={':'.join(FIO_PERCENTILES.keys())}",
+        ]
+        if time:
+            lines.append(f"runtime={time}")
+        if block_size:
+            lines.append(f"bs={block_size}")
+        if direct:
+            lines.append("direct=1")
+        if size_gb:
+            lines.append(f"size={size_gb}M")
+        if overwrite:
+            lines.append("overwrite=1")
+        if time_based:
+            lines.append("time_based")
+
+        for step_name, mode, iodepth, numjob in steps:
+            lines.extend(
+                [
+                    "",
+                    f"[{step_name}]",
+                    # wait previous sections completed, and start a new
+                    # reporting group.
+                    "stonewall",
+                    f"readwrite={mode}",
+                    f"iodepth={iodepth}",
+                ]
+            )
+            if numjob:
+                lines.append(f"numjobs={numjob}")
+        return "\n".join(lines) + "\n"
+
+    def _create_result_from_json(self, raw_result: Dict[str, Any]) -> FIOResult:
+        fio_result = FIOResult()
+        fio_result.iops = Decimal(str(raw_result["iops"]))
+        fio_result.bandwidth = Decimal(str(raw_result["bw"]))
+        # keep the same meaning of the text output, which is the total latency.
+        fio_result.latency = Decimal(str(raw_result["lat_ns"]["mean"])) / 1000
+
+        clat = raw_result.get("clat_ns", {})
+        fio_result.latency_percentiles = {
+            # "99.900000" to "99.9"
+            f"{float(key):g}": Decimal(str(value)) / 1000
+            for key, value in clat.get("percentile", {}).items()
+        }
+        # bins are available in json+ output only.
+        fio_result.latency_histogram = {
+            int(key): int(value) for key, value in clat.get("bins", {}).items()
+        }
+        return fio_result
+
     def _install_dep_packages(self) -> None:
         posix_os: Posix = cast(Posix, self.node.os)
         if isinstance(self.node.os, Redhat):
@@ -393,8 +806,13 @@ class Fio(Tool):
         )
         from .make import Make
 
-        make = self.node.tools[Make]
-        make.make_install(cwd=code_path)
+        build_cache = BuildCache(
+            self.node, self.name, version=git.get_latest_commit_id(cwd=code_path)
+        )
+        if not build_cache.restore():
+            make = self.node.tools[Make]
+            with build_cache.capture():
+                make.make_install(cwd=code_path)
         self.node.execute(
             "ln -sf /usr/local/bin/fio /usr/bin/fio", sudo=True, cwd=code_path
         ).assert_exit_code()
@@ -2,7 +2,7 @@
 # Licensed under the MIT license.
 
 import re
-from typing import cast
+from typing import List, cast
 
 from semver import VersionInfo
 
@@ -26,6 +26,13 @@ class Gcc(Tool):
     def can_install(self) -> bool:
         return True
 
+    @property
+    def batch_packages(self) -> List[str]:
+        # gcc on FreeBSD needs a link after installed.
+        if isinstance(self.node.os, BSD):
+            return []
+        return ["gcc"]
+
     def compile(
         self, filename: str, output_name: str = "", arguments: str = ""
     ) -> None:
@@ -64,7 +71,7 @@ class Gcc(Tool):
                 "ln -s /usr/local/bin/gcc11 /usr/local/bin/gcc", sudo=True
             )
         else:
-            posix_os.install_packages("gcc")
+            posix_os.install_packages(self.batch_packages)
         return self._check_exists()
 
     def install_cpp_compiler(self) -> None:
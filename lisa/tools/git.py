@@ -11,6 +11,7 @@ from semver import VersionInfo
 from lisa.executable import Tool
 from lisa.operating_system import Posix, Suse
 from lisa.util import LisaException, constants, filter_ansi_escape, get_matched_str
+from lisa.util.artifact_proxy import get_artifact_proxy
 
 
 class CodeExistsException(LisaException):
@@ -37,11 +38,17 @@ class Git(Tool):
     def can_install(self) -> bool:
         return True
 
-    def _install(self) -> bool:
+    @property
+    def batch_packages(self) -> List[str]:
         if isinstance(self.node.os, Suse):
-            self.node.os.install_packages("git-core")
+            return ["git-core"]
         elif isinstance(self.node.os, Posix):
-            self.node.os.install_packages([self])
+            return [self.package_name]
+        return []
+
+    def _install(self) -> bool:
+        if isinstance(self.node.os, Posix):
+            self.node.os.install_packages(self.batch_packages)
         else:
             raise LisaException(
                 "Doesn't support to install git in Windows. "
@@ -64,7 +71,15 @@ class Git(Tool):
         if auth_token:
             auth_flag = f'-c http.extraheader="AUTHORIZATION: bearer {auth_token}"'
 
-        cmd = f"clone {auth_flag} {url} {dir_name} --recurse-submodules"
+        source = url
+        proxy = get_artifact_proxy(url, self.node)
+        if proxy:
+            # clone from the mirror pushed by the artifact proxy, and the origin
+            # is set back to the url below.
+            source = str(proxy.push_git(self.node, url, auth_token))
+            auth_flag = ""
+
+        cmd = f"clone {auth_flag} {source} {dir_name} --recurse-submodules"
 
         # git print to stderr for normal info, so set no_error_log to True.
         result = self.run(cmd, cwd=cwd, no_error_log=True, timeout=timeout)
@@ -98,6 +113,14 @@ class Git(Tool):
                 raise LisaException(f"failed to clone the repo. {stdout}")
         full_path = cwd / code_dir
         self._log.debug(f"code path: {full_path}")
+        if proxy and result.exit_code == 0:
+            self.run(
+                f"remote set-url origin {url}",
+                cwd=full_path,
+                force_run=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="failed to set origin url",
+            )
         if ref:
             self.checkout(ref, cwd=full_path)
         return full_path
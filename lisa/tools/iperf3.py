@@ -2,9 +2,11 @@
 # Licensed under the MIT license.
 import json
 import re
+import statistics
 import time
+from dataclasses import dataclass, field
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Pattern, Type, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Pattern, Type, cast
 
 from retry import retry
 
@@ -18,6 +20,7 @@ from lisa.messages import (
 from lisa.operating_system import Posix
 from lisa.tools import Cat
 from lisa.util import LisaException, check_till_timeout, constants
+from lisa.util.build_cache import BuildCache
 from lisa.util.perf_timer import create_timer
 from lisa.util.process import ExecutableResult, Process
 
@@ -65,6 +68,51 @@ IPERF_UDP_CONCURRENCY = [
 ]
 
 
+@dataclass
+class Iperf3Result:
+    """
+    Parsed from the json output of iperf3. The interval arrays are indexed by
+    [interval][stream]. retransmits and snd_cwnd are reported by TCP senders
+    only, so they are empty on servers and in UDP mode.
+    """
+
+    # end time of each interval in seconds, it's relative to the start.
+    interval_ends: List[float] = field(default_factory=list)
+    bits_per_second: List[List[float]] = field(default_factory=list)
+    retransmits: List[List[int]] = field(default_factory=list)
+    # in bytes
+    snd_cwnd: List[List[int]] = field(default_factory=list)
+    sent_bits_per_second: float = 0
+    received_bits_per_second: float = 0
+    total_retransmits: int = 0
+    lost_percent: float = 0
+
+    @property
+    def interval_sums(self) -> List[float]:
+        return [sum(streams) for streams in self.bits_per_second]
+
+    @property
+    def stream_averages(self) -> List[float]:
+        if not self.bits_per_second:
+            return []
+        return [
+            sum(stream) / len(self.bits_per_second)
+            for stream in zip(*self.bits_per_second)
+        ]
+
+
+def get_interval_totals(results: List[Iperf3Result]) -> List[float]:
+    """
+    The throughput of all processes by intervals. The processes are started
+    together, so the intervals with the same index are in the same time window.
+    The intervals, which not all processes have, are dropped.
+    """
+    if not results:
+        return []
+    count = min(len(x.bits_per_second) for x in results)
+    return [sum(x.interval_sums[index] for x in results) for index in range(count)]
+
+
 class Iperf3(Tool):
     _repo = "https://github.com/esnet/iperf"
     _branch = "3.10.1"
@@ -190,6 +238,7 @@ class Iperf3(Tool):
         client_ip: str = "",
         ip_version: str = "",
         udp_mode: bool = False,
+        start_at: Optional[float] = None,
     ) -> Process:
         # -c: run iperf3 as client mode, followed by iperf3 server ip address
         # -t: run iperf3 testing for given seconds
@@ -245,7 +294,7 @@ class Iperf3(Tool):
             cmd += f" --logfile {log_file}"
 
         process = self.node.execute_async(
-            f"{self.command} {cmd}", shell=True, sudo=True
+            f"{self.command} {cmd}", shell=True, sudo=True, start_at=start_at
         )
 
         if log_file:
@@ -312,38 +361,145 @@ class Iperf3(Tool):
             timeout=run_time_seconds,
         )
 
+    def run_as_servers_async(
+        self,
+        ports: List[int],
+        report_periodic: int = 1,
+    ) -> List[Process]:
+        """
+        Start a server for each port. Each server handles one client and exits,
+        and prints the json result of the client, which can be parsed by
+        get_result_from_json.
+        """
+        return [
+            self.run_as_server_async(
+                port=port,
+                report_unit="g",
+                report_periodic=report_periodic,
+                use_json_format=True,
+                one_connection_only=True,
+                daemon=False,
+            )
+            for port in ports
+        ]
+
+    def run_as_clients_async(
+        self,
+        server_ip: str,
+        ports: List[int],
+        buffer_length: int = 0,
+        run_time_seconds: int = 10,
+        parallel_number: int = 0,
+        ip_version: str = "",
+        udp_mode: bool = False,
+        bitrate: str = "",
+        start_at: Optional[float] = None,
+    ) -> List[Process]:
+        """
+        A single iperf3 process runs in one thread, so it cannot saturate high
+        bandwidth NICs. It starts a client process on each port, and each
+        process runs parallel_number streams. Set start_at by
+        ClockSync.get_start_at, so all processes run in the same window.
+        """
+        return [
+            self.run_as_client_async(
+                server_ip,
+                bitrate=bitrate,
+                output_json=True,
+                report_periodic=1,
+                report_unit="g",
+                port=port,
+                buffer_length=buffer_length,
+                run_time_seconds=run_time_seconds,
+                parallel_number=parallel_number,
+                ip_version=ip_version,
+                udp_mode=udp_mode,
+                start_at=start_at,
+            )
+            for port in ports
+        ]
+
+    def get_result_from_json(self, output: str) -> Iperf3Result:
+        raw_result = json.loads(self._pre_handle(output))
+        if "error" in raw_result:
+            raise LisaException(f"iperf3 failed: {raw_result['error']}")
+        result = Iperf3Result()
+        for interval in raw_result.get("intervals", []):
+            # the omitted intervals are warming up, and not counted in the end.
+            if interval["sum"].get("omitted", False):
+                continue
+            streams = interval["streams"]
+            result.interval_ends.append(float(interval["sum"]["end"]))
+            result.bits_per_second.append(
+                [float(stream["bits_per_second"]) for stream in streams]
+            )
+            if streams and "retransmits" in streams[0]:
+                result.retransmits.append(
+                    [int(stream["retransmits"]) for stream in streams]
+                )
+            if streams and "snd_cwnd" in streams[0]:
+                result.snd_cwnd.append([int(stream["snd_cwnd"]) for stream in streams])
+
+        end = raw_result.get("end", {})
+        # iperf3 3.13 and later has sum_sent and sum_received of udp too, so
+        # the protocol decides the branch. If the protocol isn't in the output,
+        # the lost percent in the sum means udp.
+        protocol = raw_result.get("start", {}).get("test_start", {}).get("protocol")
+        is_udp = protocol == "UDP" or "lost_percent" in end.get("sum", {})
+        if "sum_sent" in end and not is_udp:
+            # tcp
+            result.sent_bits_per_second = float(end["sum_sent"]["bits_per_second"])
+            result.received_bits_per_second = float(
+                end["sum_received"]["bits_per_second"]
+            )
+            result.total_retransmits = int(end["sum_sent"].get("retransmits", 0))
+        elif "sum" in end:
+            # udp, the sum is from the view of the current side.
+            bits_per_second = float(end["sum"]["bits_per_second"])
+            result.sent_bits_per_second = bits_per_second
+            result.received_bits_per_second = bits_per_second
+            result.lost_percent = float(end["sum"].get("lost_percent", 0))
+        return result
+
     def create_iperf_tcp_performance_message(
         self,
-        server_result: str,
-        client_result: str,
+        server_result_list: List[ExecutableResult],
+        client_result_list: List[ExecutableResult],
         buffer_length: int,
         connections_num: int,
         test_case_name: str,
         test_result: "TestResult",
     ) -> NetworkTCPPerformanceMessage:
-        server_json = json.loads(self._pre_handle(server_result))
-        client_json = json.loads(self._pre_handle(client_result))
-        congestion_windowsize_kb_total: Decimal = Decimal(0)
-        for client_interval in client_json["intervals"]:
-            streams = client_interval["streams"]
-            congestion_windowsize_kb_total += streams[0]["snd_cwnd"]
+        server_results = [
+            self.get_result_from_json(x.stdout) for x in server_result_list
+        ]
+        client_results = [
+            self.get_result_from_json(x.stdout) for x in client_result_list
+        ]
+        congestion_windows = [
+            cwnd
+            for result in client_results
+            for streams in result.snd_cwnd
+            for cwnd in streams
+        ]
         other_fields: Dict[str, Any] = {}
         other_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_IPERF
         other_fields["buffer_size_bytes"] = Decimal(buffer_length)
-        other_fields["rx_throughput_in_gbps"] = (
-            server_json["end"]["sum_received"]["bits_per_second"] / 1000000000
-        )
-        other_fields["tx_throughput_in_gbps"] = (
-            client_json["end"]["sum_received"]["bits_per_second"] / 1000000000
+        other_fields["rx_throughput_in_gbps"] = self._to_gbps(
+            sum(x.received_bits_per_second for x in server_results)
         )
-        other_fields["congestion_windowsize_kb"] = (
-            congestion_windowsize_kb_total / len(client_json["intervals"]) / 1024
+        other_fields["tx_throughput_in_gbps"] = self._to_gbps(
+            sum(x.received_bits_per_second for x in client_results)
         )
+        if congestion_windows:
+            other_fields["congestion_windowsize_kb"] = (
+                Decimal(sum(congestion_windows)) / len(congestion_windows) / 1024
+            )
         other_fields["connections_num"] = connections_num
-        for client_stream in client_json["end"]["streams"]:
-            other_fields["retransmitted_segments"] = client_stream["sender"][
-                "retransmits"
-            ]
+        other_fields["retransmitted_segments"] = Decimal(
+            sum(x.total_retransmits for x in client_results)
+        )
+        self._set_variance_fields(other_fields, client_results)
         return create_perf_message(
             NetworkTCPPerformanceMessage,
             self.node,
@@ -361,73 +517,29 @@ class Iperf3(Tool):
         test_case_name: str,
         test_result: "TestResult",
     ) -> NetworkUDPPerformanceMessage:
-        client_udp_lost_list: List[Decimal] = []
-        client_intervals_throughput_list: List[Decimal] = []
-        client_throughput_list: List[Decimal] = []
-        for client_result_raw in client_result_list:
-            # remove warning which will bring exception when load json
-            # warning: UDP block size 8192 exceeds TCP MSS 1406, may result in fragmentation / drops # noqa: E501
-            client_result = json.loads(self._pre_handle(client_result_raw.stdout))
-            if (
-                "sum" in client_result["end"].keys()
-                and "lost_percent" in client_result["end"]["sum"].keys()
-            ):
-                client_udp_lost_list.append(
-                    Decimal(client_result["end"]["sum"]["lost_percent"])
-                )
-                for client_interval in client_result["intervals"]:
-                    client_intervals_throughput_list.append(
-                        client_interval["sum"]["bits_per_second"]
-                    )
-                client_throughput_list.append(
-                    (
-                        Decimal(
-                            sum(client_intervals_throughput_list)
-                            / len(client_intervals_throughput_list)
-                        )
-                        / 1000000000
-                    )
-                )
-        server_udp_lost_list: List[Decimal] = []
-        server_intervals_throughput_list: List[Decimal] = []
-        server_throughput_list: List[Decimal] = []
-        for server_result_raw in server_result_list:
-            server_result = json.loads(self._pre_handle(server_result_raw.stdout))
-            if (
-                "sum" in server_result["end"].keys()
-                and "lost_percent" in server_result["end"]["sum"].keys()
-            ):
-                server_udp_lost_list.append(
-                    Decimal(server_result["end"]["sum"]["lost_percent"])
-                )
-                for server_interval in server_result["intervals"]:
-                    server_intervals_throughput_list.append(
-                        server_interval["sum"]["bits_per_second"]
-                    )
-                server_throughput_list.append(
-                    (
-                        Decimal(
-                            sum(server_intervals_throughput_list)
-                            / len(server_intervals_throughput_list)
-                        )
-                        / 1000000000
-                    )
-                )
-
+        # remove warning which will bring exception when load json
+        # warning: UDP block size 8192 exceeds TCP MSS 1406, may result in fragmentation / drops # noqa: E501
+        server_results = [
+            self.get_result_from_json(x.stdout) for x in server_result_list
+        ]
+        client_results = [
+            self.get_result_from_json(x.stdout) for x in client_result_list
+        ]
         other_fields: Dict[str, Any] = {}
         other_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_IPERF
-        other_fields["tx_throughput_in_gbps"] = Decimal(
-            sum(client_throughput_list) / len(client_throughput_list)
+        other_fields["tx_throughput_in_gbps"] = self._to_gbps(
+            sum(x.sent_bits_per_second for x in client_results)
         )
         other_fields["data_loss"] = Decimal(
-            sum(client_udp_lost_list) / len(client_udp_lost_list)
+            str(statistics.mean(x.lost_percent for x in client_results))
         )
-        other_fields["rx_throughput_in_gbps"] = Decimal(
-            sum(server_throughput_list) / len(server_throughput_list)
+        other_fields["rx_throughput_in_gbps"] = self._to_gbps(
+            sum(x.received_bits_per_second for x in server_results)
         )
         other_fields["send_buffer_size"] = Decimal(buffer_length)
         other_fields["connections_num"] = connections_num
         other_fields["protocol_type"] = TransportProtocol.Udp
+        self._set_variance_fields(other_fields, client_results)
         return create_perf_message(
             NetworkUDPPerformanceMessage,
             self.node,
@@ -451,9 +563,14 @@ class Iperf3(Tool):
         git = self.node.tools[Git]
         git.clone(self._repo, tool_path)
         code_path = tool_path.joinpath("iperf")
-        make = self.node.tools[Make]
-        self.node.execute("./configure", cwd=code_path).assert_exit_code()
-        make.make_install(code_path)
+        build_cache = BuildCache(
+            self.node, self.name, version=git.get_latest_commit_id(cwd=code_path)
+        )
+        if not build_cache.restore():
+            make = self.node.tools[Make]
+            self.node.execute("./configure", cwd=code_path).assert_exit_code()
+            with build_cache.capture():
+                make.make_install(code_path)
         self.node.execute("ldconfig", sudo=True, cwd=code_path).assert_exit_code()
         self.node.execute(
             "ln -fs /usr/local/bin/iperf3 /usr/bin/iperf3", sudo=True, cwd=code_path
@@ -464,6 +581,30 @@ class Iperf3(Tool):
         assert matched, "fail to get bandwidth"
         return Decimal(matched.group("bandwidth"))
 
+    def _set_variance_fields(
+        self, other_fields: Dict[str, Any], results: List[Iperf3Result]
+    ) -> None:
+        # the variance over time is from the total of all processes, and the
+        # variance between streams shows the fairness of them.
+        interval_totals = get_interval_totals(results)
+        if interval_totals:
+            other_fields["tx_throughput_min_gbps"] = self._to_gbps(min(interval_totals))
+            other_fields["tx_throughput_max_gbps"] = self._to_gbps(max(interval_totals))
+            other_fields["tx_throughput_stdev_gbps"] = self._to_gbps(
+                statistics.pstdev(interval_totals)
+            )
+        stream_averages = [
+            average for result in results for average in result.stream_averages
+        ]
+        if stream_averages:
+            other_fields["stream_throughput_stdev_gbps"] = self._to_gbps(
+                statistics.pstdev(stream_averages)
+            )
+        other_fields["number_of_senders"] = len(results)
+
+    def _to_gbps(self, bits_per_second: float) -> Decimal:
+        return Decimal(str(round(bits_per_second / 1000000000, 4)))
+
     def _pre_handle(self, result: str) -> str:
         result = result.replace("-nan", "0")
         result_matched = self._json_pattern.match(result)
@@ -10,6 +10,8 @@ from lisa.executable import Tool
 from lisa.messages import NetworkLatencyPerformanceMessage, create_perf_message
 from lisa.operating_system import CBLMariner, Debian, Posix, Redhat, Suse
 from lisa.util import LisaException, constants, find_groups_in_lines, get_datetime_path
+from lisa.util.build_cache import BuildCache
+from lisa.util.perf_parser import LatencyDistribution, parse_lagscope, to_decimal
 from lisa.util.process import ExecutableResult, Process
 
 from .firewall import Firewall
@@ -48,13 +50,6 @@ class Lagscope(Tool, KillableMixin):
     #    99.9%         620
     #   99.99%         135
     #  99.999%         2654
-    _result_pattern = re.compile(
-        r"([\w\W]*?)Minimum = (?P<min_latency_us>.+?)us, "
-        r"Maximum = (?P<max_latency_us>.+?)us, Average = (?P<average_latency_us>.+?)us"
-        r"([\w\W]*?)95%\s+(?P<latency95_percentile_us>\d+)"
-        r"([\w\W]*?)99%\s+(?P<latency99_percentile_us>\d+)",
-        re.M,
-    )
     # Interval(usec)   Frequency
     #       0          0
     #      30          0
@@ -88,12 +83,6 @@ class Lagscope(Tool, KillableMixin):
     #     450          639
     #     465          457
     #     480          2204
-    _interval_frequency_pattern = re.compile(
-        r"\s+(?P<interval_us>\d+)\s+(?P<frequency>\d+)$", re.M
-    )
-    _average_pattern = re.compile(
-        r"([\w\W]*?)Average = (?P<average_latency_us>.+?)us", re.M
-    )
     _busy_pool_keys = ["net.core.busy_poll", "net.core.busy_read"]
     # 08:19:33 ERR : failed to connect to receiver: 10.0.1.4:6001
     #  on socket: 3. errno = 113
@@ -159,6 +148,7 @@ class Lagscope(Tool, KillableMixin):
         count_of_histogram_intervals: int = 30,
         dump_csv: bool = True,
         daemon: bool = False,
+        start_at: Optional[float] = None,
     ) -> Process:
         # -s: run as a sender
         # -i: test interval
@@ -192,7 +182,7 @@ class Lagscope(Tool, KillableMixin):
             cmd += " -P "
         if dump_csv:
             cmd += f" -RLatency-{get_datetime_path()}.csv "
-        process = self.node.execute_async(cmd, shell=True)
+        process = self.node.execute_async(cmd, shell=True, start_at=start_at)
         return process
 
     def run_as_client(
@@ -232,10 +222,13 @@ class Lagscope(Tool, KillableMixin):
 
         return result
 
+    def get_distribution(self, result: ExecutableResult) -> LatencyDistribution:
+        return parse_lagscope(result.stdout)
+
     def get_average(self, result: ExecutableResult) -> Decimal:
-        matched_results = self._average_pattern.match(result.stdout)
-        if matched_results:
-            return Decimal(matched_results.group("average_latency_us"))
+        distribution = self.get_distribution(result)
+        if distribution.average is not None:
+            return to_decimal(distribution.average)
         else:
             self._log.debug(f"no average latency found in {result.stdout}")
             return Decimal(-1.0)
@@ -246,34 +239,24 @@ class Lagscope(Tool, KillableMixin):
         test_case_name: str,
         test_result: "TestResult",
     ) -> List[NetworkLatencyPerformanceMessage]:
-        matched_results = self._result_pattern.match(result.stdout)
+        distribution = self.get_distribution(result)
         assert (
-            matched_results
+            distribution.average is not None
+            and 95 in distribution.percentiles
+            and 99 in distribution.percentiles
         ), "not found matched latency statistics from lagscope results."
-        all_matched_results = find_groups_in_lines(
-            result.stdout, self._interval_frequency_pattern
-        )
+        latency_fields = distribution.get_message_fields()
         perf_message_list: List[NetworkLatencyPerformanceMessage] = []
-        for matched_result in all_matched_results:
-            other_fields: Dict[str, Any] = {}
+        if not distribution.histogram_counts:
+            return perf_message_list
+        # a message per interval of the histogram.
+        for interval_us, frequency in zip(
+            distribution.histogram_starts, distribution.histogram_counts
+        ):
+            other_fields: Dict[str, Any] = dict(latency_fields)
             other_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_LAGSCOPE
-            other_fields["min_latency_us"] = Decimal(
-                matched_results.group("min_latency_us")
-            )
-            other_fields["max_latency_us"] = Decimal(
-                matched_results.group("max_latency_us")
-            )
-            other_fields["average_latency_us"] = Decimal(
-                matched_results.group("average_latency_us")
-            )
-            other_fields["latency95_percentile_us"] = Decimal(
-                matched_results.group("latency95_percentile_us")
-            )
-            other_fields["latency99_percentile_us"] = Decimal(
-                matched_results.group("latency99_percentile_us")
-            )
-            other_fields["frequency"] = int(matched_result["frequency"])
-            other_fields["interval_us"] = int(matched_result["interval_us"])
+            other_fields["frequency"] = int(frequency)
+            other_fields["interval_us"] = int(interval_us)
             message = create_perf_message(
                 NetworkLatencyPerformanceMessage,
                 self.node,
@@ -301,21 +284,28 @@ class Lagscope(Tool, KillableMixin):
         git = self.node.tools[Git]
         git.clone(self.repo, tool_path, ref=self.branch)
         code_path = tool_path.joinpath("lagscope")
-        self.node.execute(
-            "./do-cmake.sh build",
-            cwd=code_path,
-            shell=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message="fail to run do-cmake.sh build",
-        )
-        self.node.execute(
-            "./do-cmake.sh install",
-            cwd=code_path,
-            sudo=True,
-            shell=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message="fail to run do-cmake.sh install",
+        build_cache = BuildCache(
+            self.node, self.name, version=git.get_latest_commit_id(cwd=code_path)
         )
+        if not build_cache.restore():
+            self.node.execute(
+                "./do-cmake.sh build",
+                cwd=code_path,
+                shell=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="fail to run do-cmake.sh build",
+            )
+            with build_cache.capture():
+                self.node.execute(
+                    "./do-cmake.sh install",
+                    cwd=code_path,
+                    sudo=True,
+                    shell=True,
+                    expected_exit_code=0,
+                    expected_exit_code_failure_message=(
+                        "fail to run do-cmake.sh install"
+                    ),
+                )
         self.node.execute(
             "ln -sf /usr/local/bin/lagscope /usr/bin/lagscope",
             sudo=True,
@@ -407,8 +397,11 @@ class BSDLagscope(Lagscope):
         count_of_histogram_intervals: int = 30,
         dump_csv: bool = True,
         daemon: bool = False,
+        start_at: Optional[float] = None,
     ) -> Process:
-        return self.node.tools[Sockperf].run_client_async("tcp", server_ip)
+        return self.node.tools[Sockperf].run_client_async(
+            "tcp", server_ip, start_at=start_at
+        )
 
     def run_as_client(
         self,
@@ -446,12 +439,12 @@ class BSDLagscope(Lagscope):
         stats = self.node.tools[Sockperf].get_statistics(result.stdout)
 
         perf_message_list: List[NetworkLatencyPerformanceMessage] = []
-        other_fields: Dict[str, Any] = {}
+        other_fields: Dict[str, Any] = {
+            key: value
+            for key, value in stats.items()
+            if key not in ["total_observations", "run_time_seconds"]
+        }
         other_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_LAGSCOPE
-        other_fields["min_latency_us"] = stats["min_latency_us"]
-        other_fields["max_latency_us"] = stats["max_latency_us"]
-        other_fields["average_latency_us"] = stats["average_latency_us"]
-        other_fields["latency99_percentile_us"] = stats["latency99_percentile_us"]
         other_fields["frequency"] = (
             stats["total_observations"] / stats["run_time_seconds"]
         )
@@ -34,6 +34,10 @@ class Make(Tool):
     def can_install(self) -> bool:
         return True
 
+    @property
+    def batch_packages(self) -> List[str]:
+        return [self.package_name]
+
     def _install(self) -> bool:
         posix_os: Posix = cast(Posix, self.node.os)
         posix_os.install_packages([self])
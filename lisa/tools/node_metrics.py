@@ -0,0 +1,268 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import struct
+from decimal import Decimal
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type
+
+from lisa.executable import Tool
+from lisa.util import LisaException, constants
+from lisa.util.process import Process
+
+from .kill import Kill
+from .python import Python
+
+if TYPE_CHECKING:
+    from lisa.messages import PerfMessage
+
+# keep consistent with scripts/node_metrics_sampler.py
+_MAGIC = b"LNMS"
+_VERSION = 1
+_HEADER_FORMAT = "<4sIIQI"
+_SCRIPT_NAME = "node_metrics_sampler.py"
+# the busy percentage of disks is from io_ticks, so virtual disks, which stack
+# on physical disks, are not summed to avoid counting IOs twice.
+_VIRTUAL_DISK_PREFIXES = ("dm-", "md")
+
+
+class NodeMetricsResult:
+    """
+    Decoded samples. The timestamps are in seconds, and values are a 2-D array,
+    each row is a sample, and each column is a counter in names.
+    """
+
+    def __init__(
+        self, names: List[str], kinds: List[str], timestamps: Any, values: Any
+    ) -> None:
+        self.names = names
+        self.kinds = kinds
+        self.timestamps = timestamps
+        self.values = values
+        self._indexes = {name: index for index, name in enumerate(names)}
+
+    @property
+    def count(self) -> int:
+        return len(self.timestamps)
+
+    def get(self, name: str) -> Any:
+        return self.values[:, self._indexes[name]]
+
+    def get_summary(self) -> Dict[str, Decimal]:
+        """
+        Summarize counters between the first and last samples. The keys are
+        field names of PerfMessage.
+        """
+        import numpy  # type: ignore
+
+        summary: Dict[str, Decimal] = {}
+        if self.count < 2:
+            return summary
+
+        elapsed = float(self.timestamps[-1] - self.timestamps[0])
+        # counters are increasing, so the delta of whole period is enough.
+        deltas = (self.values[-1].astype(numpy.int64)) - (
+            self.values[0].astype(numpy.int64)
+        )
+        delta_by_name = dict(zip(self.names, deltas.tolist()))
+
+        def _sum(prefix: str, suffix: str = "", excluded: Any = ()) -> int:
+            return sum(
+                value
+                for name, value in delta_by_name.items()
+                if name.startswith(prefix)
+                and name.endswith(suffix)
+                and not name[len(prefix) :].startswith(excluded)
+            )
+
+        def _set(key: str, value: float) -> None:
+            summary[key] = Decimal(str(round(value, 2)))
+
+        cpu_total = _sum("cpu.")
+        if cpu_total > 0:
+            idle = delta_by_name.get("cpu.idle", 0) + delta_by_name.get("cpu.iowait", 0)
+            _set("node_cpu_usage_percent", 100 * (cpu_total - idle) / cpu_total)
+            for field in ["iowait", "softirq", "steal"]:
+                _set(
+                    f"node_cpu_{field}_percent",
+                    100 * delta_by_name.get(f"cpu.{field}", 0) / cpu_total,
+                )
+
+        interrupts = _sum("interrupts.cpu")
+        if interrupts > 0:
+            busiest = max(
+                value
+                for name, value in delta_by_name.items()
+                if name.startswith("interrupts.cpu")
+            )
+            _set("node_interrupts_per_sec", interrupts / elapsed)
+            _set("node_interrupts_max_cpu_percent", 100 * busiest / interrupts)
+        _set(
+            "node_net_rx_softirqs_per_sec",
+            delta_by_name.get("softirqs.NET_RX", 0) / elapsed,
+        )
+
+        _set("node_net_rx_mbps", _sum("net.", ".rx_bytes") * 8 / elapsed / 1e6)
+        _set("node_net_tx_mbps", _sum("net.", ".tx_bytes") * 8 / elapsed / 1e6)
+
+        excluded = _VIRTUAL_DISK_PREFIXES
+        _set("node_disk_read_iops", _sum("disk.", ".reads", excluded) / elapsed)
+        _set("node_disk_write_iops", _sum("disk.", ".writes", excluded) / elapsed)
+        io_ticks = [
+            value
+            for name, value in delta_by_name.items()
+            if name.startswith("disk.") and name.endswith(".io_ticks")
+        ]
+        if io_ticks:
+            # io_ticks is in milliseconds.
+            _set("node_disk_max_util_percent", max(io_ticks) / elapsed / 10)
+
+        if "memory.MemAvailable" in self._indexes:
+            # in kB
+            _set(
+                "node_memory_available_min_mb",
+                float(self.get("memory.MemAvailable").min()) / 1024,
+            )
+        return summary
+
+    def update_message(self, message: "PerfMessage") -> None:
+        for key, value in self.get_summary().items():
+            setattr(message, key, value)
+
+
+def decode_node_metrics(data: bytes) -> NodeMetricsResult:
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        raise LisaException(
+            "node metrics need the numpy package, install it by "
+            "'pip install lisa[numpy]'."
+        )
+
+    header_size = struct.calcsize(_HEADER_FORMAT)
+    magic, version, capacity, count, layout_size = struct.unpack_from(
+        _HEADER_FORMAT, data
+    )
+    if magic != _MAGIC or version != _VERSION:
+        raise LisaException(f"unknown node metrics format: {magic!r} {version}")
+    layout = json.loads(data[header_size : header_size + layout_size])
+    names: List[str] = layout["names"]
+
+    slot_type = numpy.dtype([("timestamp", "<f8"), ("values", "<u8", (len(names),))])
+    slots = numpy.frombuffer(
+        data,
+        dtype=slot_type,
+        count=capacity,
+        offset=header_size + layout_size,
+    )
+    if count <= capacity:
+        slots = slots[:count]
+    else:
+        # the oldest slot is the next one to write.
+        slots = numpy.roll(slots, -(count % capacity))
+    return NodeMetricsResult(
+        names=names,
+        kinds=layout["kinds"],
+        timestamps=slots["timestamp"].copy(),
+        values=slots["values"].copy(),
+    )
+
+
+class NodeMetrics(Tool):
+    """
+    Sample CPU, softirq, interrupt, network, disk and memory counters from
+    /proc in background. The samples are saved in a ring buffer on the node,
+    and downloaded once when it's stopped.
+
+        node_metrics = node.tools[NodeMetrics]
+        node_metrics.start()
+        ...
+        result = node_metrics.stop()
+        result.update_message(message)
+    """
+
+    @property
+    def command(self) -> str:
+        return "python3"
+
+    @property
+    def can_install(self) -> bool:
+        return True
+
+    @property
+    def dependencies(self) -> List[Type[Tool]]:
+        return [Python]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        self._process: Optional[Process] = None
+        self._data_file: Optional[PurePath] = None
+        self._started_count = 0
+
+    def _check_exists(self) -> bool:
+        # the script runs by python3, so both of them are needed.
+        return (
+            self.node.is_posix
+            and self.node.execute(
+                f"command -v {self.command} && test -f {self._script_path}",
+                shell=True,
+                no_info_log=True,
+            ).exit_code
+            == 0
+        )
+
+    def _install(self) -> bool:
+        self.node.shell.copy(
+            Path(__file__).parent / "scripts" / _SCRIPT_NAME, self._script_path
+        )
+        return self._check_exists()
+
+    @property
+    def is_running(self) -> bool:
+        return self._process is not None and self._process.is_running()
+
+    def start(self, interval: float = 1, capacity: int = 3600) -> None:
+        """
+        interval: seconds between samples.
+        capacity: the count of samples kept. Old samples are overwritten.
+        """
+        if self.is_running:
+            raise LisaException("node metrics sampler is running already")
+        self._started_count += 1
+        self._data_file = (
+            self.node.working_path / f"node_metrics_{self._started_count}.bin"
+        )
+        self._process = self.run_async(
+            f"{self._script_path} {self._data_file} {interval} {capacity}",
+            force_run=True,
+        )
+
+    def stop(self, timeout: int = 60) -> NodeMetricsResult:
+        """
+        Stop the sampler, download the ring buffer, and decode it.
+        """
+        assert self._process and self._data_file, "node metrics is not started"
+        data_file = self._data_file
+        process = self._process
+        self._process = None
+
+        pid_file = f"{data_file}.pid"
+        result = self.node.execute(f"cat {pid_file}", shell=True)
+        if result.exit_code == 0 and result.stdout.strip():
+            self.node.tools[Kill].by_pid(
+                result.stdout.strip(), constants.SIGTERM, ignore_not_exist=True
+            )
+        process.wait_result(timeout=timeout)
+
+        self.node.execute(f"rm -f {pid_file}", shell=True)
+        if self.node.is_remote:
+            local_file = self.node.local_log_path / data_file.name
+            self.node.shell.copy_back(data_file, local_file)
+            self.node.execute(f"rm -f {data_file}", shell=True)
+        else:
+            local_file = Path(data_file)
+        return decode_node_metrics(local_file.read_bytes())
+
+    @property
+    def _script_path(self) -> PurePath:
+        return self.get_tool_path() / _SCRIPT_NAME
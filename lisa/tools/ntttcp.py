@@ -16,6 +16,7 @@ from lisa.messages import (
 from lisa.operating_system import BSD, CBLMariner
 from lisa.tools import Firewall, Gcc, Git, Make, Sed
 from lisa.util import LisaException, constants
+from lisa.util.build_cache import BuildCache
 from lisa.util.process import ExecutableResult, Process
 
 from .sysctl import Sysctl
@@ -298,6 +299,7 @@ class Ntttcp(Tool):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        start_at: Optional[float] = None,
     ) -> ExecutableResult:
         # -sserver_ip: run as a sender with server ip address
         # -P: Number of ports listening on receiver side [default: 16] [max: 512]
@@ -333,6 +335,7 @@ class Ntttcp(Tool):
             sudo=True,
             expected_exit_code=0,
             expected_exit_code_failure_message=f"fail to run {self.command} {cmd}",
+            start_at=start_at,
         )
         return result
 
@@ -466,7 +469,12 @@ class Ntttcp(Tool):
         git.clone(self.repo, tool_path)
         make = self.node.tools[Make]
         code_path = tool_path.joinpath(self.tool_path_folder)
-        make.make_install(cwd=code_path)
+        build_cache = BuildCache(
+            self.node, self.name, version=git.get_latest_commit_id(cwd=code_path)
+        )
+        if not build_cache.restore():
+            with build_cache.capture():
+                make.make_install(cwd=code_path)
         if not isinstance(self.node.os, BSD):
             self.node.execute(
                 "ln -s /usr/local/bin/ntttcp /usr/bin/ntttcp", sudo=True, cwd=code_path
@@ -589,6 +597,7 @@ class BSDNtttcp(Ntttcp):
         dev_differentiator: str = "Hypervisor callback interrupts",
         run_as_daemon: bool = False,
         udp_mode: bool = False,
+        start_at: Optional[float] = None,
     ) -> ExecutableResult:
         self._log.debug(
             "Paramers nic_name, cool_down_time_seconds, warm_up_time_seconds, "
@@ -608,6 +617,7 @@ class BSDNtttcp(Ntttcp):
             sudo=True,
             expected_exit_code=0,
             expected_exit_code_failure_message=f"fail to run {self.command} {cmd}",
+            start_at=start_at,
         )
         return result
 
@@ -1,7 +1,8 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
+import fnmatch
 from pathlib import PurePath
-from typing import TYPE_CHECKING, Any, Optional, Type
+from typing import TYPE_CHECKING, Any, List, Optional, Type
 
 from lisa.executable import Tool
 from lisa.tools.chown import Chown
@@ -10,6 +11,7 @@ from lisa.tools.ls import Ls
 from lisa.tools.mkdir import Mkdir
 from lisa.tools.rm import Rm
 from lisa.tools.whoami import Whoami
+from lisa.util.shell import LocalShell, SshShell
 
 if TYPE_CHECKING:
     from lisa.node import Node
@@ -29,16 +31,33 @@ class RemoteCopy(Tool):
         src: PurePath,
         dest: PurePath,
         recurse: bool = False,
+        patterns: Optional[List[str]] = None,
     ) -> None:
-        self._copy_internal(src=src, dest=dest, recurse=recurse, is_copy_to_local=True)
+        """
+        patterns: glob patterns of file names to copy. It's used on folders.
+        """
+        self._copy_internal(
+            src=src,
+            dest=dest,
+            recurse=recurse,
+            is_copy_to_local=True,
+            patterns=patterns,
+        )
 
     def copy_to_remote(
         self,
         src: PurePath,
         dest: PurePath,
         recurse: bool = False,
+        patterns: Optional[List[str]] = None,
     ) -> None:
-        self._copy_internal(src=src, dest=dest, recurse=recurse, is_copy_to_local=False)
+        self._copy_internal(
+            src=src,
+            dest=dest,
+            recurse=recurse,
+            is_copy_to_local=False,
+            patterns=patterns,
+        )
 
     @classmethod
     def _windows_tool(cls) -> Optional[Type[Tool]]:
@@ -56,6 +75,7 @@ class RemoteCopy(Tool):
         dest: PurePath,
         recurse: bool = False,
         is_copy_to_local: bool = True,
+        patterns: Optional[List[str]] = None,
     ) -> None:
         is_file = self._is_file(
             self._get_source_node(is_copy_to_local=is_copy_to_local), src
@@ -71,6 +91,7 @@ class RemoteCopy(Tool):
                 recurse=recurse,
                 is_file=is_file,
                 is_copy_to_local=is_copy_to_local,
+                patterns=patterns,
             )
         except Exception as e:
             # use temp folder on copy to local only, because no scenario needs
@@ -88,7 +109,13 @@ class RemoteCopy(Tool):
 
             # copy files from the temp directory and remove the temp directory
             try:
-                self._copy(tmp_location, dest, recurse=recurse, is_file=is_file)
+                self._copy(
+                    tmp_location,
+                    dest,
+                    recurse=recurse,
+                    is_file=is_file,
+                    patterns=patterns,
+                )
             finally:
                 self.node.tools[Rm].remove_directory(
                     self.node.get_str_path(tmp_location), sudo=True
@@ -161,6 +188,7 @@ class RemoteCopy(Tool):
         is_file: bool = False,
         recurse: bool = False,
         is_copy_to_local: bool = True,
+        patterns: Optional[List[str]] = None,
     ) -> None:
         if is_copy_to_local:
             src_node = self.node
@@ -169,6 +197,28 @@ class RemoteCopy(Tool):
             src_node = self._local_node
             dest_node = self.node
 
+        shell = self.node.shell
+        # the WSL shell copies files through a temp folder of the host, so it
+        # doesn't support tar streams, and files are copied one by one.
+        if (
+            not is_file
+            and recurse
+            and self.node.is_posix
+            and isinstance(shell, (LocalShell, SshShell))
+        ):
+            # transfer the whole folder in one tar stream, instead of listing
+            # and copying files one by one. If some files cannot be read, it
+            # raises, and the caller retries with a temp copy by sudo.
+            destination_dir = dest / src.name
+            if is_copy_to_local:
+                statistics = shell.copy_tree_back(
+                    src, destination_dir, patterns=patterns
+                )
+            else:
+                statistics = shell.copy_tree(src, destination_dir, patterns=patterns)
+            self._log.debug(f"copied '{src}' to '{destination_dir}': {statistics}")
+            return
+
         if is_file:
             destination_dir = dest
             dirs = []
@@ -190,7 +240,13 @@ class RemoteCopy(Tool):
                 else []
             )
             source_files = [
-                PurePath(content) for content in contents if not content.endswith("/")
+                PurePath(content)
+                for content in contents
+                if not content.endswith("/")
+                and (
+                    not patterns
+                    or any(fnmatch.fnmatch(PurePath(content).name, x) for x in patterns)
+                )
             ]
 
         # copy files
@@ -205,7 +261,7 @@ class RemoteCopy(Tool):
 
         # copy sub folders
         for dir_ in dirs:
-            self._copy(dir_, destination_dir, recurse=recurse)
+            self._copy(dir_, destination_dir, recurse=recurse, patterns=patterns)
 
 
 class WindowsRemoteCopy(RemoteCopy):
@@ -1,6 +1,5 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
-import re
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, cast
 
@@ -9,7 +8,8 @@ from assertpy.assertpy import assert_that
 from lisa.executable import Tool
 from lisa.messages import NetworkPPSPerformanceMessage, create_perf_message
 from lisa.operating_system import Posix
-from lisa.util import constants, find_groups_in_lines
+from lisa.util import LisaException, constants
+from lisa.util.perf_parser import PpsSamples, parse_netstat, parse_sar, to_decimal
 from lisa.util.process import ExecutableResult, Process
 
 from .firewall import Firewall
@@ -19,15 +19,6 @@ if TYPE_CHECKING:
 
 
 class Sar(Tool):
-    # 06:37:41        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil # noqa: E501
-    # 06:37:42           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00 # noqa: E501
-    # 06:37:42         eth0   2856.00   2857.00    186.86    187.28      0.00      0.00      0.00      0.00 # noqa: E501
-    #
-    # 06:37:42        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil # noqa: E501
-    # 06:37:43           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00 # noqa: E501
-    # 06:37:43         eth0   3195.00   3194.00    209.04    209.33      0.00      0.00      0.00      0.00 # noqa: E501
-    sar_results_pattern = re.compile(r"(IFACE[\w\W]*?)(?=IFACE|\Z)", re.MULTILINE)
-
     @property
     def command(self) -> str:
         return "sar"
@@ -85,33 +76,27 @@ class Sar(Tool):
             expected_exit_code_failure_message="fail to run sar command",
         )
 
+    def get_samples(self, nic_name: str, result: ExecutableResult) -> PpsSamples:
+        # 06:37:41        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil # noqa: E501
+        # 06:37:42           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00 # noqa: E501
+        # 06:37:42         eth0   2856.00   2857.00    186.86    187.28      0.00      0.00      0.00      0.00 # noqa: E501
+        #
+        # 06:37:42        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil # noqa: E501
+        # 06:37:43           lo      0.00      0.00      0.00      0.00      0.00      0.00      0.00      0.00 # noqa: E501
+        # 06:37:43         eth0   3195.00   3194.00    209.04    209.33      0.00      0.00      0.00      0.00 # noqa: E501
+        samples = parse_sar(result.stdout, nic_name)
+        if not samples.rx:
+            raise LisaException(f"not find matched sar result for nic {nic_name}")
+        return samples
+
     def get_data(
         self, nic_name: str, result: ExecutableResult
     ) -> Dict[str, List[Decimal]]:
-        sar_result_pattern = re.compile(
-            rf"([\w\W]*?){nic_name}([\w\W]*?)\s+(?P<rxpck>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<txpck>\d+.\d+)([\w\W]*?)\s+(?P<rxkb>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<rxcmp>\d+.\d+)([\w\W]*?)\s+(?P<txcmp>\d+.\d+)"
-            r"([\w\W]*?)\s+(?P<rxmcst>\d+.\d+)([\w\W]*?)\s+(?P<ifutil>\d+.\d+)",
-            re.M,
-        )
-        raw_list = re.finditer(self.sar_results_pattern, result.stdout)
-        rx_pps: List[Decimal] = []
-        tx_pps: List[Decimal] = []
-        tx_rx_pps: List[Decimal] = []
-        for sar_result in raw_list:
-            temp = sar_result_pattern.match(sar_result.group())
-            assert temp, f"not find matched sar result for nic {nic_name}"
-            rx_pps.append(Decimal(temp.group("rxpck")))
-            tx_pps.append(Decimal(temp.group("txpck")))
-            tx_rx_pps.append(
-                Decimal(temp.group("rxpck")) + Decimal(temp.group("txpck"))
-            )
-
+        samples = self.get_samples(nic_name, result)
         return {
-            "rx_pps": rx_pps,
-            "tx_pps": tx_pps,
-            "tx_rx_pps": tx_rx_pps,
+            "rx_pps": [to_decimal(x, 2) for x in samples.rx],
+            "tx_pps": [to_decimal(x, 2) for x in samples.tx],
+            "tx_rx_pps": [to_decimal(x, 2) for x in samples.rx_tx],
         }
 
     def create_pps_performance_messages(
@@ -130,23 +115,11 @@ class Sar(Tool):
         # txcmp/s: compressed packets transmitting rate (unit: Kbytes/second)
         # rxmcst/s: multicast packets receiving rate (unit: Kbytes/second)
         nic_name = self.node.nics.default_nic
-        data = self.get_data(nic_name, result)
-        rx_pps = data["rx_pps"]
-        tx_pps = data["tx_pps"]
-        tx_rx_pps = data["tx_rx_pps"]
+        samples = self.get_samples(nic_name, result)
 
-        result_fields: Dict[str, Any] = {}
+        result_fields: Dict[str, Any] = samples.get_message_fields()
         result_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_SAR
         result_fields["test_type"] = test_type
-        result_fields["rx_pps_maximum"] = max(rx_pps)
-        result_fields["rx_pps_average"] = Decimal(sum(rx_pps) / len(rx_pps))
-        result_fields["rx_pps_minimum"] = min(rx_pps)
-        result_fields["tx_pps_maximum"] = max(tx_pps)
-        result_fields["tx_pps_average"] = Decimal(sum(tx_pps) / len(tx_pps))
-        result_fields["tx_pps_minimum"] = min(tx_pps)
-        result_fields["rx_tx_pps_maximum"] = max(tx_rx_pps)
-        result_fields["rx_tx_pps_average"] = Decimal(sum(tx_rx_pps) / len(tx_rx_pps))
-        result_fields["rx_tx_pps_minimum"] = min(tx_rx_pps)
         message = create_perf_message(
             NetworkPPSPerformanceMessage,
             self.node,
@@ -162,16 +135,6 @@ class Sar(Tool):
 
 
 class SarBSD(Sar):
-    #             input            hn0           output
-    # packets  errs idrops      bytes    packets  errs      bytes colls
-    #   16     0     0       3506         23     0       5473     0
-    #  34     0     0       8253         50     0       8570     0
-    sar_results_pattern = re.compile(
-        r"\s*(?P<rxpck>\d+)\s+(?P<rxerr>\d+)\s+(?P<rxdrop>\d+)\s+(?P<rxbytes>\d+)"
-        r"\s+(?P<txpck>\d+)\s+(?P<txerr>\d+)\s+(?P<txdrop>\d+)\s+(?P<txbytes>\d+)",
-        re.M,
-    )
-
     @property
     def command(self) -> str:
         return "netstat"
@@ -193,20 +156,12 @@ class SarBSD(Sar):
         process = self.node.execute_async(cmd, shell=True)
         return process
 
-    def get_data(
-        self, nic_name: str, result: ExecutableResult
-    ) -> Dict[str, List[Decimal]]:
-        data = find_groups_in_lines(result.stdout, self.sar_results_pattern)
-        rx_pps: List[Decimal] = []
-        tx_pps: List[Decimal] = []
-        tx_rx_pps: List[Decimal] = []
-        for item in data:
-            rx_pps.append(Decimal(item["rxpck"]))
-            tx_pps.append(Decimal(item["txpck"]))
-            tx_rx_pps.append(Decimal(item["rxpck"]) + Decimal(item["txpck"]))
-
-        return {
-            "rx_pps": rx_pps,
-            "tx_pps": tx_pps,
-            "tx_rx_pps": tx_rx_pps,
-        }
+    def get_samples(self, nic_name: str, result: ExecutableResult) -> PpsSamples:
+        #             input            hn0           output
+        # packets  errs idrops      bytes    packets  errs      bytes colls
+        #   16     0     0       3506         23     0       5473     0
+        #  34     0     0       8253         50     0       8570     0
+        samples = parse_netstat(result.stdout)
+        if not samples.rx:
+            raise LisaException(f"not find matched netstat result for nic {nic_name}")
+        return samples
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Sample counters from /proc into a binary ring buffer. It runs on nodes, so it
+uses the standard library only, and supports old python3 versions.
+
+The file layout is,
+
+    header: magic, version, capacity, count, layout length
+    layout: json of counter names and kinds
+    slots: capacity * (timestamp, counters...)
+
+The count is updated after each slot is written, so the file can be decoded,
+even if the sampler is killed.
+"""
+
+import json
+import os
+import signal
+import struct
+import sys
+import time
+from typing import Dict, List
+
+MAGIC = b"LNMS"
+VERSION = 1
+HEADER_FORMAT = "<4sIIQI"
+COUNT_OFFSET = 12
+
+# the gauges are values at the time, others are increasing counters.
+KIND_COUNTER = "counter"
+KIND_GAUGE = "gauge"
+
+CPU_FIELDS = ["user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal"]
+NET_FIELDS = {
+    "rx_bytes": 0,
+    "rx_packets": 1,
+    "rx_drop": 3,
+    "tx_bytes": 8,
+    "tx_packets": 9,
+    "tx_drop": 11,
+}
+DISK_FIELDS = {
+    "reads": 0,
+    "read_sectors": 2,
+    "writes": 4,
+    "write_sectors": 6,
+    "io_ticks": 9,
+}
+MEMORY_FIELDS = ["MemFree", "MemAvailable", "Cached"]
+SKIPPED_DISK_PREFIXES = ("loop", "ram", "sr", "zram", "fd")
+
+
+def _read_lines(path: str) -> List[str]:
+    try:
+        with open(path, "r") as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+
+def _read_stat(values: Dict[str, int]) -> None:
+    for line in _read_lines("/proc/stat"):
+        fields = line.split()
+        if not fields:
+            continue
+        if fields[0] == "cpu":
+            for index, name in enumerate(CPU_FIELDS):
+                if index + 1 < len(fields):
+                    values["cpu." + name] = int(fields[index + 1])
+        elif fields[0] in ("intr", "ctxt"):
+            values[fields[0]] = int(fields[1])
+        elif fields[0] == "procs_running":
+            values["procs_running"] = int(fields[1])
+
+
+def _read_net(values: Dict[str, int]) -> None:
+    # skip two header lines
+    for line in _read_lines("/proc/net/dev")[2:]:
+        name, _, raw_fields = line.partition(":")
+        name = name.strip()
+        if name == "lo":
+            continue
+        fields = raw_fields.split()
+        for key, index in NET_FIELDS.items():
+            values["net.%s.%s" % (name, key)] = int(fields[index])
+
+
+def _read_disks(values: Dict[str, int]) -> None:
+    for line in _read_lines("/proc/diskstats"):
+        fields = line.split()
+        if len(fields) < 14:
+            continue
+        name = fields[2]
+        # whole disks only, partitions are in the disks already.
+        if name.startswith(SKIPPED_DISK_PREFIXES) or not os.path.exists(
+            "/sys/block/" + name
+        ):
+            continue
+        for key, index in DISK_FIELDS.items():
+            values["disk.%s.%s" % (name, key)] = int(fields[index + 3])
+
+
+def _read_per_cpu(path: str, prefix: str, values: Dict[str, int]) -> None:
+    lines = _read_lines(path)
+    if not lines:
+        return
+    cpu_count = len(lines[0].split())
+    per_cpu = [0] * cpu_count
+    for line in lines[1:]:
+        name, _, raw_fields = line.partition(":")
+        fields = raw_fields.split()[:cpu_count]
+        counters = []
+        for field in fields:
+            if not field.isdigit():
+                break
+            counters.append(int(field))
+        if prefix == "softirqs":
+            values["softirqs." + name.strip()] = sum(counters)
+        for index, counter in enumerate(counters):
+            per_cpu[index] += counter
+    for index, counter in enumerate(per_cpu):
+        values["%s.cpu%d" % (prefix, index)] = counter
+
+
+def _read_memory(values: Dict[str, int]) -> None:
+    for line in _read_lines("/proc/meminfo"):
+        name, _, raw_value = line.partition(":")
+        if name in MEMORY_FIELDS:
+            # in kB
+            values["memory." + name] = int(raw_value.split()[0])
+
+
+def read_counters() -> Dict[str, int]:
+    # the type comment keeps it runnable on python 3.5.
+    values = {}  # type: Dict[str, int]
+    _read_stat(values)
+    _read_net(values)
+    _read_disks(values)
+    _read_per_cpu("/proc/softirqs", "softirqs", values)
+    _read_per_cpu("/proc/interrupts", "interrupts", values)
+    _read_memory(values)
+    return values
+
+
+def _get_kind(name: str) -> str:
+    if name.startswith("memory.") or name == "procs_running":
+        return KIND_GAUGE
+    return KIND_COUNTER
+
+
+def main() -> int:
+    if len(sys.argv) != 4:
+        print("usage: node_metrics_sampler.py <file> <interval> <capacity>")
+        return 1
+    path = sys.argv[1]
+    interval = float(sys.argv[2])
+    capacity = int(sys.argv[3])
+
+    # the counters are fixed by the first sample, new devices are ignored.
+    first_values = read_counters()
+    names = sorted(first_values.keys())
+    layout = json.dumps(
+        {"names": names, "kinds": [_get_kind(name) for name in names]}
+    ).encode("utf-8")
+    # align slots to 8 bytes.
+    layout += b" " * (-(struct.calcsize(HEADER_FORMAT) + len(layout)) % 8)
+    slot_format = "<d%dQ" % len(names)
+    slot_size = struct.calcsize(slot_format)
+    slots_offset = struct.calcsize(HEADER_FORMAT) + len(layout)
+
+    stopped = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.append(signum))
+
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        header = struct.pack(HEADER_FORMAT, MAGIC, VERSION, capacity, 0, len(layout))
+        os.write(fd, header + layout)
+        os.ftruncate(fd, slots_offset + slot_size * capacity)
+        with open(path + ".pid", "w") as f:
+            f.write(str(os.getpid()))
+
+        count = 0
+        values = first_values
+        start = time.time()
+        while not stopped:
+            slot = struct.pack(
+                slot_format,
+                time.time(),
+                *[max(values.get(name, 0), 0) for name in names],
+            )
+            os.pwrite(fd, slot, slots_offset + slot_size * (count % capacity))
+            count += 1
+            os.pwrite(fd, struct.pack("<Q", count), COUNT_OFFSET)
+            # sleep to the next tick, so the interval doesn't drift.
+            delay = start + count * interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            values = read_counters()
+    finally:
+        os.close(fd)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
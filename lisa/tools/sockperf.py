@@ -2,9 +2,8 @@
 # Licensed under the MIT license.
 
 import pathlib
-import re
 from decimal import Decimal
-from typing import TYPE_CHECKING, Any, Dict, List, Type, Union, cast
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, Union, cast
 
 from assertpy import assert_that
 
@@ -13,6 +12,8 @@ from lisa.executable import Tool
 from lisa.messages import NetworkLatencyPerformanceMessage, create_perf_message
 from lisa.operating_system import BSD, CBLMariner, Posix, Ubuntu
 from lisa.util import constants
+from lisa.util.build_cache import BuildCache
+from lisa.util.perf_parser import LatencyDistribution, parse_sockperf, to_decimal
 from lisa.util.process import Process
 
 from .firewall import Firewall
@@ -41,42 +42,8 @@ class Sockperf(Tool):
         )
 
     _sockperf_repo = "https://github.com/Mellanox/sockperf.git"
-
-    sockperf_result_regex = re.compile(
-        r"sockperf: ---> <MAX> observation"
-        r" =\s+(?P<max_latency_us>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 99\.999 "
-        r"=\s+(?P<latency99_999_percentile_us>.[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 99\.990 "
-        r"=\s+(?P<latency99_990_percentile_us>.[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 99\.900 "
-        r"=\s+(?P<latency99_900_percentile_us>.[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 99\.000 "
-        r"=\s+(?P<latency99_percentile_us>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 90\.000 "
-        r"=\s+(?P<latency_us_90>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 75\.000 "
-        r"=\s+(?P<latency_us_75>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 50\.000 "
-        r"=\s+(?P<latency_us_50>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> percentile 25\.000 "
-        r"=\s+(?P<latency_us_25>[0-9]+\.[0-9]+)\s+"
-        r"sockperf: ---> <MIN> observation "
-        r"=\s+(?P<min_latency_us>[0-9]+\.[0-9]+)"
-    )
-
-    # Summary: Round trip is 297.328 usec
-    sockperf_average_latency = re.compile(
-        r"Summary: Round trip is (?P<avg_latency_us>[0-9]+\.[0-9]+) usec"
-    )  # noqa: E501
-
-    # Total 1283 observations;
-    sockperf_total_observations = re.compile(
-        r"Total (?P<total_observations>[0-9]+) observations"
-    )  # noqa: E501
-
-    # [Valid Duration] RunTime=0.546 sec; SentMessages=1283; ReceivedMessages=1283
-    sockperf_run_time = re.compile(r"RunTime=(?P<run_time>[0-9]+\.[0-9]+) sec")
+    # the stable tag, which is built, if the latest fails.
+    _stable_ref = "3.10"
 
     def _get_protocol_flag(self, mode: str) -> str:
         assert_that(mode).described_as(
@@ -122,25 +89,56 @@ class Sockperf(Tool):
             git = self.node.tools[Git]
             git.clone(self._sockperf_repo, tool_path)
             code_path = tool_path.joinpath("sockperf")
-            # try latest, if fails, try stable
-            # seems to work best for BSD+Linux compat for now
-            try:
-                self.run_build_install(code_path)
-            except AssertionError:  # catch build failures
-                self.node.tools[Make].run("clean", cwd=code_path, force_run=True)
-                # try and older stable tag
-                git.checkout(cwd=code_path, ref="3.10")
-                self.node.log.debug(
-                    "Latest build failed, re-running with stable version 3.10."
+            commit_id = git.get_latest_commit_id(cwd=code_path)
+            # the stable version is built, if the latest fails, so the result
+            # of each build path is cached separately.
+            build_cache = BuildCache(self.node, self.name, version=commit_id)
+            fallback_cache = BuildCache(
+                self.node,
+                self.name,
+                version=commit_id,
+                variant=f"fallback {self._stable_ref}",
+            )
+            if not (build_cache.restore() or fallback_cache.restore()):
+                self._build_install_with_fallback(
+                    code_path, build_cache, fallback_cache
                 )
-                self.run_build_install(code_path)
 
         # disable any firewalls running which might mess with the test
         self.node.tools[Firewall].stop()
 
         return self._check_exists()
 
-    def run_build_install(self, code_path: pathlib.PurePath) -> None:
+    def _build_install_with_fallback(
+        self,
+        code_path: pathlib.PurePath,
+        build_cache: BuildCache,
+        fallback_cache: BuildCache,
+    ) -> None:
+        # try latest, if fails, try stable
+        # seems to work best for BSD+Linux compat for now
+        try:
+            # /usr is shared with packages, so the build is installed to a
+            # staging folder, and only its files are cached.
+            with build_cache.stage() as staging_path:
+                self.run_build_install(code_path, staging_path)
+        except AssertionError:  # catch build failures
+            self.node.tools[Make].run("clean", cwd=code_path, force_run=True)
+            # try and older stable tag
+            git = self.node.tools[Git]
+            git.checkout(cwd=code_path, ref=self._stable_ref)
+            self.node.log.debug(
+                f"Latest build failed, re-running with stable version "
+                f"{self._stable_ref}."
+            )
+            with fallback_cache.stage() as staging_path:
+                self.run_build_install(code_path, staging_path)
+
+    def run_build_install(
+        self,
+        code_path: pathlib.PurePath,
+        staging_path: Optional[pathlib.PurePath] = None,
+    ) -> None:
         make = self.node.tools[Make]
         self.node.execute(
             "./autogen.sh",
@@ -162,93 +160,116 @@ class Sockperf(Tool):
             ),
         )
 
-        make.make_install(cwd=code_path, sudo=True)
+        if staging_path:
+            make.make(arguments="", cwd=code_path, sudo=True)
+            make.make(
+                arguments=f"install DESTDIR={staging_path}", cwd=code_path, sudo=True
+            )
+        else:
+            make.make_install(cwd=code_path, sudo=True)
 
-    def start(self, command: str) -> Process:
-        return self.run_async(command, shell=True, force_run=True)
+    def start(self, command: str, start_at: Optional[float] = None) -> Process:
+        return self.run_async(command, shell=True, force_run=True, start_at=start_at)
 
     def start_server_async(self, mode: str, timeout: int = 30) -> Process:
         self_ip = self.node.nics.get_primary_nic().ip_addr
         protocol_flag = self._get_protocol_flag(mode)
         return self.start(command=f"server {protocol_flag} -i {self_ip}")
 
-    def run_client_async(self, mode: str, server_ip: str) -> Process:
+    def run_client_async(
+        self,
+        mode: str,
+        server_ip: str,
+        run_time_seconds: int = 0,
+        start_at: Optional[float] = None,
+    ) -> Process:
+        # -t: run for given seconds, the default is 1 second.
         protocol_flag = self._get_protocol_flag(mode)
-        return self.start(
-            command=f"ping-pong {protocol_flag} --full-rtt -i {server_ip}"
+        command = f"ping-pong {protocol_flag} --full-rtt -i {server_ip}"
+        if run_time_seconds:
+            command += f" -t {run_time_seconds}"
+        return self.start(command=command, start_at=start_at)
+
+    def run_client(self, mode: str, server_ip: str, run_time_seconds: int = 0) -> str:
+        return (
+            self.run_client_async(mode, server_ip, run_time_seconds)
+            .wait_result()
+            .stdout
         )
 
-    def run_client(self, mode: str, server_ip: str) -> str:
-        return self.run_client_async(mode, server_ip).wait_result().stdout
-
     def create_latency_performance_message(
         self,
         sockperf_output: str,
         test_case_name: str,
         test_result: "TestResult",
     ) -> None:
-        matched_results = self.sockperf_result_regex.search(sockperf_output)
-        assert matched_results, "Could not find sockperf latency results in output."
+        message = self.get_latency_performance_message(
+            sockperf_output, test_case_name, test_result
+        )
+        notifier.notify(message)
 
-        other_fields: Dict[str, Any] = {}
+    def get_latency_performance_message(
+        self,
+        sockperf_output: str,
+        test_case_name: str,
+        test_result: "TestResult",
+    ) -> NetworkLatencyPerformanceMessage:
+        distribution = self.get_distribution(sockperf_output)
+        assert (
+            distribution.percentiles
+        ), "Could not find sockperf latency results in output."
+
+        other_fields: Dict[str, Any] = distribution.get_message_fields()
         other_fields["tool"] = constants.NETWORK_PERFORMANCE_TOOL_SOCKPERF
-        other_fields["min_latency_us"] = Decimal(
-            matched_results.group("min_latency_us")
-        )
-        other_fields["max_latency_us"] = Decimal(
-            matched_results.group("max_latency_us")
-        )
-        other_fields["latency99_percentile_us"] = Decimal(
-            matched_results.group("latency99_percentile_us")
+        percentiles = "\n".join(
+            f"{percentile:.3f}: {value}"
+            for percentile, value in sorted(
+                distribution.percentiles.items(), reverse=True
+            )
         )
         self.node.log.info(
             f"sockperf latency results (usec):\n"
             "Percentiles:\n"
-            f'MAX   :  {matched_results.group("max_latency_us")}\n'
-            f'99.999: {matched_results.group("latency99_999_percentile_us")}\n'
-            f'99.990: {matched_results.group("latency99_990_percentile_us")}\n'
-            f'99.900: {matched_results.group("latency99_900_percentile_us")}\n'
-            f'99.000: {matched_results.group("latency99_percentile_us")}\n'
-            f'90.000: {matched_results.group("latency_us_90")}\n'
-            f'75.000: {matched_results.group("latency_us_75")}\n'
-            f'50.000: {matched_results.group("latency_us_50")}\n'
-            f'25.000: {matched_results.group("latency_us_25")}\n'
-            f'MIN   :  {matched_results.group("min_latency_us")}\n'
+            f"MAX   :  {distribution.maximum}\n"
+            f"{percentiles}\n"
+            f"MIN   :  {distribution.minimum}\n"
         )
-        message = create_perf_message(
+        return create_perf_message(
             NetworkLatencyPerformanceMessage,
             self.node,
             test_result,
             test_case_name,
             other_fields,
         )
-        notifier.notify(message)
+
+    def get_distribution(self, sockperf_output: str) -> LatencyDistribution:
+        return parse_sockperf(sockperf_output)
 
     def get_average_latency(self, sockperf_output: str) -> Decimal:
-        matched_results = self.sockperf_average_latency.search(sockperf_output)
-        assert matched_results, "Could not find sockperf latency results in output."
-        return Decimal(matched_results.group("avg_latency_us"))
+        distribution = self.get_distribution(sockperf_output)
+        assert (
+            distribution.average is not None
+        ), "Could not find sockperf latency results in output."
+        return to_decimal(distribution.average)
 
     def get_total_observations(self, sockperf_output: str) -> int:
-        matched_results = self.sockperf_total_observations.search(sockperf_output)
-        assert matched_results, "Could not find sockperf latency results in output."
-        return int(matched_results.group("total_observations"))
+        distribution = self.get_distribution(sockperf_output)
+        assert distribution.count, "Could not find sockperf latency results in output."
+        return distribution.count
 
     def get_run_time(self, sockperf_output: str) -> Decimal:
-        matched_results = self.sockperf_run_time.search(sockperf_output)
-        assert matched_results, "Could not find sockperf latency results in output."
-        return Decimal(matched_results.group("run_time"))
+        distribution = self.get_distribution(sockperf_output)
+        assert (
+            distribution.run_time_seconds
+        ), "Could not find sockperf latency results in output."
+        return to_decimal(distribution.run_time_seconds)
 
     def get_statistics(self, sockperf_output: str) -> Dict[str, Any]:
-        matched_results = self.sockperf_result_regex.search(sockperf_output)
-        assert matched_results, "Could not find sockperf latency results in output."
-        stats: Dict[str, Any] = {}
-        stats["min_latency_us"] = Decimal(matched_results.group("min_latency_us"))
-        stats["max_latency_us"] = Decimal(matched_results.group("max_latency_us"))
-        stats["average_latency_us"] = self.get_average_latency(sockperf_output)
-        stats["latency99_percentile_us"] = Decimal(
-            matched_results.group("latency99_percentile_us")
-        )
-        stats["total_observations"] = self.get_total_observations(sockperf_output)
-        stats["run_time_seconds"] = self.get_run_time(sockperf_output)
+        distribution = self.get_distribution(sockperf_output)
+        assert (
+            distribution.count and distribution.run_time_seconds
+        ), "Could not find sockperf latency results in output."
+        stats: Dict[str, Any] = distribution.get_message_fields()
+        stats["total_observations"] = distribution.count
+        stats["run_time_seconds"] = to_decimal(distribution.run_time_seconds)
         return stats
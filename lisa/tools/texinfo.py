@@ -40,6 +40,7 @@ class Texinfo(Tool):
             url=self.source_link,
             filename=f"texinfo-{self.version}.tar.xz",
             file_path=str(tool_path),
+            cache=True,
         )
         tar.extract(download_path, dest_dir=str(tool_path))
         code_path = tool_path.joinpath(f"texinfo-{self.version}")
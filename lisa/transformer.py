@@ -9,7 +9,7 @@ from lisa import schema
 from lisa.environment import Environment
 from lisa.node import Node
 from lisa.parameter_parser.runbook import RunbookBuilder
-from lisa.util import InitializableMixin, LisaException, constants, subclasses
+from lisa.util import InitializableMixin, LisaException, constants, profiler, subclasses
 from lisa.util.logger import get_logger
 from lisa.variable import VariableEntry, merge_variables
 
@@ -223,14 +223,15 @@ def run(
     # real run
     log.debug(f"detecting or running transformers of phase '{phase}'...")
 
-    # Some transformer phases, like environment_connected, expect initialized nodes
-    # so we offer the nodes if available.
-    if environment and environment.nodes:
-        for node in environment.nodes.list():
-            output_variables = _run_transformers(
-                runbook_builder, phase=phase, node=node
-            )
+    with profiler.phase(profiler.PHASE_TRANSFORMER):
+        # Some transformer phases, like environment_connected, expect initialized
+        # nodes so we offer the nodes if available.
+        if environment and environment.nodes:
+            for node in environment.nodes.list():
+                output_variables = _run_transformers(
+                    runbook_builder, phase=phase, node=node
+                )
+                merge_variables(runbook_builder.variables, output_variables)
+        else:
+            output_variables = _run_transformers(runbook_builder, phase=phase)
             merge_variables(runbook_builder.variables, output_variables)
-    else:
-        output_variables = _run_transformers(runbook_builder, phase=phase)
-        merge_variables(runbook_builder.variables, output_variables)
@@ -0,0 +1,191 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Measure performance by short windows repeatedly, until the mean is stable,
+instead of one long run with a fixed duration.
+
+After each window, the confidence interval of the mean is calculated by the t
+distribution. The sampling stops, when the relative half width of the interval
+is under the target, or when the count or time budget is used up. So stable
+configurations finish early, and noisy ones get more windows, and the achieved
+interval is recorded in perf messages.
+"""
+
+import copy
+import math
+import statistics
+from dataclasses import dataclass, fields
+from decimal import Decimal
+from typing import Callable, Generic, List, Sequence, TypeVar
+
+from lisa.messages import PerfMessage
+from lisa.util.logger import get_logger
+from lisa.util.perf_store import get_t_p_value
+from lisa.util.perf_timer import create_timer
+
+T = TypeVar("T")
+M = TypeVar("M", bound=PerfMessage)
+
+
+def get_t_quantile(confidence: float, freedom: float) -> float:
+    """
+    The t value, which the two-sided interval covers the confidence. It's
+    found by bisection, since the p-value decreases by t.
+    """
+    low, high = 0.0, 1.0
+    while get_t_p_value(high, freedom) > 1 - confidence:
+        high *= 2
+    for _ in range(100):
+        middle = (low + high) / 2
+        if get_t_p_value(middle, freedom) > 1 - confidence:
+            low = middle
+        else:
+            high = middle
+        if high - low < 1e-9:
+            break
+    return high
+
+
+def get_relative_ci(values: Sequence[float], confidence: float = 0.95) -> float:
+    """
+    The half width of the confidence interval of the mean in percentage of the
+    mean. It's infinite, if there are not enough samples.
+    """
+    if len(values) < 2:
+        return math.inf
+    mean = statistics.mean(values)
+    stdev = statistics.stdev(values)
+    if not stdev:
+        return 0.0
+    if not mean:
+        return math.inf
+    half_width = (
+        get_t_quantile(confidence, len(values) - 1) * stdev / math.sqrt(len(values))
+    )
+    return half_width / abs(mean) * 100
+
+
+def average_messages(messages: List[M]) -> M:
+    """
+    Average the Decimal fields, which are metrics of windows. Other fields are
+    from the first message.
+    """
+    assert messages, "messages must not be empty"
+    result = copy.deepcopy(messages[0])
+    for item in fields(result):
+        if isinstance(getattr(result, item.name), Decimal):
+            setattr(
+                result,
+                item.name,
+                statistics.mean(getattr(x, item.name) for x in messages),
+            )
+    return result
+
+
+@dataclass
+class SamplingResult(Generic[T]):
+    samples: List[T]
+    # the metrics of each sample, which are checked for stability.
+    values: List[List[float]]
+    # the max relative confidence interval of metrics, in percentage.
+    relative_ci: float
+    is_stable: bool
+    elapsed: float
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def update_message(self, message: PerfMessage) -> None:
+        message.sample_count = self.count
+        if math.isfinite(self.relative_ci):
+            message.confidence_interval_percent = Decimal(
+                str(round(self.relative_ci, 2))
+            )
+
+
+class AdaptiveSampler:
+    """
+    The usage is like,
+
+        sampler = AdaptiveSampler(window_seconds=10, relative_ci=2)
+        result = sampler.run(
+            lambda: run_tool(time=sampler.window_seconds),
+            lambda message: [float(message.throughput_in_gbps)],
+        )
+        message = average_messages(result.samples)
+        result.update_message(message)
+    """
+
+    def __init__(
+        self,
+        window_seconds: int = 10,
+        relative_ci: float = 5,
+        confidence: float = 0.95,
+        min_samples: int = 3,
+        max_samples: int = 10,
+        max_seconds: float = 0,
+    ) -> None:
+        """
+        window_seconds: the duration of each window, it's used by callers.
+        relative_ci: the target half width of the interval in percentage.
+        max_seconds: the time budget, 0 means no limit. A window isn't started,
+            if it's expected to exceed the budget.
+        """
+        assert min_samples >= 2, "at least 2 samples are needed for the interval"
+        assert max_samples >= min_samples, "max_samples is less than min_samples"
+        self.window_seconds = window_seconds
+        self.relative_ci = relative_ci
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.max_seconds = max_seconds
+        self._log = get_logger("adaptive_sampling")
+
+    def run(
+        self, sample: Callable[[], T], get_values: Callable[[T], Sequence[float]]
+    ) -> SamplingResult[T]:
+        """
+        sample: run one window, and return its result.
+        get_values: get metrics from a result. All metrics need to be stable.
+        """
+        timer = create_timer()
+        samples: List[T] = []
+        values: List[List[float]] = []
+        relative_ci = math.inf
+        is_stable = False
+        while True:
+            current = sample()
+            samples.append(current)
+            values.append([float(x) for x in get_values(current)])
+            relative_ci = max(
+                (get_relative_ci(x, self.confidence) for x in zip(*values)),
+                default=math.inf,
+            )
+            count = len(samples)
+            self._log.debug(
+                f"sample {count}: {values[-1]}, relative ci: {relative_ci:.2f}%"
+            )
+            if count >= self.min_samples and relative_ci <= self.relative_ci:
+                is_stable = True
+                break
+            if count >= self.max_samples:
+                break
+            elapsed = timer.elapsed(False)
+            if self.max_seconds and elapsed + elapsed / count > self.max_seconds:
+                break
+
+        if not is_stable:
+            self._log.info(
+                f"the result isn't stable after {len(samples)} samples, the "
+                f"relative ci is {relative_ci:.2f}%, the target is "
+                f"{self.relative_ci}%"
+            )
+        return SamplingResult(
+            samples=samples,
+            values=values,
+            relative_ci=relative_ci,
+            is_stable=is_stable,
+            elapsed=timer.elapsed(),
+        )
@@ -0,0 +1,271 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+The artifact proxy fetches artifacts on the controller once, and pushes them to
+nodes over the existing SSH connection. So nodes don't download the same large
+files from internet, and nodes can run tests without internet access. If it's
+offline, artifacts are served from the cache folder only, so the folder can be
+pre-populated, like by "wget -x" and "git clone --mirror".
+
+The layout of the cache folder,
+    files/<host>/<path>: files of urls.
+    git/<host>/<path>.git: mirrors of git repos.
+"""
+
+import hashlib
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import threading
+import urllib.request
+import uuid
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Dict, List, Optional
+from urllib.parse import urlparse
+
+from lisa import schema
+from lisa.util import LisaException, constants
+from lisa.util.logger import get_logger
+from lisa.util.perf_timer import create_timer
+
+if TYPE_CHECKING:
+    from lisa.node import Node
+
+_FILES_FOLDER = "files"
+_GIT_FOLDER = "git"
+_DEFAULT_INDEX_NAME = "index.html"
+_BLOCK_SIZE = 1024 * 1024
+_DOWNLOAD_TIMEOUT = 600
+
+_proxy: Optional["ArtifactProxy"] = None
+
+
+def load_artifact_proxy_settings(runbook: Optional[schema.ArtifactProxy]) -> None:
+    global _proxy
+    if runbook and runbook.enabled:
+        _proxy = ArtifactProxy(runbook)
+    else:
+        _proxy = None
+
+
+def get_artifact_proxy(url: str, node: "Node") -> Optional["ArtifactProxy"]:
+    """
+    Return the proxy, if the url should be served to the node by it.
+    """
+    if _proxy and node.is_remote and node.is_posix and _proxy.is_served(url):
+        return _proxy
+    return None
+
+
+class ArtifactProxy:
+    def __init__(self, runbook: schema.ArtifactProxy) -> None:
+        self._runbook = runbook
+        if runbook.path:
+            self._path = Path(runbook.path).expanduser().absolute()
+        else:
+            self._path = constants.CACHE_PATH / "artifacts"
+        self._log = get_logger("artifact_proxy")
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._hashes: Dict[Path, str] = {}
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def is_served(self, url: str) -> bool:
+        if urlparse(url).scheme not in ["http", "https"]:
+            return False
+        if self._runbook.include:
+            return any(url.startswith(x) for x in self._runbook.include)
+        return True
+
+    def get_file(self, url: str) -> Path:
+        """
+        Return the cached file of the url, it's downloaded if not cached.
+        """
+        local_path = self._path / _FILES_FOLDER / self._get_relative_path(url)
+        with self._get_key_lock(str(local_path)):
+            if local_path.exists():
+                return local_path
+            self._check_online(url)
+
+            timer = create_timer()
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            # download to a temp file and rename it, so a broken download
+            # doesn't leave a partial file in the cache.
+            temp_file = tempfile.NamedTemporaryFile(
+                dir=local_path.parent, prefix=f".{local_path.name}.", delete=False
+            )
+            try:
+                with temp_file, urllib.request.urlopen(
+                    url, timeout=_DOWNLOAD_TIMEOUT
+                ) as response:
+                    shutil.copyfileobj(response, temp_file, _BLOCK_SIZE)
+                os.replace(temp_file.name, local_path)
+            except Exception as identifier:
+                os.unlink(temp_file.name)
+                raise LisaException(f"failed to download '{url}': {identifier}")
+            self._log.debug(f"downloaded '{url}' to '{local_path}' in {timer}")
+        return local_path
+
+    def get_git(self, url: str, auth_token: Optional[str] = None) -> Path:
+        """
+        Return the cached mirror of the git repo. It's cloned if not cached, and
+        fetched if update_git is enabled.
+        """
+        relative_path = self._get_relative_path(url)
+        if relative_path.suffix != ".git":
+            relative_path = relative_path.with_name(f"{relative_path.name}.git")
+        mirror_path = self._path / _GIT_FOLDER / relative_path
+        auth_args: List[str] = []
+        if auth_token:
+            auth_args = ["-c", f"http.extraheader=AUTHORIZATION: bearer {auth_token}"]
+
+        with self._get_key_lock(str(mirror_path)):
+            timer = create_timer()
+            if mirror_path.exists():
+                if self._runbook.offline or not self._runbook.update_git:
+                    return mirror_path
+                self._run_git(["remote", "update", "--prune"], mirror_path, auth_args)
+                self._log.debug(f"updated mirror of '{url}' in {timer}")
+            else:
+                self._check_online(url)
+                mirror_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = Path(
+                    tempfile.mkdtemp(dir=mirror_path.parent, prefix=".clone.")
+                )
+                try:
+                    self._run_git(
+                        ["clone", "--mirror", url, str(temp_path)],
+                        mirror_path.parent,
+                        auth_args,
+                    )
+                    os.replace(temp_path, mirror_path)
+                finally:
+                    shutil.rmtree(temp_path, ignore_errors=True)
+                self._log.debug(f"cloned mirror of '{url}' in {timer}")
+        return mirror_path
+
+    def push_file(self, node: "Node", url: str) -> PurePath:
+        """
+        Push the file of url to the node, and return the path on node. Files on
+        node are keyed by sha256, so a file is pushed once for each node.
+        """
+        local_path = self.get_file(url)
+        node_path = (
+            self._get_node_root(node)
+            / _FILES_FOLDER
+            / self._get_sha256(local_path)
+            / local_path.name
+        )
+        with self._get_key_lock(f"{id(node)}:{node_path}"):
+            if not node.shell.exists(node_path):
+                node.shell.mkdir(node_path.parent, parents=True, exist_ok=True)
+                temp_path = self._get_node_temp_path(node_path)
+                node.shell.copy(local_path, temp_path)
+                self._move_on_node(node, temp_path, node_path)
+        return node_path
+
+    def push_git(
+        self, node: "Node", url: str, auth_token: Optional[str] = None
+    ) -> PurePath:
+        """
+        Push the mirror of git repo to the node, and return the path on node. The
+        mirror is pushed again, only if its refs are changed.
+        """
+        mirror_path = self.get_git(url, auth_token)
+        refs = self._run_git(["show-ref"], mirror_path, check=False)
+        fingerprint = hashlib.sha256(refs.encode("utf-8")).hexdigest()[:16]
+        node_path = (
+            self._get_node_root(node) / _GIT_FOLDER / fingerprint / mirror_path.name
+        )
+        with self._get_key_lock(f"{id(node)}:{node_path}"):
+            if not node.shell.exists(node_path):
+                temp_path = self._get_node_temp_path(node_path)
+                statistics = node.shell.copy_tree(mirror_path, temp_path)
+                self._move_on_node(node, temp_path, node_path)
+                self._log.debug(f"pushed '{mirror_path}': {statistics}")
+        return node_path
+
+    def _get_relative_path(self, url: str) -> PurePath:
+        parsed = urlparse(url)
+        host = parsed.hostname or "localhost"
+        if parsed.port:
+            host = f"{host}_{parsed.port}"
+        parts = [x for x in parsed.path.split("/") if x not in ["", ".", ".."]]
+        if not parts or parsed.path.endswith("/"):
+            parts.append(_DEFAULT_INDEX_NAME)
+        if parsed.query:
+            query_hash = hashlib.sha256(parsed.query.encode("utf-8")).hexdigest()[:8]
+            parts[-1] = f"{parts[-1]}_{query_hash}"
+        return PurePath(host, *parts)
+
+    def _get_node_root(self, node: "Node") -> PurePath:
+        # it's shared by runs, like the global tool path.
+        return node.get_working_path().parent.parent.joinpath(
+            constants.PATH_TOOL, "artifact_proxy"
+        )
+
+    def _get_node_temp_path(self, node_path: PurePath) -> PurePath:
+        return node_path.with_name(f".{node_path.name}.{uuid.uuid4().hex[:8]}")
+
+    def _move_on_node(
+        self, node: "Node", temp_path: PurePath, node_path: PurePath
+    ) -> None:
+        # a broken push leaves the temp path only, so it's not used by others.
+        # If another push completes first, its result is kept.
+        temp = shlex.quote(str(temp_path))
+        node.execute(
+            f"mv -T {temp} {shlex.quote(str(node_path))} 2>/dev/null || rm -rf {temp}",
+            shell=True,
+        )
+
+    def _get_sha256(self, path: Path) -> str:
+        with self._lock:
+            cached = self._hashes.get(path)
+        if cached:
+            return cached
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+                sha.update(block)
+        with self._lock:
+            self._hashes[path] = sha.hexdigest()
+        return sha.hexdigest()
+
+    def _get_key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _check_online(self, url: str) -> None:
+        if self._runbook.offline:
+            raise LisaException(
+                f"'{url}' is not in the artifact cache '{self._path}', "
+                "and the artifact proxy is offline."
+            )
+
+    def _run_git(
+        self,
+        args: List[str],
+        cwd: Path,
+        auth_args: Optional[List[str]] = None,
+        check: bool = True,
+    ) -> str:
+        process = subprocess.run(
+            ["git"] + (auth_args or []) + args,
+            cwd=cwd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if check and process.returncode != 0:
+            # the auth arguments are not printed, they contain the token.
+            raise LisaException(
+                f"'git {' '.join(args)}' failed on controller, "
+                f"exit code: {process.returncode}, {process.stderr}"
+            )
+        return process.stdout
@@ -0,0 +1,280 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Cache files installed by builds from source on the controller. The cache key
+includes the tool name, the source version, the distro, the arch and the
+toolchain, so the cached files are compatible with nodes of the same key. Later
+nodes extract the cached files, instead of building again.
+
+The installed files are captured by their change time. A marker file is created
+before the install step, and files under the install prefix, which are changed
+after the marker, are packed into a tarball. The prefix is scoped, so files
+changed by other processes, like package managers, are not captured. If the
+prefix is shared with other packages, like /usr, the build is installed to a
+staging folder by DESTDIR, and only files in it are packed.
+"""
+
+import hashlib
+import json
+import os
+import shlex
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path, PurePath
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+from lisa.util import constants
+from lisa.util.logger import get_logger
+from lisa.util.perf_timer import create_timer
+
+if TYPE_CHECKING:
+    from lisa.node import Node
+
+# increase it, when the cached content or the key is changed.
+CACHE_VERSION = 3
+_CACHE_FOLDER = "build"
+
+
+class BuildCache:
+    """
+    The usage is like,
+
+        build_cache = BuildCache(node, "fio", version=commit_id)
+        if not build_cache.restore():
+            with build_cache.capture():
+                make.make_install(code_path)
+
+    or with a staging folder,
+
+        if not build_cache.restore():
+            with build_cache.stage() as staging_path:
+                make.make(f"install DESTDIR={staging_path}", code_path, sudo=True)
+    """
+
+    def __init__(
+        self,
+        node: "Node",
+        name: str,
+        version: str,
+        variant: str = "",
+        prefix: str = "/usr/local",
+    ) -> None:
+        """
+        variant: build options, which change installed files.
+        prefix: the install prefix of the build, files under it are captured.
+        """
+        self._node = node
+        self._name = name
+        self._version = version
+        self._variant = variant
+        self._prefix = prefix
+        self._log = get_logger("build_cache", name)
+        self._key: Optional[str] = None
+        self._key_fields: Dict[str, str] = {}
+
+    @property
+    def is_enabled(self) -> bool:
+        # the controller is the node itself for local nodes, and builds
+        # on Windows are not captured by files.
+        return (
+            self._node.is_remote
+            and self._node.is_posix
+            and bool(self._version)
+            and hasattr(constants, "CACHE_PATH")
+        )
+
+    @property
+    def cache_file(self) -> Path:
+        return constants.CACHE_PATH / _CACHE_FOLDER / f"{self.key}.tar.gz"
+
+    @property
+    def key(self) -> str:
+        if self._key is None:
+            self._key_fields = self._get_key_fields()
+            raw_key = json.dumps(self._key_fields, sort_keys=True)
+            self._key = (
+                f"{self._name}_{hashlib.sha256(raw_key.encode('utf-8')).hexdigest()}"
+            )
+        return self._key
+
+    def restore(self) -> bool:
+        """
+        Extract cached files to the node. It returns False, if it's not cached,
+        or the extraction fails, and the tool should be built.
+        """
+        if not self.is_enabled or not self.cache_file.exists():
+            return False
+
+        timer = create_timer()
+        node = self._node
+        node_file = self._get_node_file()
+        try:
+            node.shell.copy(self.cache_file, node_file)
+            self._extract(node_file)
+        except Exception as identifier:
+            self._log.debug(f"failed to restore build cache, build it: {identifier}")
+            return False
+        finally:
+            node.execute(f"rm -f {shlex.quote(str(node_file))}", shell=True, sudo=True)
+        self._log.debug(f"restored {self._key_fields} in {timer}")
+        return True
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """
+        Capture files installed in the context, and save them to the cache. If
+        the context raises exceptions, nothing is saved.
+        """
+        if not self.is_enabled:
+            yield
+            return
+
+        node = self._node
+        marker = self._get_node_file(".marker")
+        quoted_marker = shlex.quote(str(marker))
+        node.execute(f"touch {quoted_marker}", shell=True)
+        try:
+            yield
+        except Exception:
+            node.execute(f"rm -f {quoted_marker}", shell=True)
+            raise
+
+        timer = create_timer()
+        node_file = self._get_node_file()
+        quoted_file = shlex.quote(str(node_file))
+        quoted_list = shlex.quote(str(self._get_node_file(".list")))
+        try:
+            # if nothing is installed, it's not saved.
+            node.execute(
+                f"find {shlex.quote(self._prefix)} -xdev -cnewer {quoted_marker} "
+                rf"\( -type f -o -type l \) -print0 2>/dev/null > {quoted_list}; "
+                f"[ -s {quoted_list} ] && "
+                f"tar --null -T {quoted_list} -czf {quoted_file}",
+                shell=True,
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="failed to pack installed files",
+            )
+            self._save(node_file)
+            self._log.debug(
+                f"saved {self._key_fields} to {self.cache_file.name} in {timer}"
+            )
+        except Exception as identifier:
+            # the build is done, so the cache failure doesn't fail the install.
+            self._log.debug(f"failed to save build cache: {identifier}")
+        finally:
+            node.execute(
+                f"rm -f {quoted_marker} {quoted_list} {quoted_file}",
+                shell=True,
+                sudo=True,
+            )
+
+    @contextmanager
+    def stage(self) -> Iterator[PurePath]:
+        """
+        Yield a staging folder on the node, and the build installs files to it
+        by DESTDIR in the context. Then files in it are installed to the root,
+        and saved to the cache. Unlike capture, other files under the prefix
+        are not captured. If the context raises exceptions, nothing is
+        installed.
+        """
+        node = self._node
+        staging_path = self._get_node_path(f"{self._name}.staging")
+        node_file = self._get_node_path(f"{self._name}.staging.tar.gz")
+        quoted_staging = shlex.quote(str(staging_path))
+        quoted_file = shlex.quote(str(node_file))
+        quoted_list = shlex.quote(str(self._get_node_path(f"{self._name}.list")))
+        node.execute(
+            f"rm -rf {quoted_staging} && mkdir -p {quoted_staging}",
+            shell=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to create staging folder",
+        )
+        try:
+            yield staging_path
+
+            timer = create_timer()
+            node.execute(
+                f"cd {quoted_staging} && "
+                rf"find . \( -type f -o -type l \) -print0 > {quoted_list} && "
+                f"[ -s {quoted_list} ] && "
+                f"tar --null -T {quoted_list} -czf {quoted_file}",
+                shell=True,
+                sudo=True,
+                expected_exit_code=0,
+                expected_exit_code_failure_message="failed to pack staged files",
+            )
+            self._extract(node_file)
+            if self.is_enabled:
+                try:
+                    self._save(node_file)
+                    self._log.debug(
+                        f"saved {self._key_fields} to {self.cache_file.name} "
+                        f"in {timer}"
+                    )
+                except Exception as identifier:
+                    # the build is installed, so the cache failure doesn't
+                    # fail the install.
+                    self._log.debug(f"failed to save build cache: {identifier}")
+        finally:
+            node.execute(
+                f"rm -rf {quoted_staging} {quoted_list} {quoted_file}",
+                shell=True,
+                sudo=True,
+            )
+
+    def _extract(self, node_file: PurePath) -> None:
+        self._node.execute(
+            f"tar -xzf {shlex.quote(str(node_file))} -C / && "
+            "(ldconfig 2>/dev/null || true)",
+            shell=True,
+            sudo=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message="failed to extract build files",
+        )
+
+    def _save(self, node_file: PurePath) -> None:
+        self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # copy to a temp file and rename, so other runs don't read a partial
+        # file.
+        temp_file = tempfile.NamedTemporaryFile(
+            dir=self.cache_file.parent, suffix=".tmp", delete=False
+        )
+        temp_file.close()
+        try:
+            self._node.shell.copy_back(node_file, PurePath(temp_file.name))
+            os.replace(temp_file.name, self.cache_file)
+        finally:
+            if os.path.exists(temp_file.name):
+                os.unlink(temp_file.name)
+
+    def _get_key_fields(self) -> Dict[str, str]:
+        node = self._node
+        result = node.execute(
+            "uname -m; (cc --version || gcc --version) 2>/dev/null | head -n 1",
+            shell=True,
+        )
+        lines = result.stdout.splitlines()
+        information = node.os.information
+        return {
+            "cache_version": str(CACHE_VERSION),
+            "name": self._name,
+            "version": self._version,
+            "variant": self._variant,
+            "distro": f"{node.os.name} {information.vendor} {information.version}",
+            "arch": lines[0].strip() if lines else "",
+            "toolchain": lines[1].strip() if len(lines) > 1 else "",
+        }
+
+    def _get_node_file(self, suffix: str = ".tar.gz") -> PurePath:
+        return self._get_node_path(f"{self.key}{suffix}")
+
+    def _get_node_path(self, name: str) -> PurePath:
+        # it's in the global tool path, which is shared by runs.
+        path = self._node.get_working_path().parent.parent.joinpath(
+            constants.PATH_TOOL, _CACHE_FOLDER
+        )
+        self._node.shell.mkdir(path, parents=True, exist_ok=True)
+        return path / name
@@ -0,0 +1,319 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+The index of test suites and test cases in extension packages. It's built by
+parsing the source code, so the modules don't need to be imported to know which
+test cases they have. Each module is keyed by its hash, so a changed module is
+parsed again, and unchanged modules are reused from the cached index file.
+"""
+
+import ast
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from dataclasses_json import dataclass_json
+
+from lisa.util.logger import get_logger
+
+# increase it, when the index format or the parsing logic is changed.
+INDEX_VERSION = 1
+
+_SUITE_DECORATOR = "TestSuiteMetadata"
+_CASE_DECORATOR = "TestCaseMetadata"
+# the positional parameters of decorators, they are used to resolve arguments
+# without keywords.
+_SUITE_PARAMETERS = ["area", "category", "description", "tags", "name"]
+_CASE_PARAMETERS = ["description", "priority"]
+_DEFAULT_PRIORITY = 2
+_REQUIREMENT_MAX_LENGTH = 500
+
+
+@dataclass_json()
+@dataclass
+class CaseIndex:
+    name: str
+    priority: int = _DEFAULT_PRIORITY
+
+
+@dataclass_json()
+@dataclass
+class SuiteIndex:
+    # the class name, it's the key of suites.
+    class_name: str
+    name: str
+    area: str
+    category: str
+    tags: List[str] = field(default_factory=list)
+    owner: str = ""
+    # the source code of requirement, it's for reading only.
+    requirement: str = ""
+    cases: List[CaseIndex] = field(default_factory=list)
+
+
+@dataclass_json()
+@dataclass
+class ModuleIndex:
+    path: str
+    hash: str
+    suites: List[SuiteIndex] = field(default_factory=list)
+    # False, if any metadata cannot be resolved from source code. The module
+    # should be imported to get the real metadata.
+    is_static: bool = True
+    # True, if the module registers hooks. It should be imported always.
+    has_hooks: bool = False
+
+    @property
+    def can_defer(self) -> bool:
+        return self.is_static and not self.has_hooks
+
+
+@dataclass
+class IndexedCase:
+    """
+    The view of a test case in the index. It has the same attributes as
+    TestCaseMetadata for filtering, so the selector can match it by criteria.
+    """
+
+    name: str
+    full_name: str
+    area: str
+    category: str
+    tags: List[str]
+    priority: int
+    module: str
+
+
+def iter_cases(modules: Dict[str, ModuleIndex]) -> Iterator[IndexedCase]:
+    for module_name, module_index in modules.items():
+        for suite in module_index.suites:
+            for case in suite.cases:
+                yield IndexedCase(
+                    name=case.name,
+                    full_name=f"{suite.name}.{case.name}",
+                    area=suite.area,
+                    category=suite.category,
+                    tags=suite.tags,
+                    priority=case.priority,
+                    module=module_name,
+                )
+
+
+def load_index(
+    package_dir: Path, files: Iterable[Path], cache_file: Optional[Path] = None
+) -> Dict[Path, ModuleIndex]:
+    """
+    Return index of files. The cached index is reused for files, which have the
+    same hash. The cache file is updated, if any file is changed.
+    """
+    log = get_logger("init", "index")
+    cached: Dict[str, ModuleIndex] = {}
+    if cache_file and cache_file.exists():
+        cached = _read_cache(cache_file)
+
+    results: Dict[Path, ModuleIndex] = {}
+    parsed_count = 0
+    for file in files:
+        content = file.read_bytes()
+        file_hash = hashlib.sha256(content).hexdigest()
+        relative_path = file.relative_to(package_dir).as_posix()
+        module_index = cached.get(relative_path)
+        if module_index is None or module_index.hash != file_hash:
+            module_index = parse_module(content, relative_path, file_hash)
+            parsed_count += 1
+        results[file] = module_index
+
+    log.debug(
+        f"indexed {len(results)} modules in '{package_dir}', "
+        f"parsed: {parsed_count}, reused: {len(results) - parsed_count}"
+    )
+    if cache_file and (parsed_count or len(results) != len(cached)):
+        _write_cache(cache_file, results.values())
+
+    return results
+
+
+def parse_module(content: bytes, path: str, file_hash: str) -> ModuleIndex:
+    module_index = ModuleIndex(path=path, hash=file_hash)
+    try:
+        source = content.decode("utf-8")
+        tree = ast.parse(source, filename=path)
+    except (SyntaxError, UnicodeDecodeError, ValueError):
+        # import it, so the error is raised like before.
+        module_index.is_static = False
+        return module_index
+
+    handled_count = 0
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        suite_decorator = _find_decorator(node.decorator_list, _SUITE_DECORATOR)
+        cases: List[CaseIndex] = []
+        for item in node.body:
+            if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                continue
+            case_decorator = _find_decorator(item.decorator_list, _CASE_DECORATOR)
+            if case_decorator is None:
+                continue
+            handled_count += 1
+            case, is_resolved = _parse_case(item.name, case_decorator)
+            cases.append(case)
+            module_index.is_static = module_index.is_static and is_resolved
+        if suite_decorator is None:
+            # cases without a suite decorator are not registered to any suite.
+            continue
+        handled_count += 1
+        suite, is_resolved = _parse_suite(node.name, suite_decorator, source)
+        suite.cases = cases
+        module_index.suites.append(suite)
+        module_index.is_static = module_index.is_static and is_resolved
+
+    for child in ast.walk(tree):
+        if isinstance(child, ast.Call) and _get_name(child.func) in [
+            _SUITE_DECORATOR,
+            _CASE_DECORATOR,
+        ]:
+            handled_count -= 1
+        elif _is_hook(child):
+            module_index.has_hooks = True
+    if handled_count != 0:
+        # some metadata is created out of class and method decorators, like
+        # in a nested class or by a function. It cannot be indexed.
+        module_index.is_static = False
+
+    return module_index
+
+
+def _parse_suite(
+    class_name: str, decorator: ast.Call, source: str
+) -> Tuple[SuiteIndex, bool]:
+    arguments, is_resolved = _get_arguments(
+        decorator, _SUITE_PARAMETERS, ["area", "category", "tags", "name", "owner"]
+    )
+    requirement = ""
+    for keyword in decorator.keywords:
+        if keyword.arg == "requirement":
+            requirement = " ".join(
+                (ast.get_source_segment(source, keyword.value) or "").split()
+            )[:_REQUIREMENT_MAX_LENGTH]
+
+    tags = arguments.get("tags") or []
+    if not isinstance(tags, list) or not all(isinstance(x, str) for x in tags):
+        is_resolved = False
+        tags = []
+    for name in ["area", "category", "name", "owner"]:
+        if not isinstance(arguments.get(name, ""), str):
+            is_resolved = False
+            arguments[name] = ""
+
+    suite = SuiteIndex(
+        class_name=class_name,
+        name=arguments.get("name") or class_name,
+        area=arguments.get("area", ""),
+        category=arguments.get("category", ""),
+        tags=tags,
+        owner=arguments.get("owner", "Microsoft"),
+        requirement=requirement,
+    )
+    return suite, is_resolved
+
+
+def _parse_case(name: str, decorator: ast.Call) -> Tuple[CaseIndex, bool]:
+    arguments, is_resolved = _get_arguments(decorator, _CASE_PARAMETERS, ["priority"])
+    priority = arguments.get("priority", _DEFAULT_PRIORITY)
+    if not isinstance(priority, int):
+        is_resolved = False
+        priority = _DEFAULT_PRIORITY
+    return CaseIndex(name=name, priority=priority), is_resolved
+
+
+def _get_arguments(
+    decorator: ast.Call, parameters: List[str], required: List[str]
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    return literal values of required arguments. The second value is False, if
+    any required argument is not a literal.
+    """
+    nodes: Dict[str, ast.expr] = {}
+    for index, argument in enumerate(decorator.args):
+        if index >= len(parameters) or isinstance(argument, ast.Starred):
+            return {}, False
+        nodes[parameters[index]] = argument
+    for keyword in decorator.keywords:
+        if keyword.arg is None:
+            # **kwargs cannot be resolved.
+            return {}, False
+        nodes[keyword.arg] = keyword.value
+
+    results: Dict[str, Any] = {}
+    for name in required:
+        node = nodes.get(name)
+        if node is None:
+            continue
+        try:
+            results[name] = ast.literal_eval(node)
+        except (ValueError, TypeError, SyntaxError):
+            return results, False
+    return results, True
+
+
+def _find_decorator(decorators: List[ast.expr], name: str) -> Optional[ast.Call]:
+    for decorator in decorators:
+        if isinstance(decorator, ast.Call) and _get_name(decorator.func) == name:
+            return decorator
+    return None
+
+
+def _get_name(node: ast.expr) -> str:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return ""
+
+
+def _is_hook(node: ast.AST) -> bool:
+    # hookimpl decorators, or plugin_manager.register calls.
+    if isinstance(node, (ast.Name, ast.Attribute)):
+        return _get_name(node) == "hookimpl"
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+        return (
+            node.func.attr == "register"
+            and _get_name(node.func.value) == "plugin_manager"
+        )
+    return False
+
+
+def _read_cache(cache_file: Path) -> Dict[str, ModuleIndex]:
+    log = get_logger("init", "index")
+    try:
+        with open(cache_file, "r") as f:
+            raw_data = json.load(f)
+        if raw_data.get("version") != INDEX_VERSION:
+            return {}
+        return {
+            path: ModuleIndex.from_dict(value)  # type: ignore
+            for path, value in raw_data["modules"].items()
+        }
+    except Exception as identifier:
+        # the index is rebuilt, if the cache is broken.
+        log.debug(f"ignored broken index file '{cache_file}': {identifier}")
+        return {}
+
+
+def _write_cache(cache_file: Path, modules: Iterable[ModuleIndex]) -> None:
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    raw_data = {
+        "version": INDEX_VERSION,
+        "modules": {x.path: x.to_dict() for x in modules},  # type: ignore
+    }
+    # write to a temp file and replace, so concurrent runs don't read a partial
+    # file.
+    temp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+    with open(temp_file, "w") as f:
+        json.dump(raw_data, f)
+    os.replace(temp_file, cache_file)
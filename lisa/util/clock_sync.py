@@ -0,0 +1,146 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Start commands on multiple nodes at the same time, and put samples of nodes on
+the timeline of the controller.
+
+Clocks of nodes are different from the controller. The offset of a node is
+measured by reading the node clock, and the middle of the round trip is
+regarded as the controller time of the reading. The sample with the shortest
+round trip is used, since it has the smallest error.
+
+A coordinated start schedules a start time on the controller timeline, and
+converts it to the clock of each node. Commands, which are launched with the
+start_at of the node, wait on nodes until the time, so the launch order and the
+latency of remote calls don't skew the start. Other commands, like checks and
+installation of tools, are not delayed.
+"""
+
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from lisa.util import LisaException
+from lisa.util.logger import get_logger
+from lisa.util.parallel import run_in_parallel
+
+if TYPE_CHECKING:
+    from lisa.node import Node
+
+
+@dataclass
+class ClockOffset:
+    # node clock - controller clock, in seconds.
+    offset: float
+    # the round trip of the best sample, it's the upper bound of the error.
+    round_trip: float
+
+
+def measure_clock_offset(node: "Node", samples: int = 5) -> ClockOffset:
+    if not node.is_posix:
+        raise LisaException("clock offset is supported on posix nodes only")
+    best: Optional[ClockOffset] = None
+    for _ in range(samples):
+        before = time.time()
+        result = node.execute("date +%s.%N", no_info_log=True, no_debug_log=True)
+        after = time.time()
+        try:
+            node_time = float(result.stdout.strip())
+        except ValueError:
+            raise LisaException(f"unknown node time: '{result.stdout}'")
+        round_trip = after - before
+        if best is None or round_trip < best.round_trip:
+            best = ClockOffset(
+                offset=node_time - (before + after) / 2, round_trip=round_trip
+            )
+    assert best, "samples must be more than zero"
+    return best
+
+
+def get_wait_until_command(node_timestamp: float) -> str:
+    """
+    A shell command, which sleeps until the timestamp of node clock. On the
+    systems, which don't support %N of date, it's accurate to one second.
+    """
+    return (
+        f"sleep $(awk -v t={node_timestamp:.6f} -v n=$(date +%s.%N) "
+        "'BEGIN { d = t - n; if (d < 0) d = 0; printf \"%.6f\", d }')"
+    )
+
+
+class ClockSync:
+    """
+    The usage is like,
+
+        clock_sync = ClockSync([server, client1, client2])
+        start_server()
+        clock_sync.schedule_start(lead_time=3)
+        for client in clients:
+            processes.append(
+                client.tools[Iperf3].run_as_client_async(
+                    ..., start_at=clock_sync.get_start_at(client)
+                )
+            )
+        ...
+        timestamps = clock_sync.to_controller_time(client1, node_timestamps)
+    """
+
+    def __init__(self, nodes: List["Node"], samples: int = 5) -> None:
+        self._nodes = nodes
+        self._samples = samples
+        self._offsets: Dict[int, ClockOffset] = {}
+        self._log = get_logger("clock_sync")
+        self.start_time: float = 0
+
+    def measure(self) -> Dict[str, ClockOffset]:
+        """
+        Measure offsets of all nodes in parallel. The result is keyed by node
+        names, and it's for logging.
+        """
+        offsets = run_in_parallel(
+            [partial(measure_clock_offset, node, self._samples) for node in self._nodes]
+        )
+        result: Dict[str, ClockOffset] = {}
+        for node, offset in zip(self._nodes, offsets):
+            self._offsets[id(node)] = offset
+            result[node.name or f"node-{node.index}"] = offset
+        self._log.debug(f"clock offsets: {result}")
+        return result
+
+    def get_offset(self, node: "Node") -> ClockOffset:
+        if not self._offsets:
+            self.measure()
+        if id(node) not in self._offsets:
+            raise LisaException(f"node {node.name} is not in the clock sync")
+        return self._offsets[id(node)]
+
+    def to_node_time(self, node: "Node", timestamp: Any) -> Any:
+        """
+        timestamp: a float or an array, which supports the minus operator.
+        """
+        return timestamp + self.get_offset(node).offset
+
+    def to_controller_time(self, node: "Node", timestamp: Any) -> Any:
+        return timestamp - self.get_offset(node).offset
+
+    def schedule_start(self, lead_time: float = 3) -> float:
+        """
+        Schedule the start time, which is lead_time seconds later, and return it
+        on the controller timeline. The lead time should be longer than
+        launching all commands, otherwise late commands start immediately.
+        """
+        if not self._offsets:
+            self.measure()
+        self.start_time = time.time() + lead_time
+        return self.start_time
+
+    def get_start_at(self, node: "Node") -> float:
+        """
+        The scheduled start time on the node clock, it's the start_at of
+        commands.
+        """
+        if not self.start_time:
+            raise LisaException("the start time is not scheduled")
+        return float(self.to_node_time(node, self.start_time))
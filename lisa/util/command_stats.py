@@ -0,0 +1,217 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# The first bucket covers everything below 0.1 ms, which is far below the cost
+# of a remote round trip.
+_HISTOGRAM_MIN_VALUE = 0.0001
+# each bucket is 2% wider than the previous one, so percentiles are within 2%
+# of the real value.
+_HISTOGRAM_PRECISION = 0.02
+# commands are keyed by their text. Limit the count per node, so commands with
+# unique text, like timestamps in parameters, don't grow memory forever.
+_MAX_COMMANDS_PER_NODE = 2000
+_COMMAND_OVERFLOW_KEY = "(other commands)"
+_COMMAND_MAX_LENGTH = 200
+
+# it's used, when commands are run by Node.execute directly.
+NODE_TOOL_NAME = "(node)"
+
+
+class LatencyHistogram:
+    """
+    A log-linear bucketed histogram like HdrHistogram. It records elapsed seconds
+    in buckets with bounded relative error, so the memory doesn't depend on the
+    count of samples.
+    """
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0
+        self.min: float = 0
+        self.max: float = 0
+        self.output_bytes: int = 0
+        self._buckets: Dict[int, int] = {}
+        self._log_base = math.log(1 + _HISTOGRAM_PRECISION)
+
+    def record(self, value: float, output_bytes: int = 0) -> None:
+        value = max(value, 0)
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+        self.output_bytes += output_bytes
+
+        index = self._get_index(value)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, percent: float) -> float:
+        """
+        percent is between 0 and 100. It returns the upper bound of the bucket,
+        which contains the value. The bound is capped by recorded min/max.
+        """
+        if not self.count:
+            return 0
+        rank = max(math.ceil(self.count * percent / 100), 1)
+        accumulated = 0
+        for index in sorted(self._buckets):
+            accumulated += self._buckets[index]
+            if accumulated >= rank:
+                return min(max(self._get_upper_bound(index), self.min), self.max)
+        return self.max
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if not other.count:
+            return
+        if self.count == 0 or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+        self.output_bytes += other.output_bytes
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+
+    def _get_index(self, value: float) -> int:
+        if value <= _HISTOGRAM_MIN_VALUE:
+            return 0
+        return int(math.log(value / _HISTOGRAM_MIN_VALUE) / self._log_base) + 1
+
+    def _get_upper_bound(self, index: int) -> float:
+        return float(_HISTOGRAM_MIN_VALUE * math.exp(index * self._log_base))
+
+
+@dataclass
+class CommandStatistics:
+    node_name: str
+    tool_name: str
+    command: str
+    count: int = 0
+    total: float = 0
+    max: float = 0
+    output_bytes: int = 0
+    timeout_count: int = 0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0
+
+
+@dataclass
+class NodeStatistics:
+    node_name: str
+    # tool name to histogram
+    tools: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    commands: Dict[str, CommandStatistics] = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_nodes: Dict[str, NodeStatistics] = {}
+
+
+def record(
+    node_name: str,
+    tool_name: str,
+    command: str,
+    elapsed: float,
+    output_bytes: int = 0,
+    is_timeout: bool = False,
+) -> None:
+    """
+    Record a completed command. It's called by Process once per command, so it
+    should be cheap.
+    """
+    if not tool_name:
+        tool_name = NODE_TOOL_NAME
+    command = command[:_COMMAND_MAX_LENGTH]
+
+    with _lock:
+        node_stats = _nodes.get(node_name)
+        if node_stats is None:
+            node_stats = NodeStatistics(node_name=node_name)
+            _nodes[node_name] = node_stats
+
+        histogram = node_stats.tools.get(tool_name)
+        if histogram is None:
+            histogram = LatencyHistogram()
+            node_stats.tools[tool_name] = histogram
+        histogram.record(elapsed, output_bytes)
+
+        command_key = f"{tool_name}|{command}"
+        command_stats = node_stats.commands.get(command_key)
+        if command_stats is None:
+            if len(node_stats.commands) >= _MAX_COMMANDS_PER_NODE:
+                command_key = _COMMAND_OVERFLOW_KEY
+                command_stats = node_stats.commands.get(command_key)
+            if command_stats is None:
+                command_stats = CommandStatistics(
+                    node_name=node_name,
+                    tool_name=tool_name,
+                    command=command
+                    if command_key != _COMMAND_OVERFLOW_KEY
+                    else _COMMAND_OVERFLOW_KEY,
+                )
+                node_stats.commands[command_key] = command_stats
+        command_stats.count += 1
+        command_stats.total += elapsed
+        command_stats.max = max(command_stats.max, elapsed)
+        command_stats.output_bytes += output_bytes
+        if is_timeout:
+            command_stats.timeout_count += 1
+
+
+def get_statistics() -> List[NodeStatistics]:
+    """
+    return a snapshot of current statistics, which is safe to be read, when
+    commands are still running.
+    """
+    with _lock:
+        results: List[NodeStatistics] = []
+        for node_stats in _nodes.values():
+            snapshot = NodeStatistics(node_name=node_stats.node_name)
+            for tool_name, histogram in node_stats.tools.items():
+                copied = LatencyHistogram()
+                copied.merge(histogram)
+                snapshot.tools[tool_name] = copied
+            for key, command_stats in node_stats.commands.items():
+                snapshot.commands[key] = CommandStatistics(**command_stats.__dict__)
+            results.append(snapshot)
+    return results
+
+
+def get_slowest_commands(
+    node_stats: NodeStatistics, count: int
+) -> List[CommandStatistics]:
+    return sorted(node_stats.commands.values(), key=lambda x: x.max, reverse=True)[
+        :count
+    ]
+
+
+def get_frequent_commands(
+    node_stats: NodeStatistics, count: int
+) -> List[CommandStatistics]:
+    # sort by total time for ties, so expensive commands show first.
+    return sorted(
+        node_stats.commands.values(), key=lambda x: (x.count, x.total), reverse=True
+    )[:count]
+
+
+def get_tool_summary(
+    node_stats: NodeStatistics,
+) -> List[Tuple[str, LatencyHistogram]]:
+    return sorted(node_stats.tools.items(), key=lambda x: x[1].total, reverse=True)
+
+
+def reset() -> None:
+    with _lock:
+        _nodes.clear()
@@ -14,23 +14,51 @@ Steps,
 1. Import the root folder as a package. It's used by importlib.import_module
 2. Go through all files, and check if it exists in sys.modules. If it's not, import it.
 
+If a cache path is given, the test cases are indexed from source code instead, and
+modules are imported when their test cases are selected. Modules, which cannot be
+indexed, are imported like before.
+
 """
 
+import hashlib
 import importlib
 import importlib.util
 import sys
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
+from lisa.util import case_index
 from lisa.util.logger import Logger, get_logger
 
+# The modules of extensions, which are not imported yet. The key is the full
+# module name, the value is the relative module name, the root package name and
+# the index of the module.
+_pending_modules: Dict[str, Tuple[str, Optional[str], case_index.ModuleIndex]] = {}
 
-def _import_module(
-    file: Path,
-    root_package_name: Optional[str],
-    package_dir: Path,
-    log: Optional[Logger] = None,
-) -> None:
+
+def get_pending_modules() -> Dict[str, case_index.ModuleIndex]:
+    return {name: value[2] for name, value in _pending_modules.items()}
+
+
+def import_pending_modules(modules: Optional[Iterable[str]] = None) -> None:
+    """
+    Import deferred modules of extensions. If modules is None, all deferred
+    modules are imported.
+    """
+    if modules is None:
+        modules = list(_pending_modules.keys())
+    for full_module_name in modules:
+        pending = _pending_modules.pop(full_module_name, None)
+        if pending is None:
+            continue
+        module_name, root_package_name, _ = pending
+        if full_module_name not in sys.modules:
+            importlib.import_module(name=module_name, package=root_package_name)
+
+
+def _get_module_name(
+    file: Path, root_package_name: Optional[str], package_dir: Path
+) -> Tuple[str, str]:
     dir_name = file.parent
     module_name = file.stem
     relative_module_path = dir_name.relative_to(package_dir)
@@ -46,6 +74,18 @@ def _import_module(
         full_module_name = f"{root_package_name}{module_name}"
     else:
         full_module_name = module_name
+    return module_name, full_module_name
+
+
+def _import_module(
+    file: Path,
+    root_package_name: Optional[str],
+    package_dir: Path,
+    log: Optional[Logger] = None,
+) -> None:
+    module_name, full_module_name = _get_module_name(
+        file, root_package_name, package_dir
+    )
 
     if full_module_name not in sys.modules:
         if log:
@@ -73,7 +113,16 @@ def _import_root_package(package_name: str, path: Path) -> None:
         spec.loader.exec_module(module)
 
 
-def import_package(path: Path, package_name: str, enable_log: bool = True) -> None:
+def import_package(
+    path: Path,
+    package_name: str,
+    enable_log: bool = True,
+    cache_path: Optional[Path] = None,
+) -> None:
+    """
+    Import modules of a package. If cache_path is specified, modules with test
+    suites are deferred by the index in the cache path, until they are selected.
+    """
     if not path.exists():
         raise FileNotFoundError(f"import module path: {path}")
 
@@ -97,18 +146,62 @@ def import_package(path: Path, package_name: str, enable_log: bool = True) -> No
     # import the package
     _import_root_package(package_name=package_name, path=package_dir)
 
+    package_files = [file for file in package_files if not _is_skipped(file)]
+    if cache_path and path.is_dir():
+        package_files = _defer_modules(
+            package_files, package_name, package_dir, cache_path, log
+        )
+
     # import all the modules in the package
     for file in package_files:
-        file_name = file.stem
-        # skip test files and __init__.py
-        if ("tests" == file.parent.stem and file_name.startswith("test_")) or (
-            file.stem == "__init__"
-        ):
-            continue
-
         _import_module(
             file=file,
             root_package_name=package_name,
             package_dir=package_dir,
             log=log,
         )
+
+
+def _is_skipped(file: Path) -> bool:
+    # skip test files and __init__.py
+    return ("tests" == file.parent.stem and file.stem.startswith("test_")) or (
+        file.stem == "__init__"
+    )
+
+
+def _defer_modules(
+    files: List[Path],
+    package_name: str,
+    package_dir: Path,
+    cache_path: Path,
+    log: Optional[Logger],
+) -> List[Path]:
+    """
+    Add indexed modules to pending modules, and return modules, which should be
+    imported now.
+    """
+    path_hash = hashlib.sha256(str(package_dir.resolve()).encode()).hexdigest()
+    cache_file = cache_path / f"{package_name}_{path_hash[:16]}.json"
+    index = case_index.load_index(package_dir, files, cache_file)
+
+    eager_files: List[Path] = []
+    for file in files:
+        module_index = index[file]
+        if not module_index.can_defer:
+            eager_files.append(file)
+            continue
+        module_name, full_module_name = _get_module_name(
+            file, package_name, package_dir
+        )
+        if full_module_name not in sys.modules:
+            _pending_modules[full_module_name] = (
+                module_name,
+                package_name,
+                module_index,
+            )
+    if log:
+        log.info(
+            f"indexed {len(files)} modules, deferred: "
+            f"{len(files) - len(eager_files)}, imported: {len(eager_files)}"
+        )
+    return eager_files
@@ -0,0 +1,308 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Parse outputs of network performance tools line by line in one pass, and
+calculate distributions of them. The patterns are anchored by literal words,
+so they don't backtrack on long outputs. The samples are small, like a row per
+second, so they are plain lists, and numpy isn't needed.
+"""
+
+import bisect
+import itertools
+import re
+import statistics
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from lisa.util import LisaException
+
+# the percentiles in perf messages, and the field names of them.
+LATENCY_PERCENTILE_FIELDS: Dict[float, str] = {
+    50: "latency50_percentile_us",
+    90: "latency90_percentile_us",
+    95: "latency95_percentile_us",
+    99: "latency99_percentile_us",
+    99.9: "latency99_9_percentile_us",
+    99.99: "latency99_99_percentile_us",
+}
+
+# 02:11:12 INFO:    Minimum = 135.500us, Maximum = 9644.250us, Average = 294.313us
+_lagscope_summary_pattern = re.compile(
+    r"Minimum = (?P<minimum>[0-9.]+)us, Maximum = (?P<maximum>[0-9.]+)us, "
+    r"Average = (?P<average>[0-9.]+)us"
+)
+# 02:11:12 INFO:    Number of successful Pings: 1000000
+_lagscope_count_pattern = re.compile(r"Number of successful Pings: (?P<count>\d+)")
+# sockperf: ====> avg-rtt=297.328 (std-dev=47.318, mean-ad=36.026)
+_sockperf_stdev_pattern = re.compile(r"std-dev=(?P<stdev>[0-9.]+)")
+# sockperf: Summary: Round trip is 297.328 usec
+_sockperf_average_pattern = re.compile(
+    r"Summary: (?:Round trip|Latency) is (?P<average>[0-9.]+) usec"
+)
+# sockperf: Total 1283 observations; each percentile contains 12.83 observations
+_sockperf_count_pattern = re.compile(r"Total (?P<count>\d+) observations")
+# sockperf: [Valid Duration] RunTime=0.546 sec; SentMessages=1283;
+_sockperf_run_time_pattern = re.compile(r"RunTime=(?P<run_time>[0-9.]+) sec")
+
+
+def get_percentile(sorted_values: List[float], percentile: float) -> float:
+    """
+    The percentile with linear interpolation between closest ranks, it's the
+    same as the default method of numpy.
+    """
+    position = (len(sorted_values) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        position - lower
+    )
+
+
+def _interpolate(x: float, points: List[Tuple[float, float]]) -> float:
+    keys = [key for key, _ in points]
+    index = bisect.bisect_left(keys, x)
+    if index == 0:
+        return points[0][1]
+    if index == len(points):
+        return points[-1][1]
+    (x0, y0), (x1, y1) = points[index - 1], points[index]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def to_decimal(value: float, digits: int = 3) -> Decimal:
+    return Decimal(str(round(float(value), digits)))
+
+
+@dataclass
+class LatencyDistribution:
+    """
+    The latency distribution in microseconds. The percentiles are reported by
+    tools, and the histogram is optional. The histogram is in start values of
+    intervals and counts, the last interval counts all values after its start,
+    and it ends at the maximum.
+    """
+
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    average: Optional[float] = None
+    stdev: Optional[float] = None
+    count: int = 0
+    run_time_seconds: float = 0
+    # the key is in percentage, like 99.9
+    percentiles: Dict[float, float] = field(default_factory=dict)
+    histogram_starts: List[float] = field(default_factory=list)
+    histogram_counts: List[int] = field(default_factory=list)
+
+    @property
+    def has_histogram(self) -> bool:
+        return sum(self.histogram_counts) > 0
+
+    def get_percentiles(self, percentiles: Iterable[float]) -> List[float]:
+        """
+        The reported percentiles are used, if they exist. Others are
+        calculated from the histogram, or interpolated between reported
+        percentiles, if there is no histogram.
+        """
+        targets = [float(x) for x in percentiles]
+        if self.has_histogram:
+            values = [self._get_histogram_percentile(x) for x in targets]
+        elif self.percentiles:
+            points = dict(self.percentiles)
+            if self.minimum is not None:
+                points.setdefault(0, self.minimum)
+            if self.maximum is not None:
+                points.setdefault(100, self.maximum)
+            sorted_points = sorted(points.items())
+            values = [_interpolate(x, sorted_points) for x in targets]
+        else:
+            raise LisaException("no percentiles or histogram of latency found.")
+        return [
+            self.percentiles.get(target, value)
+            for target, value in zip(targets, values)
+        ]
+
+    def get_message_fields(self) -> Dict[str, Any]:
+        """
+        The fields of NetworkLatencyPerformanceMessage.
+        """
+        if self.minimum is None or self.maximum is None or self.average is None:
+            raise LisaException("no latency summary found.")
+        fields: Dict[str, Any] = {
+            "min_latency_us": to_decimal(self.minimum),
+            "max_latency_us": to_decimal(self.maximum),
+            "average_latency_us": to_decimal(self.average),
+        }
+        if self.stdev is not None:
+            fields["latency_stdev_us"] = to_decimal(self.stdev)
+        if self.percentiles or self.has_histogram:
+            values = self.get_percentiles(LATENCY_PERCENTILE_FIELDS.keys())
+            for name, value in zip(LATENCY_PERCENTILE_FIELDS.values(), values):
+                fields[name] = to_decimal(value)
+        return fields
+
+    def _get_histogram_percentile(self, target: float) -> float:
+        starts = self.histogram_starts
+        counts = self.histogram_counts
+        cumulative = list(itertools.accumulate(counts))
+        rank = target / 100 * cumulative[-1]
+        index = min(bisect.bisect_left(cumulative, rank), len(counts) - 1)
+        # the position in the interval, values are spread evenly in it.
+        previous = cumulative[index] - counts[index]
+        fraction = (rank - previous) / counts[index] if counts[index] else 0
+        # the last interval is open, so it ends at the maximum.
+        if index + 1 < len(starts):
+            end = starts[index + 1]
+        else:
+            end = max(starts[-1], self.maximum or starts[-1])
+        value = starts[index] + fraction * (end - starts[index])
+        if self.minimum is not None and self.maximum is not None:
+            value = min(max(value, self.minimum), self.maximum)
+        return value
+
+
+@dataclass
+class PpsSamples:
+    """
+    Packets per second of each interval.
+    """
+
+    rx: List[float]
+    tx: List[float]
+
+    @property
+    def rx_tx(self) -> List[float]:
+        return [rx + tx for rx, tx in zip(self.rx, self.tx)]
+
+    def get_message_fields(self) -> Dict[str, Any]:
+        """
+        The fields of NetworkPPSPerformanceMessage.
+        """
+        if not self.rx:
+            raise LisaException("no pps samples found.")
+        fields: Dict[str, Any] = {}
+        for name, values in [("rx", self.rx), ("tx", self.tx), ("rx_tx", self.rx_tx)]:
+            sorted_values = sorted(values)
+            fields[f"{name}_pps_minimum"] = to_decimal(sorted_values[0], 2)
+            fields[f"{name}_pps_average"] = to_decimal(statistics.mean(values), 2)
+            fields[f"{name}_pps_maximum"] = to_decimal(sorted_values[-1], 2)
+            fields[f"{name}_pps_median"] = to_decimal(
+                get_percentile(sorted_values, 50), 2
+            )
+            fields[f"{name}_pps_percentile5"] = to_decimal(
+                get_percentile(sorted_values, 5), 2
+            )
+            fields[f"{name}_pps_stdev"] = to_decimal(statistics.pstdev(values), 2)
+        return fields
+
+
+def parse_lagscope(output: str) -> LatencyDistribution:
+    result = LatencyDistribution()
+    # the table, which following lines belong to.
+    table = ""
+    for line in output.splitlines():
+        parts = line.split()
+        if parts and parts[0] == "Percentile":
+            table = "percentile"
+        elif parts and parts[0] == "Interval(usec)":
+            table = "histogram"
+        elif table and len(parts) == 2 and parts[1].isdigit():
+            # 95%         376
+            # 135          1013
+            if table == "percentile":
+                result.percentiles[float(parts[0].rstrip("%"))] = float(parts[1])
+            else:
+                result.histogram_starts.append(float(parts[0]))
+                result.histogram_counts.append(int(parts[1]))
+        else:
+            table = ""
+            if "Minimum = " in line:
+                matched = _lagscope_summary_pattern.search(line)
+                if matched:
+                    result.minimum = float(matched.group("minimum"))
+                    result.maximum = float(matched.group("maximum"))
+                    result.average = float(matched.group("average"))
+            elif "Number of successful Pings" in line:
+                matched = _lagscope_count_pattern.search(line)
+                if matched:
+                    result.count = int(matched.group("count"))
+    return result
+
+
+def parse_sockperf(output: str) -> LatencyDistribution:
+    result = LatencyDistribution()
+    for line in output.splitlines():
+        if "---> " in line:
+            # sockperf: ---> <MAX> observation =  921.497
+            # sockperf: ---> percentile 99.999 =  921.497
+            name, _, raw_value = line.rpartition("=")
+            value = float(raw_value)
+            if "<MAX>" in name:
+                result.maximum = value
+            elif "<MIN>" in name:
+                result.minimum = value
+            elif "percentile" in name:
+                result.percentiles[float(name.split()[-1])] = value
+        elif "std-dev=" in line:
+            matched = _sockperf_stdev_pattern.search(line)
+            if matched:
+                result.stdev = float(matched.group("stdev"))
+        elif "Summary: " in line:
+            matched = _sockperf_average_pattern.search(line)
+            if matched:
+                result.average = float(matched.group("average"))
+        elif " observations" in line:
+            matched = _sockperf_count_pattern.search(line)
+            if matched:
+                result.count = int(matched.group("count"))
+        elif "RunTime=" in line:
+            matched = _sockperf_run_time_pattern.search(line)
+            if matched:
+                result.run_time_seconds = float(matched.group("run_time"))
+    return result
+
+
+def parse_sar(output: str, nic_name: str) -> PpsSamples:
+    """
+    Parse the output of "sar -n DEV". The columns are located by the header,
+    so the time in 12 or 24 hours format doesn't matter. The average lines
+    at the end are skipped.
+    """
+    rx: List[float] = []
+    tx: List[float] = []
+    iface_index = -1
+    rx_index = -1
+    tx_index = -1
+    for line in output.splitlines():
+        parts = line.split()
+        if "IFACE" in parts:
+            # 06:37:42        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s
+            iface_index = parts.index("IFACE")
+            rx_index = parts.index("rxpck/s")
+            tx_index = parts.index("txpck/s")
+        elif (
+            iface_index >= 0
+            and len(parts) > max(rx_index, tx_index)
+            and parts[iface_index] == nic_name
+            and not parts[0].startswith("Average")
+        ):
+            rx.append(float(parts[rx_index]))
+            tx.append(float(parts[tx_index]))
+    return PpsSamples(rx=rx, tx=tx)
+
+
+def parse_netstat(output: str) -> PpsSamples:
+    """
+    Parse the output of "netstat -I <nic> -w 1" on FreeBSD.
+    """
+    rx: List[float] = []
+    tx: List[float] = []
+    for line in output.splitlines():
+        # packets errs idrops bytes packets errs bytes colls
+        #   16     0     0       3506         23     0       5473     0
+        parts = line.split()
+        if len(parts) >= 8 and all(x.isdigit() for x in parts[:8]):
+            rx.append(float(parts[0]))
+            tx.append(float(parts[4]))
+    return PpsSamples(rx=rx, tx=tx)
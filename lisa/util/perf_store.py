@@ -0,0 +1,432 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+A local store of performance messages, and the comparison between runs.
+
+Messages are saved in a SQLite database. Each message type is a table, and
+each field is a typed column, so results can be queried by any SQL tool. The
+table is indexed by tool, vmsize and kernel version, which are the common
+partitions of queries. New fields of messages are added as new columns.
+
+Rows are compared by groups. A group has the same test case and the same
+configurations, like block size or connections. The configurations are text
+and integer columns, except the fields about versions and time, so a kernel
+change is compared in the same group. The numeric columns are metrics.
+"""
+
+import math
+import sqlite3
+import statistics
+import threading
+from dataclasses import dataclass, fields
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from lisa.messages import PerfMessage
+from lisa.util import LisaException, constants
+
+DEFAULT_STORE_NAME = "perf_store.sqlite"
+RUN_ID_COLUMN = "run_id"
+
+# these fields are different between runs, so they are not configurations.
+_NOT_KEY_FIELDS = {
+    RUN_ID_COLUMN,
+    "time",
+    "elapsed",
+    "test_date",
+    "test_result_id",
+    "location",
+    "host_version",
+    "distro_version",
+    "kernel_version",
+    "lis_version",
+    # they are from adaptive sampling.
+    "sample_count",
+    "confidence_interval_percent",
+}
+# they are configurations, though the types are Decimal.
+_DECIMAL_KEY_FIELDS = {"buffer_size", "buffer_size_bytes", "send_buffer_size"}
+# they are metrics, though the types are int.
+_INTEGER_METRIC_FIELDS = {"retrans_segments", "connections_created_time"}
+# if any of words is in the name, the metric is lower better.
+_LOWER_BETTER_WORDS = [
+    "lat",
+    "_us",
+    "usec",
+    "_sec",
+    "time",
+    "retrans",
+    "loss",
+    "cycles",
+    "stdev",
+    "interference",
+]
+# the node metrics are context of results, they are not better or worse.
+_CONTEXT_METRIC_PREFIX = "node_"
+# the type column is the same in a table, and others are the same in most runs.
+_LABEL_EXCLUDED_FIELDS = {"type", "guest_os_type", "ip_version"}
+
+_INDEX_FIELDS = ["tool", "vmsize", "kernel_version"]
+
+
+@dataclass
+class Comparison:
+    table: str
+    label: str
+    metric: str
+    baseline_mean: float
+    baseline_stdev: float
+    baseline_count: int
+    target_mean: float
+    target_count: int
+    # in percentage, it's positive, if the target is greater.
+    change: float
+    # None, if there are not enough samples to test.
+    p_value: Optional[float]
+    # 1: higher is better, -1: lower is better, 0: unknown.
+    direction: int
+    is_regression: bool = False
+    is_improvement: bool = False
+
+
+def get_default_store_path() -> Path:
+    return constants.CACHE_PATH.parent / DEFAULT_STORE_NAME
+
+
+def parse_selector(raw: str) -> Dict[str, str]:
+    """
+    A selector is a run id, or pairs like "kernel_version=5.15.0,vmsize=D2s_v3".
+    """
+    if "=" not in raw:
+        return {RUN_ID_COLUMN: raw}
+    selector: Dict[str, str] = {}
+    for pair in raw.split(","):
+        name, _, value = pair.partition("=")
+        selector[name.strip()] = value.strip()
+    return selector
+
+
+class PerfStore:
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # notifiers may be called from different threads.
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.RLock()
+        self._columns: Dict[str, Dict[str, str]] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def save(self, message: PerfMessage, run_id: str = "") -> None:
+        table = type(message).__name__
+        row: Dict[str, Any] = {RUN_ID_COLUMN: run_id or constants.RUN_ID}
+        column_types: Dict[str, str] = {RUN_ID_COLUMN: "TEXT"}
+        for item in fields(message):
+            row[item.name] = _to_column_value(getattr(message, item.name))
+            column_types[item.name] = _get_column_type(item.type)
+
+        with self._lock:
+            self._ensure_table(table, column_types)
+            names = ", ".join(f'"{x}"' for x in row.keys())
+            placeholders = ", ".join("?" for _ in row)
+            self._connection.execute(
+                f'INSERT INTO "{table}" ({names}) VALUES ({placeholders})',
+                list(row.values()),
+            )
+            self._connection.commit()
+
+    def get_tables(self) -> List[str]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' ORDER BY name"
+            ).fetchall()
+        return [x[0] for x in rows]
+
+    def get_latest_run_id(self) -> str:
+        latest: Tuple[str, str] = ("", "")
+        for table in self.get_tables():
+            with self._lock:
+                row = self._connection.execute(
+                    f'SELECT MAX("time"), "{RUN_ID_COLUMN}" FROM "{table}"'
+                ).fetchone()
+            if row and row[0] and row[0] > latest[0]:
+                latest = (row[0], row[1])
+        if not latest[1]:
+            raise LisaException("no run is found in the perf store")
+        return latest[1]
+
+    def query(
+        self, table: str, selector: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        columns = self._load_columns(table)
+        conditions: List[str] = []
+        values: List[str] = []
+        for name, value in (selector or {}).items():
+            if name not in columns:
+                raise LisaException(f"unknown column '{name}' in table '{table}'")
+            # compare as text, so selectors work on all column types.
+            conditions.append(f'CAST("{name}" AS TEXT) = ?')
+            values.append(value)
+        sql = f'SELECT * FROM "{table}"'
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        with self._lock:
+            cursor = self._connection.execute(sql, values)
+            names = [x[0] for x in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def compare(
+        self,
+        baseline: Dict[str, str],
+        target: Dict[str, str],
+        alpha: float = 0.05,
+        threshold: float = 5,
+    ) -> List[Comparison]:
+        """
+        Compare metrics of target rows with baseline rows in the same groups.
+        alpha: the significance level of t-test.
+        threshold: the minimum change in percentage to be flagged.
+        """
+        result: List[Comparison] = []
+        for table in self.get_tables():
+            columns = self._load_columns(table)
+            if not all(x in columns for x in list(baseline) + list(target)):
+                continue
+            keys = [x for x, type_ in columns.items() if _is_key(x, type_)]
+            metrics = [x for x, type_ in columns.items() if _is_metric(x, type_)]
+            baseline_groups = _group_rows(self.query(table, baseline), keys)
+            target_groups = _group_rows(self.query(table, target), keys)
+            for key, target_rows in sorted(target_groups.items(), key=str):
+                baseline_rows = baseline_groups.get(key, [])
+                if not baseline_rows:
+                    continue
+                label = _get_label(keys, key)
+                for metric in metrics:
+                    comparison = _compare_metric(
+                        table,
+                        label,
+                        metric,
+                        [x[metric] for x in baseline_rows if x[metric] is not None],
+                        [x[metric] for x in target_rows if x[metric] is not None],
+                        alpha,
+                        threshold,
+                    )
+                    if comparison:
+                        result.append(comparison)
+        return result
+
+    def _ensure_table(self, table: str, column_types: Dict[str, str]) -> None:
+        existing = self._load_columns(table)
+        if not existing:
+            columns = ", ".join(f'"{x}" {y}' for x, y in column_types.items())
+            self._connection.execute(f'CREATE TABLE "{table}" ({columns})')
+            index_columns = ", ".join(f'"{x}"' for x in _INDEX_FIELDS)
+            self._connection.execute(
+                f'CREATE INDEX "{table}_partition" ON "{table}" ({index_columns})'
+            )
+        else:
+            # the message may have new fields.
+            for name, type_ in column_types.items():
+                if name not in existing:
+                    self._connection.execute(
+                        f'ALTER TABLE "{table}" ADD COLUMN "{name}" {type_}'
+                    )
+        self._columns[table] = column_types.copy()
+        self._columns[table].update(existing)
+
+    def _load_columns(self, table: str) -> Dict[str, str]:
+        with self._lock:
+            if table not in self._columns:
+                rows = self._connection.execute(f'PRAGMA table_info("{table}")')
+                columns = {row[1]: row[2] for row in rows}
+                if not columns:
+                    return {}
+                self._columns[table] = columns
+            return self._columns[table]
+
+
+def _get_column_type(type_: Any) -> str:
+    if type_ is bool or type_ is int:
+        return "INTEGER"
+    if type_ is float or type_ is Decimal:
+        return "REAL"
+    return "TEXT"
+
+
+def _to_column_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        # the values of str enums are readable, others are by names.
+        value = value.value if isinstance(value, str) else value.name
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _is_key(name: str, type_: str) -> bool:
+    if name in _NOT_KEY_FIELDS or name in _INTEGER_METRIC_FIELDS:
+        return False
+    return type_ in ["TEXT", "INTEGER"] or name in _DECIMAL_KEY_FIELDS
+
+
+def _is_metric(name: str, type_: str) -> bool:
+    if name in _NOT_KEY_FIELDS:
+        return False
+    return (type_ == "REAL" and name not in _DECIMAL_KEY_FIELDS) or (
+        name in _INTEGER_METRIC_FIELDS
+    )
+
+
+def _get_direction(metric: str) -> int:
+    if metric.startswith(_CONTEXT_METRIC_PREFIX):
+        return 0
+    if any(word in metric for word in _LOWER_BETTER_WORDS):
+        return -1
+    return 1
+
+
+def _group_rows(
+    rows: List[Dict[str, Any]], keys: List[str]
+) -> Dict[Tuple[Any, ...], List[Dict[str, Any]]]:
+    groups: Dict[Tuple[Any, ...], List[Dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault(tuple(row.get(x) for x in keys), []).append(row)
+    return groups
+
+
+def _get_label(keys: List[str], values: Tuple[Any, ...]) -> str:
+    return ", ".join(
+        f"{name}={value}"
+        for name, value in zip(keys, values)
+        if value not in (None, "", 0) and name not in _LABEL_EXCLUDED_FIELDS
+    )
+
+
+def _compare_metric(
+    table: str,
+    label: str,
+    metric: str,
+    baseline: List[float],
+    target: List[float],
+    alpha: float,
+    threshold: float,
+) -> Optional[Comparison]:
+    # the metric is not reported by the test.
+    if not any(baseline) and not any(target):
+        return None
+    # the metric exists on one side only, like the column is added by a newer
+    # version of the message, so it cannot be compared.
+    if not baseline or not target:
+        return None
+    baseline_mean = statistics.mean(baseline)
+    target_mean = statistics.mean(target)
+    if baseline_mean:
+        change = (target_mean - baseline_mean) / abs(baseline_mean) * 100
+    else:
+        change = math.inf
+    comparison = Comparison(
+        table=table,
+        label=label,
+        metric=metric,
+        baseline_mean=baseline_mean,
+        baseline_stdev=statistics.stdev(baseline) if len(baseline) > 1 else 0,
+        baseline_count=len(baseline),
+        target_mean=target_mean,
+        target_count=len(target),
+        change=change,
+        p_value=welch_t_test(baseline, target),
+        direction=_get_direction(metric),
+    )
+    if (
+        comparison.p_value is not None
+        and comparison.p_value < alpha
+        and abs(change) >= threshold
+        and comparison.direction
+    ):
+        if change * comparison.direction < 0:
+            comparison.is_regression = True
+        else:
+            comparison.is_improvement = True
+    return comparison
+
+
+def welch_t_test(baseline: List[float], target: List[float]) -> Optional[float]:
+    """
+    The two-sided p-value of the difference of means. If the target has one
+    sample only, it's tested against the distribution of the baseline. It
+    returns None, if there are not enough samples.
+    """
+    if len(baseline) < 2 or not target:
+        return None
+    baseline_mean = statistics.mean(baseline)
+    target_mean = statistics.mean(target)
+    baseline_variance = statistics.variance(baseline) / len(baseline)
+    freedom = 0.0
+    if len(target) < 2:
+        # the prediction interval of a new sample.
+        variance = statistics.variance(baseline) + baseline_variance
+        freedom = float(len(baseline) - 1)
+    else:
+        target_variance = statistics.variance(target) / len(target)
+        variance = baseline_variance + target_variance
+        if variance:
+            freedom = variance**2 / (
+                baseline_variance**2 / (len(baseline) - 1)
+                + target_variance**2 / (len(target) - 1)
+            )
+    if not variance:
+        return 1.0 if baseline_mean == target_mean else 0.0
+    t_value = (target_mean - baseline_mean) / math.sqrt(variance)
+    return get_t_p_value(t_value, freedom)
+
+
+def get_t_p_value(t_value: float, freedom: float) -> float:
+    """
+    The two-sided p-value of the t distribution.
+    """
+    return _incomplete_beta(freedom / 2, 0.5, freedom / (freedom + t_value**2))
+
+
+def _incomplete_beta(a: float, b: float, x: float) -> float:
+    # the regularized incomplete beta function by continued fraction, it's from
+    # Numerical Recipes.
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _incomplete_beta(b, a, 1 - x)
+    front = math.exp(
+        math.lgamma(a + b)
+        - math.lgamma(a)
+        - math.lgamma(b)
+        + a * math.log(x)
+        + b * math.log(1 - x)
+    )
+
+    tiny = 1e-300
+    c = 1.0
+    d = 1 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, 200):
+        for numerator in [
+            m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+            -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+        ]:
+            d = 1 + numerator * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1) < 1e-12:
+            break
+    return front * fraction / a
@@ -22,6 +22,7 @@ from lisa.util import (
     LisaException,
     RequireUserPasswordException,
     SshSpawnTimeoutException,
+    command_stats,
     create_timer,
     filter_ansi_escape,
 )
@@ -184,10 +185,16 @@ class Process:
         id_: str,
         shell: Shell,
         parent_logger: Optional[Logger] = None,
+        node_name: str = "",
     ) -> None:
         # the shell can be LocalShell or SshShell
         self._shell = shell
         self._id_ = id_
+        # the node name and tool name are used to aggregate command statistics.
+        # The tool name is set by the tool, which runs the command.
+        self.node_name = node_name
+        self.tool_name = ""
+        self._command = ""
         self._is_posix = shell.is_posix
         self._running: bool = False
         self._log = get_logger("cmd", id_, parent=parent_logger)
@@ -285,6 +292,7 @@ class Process:
             )
             # save for logging.
             self._cmd = split_command
+            self._command = command
             self._running = True
         except (FileNotFoundError, NoSuchCommandError) as identifier:
             # FileNotFoundError: not found command on Windows
@@ -387,6 +395,14 @@ class Process:
             self._log.debug(
                 f"execution time: {self._timer}, exit code: {self._result.exit_code}"
             )
+            command_stats.record(
+                node_name=self.node_name,
+                tool_name=self.tool_name,
+                command=self._command,
+                elapsed=self._result.elapsed,
+                output_bytes=len(self._result.stdout) + len(self._result.stderr),
+                is_timeout=is_timeout,
+            )
 
         if expected_exit_code is not None:
             self._result.assert_exit_code(
@@ -0,0 +1,215 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from __future__ import annotations
+
+import re
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from types import FrameType
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from lisa.util.logger import get_logger
+
+PHASE_RUNBOOK = "runbook"
+PHASE_TRANSFORMER = "transformer"
+PHASE_PREPARE = "prepare"
+PHASE_DEPLOY = "deploy"
+PHASE_TEST = "test"
+PHASE_NOTIFIER = "notifier"
+# samples of threads, which are not in any phase.
+PHASE_OTHER = "other"
+
+# merge threads of a pool, like ThreadPoolExecutor-0_1, ThreadPoolExecutor-0_2,
+# so the collapsed stacks are not split by worker index.
+_THREAD_INDEX_PATTERN = re.compile(r"_\d+$")
+_MAX_STACK_DEPTH = 128
+
+# (phase, collapsed stack)
+_SampleKey = Tuple[str, str]
+
+
+class SamplingProfiler:
+    """
+    A low overhead sampling profiler. It snapshots stacks of all threads by an
+    interval in a daemon thread, so the profiled code doesn't need to be
+    instrumented. Each sample is attributed to the phase of its thread, or the
+    phase of the main thread, if the thread doesn't set its own phase.
+    """
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self._interval = interval
+        self._samples: Counter[_SampleKey] = Counter()
+        self._thread_phases: Dict[int, List[str]] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._main_thread_id = threading.main_thread().ident or 0
+        self._sample_count = 0
+        self._log = get_logger("profiler")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="lisa_profiler", daemon=True
+        )
+        self._thread.start()
+        self._log.debug(f"started, interval: {self._interval} sec")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._log.debug(f"stopped, collected {self._sample_count} samples")
+
+    def push_phase(self, phase: str) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._thread_phases.setdefault(thread_id, []).append(phase)
+
+    def pop_phase(self) -> None:
+        thread_id = threading.get_ident()
+        with self._lock:
+            phases = self._thread_phases.get(thread_id)
+            if phases:
+                phases.pop()
+            if not phases:
+                self._thread_phases.pop(thread_id, None)
+
+    def save(self, path: Path, top_count: int = 30) -> None:
+        """
+        save one collapsed stack file per phase, which can be consumed by
+        flamegraph tools, and a summary of the hottest functions.
+        """
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            samples = self._samples.copy()
+
+        phases: Dict[str, Counter[str]] = {}
+        for (phase, stack), count in samples.items():
+            phases.setdefault(phase, Counter())[stack] += count
+
+        for phase, stacks in phases.items():
+            with open(path / f"{phase}.collapsed", "w") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+
+        with open(path / "summary.txt", "w") as f:
+            total = sum(samples.values())
+            f.write(
+                f"interval: {self._interval} sec, samples: {self._sample_count}, "
+                f"thread samples: {total}\n\n"
+            )
+            for phase, stacks in sorted(
+                phases.items(), key=lambda x: sum(x[1].values()), reverse=True
+            ):
+                self._write_phase_summary(f, phase, stacks, top_count)
+        self._log.info(f"profile results are saved to {path}")
+
+    def _write_phase_summary(
+        self, f: TextIO, phase: str, stacks: Counter[str], top_count: int
+    ) -> None:
+        own: Counter[str] = Counter()
+        inclusive: Counter[str] = Counter()
+        for stack, count in stacks.items():
+            # the first frame is the thread name.
+            frames = stack.split(";")[1:]
+            if not frames:
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        phase_total = sum(stacks.values())
+        f.write(f"phase: {phase}, thread samples: {phase_total}\n")
+        f.write(f"  top {top_count} by own samples:\n")
+        for frame, count in own.most_common(top_count):
+            f.write(f"  {count:>8} {count * 100 / phase_total:>6.2f}% {frame}\n")
+        f.write(f"  top {top_count} by inclusive samples:\n")
+        for frame, count in inclusive.most_common(top_count):
+            f.write(f"  {count:>8} {count * 100 / phase_total:>6.2f}% {frame}\n")
+        f.write("\n")
+
+    def _run(self) -> None:
+        current_id = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            thread_names = {
+                thread.ident: _THREAD_INDEX_PATTERN.sub("", thread.name)
+                for thread in threading.enumerate()
+            }
+            # collapse stacks out of the lock, so the phase changes in other
+            # threads are not blocked.
+            stacks = [
+                (
+                    thread_id,
+                    self._collapse(thread_names.get(thread_id, str(thread_id)), frame),
+                )
+                for thread_id, frame in sys._current_frames().items()
+                if thread_id != current_id
+            ]
+            with self._lock:
+                main_phases = self._thread_phases.get(self._main_thread_id)
+                default_phase = main_phases[-1] if main_phases else PHASE_OTHER
+                for thread_id, stack in stacks:
+                    phases = self._thread_phases.get(thread_id)
+                    phase = phases[-1] if phases else default_phase
+                    self._samples[(phase, stack)] += 1
+                self._sample_count += 1
+
+    def _collapse(self, thread_name: str, frame: Optional[FrameType]) -> str:
+        frames: List[str] = []
+        while frame is not None and len(frames) < _MAX_STACK_DEPTH:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "")
+            frames.append(f"{module}:{code.co_name}")
+            frame = frame.f_back
+        frames.append(thread_name)
+        frames.reverse()
+        return ";".join(frames)
+
+
+_profiler: Optional[SamplingProfiler] = None
+
+
+def start(interval: float = 0.01) -> SamplingProfiler:
+    global _profiler
+    assert _profiler is None, "profiler is started already."
+    _profiler = SamplingProfiler(interval=interval)
+    _profiler.start()
+    return _profiler
+
+
+def stop(path: Optional[Path] = None) -> None:
+    global _profiler
+    if _profiler is None:
+        return
+    profiler = _profiler
+    _profiler = None
+    profiler.stop()
+    if path:
+        profiler.save(path)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Mark the current thread is in a phase. It does nothing, if the profiler is
+    not started, so it's cheap to be left in code.
+    """
+    profiler = _profiler
+    if profiler is None:
+        yield
+        return
+    profiler.push_phase(name)
+    try:
+        yield
+    finally:
+        profiler.pop_phase()
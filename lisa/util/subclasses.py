@@ -1,12 +1,24 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import importlib
 from collections import UserDict
-from typing import TYPE_CHECKING, Any, Generic, Iterable, Type, TypeVar, cast
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Type,
+    TypeVar,
+    cast,
+)
 
 from lisa import schema
 from lisa.util import BaseClassMixin, InitializableMixin, LisaException, constants
 from lisa.util.logger import get_logger
+from lisa.util.package import import_pending_modules
 
 
 class BaseClassWithRunbookMixin(BaseClassMixin):
@@ -30,6 +42,58 @@ class BaseClassWithRunbookMixin(BaseClassMixin):
 
 T_BASECLASS = TypeVar("T_BASECLASS", bound=BaseClassMixin)
 
+# The manifest of types, which are imported when they are referenced. The key is
+# the full name of the base class, like "lisa.notifier.Notifier". The value maps
+# type names to module paths.
+_lazy_modules: Dict[str, Dict[str, str]] = {}
+_imported_modules: Dict[str, bool] = {}
+
+
+def add_lazy_types(base_type_name: str, types: Dict[str, str]) -> None:
+    """
+    Register type names and the modules, which define them. The modules are
+    imported when a type name is looked up by a Factory of the base type, so the
+    startup doesn't pay for unused platforms, notifiers, transformers and their
+    dependencies.
+    """
+    _lazy_modules.setdefault(base_type_name, {}).update(types)
+
+
+def import_lazy_modules() -> List[str]:
+    """
+    import all modules in the manifest. It returns modules, which cannot be
+    imported due to missing packages.
+    """
+    failed_modules: List[str] = []
+    modules = {x for types in _lazy_modules.values() for x in types.values()}
+    for module in sorted(modules):
+        if not _import_module(module, raise_error=False):
+            failed_modules.append(module)
+    return failed_modules
+
+
+def _get_full_name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _import_module(module: str, raise_error: bool = True) -> bool:
+    if module in _imported_modules:
+        return _imported_modules[module]
+
+    log = get_logger("subclasses")
+    try:
+        importlib.import_module(module)
+        _imported_modules[module] = True
+    except ModuleNotFoundError as identifier:
+        _imported_modules[module] = False
+        if raise_error:
+            raise LisaException(
+                f"failed to import '{module}', the optional package may be not "
+                f"installed. [{identifier}]"
+            )
+        log.debug(f"skipped module '{module}', because of [{identifier}]")
+    return _imported_modules[module]
+
 
 if TYPE_CHECKING:
     SubClassTypeDict = UserDict[str, type]
@@ -44,12 +108,18 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
         self._log = get_logger("subclasses", base_type.__name__)
 
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        self._register_subclasses()
+
+    def _register_subclasses(self) -> None:
         # initialize types from subclasses.
         # each type should be unique in code, or there is warning message.
         for subclass_type in self._get_subclasses(self._base_type):
             subclass_type_name = subclass_type.type_name()
             exists_type = self.get(subclass_type_name)
-            if exists_type:
+            if exists_type is subclass_type:
+                # it's registered in previous scan.
+                continue
+            elif exists_type:
                 # so far, it happens on ut only.
                 # When UT code import each other, it happens.
                 # it's important to use first registered.
@@ -106,9 +176,35 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
         self.initialize()
         sub_type = self.get(type_name)
         if sub_type is None:
+            sub_type = self._load_lazy_type(type_name)
+        if sub_type is None:
+            lazy_types = _lazy_modules.get(_get_full_name(self._base_type), {})
             raise LisaException(
                 f"cannot find subclass '{type_name}' of {self._base_type.__name__}. "
-                f"Supported types include: {list(self.keys())}. "
+                f"Supported types include: "
+                f"{sorted(set(self.keys()).union(lazy_types.keys()))}. "
                 f"Are you missing an import in 'mixin_modules.py' or an extension?"
             )
         return sub_type
+
+    def _load_lazy_type(self, type_name: str) -> Any:
+        # the type may be imported by other code after the factory initialized.
+        self._register_subclasses()
+        sub_type = self.get(type_name)
+        if sub_type is not None:
+            return sub_type
+
+        lazy_types = _lazy_modules.get(_get_full_name(self._base_type), {})
+        module = lazy_types.get(type_name)
+        if module:
+            self._log.debug(f"importing '{module}' for type '{type_name}'")
+            _import_module(module)
+        else:
+            # not in the manifest, it may be defined in a module with other
+            # types, so import all of them like before.
+            self._log.debug(f"not found '{type_name}' in manifest, importing all")
+            import_lazy_modules()
+            # it may be defined in a deferred module of extensions.
+            import_pending_modules()
+        self._register_subclasses()
+        return self.get(type_name)
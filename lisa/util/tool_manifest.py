@@ -0,0 +1,162 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Record tools found on images, so nodes from the same image don't check tools one
+by one in every run. The manifest is keyed by the image identity, which includes
+the distro, the kernel and the arch. It's saved on the controller, and shared by
+runs.
+
+A manifest is validated before it's used. Commands in the manifest are resolved
+on the node by one call, and the checksum of resolved paths is compared with the
+checksum of recorded paths. Tools installed by lisa are compared, only if they
+are found, because they are missing on new nodes. If the checksums are
+different, only tools, whose paths are not changed, are seeded to the node.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional
+
+from lisa.util import constants
+from lisa.util.logger import get_logger
+
+if TYPE_CHECKING:
+    from lisa.node import Node
+
+# increase it, when the format of manifest is changed.
+MANIFEST_VERSION = 1
+# the tool exists in the image.
+METHOD_PRESENT = "present"
+# the tool is installed by lisa.
+METHOD_INSTALLED = "installed"
+
+_MANIFEST_FOLDER = "tools"
+
+_lock = threading.Lock()
+_path_locks: Dict[Path, threading.Lock] = {}
+
+
+@dataclass
+class ToolRecord:
+    command: str
+    path: str
+    method: str = METHOD_PRESENT
+    use_sudo: bool = False
+
+
+def get_paths_checksum(records: Dict[str, ToolRecord]) -> str:
+    content = "\n".join(f"{key}={records[key].path}" for key in sorted(records))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ToolManifest:
+    def __init__(self, node: "Node") -> None:
+        self._node = node
+        self._log = get_logger("tool_manifest", parent=node.log)
+        self._path: Optional[Path] = None
+        self._identity: Dict[str, str] = {}
+
+    @property
+    def is_enabled(self) -> bool:
+        # local nodes are checked quickly, and Windows tools don't have paths.
+        return (
+            self._node.is_remote
+            and self._node.is_posix
+            and hasattr(constants, "CACHE_PATH")
+        )
+
+    @property
+    def path(self) -> Path:
+        if self._path is None:
+            self._identity = self._get_identity()
+            raw_key = json.dumps(self._identity, sort_keys=True)
+            key = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+            self._path = constants.CACHE_PATH / _MANIFEST_FOLDER / f"{key}.json"
+        return self._path
+
+    def load(self) -> Dict[str, ToolRecord]:
+        """
+        Return records by tool keys. A missing or broken manifest returns empty.
+        """
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                raw_data = json.load(f)
+            if raw_data.get("version") != MANIFEST_VERSION:
+                return {}
+            records = {
+                key: ToolRecord(**value) for key, value in raw_data["tools"].items()
+            }
+        except Exception as identifier:
+            self._log.debug(f"ignored broken manifest {self.path}: {identifier}")
+            return {}
+        return records
+
+    def record(self, key: str, record: ToolRecord) -> None:
+        """
+        Add or update a tool. It's merged with records of other nodes, which use
+        the same image.
+        """
+
+        def _add(records: Dict[str, ToolRecord]) -> bool:
+            if records.get(key) == record:
+                return False
+            records[key] = record
+            return True
+
+        self._update(_add)
+
+    def remove(self, keys: Iterable[str]) -> None:
+        def _remove(records: Dict[str, ToolRecord]) -> bool:
+            removed = [records.pop(key, None) for key in keys]
+            return any(removed)
+
+        self._update(_remove)
+
+    def _update(self, change: Callable[[Dict[str, ToolRecord]], bool]) -> None:
+        """
+        The change returns False, if records are not changed, so the manifest
+        isn't written.
+        """
+        path = self.path
+        with _lock:
+            path_lock = _path_locks.setdefault(path, threading.Lock())
+        with path_lock:
+            records = self.load()
+            if not change(records):
+                return
+            data = {
+                "version": MANIFEST_VERSION,
+                "identity": self._identity,
+                "tools": {key: asdict(value) for key, value in records.items()},
+            }
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write to a temp file and rename, so other runs don't read a
+            # partial file.
+            temp_file = tempfile.NamedTemporaryFile(
+                "w", dir=path.parent, suffix=".tmp", delete=False
+            )
+            try:
+                with temp_file:
+                    json.dump(data, temp_file, indent=2, sort_keys=True)
+                os.replace(temp_file.name, path)
+            finally:
+                if os.path.exists(temp_file.name):
+                    os.unlink(temp_file.name)
+
+    def _get_identity(self) -> Dict[str, str]:
+        node = self._node
+        result = node.execute("uname -r -m", no_info_log=True)
+        information = node.os.information
+        return {
+            "distro": f"{node.os.name} {information.vendor} {information.release}",
+            "full_version": information.full_version,
+            "kernel": result.stdout.strip(),
+        }
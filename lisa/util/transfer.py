@@ -0,0 +1,323 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+"""
+Transfer large files by SFTP in parallel chunks. A single SFTP stream waits for
+the response of each request, so it's limited by the latency of the link. The
+file is split into chunks, and chunks are transferred by multiple SFTP channels
+with pipelined writes and prefetched reads. Completed chunks are saved in a
+journal, so an interrupted transfer can be resumed. The result is verified by
+sha256 of both sides.
+"""
+
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import paramiko
+
+from lisa.util import LisaException, constants
+from lisa.util.logger import Logger
+from lisa.util.parallel import run_in_parallel
+from lisa.util.perf_timer import create_timer
+
+# files larger than it are transferred by chunks.
+LARGE_FILE_SIZE = 128 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_CONNECTION_COUNT = 4
+
+PARTIAL_SUFFIX = ".lisa_partial"
+_BLOCK_SIZE = 1024 * 1024
+_JOURNAL_FOLDER = "transfer"
+
+
+@dataclass
+class TransferStatistics:
+    file_count: int = 0
+    # the size of files before compression.
+    size: int = 0
+    # the size on wire after compression.
+    transferred_size: int = 0
+    elapsed: float = 0
+
+    @property
+    def throughput(self) -> float:
+        """
+        MB/s of file content.
+        """
+        if self.elapsed <= 0:
+            return 0
+        return self.size / 1024 / 1024 / self.elapsed
+
+    def __str__(self) -> str:
+        return (
+            f"{self.file_count} files, {self.size} bytes, "
+            f"transferred {self.transferred_size} bytes, "
+            f"{self.elapsed:.3f} sec, {self.throughput:.2f} MB/s"
+        )
+
+
+@dataclass
+class _Journal:
+    key: str
+    size: int
+    chunk_size: int
+    completed: List[int] = field(default_factory=list)
+
+
+def get_journal_path() -> Path:
+    # the cache path is not set, if it's not in a run.
+    if hasattr(constants, "CACHE_PATH"):
+        return constants.CACHE_PATH / _JOURNAL_FOLDER
+    return Path(tempfile.gettempdir()) / "lisa" / _JOURNAL_FOLDER
+
+
+def get_local_sha256(path: Path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_BLOCK_SIZE), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ChunkedTransfer:
+    """
+    sftp_opener: open a new SFTP client, each worker uses its own client, so the
+        chunks are transferred by multiple channels.
+    remote_sha256: return sha256 of a file on remote.
+    """
+
+    def __init__(
+        self,
+        sftp_opener: Callable[[], paramiko.SFTPClient],
+        remote_sha256: Callable[[str], str],
+        log: Logger,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        connection_count: int = DEFAULT_CONNECTION_COUNT,
+        journal_path: Optional[Path] = None,
+    ) -> None:
+        self._sftp_opener = sftp_opener
+        self._remote_sha256 = remote_sha256
+        self._log = log
+        self._chunk_size = chunk_size
+        self._connection_count = connection_count
+        self._journal_path = journal_path or get_journal_path()
+        self._lock = threading.Lock()
+
+    def upload(self, local_path: Path, node_path: str, key: str) -> TransferStatistics:
+        """
+        key: identify the transfer for resuming, like the address of node.
+        """
+        timer = create_timer()
+        local_stat = local_path.stat()
+        size = local_stat.st_size
+        partial_path = f"{node_path}{PARTIAL_SUFFIX}"
+        journal = self._load_journal(
+            f"upload|{key}|{local_path.resolve()}|{size}|"
+            f"{local_stat.st_mtime_ns}|{node_path}",
+            size,
+        )
+
+        sftp = self._sftp_opener()
+        try:
+            if journal.completed and not self._is_remote_size(sftp, partial_path, size):
+                journal.completed = []
+            if not journal.completed:
+                with sftp.open(partial_path, "wb") as remote_file:
+                    remote_file.truncate(size)
+                self._save_journal(journal)
+
+            def _upload_chunk(client: paramiko.SFTPClient, index: int) -> int:
+                offset, length = self._get_range(index, size)
+                with open(local_path, "rb") as local_file:
+                    local_file.seek(offset)
+                    with client.open(partial_path, "r+b") as remote_file:
+                        remote_file.set_pipelined(True)
+                        remote_file.seek(offset)
+                        remaining = length
+                        while remaining > 0:
+                            block = local_file.read(min(_BLOCK_SIZE, remaining))
+                            if not block:
+                                raise LisaException(
+                                    f"{local_path} is changed during uploading"
+                                )
+                            remote_file.write(block)
+                            remaining -= len(block)
+                    # the remote file is closed, all pipelined writes are
+                    # acknowledged.
+                return length
+
+            transferred = self._run_chunks(journal, _upload_chunk)
+
+            local_sha256 = get_local_sha256(local_path)
+            remote_sha256 = self._remote_sha256(partial_path)
+            if local_sha256 != remote_sha256:
+                self._remove_journal(journal)
+                sftp.remove(partial_path)
+                raise LisaException(
+                    f"checksum mismatch on uploading {local_path} to {node_path}, "
+                    f"local: {local_sha256}, remote: {remote_sha256}"
+                )
+            sftp.posix_rename(partial_path, node_path)
+        finally:
+            sftp.close()
+
+        self._remove_journal(journal)
+        return self._get_statistics(size, transferred, timer.elapsed())
+
+    def download(
+        self, node_path: str, local_path: Path, key: str
+    ) -> TransferStatistics:
+        timer = create_timer()
+        partial_path = local_path.with_name(f"{local_path.name}{PARTIAL_SUFFIX}")
+        sftp = self._sftp_opener()
+        try:
+            remote_stat = sftp.stat(node_path)
+        finally:
+            sftp.close()
+        size = int(remote_stat.st_size or 0)
+        journal = self._load_journal(
+            f"download|{key}|{node_path}|{size}|{remote_stat.st_mtime}|"
+            f"{local_path.resolve()}",
+            size,
+        )
+
+        if journal.completed and not (
+            partial_path.exists() and partial_path.stat().st_size == size
+        ):
+            journal.completed = []
+        if not journal.completed:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(partial_path, "wb") as local_file:
+                local_file.truncate(size)
+            self._save_journal(journal)
+
+        def _download_chunk(client: paramiko.SFTPClient, index: int) -> int:
+            offset, length = self._get_range(index, size)
+            blocks = [
+                (block_offset, min(_BLOCK_SIZE, offset + length - block_offset))
+                for block_offset in range(offset, offset + length, _BLOCK_SIZE)
+            ]
+            with client.open(node_path, "rb") as remote_file:
+                with open(partial_path, "r+b") as local_file:
+                    local_file.seek(offset)
+                    # readv prefetches all blocks, so requests are pipelined.
+                    for data in remote_file.readv(blocks):
+                        local_file.write(data)
+            return length
+
+        transferred = self._run_chunks(journal, _download_chunk)
+
+        local_sha256 = get_local_sha256(partial_path)
+        remote_sha256 = self._remote_sha256(node_path)
+        if local_sha256 != remote_sha256:
+            self._remove_journal(journal)
+            partial_path.unlink()
+            raise LisaException(
+                f"checksum mismatch on downloading {node_path} to {local_path}, "
+                f"local: {local_sha256}, remote: {remote_sha256}"
+            )
+        os.replace(partial_path, local_path)
+
+        self._remove_journal(journal)
+        return self._get_statistics(size, transferred, timer.elapsed())
+
+    def _run_chunks(
+        self,
+        journal: _Journal,
+        transfer_chunk: Callable[[paramiko.SFTPClient, int], int],
+    ) -> int:
+        chunk_count = max((journal.size + self._chunk_size - 1) // self._chunk_size, 1)
+        pending: "queue.Queue[int]" = queue.Queue()
+        for index in range(chunk_count):
+            if index not in journal.completed:
+                pending.put(index)
+        if journal.completed:
+            self._log.debug(
+                f"resuming transfer, completed chunks: {len(journal.completed)}, "
+                f"pending chunks: {pending.qsize()}"
+            )
+        failed = threading.Event()
+
+        def _worker() -> int:
+            transferred = 0
+            client = self._sftp_opener()
+            try:
+                while not failed.is_set():
+                    try:
+                        index = pending.get_nowait()
+                    except queue.Empty:
+                        break
+                    try:
+                        transferred += transfer_chunk(client, index)
+                    except Exception:
+                        # stop other workers, the completed chunks are kept in
+                        # the journal for resuming.
+                        failed.set()
+                        raise
+                    with self._lock:
+                        journal.completed.append(index)
+                        self._save_journal(journal)
+            finally:
+                client.close()
+            return transferred
+
+        worker_count = max(min(self._connection_count, pending.qsize()), 1)
+        results = run_in_parallel([_worker] * worker_count, log=self._log)
+        return sum(results)
+
+    def _get_range(self, index: int, size: int) -> Tuple[int, int]:
+        offset = index * self._chunk_size
+        return offset, min(self._chunk_size, size - offset)
+
+    def _is_remote_size(self, sftp: paramiko.SFTPClient, path: str, size: int) -> bool:
+        try:
+            return bool(sftp.stat(path).st_size == size)
+        except FileNotFoundError:
+            return False
+
+    def _get_statistics(
+        self, size: int, transferred: int, elapsed: float
+    ) -> TransferStatistics:
+        return TransferStatistics(
+            file_count=1, size=size, transferred_size=transferred, elapsed=elapsed
+        )
+
+    def _get_journal_file(self, journal: _Journal) -> Path:
+        return self._journal_path / f"{journal.key}.json"
+
+    def _load_journal(self, identity: str, size: int) -> _Journal:
+        key = hashlib.sha256(identity.encode()).hexdigest()[:32]
+        journal = _Journal(key=key, size=size, chunk_size=self._chunk_size)
+        journal_file = self._get_journal_file(journal)
+        if journal_file.exists():
+            try:
+                with open(journal_file, "r") as f:
+                    raw_data = json.load(f)
+                if (
+                    raw_data["size"] == size
+                    and raw_data["chunk_size"] == self._chunk_size
+                ):
+                    journal.completed = list(raw_data["completed"])
+            except Exception as identifier:
+                self._log.debug(f"ignored broken journal {journal_file}: {identifier}")
+        return journal
+
+    def _save_journal(self, journal: _Journal) -> None:
+        journal_file = self._get_journal_file(journal)
+        journal_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = journal_file.with_name(f"{journal_file.name}.tmp")
+        with open(temp_file, "w") as f:
+            json.dump(journal.__dict__, f)
+        os.replace(temp_file, journal_file)
+
+    def _remove_journal(self, journal: _Journal) -> None:
+        journal_file = self._get_journal_file(journal)
+        if journal_file.exists():
+            journal_file.unlink()
@@ -0,0 +1,200 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from lisa.util import LisaException
+from lisa.util.perf_parser import get_percentile
+
+RX = "rx"
+TX = "tx"
+
+# Rx-pps:       1208704          Rx-bps:    580178176
+_pps_pattern = re.compile(r"(?P<direction>Rx|Tx)-pps:\s+(?P<value>[0-9]+)")
+_device_removal_event = "Port 0: device removal event"
+_command_dumped = "timeout: the monitored command dumped core"
+# regex to identify sriov re-enable event, example:
+# EAL: Probe PCI driver: net_mlx4 (15b3:1004) device: e8ef:00:02.0 (socket 0)
+_hotplug_pattern = re.compile(
+    r"EAL: Probe PCI driver: ([a-z_A-Z0-9\-]+) "
+    r"\([0-9a-fA-F]{4}:[0-9a-fA-F]{4}\) device: "
+    r"[a-fA-F0-9]{4}:[a-fA-F0-9]{2}:"
+    r"[a-fA-F0-9]{2}\.[a-fA-F0-9]"
+    r" \(socket 0\)"
+)
+_hotplug_pattern_alt = re.compile(
+    r"EAL: PCI device [a-fA-F0-9]{4}:[a-fA-F0-9]{2}:[a-fA-F0-9]{2}\.[a-fA-F0-9] "
+    r"on NUMA socket [0-9]+"
+)
+
+
+class _Samples:
+    """
+    Samples in a preallocated list. If the list is full, adjacent samples are
+    merged by average, and later samples are averaged by the same stride
+    before saving. So the memory is bounded, and the mean is kept.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        assert capacity >= 2 and capacity % 2 == 0, "capacity must be even"
+        self._data: List[float] = [0.0] * capacity
+        self._length = 0
+        self.stride = 1
+        # count of raw samples
+        self.raw_count = 0
+        self._pending_sum = 0
+        self._pending_count = 0
+
+    def append(self, value: int) -> None:
+        self.raw_count += 1
+        self._pending_sum += value
+        self._pending_count += 1
+        if self._pending_count < self.stride:
+            return
+        if self._length == len(self._data):
+            half = self._length // 2
+            for index in range(half):
+                self._data[index] = (
+                    self._data[2 * index] + self._data[2 * index + 1]
+                ) / 2
+            self._length = half
+            self.stride *= 2
+            # the pending samples are less than the new stride, keep them.
+            return
+        self._data[self._length] = self._pending_sum / self._pending_count
+        self._length += 1
+        self._pending_sum = 0
+        self._pending_count = 0
+
+    @property
+    def values(self) -> List[float]:
+        return self._data[: self._length]
+
+    def get_index(self, raw_index: int) -> int:
+        return min(raw_index // self.stride, self._length)
+
+
+class TestpmdStats:
+    """
+    Parse statistics of testpmd line by line, so the output doesn't need to be
+    searched again for each metric. The usage is like,
+
+        stats = TestpmdStats()
+        for line in output_lines:
+            stats.feed(line)
+        mean = stats.get_mean(RX)
+        before, during, after = stats.get_rescind_means(TX)
+    """
+
+    def __init__(self, capacity: int = 4096) -> None:
+        self._samples = {RX: _Samples(capacity), TX: _Samples(capacity)}
+        # raw sample counts of rx and tx, when events happen.
+        self._removal_position: Optional[Tuple[int, int]] = None
+        self._hotplug_position: Optional[Tuple[int, int]] = None
+        self._has_standard_hotplug = False
+        self.hotplug_event = ""
+        self.is_crashed = False
+
+    def feed(self, line: str) -> None:
+        if "-pps:" in line:
+            for matched in _pps_pattern.finditer(line):
+                self._samples[matched.group("direction").lower()].append(
+                    int(matched.group("value"))
+                )
+        elif _device_removal_event in line:
+            # the first removal is the rescind.
+            if self._removal_position is None:
+                self._removal_position = self._get_position()
+        elif "EAL: " in line and self._removal_position is not None:
+            matched = _hotplug_pattern.search(line)
+            if matched:
+                self._has_standard_hotplug = True
+            elif not self._has_standard_hotplug:
+                # the alternative form is used, only if there is no standard form.
+                matched = _hotplug_pattern_alt.search(line)
+            if matched:
+                # the last re-enable is used.
+                self._hotplug_position = self._get_position()
+                self.hotplug_event = matched.group(0)
+        elif _command_dumped in line:
+            self.is_crashed = True
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        for line in lines:
+            self.feed(line)
+
+    def get_raw_count(self, direction: str) -> int:
+        return self._samples[direction].raw_count
+
+    def get_samples(self, direction: str, start: int = 0, end: int = -1) -> List[float]:
+        """
+        Samples between the raw sample indexes, leading zeroes are discarded,
+        since the first sample may be zero. The first and last samples are
+        discarded too, they are unreliable after switch messages.
+        """
+        samples = self._samples[direction]
+        values = samples.values
+        end_index = samples.get_index(end) if end >= 0 else len(values)
+        data = values[samples.get_index(start) : end_index]
+        first_non_zero = next((i for i, x in enumerate(data) if x), 0)
+        data = data[first_non_zero:]
+        if len(data) >= 3:
+            data = data[1:-1]
+        return data
+
+    def get_mean(self, direction: str) -> int:
+        return _mean(self._check_samples(self.get_samples(direction), direction))
+
+    def get_max(self, direction: str) -> int:
+        return int(max(self._check_samples(self.get_samples(direction), direction)))
+
+    def get_min(self, direction: str) -> int:
+        return int(min(self._check_samples(self.get_samples(direction), direction)))
+
+    def get_percentiles(
+        self, direction: str, percentiles: Iterable[float] = (50, 90, 99)
+    ) -> List[int]:
+        data = sorted(self._check_samples(self.get_samples(direction), direction))
+        return [int(get_percentile(data, x)) for x in percentiles]
+
+    def get_rescind_means(self, direction: str) -> Tuple[int, int, int]:
+        """
+        The mean pps before rescind, during rescind, and after re-enable.
+        """
+        if self._removal_position is None:
+            raise LisaException(
+                "Could not locate SRIOV rescind event in testpmd output"
+            )
+        if self._hotplug_position is None:
+            if self.is_crashed:
+                raise LisaException("Testpmd crashed after device removal.")
+            raise LisaException(
+                "Found no vf hotplug events in testpmd output. "
+                "Check output to verify if PPS drop occurred and port removal "
+                "event message matches the expected forms."
+            )
+        direction_index = 0 if direction == RX else 1
+        removal = self._removal_position[direction_index]
+        hotplug = self._hotplug_position[direction_index]
+        windows = [(0, removal), (removal, hotplug), (hotplug, -1)]
+        before, during, after = [
+            _mean(self.get_samples(direction, start, end)) for start, end in windows
+        ]
+        return before, during, after
+
+    def _get_position(self) -> Tuple[int, int]:
+        return (self._samples[RX].raw_count, self._samples[TX].raw_count)
+
+    def _check_samples(self, data: List[float], direction: str) -> List[float]:
+        if not any(data):
+            raise LisaException(
+                f"{direction} pps data was empty or all zeroes in testpmd output."
+            )
+        return data
+
+
+def _mean(data: List[float]) -> int:
+    if not data:
+        raise LisaException("no pps data in the window of testpmd output.")
+    return int(sum(data) // len(data))
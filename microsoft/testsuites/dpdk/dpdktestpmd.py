@@ -1,9 +1,10 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import io
 import re
 from pathlib import PurePosixPath
-from typing import Any, List, Tuple, Type, Union
+from typing import Any, Iterable, List, Tuple, Type, Union
 
 from assertpy import assert_that, fail
 from semver import VersionInfo
@@ -35,11 +36,13 @@ from lisa.util import (
     SkippedException,
     UnsupportedDistroException,
 )
+from lisa.util.build_cache import BuildCache
 from lisa.util.constants import DEVICE_TYPE_SRIOV, SIGINT
 from microsoft.testsuites.dpdk.common import (
     is_ubuntu_latest_or_prerelease,
     is_ubuntu_lts_version,
 )
+from microsoft.testsuites.dpdk.dpdkstats import RX, TX, TestpmdStats
 
 PACKAGE_MANAGER_SOURCE = "package_manager"
 
@@ -47,22 +50,6 @@ PACKAGE_MANAGER_SOURCE = "package_manager"
 class DpdkTestpmd(Tool):
     # TestPMD tool to bundle the DPDK build and toolset together.
 
-    # regex to identify sriov re-enable event, example:
-    # EAL: Probe PCI driver: net_mlx4 (15b3:1004) device: e8ef:00:02.0 (socket 0)
-    _search_hotplug_regex = re.compile(
-        (
-            r"EAL: Probe PCI driver: ([a-z_A-Z0-9\-]+) "
-            r"\([0-9a-fA-F]{4}:[0-9a-fA-F]{4}\) device: "
-            r"[a-fA-F0-9]{4}:[a-fA-F0-9]{2}:"
-            r"[a-fA-F0-9]{2}\.[a-fA-F0-9]"
-            r" \(socket 0\)"
-        )
-    )
-    _search_hotplug_regex_alt = re.compile(
-        r"EAL: PCI device [a-fA-F0-9]{4}:[a-fA-F0-9]{2}:[a-fA-F0-9]{2}\.[a-fA-F0-9] "
-        r"on NUMA socket [0-9]+"
-    )
-
     # ex v19.11-rc3 or 19.11
     _version_info_from_git_tag_regex = re.compile(
         r"v?(?P<major>[0-9]+)\.(?P<minor>[0-9]+)"
@@ -128,14 +115,6 @@ class DpdkTestpmd(Tool):
     _rte_target = "x86_64-native-linuxapp-gcc"
     _ninja_url = "https://github.com/ninja-build/ninja/"
 
-    _tx_pps_key = "transmit-packets-per-second"
-    _rx_pps_key = "receive-packets-per-second"
-
-    _testpmd_output_regex = {
-        _tx_pps_key: r"Tx-pps:\s+([0-9]+)",
-        _rx_pps_key: r"Rx-pps:\s+([0-9]+)",
-    }
-
     def get_rdma_core_package_name(self) -> str:
         distro = self.node.os
         package = ""
@@ -345,9 +324,7 @@ class DpdkTestpmd(Tool):
         proc_result = self.node.tools[Timeout].run_with_timeout(
             cmd, timeout, SIGINT, kill_timeout=timeout + 10
         )
-        self._last_run_output = proc_result.stdout
-        self.populate_performance_data()
-        return proc_result.stdout
+        return self.process_testpmd_output(proc_result)
 
     def start_for_n_seconds(self, cmd: str, timeout: int) -> str:
         self._last_run_timeout = timeout
@@ -359,8 +336,10 @@ class DpdkTestpmd(Tool):
         return self.process_testpmd_output(proc_result)
 
     def process_testpmd_output(self, result: ExecutableResult) -> str:
-        self._last_run_output = result.stdout
-        self.populate_performance_data()
+        assert_that(result.stdout).described_as(
+            "Could not find output from last testpmd run."
+        ).is_not_equal_to("")
+        self.populate_performance_data(io.StringIO(result.stdout))
         return result.stdout
 
     def check_testpmd_is_running(self) -> bool:
@@ -394,68 +373,47 @@ class DpdkTestpmd(Tool):
                     "Proceeding with processing test run results."
                 )
 
-    def get_data_from_testpmd_output(
-        self,
-        search_key_constant: str,
-        testpmd_output: str,
-    ) -> List[int]:
-        # Find all data in the output that matches
-        # Apply a list of filters to the data
-        # return a single output from a final filter function
-        assert_that(testpmd_output).described_as(
-            "Could not find output from last testpmd run."
-        ).is_not_equal_to("")
-        matches = re.findall(
-            self._testpmd_output_regex[search_key_constant], testpmd_output
-        )
-        assert_that(matches).described_as(
+    def populate_performance_data(self, lines: Iterable[str]) -> None:
+        # the output is parsed in one pass, and pps samples are kept in bounded
+        # lists, so long runs don't need to be searched again for each metric.
+        stats = TestpmdStats()
+        stats.feed_lines(lines)
+        self._stats = stats
+
+    @property
+    def stats(self) -> TestpmdStats:
+        assert_that(hasattr(self, "_stats")).described_as(
             (
-                "Could not locate any matches for search key "
-                f"{self._testpmd_output_regex[search_key_constant]} "
-                "in the test output."
+                "PPS data did not exist for testpmd object. "
+                "This indicates either testpmd did not run or the suite is "
+                "missing an assert. Contact the test maintainer."
             )
-        )
-        cast_to_ints = list(map(int, matches))
-        cast_to_ints = _discard_first_zeroes(cast_to_ints)
-        return _discard_first_and_last_sample(cast_to_ints)
-
-    def populate_performance_data(self) -> None:
-        self.rx_pps_data = self.get_data_from_testpmd_output(
-            self._rx_pps_key, self._last_run_output
-        )
-        self.tx_pps_data = self.get_data_from_testpmd_output(
-            self._tx_pps_key, self._last_run_output
-        )
+        ).is_true()
+        return self._stats
 
     def get_mean_rx_pps(self) -> int:
-        self._check_pps_data("RX")
-        return _mean(self.rx_pps_data)
+        return self.stats.get_mean(RX)
 
     def get_mean_tx_pps(self) -> int:
-        self._check_pps_data("TX")
-        return _mean(self.tx_pps_data)
+        return self.stats.get_mean(TX)
 
     def get_max_rx_pps(self) -> int:
-        self._check_pps_data("RX")
-        return max(self.rx_pps_data)
+        return self.stats.get_max(RX)
 
     def get_max_tx_pps(self) -> int:
-        self._check_pps_data("TX")
-        return max(self.tx_pps_data)
+        return self.stats.get_max(TX)
 
     def get_min_rx_pps(self) -> int:
-        self._check_pps_data("RX")
-        return min(self.rx_pps_data)
+        return self.stats.get_min(RX)
 
     def get_min_tx_pps(self) -> int:
-        self._check_pps_data("TX")
-        return min(self.tx_pps_data)
+        return self.stats.get_min(TX)
 
     def get_mean_tx_pps_sriov_rescind(self) -> Tuple[int, int, int]:
-        return self._get_pps_sriov_rescind(self._tx_pps_key)
+        return self._get_pps_sriov_rescind(TX)
 
     def get_mean_rx_pps_sriov_rescind(self) -> Tuple[int, int, int]:
-        return self._get_pps_sriov_rescind(self._rx_pps_key)
+        return self._get_pps_sriov_rescind(RX)
 
     def add_sample_apps_to_build_list(self, apps: Union[List[str], None]) -> None:
         if apps:
@@ -494,34 +452,6 @@ class DpdkTestpmd(Tool):
         )
         self.is_mana = any(["Microsoft" in dev.vendor for dev in device_list])
 
-    def _check_pps_data_exists(self, rx_or_tx: str) -> None:
-        data_attr_name = f"{rx_or_tx.lower()}_pps_data"
-        assert_that(hasattr(self, data_attr_name)).described_as(
-            (
-                f"PPS data ({rx_or_tx}) did not exist for testpmd object. "
-                "This indicates either testpmd did not run or the suite is "
-                "missing an assert. Contact the test maintainer."
-            )
-        ).is_true()
-
-    def _check_pps_data(self, rx_or_tx: str) -> None:
-        self._check_pps_data_exists(rx_or_tx)
-        data_set: List[int] = []
-        if rx_or_tx == "RX":
-            data_set = self.rx_pps_data
-        elif rx_or_tx == "TX":
-            data_set = self.tx_pps_data
-        else:
-            fail(
-                "Identifier passed to _check_pps_data was not recognized, "
-                f"must be RX or TX. Found {rx_or_tx}"
-            )
-
-        assert_that(any(data_set)).described_as(
-            f"any({str(data_set)}) resolved to false. Test data was "
-            f"empty or all zeroes for dpdktestpmd.{rx_or_tx.lower()}_pps_data."
-        ).is_true()
-
     def _install_upstream_rdma_core_for_mana(self) -> None:
         node = self.node
         wget = node.tools[Wget]
@@ -558,6 +488,7 @@ class DpdkTestpmd(Tool):
                 "releases/download/v46.0/rdma-core-46.0.tar.gz"
             ),
             file_path=str(node.working_path),
+            cache=True,
         )
 
         tar.extract(tar_path, dest_dir=str(node.working_path), gzip=True, sudo=True)
@@ -592,10 +523,6 @@ class DpdkTestpmd(Tool):
             self._backport_repo_args = []
 
     def _install(self) -> bool:
-        self._testpmd_output_after_reenable = ""
-        self._testpmd_output_before_rescind = ""
-        self._testpmd_output_during_rescind = ""
-        self._last_run_output = ""
         node = self.node
         # before doing anything: determine if backport repo needs to be enabled
         self._set_backport_repo_args()
@@ -681,6 +608,7 @@ class DpdkTestpmd(Tool):
                 str(self.dpdk_path),
                 strip_components=1,
             )
+            source_version = self._dpdk_source
         else:
             git_tool.clone(
                 self._dpdk_source,
@@ -695,6 +623,7 @@ class DpdkTestpmd(Tool):
                 )
 
             git_tool.checkout(self._dpdk_branch, cwd=self.dpdk_path)
+            source_version = git_tool.get_latest_commit_id(cwd=self.dpdk_path)
 
         self._load_drivers_for_dpdk()
 
@@ -704,41 +633,50 @@ class DpdkTestpmd(Tool):
         else:
             sample_apps = ""
 
-        node.execute(
-            f"meson {sample_apps} build",
-            shell=True,
-            cwd=self.dpdk_path,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "meson build for dpdk failed, check that"
-                "dpdk build has not changed to eliminate the use of meson or "
-                "meson version is compatible with this dpdk version and OS."
-            ),
-        )
         self.dpdk_build_path = self.dpdk_path.joinpath("build")
-        node.execute(
-            "ninja",
-            cwd=self.dpdk_build_path,
-            timeout=1800,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "ninja build for dpdk failed. check build spew for missing headers "
-                "or dependencies. Also check that this ninja version requirement "
-                "has not changed for dpdk."
-            ),
-        )
-        node.execute(
-            "ninja install",
-            cwd=self.dpdk_build_path,
-            sudo=True,
-            expected_exit_code=0,
-            expected_exit_code_failure_message=(
-                "ninja install failed for dpdk binaries."
-            ),
+        # sample apps are used from the build folder, which is not in the
+        # installed files, so the build is not cached with sample apps.
+        build_cache = BuildCache(
+            node,
+            self.name,
+            version="" if self._sample_apps_to_build else source_version,
         )
+        if not build_cache.restore():
+            node.execute(
+                f"meson {sample_apps} build",
+                shell=True,
+                cwd=self.dpdk_path,
+                expected_exit_code=0,
+                expected_exit_code_failure_message=(
+                    "meson build for dpdk failed, check that"
+                    "dpdk build has not changed to eliminate the use of meson or "
+                    "meson version is compatible with this dpdk version and OS."
+                ),
+            )
+            node.execute(
+                "ninja",
+                cwd=self.dpdk_build_path,
+                timeout=1800,
+                expected_exit_code=0,
+                expected_exit_code_failure_message=(
+                    "ninja build for dpdk failed. check build spew for missing "
+                    "headers or dependencies. Also check that this ninja version "
+                    "requirement has not changed for dpdk."
+                ),
+            )
+            with build_cache.capture():
+                node.execute(
+                    "ninja install",
+                    cwd=self.dpdk_build_path,
+                    sudo=True,
+                    expected_exit_code=0,
+                    expected_exit_code_failure_message=(
+                        "ninja install failed for dpdk binaries."
+                    ),
+                )
+        # the build folder doesn't exist, if it's restored from the cache.
         node.execute(
             "ldconfig",
-            cwd=self.dpdk_build_path,
             sudo=True,
             expected_exit_code=0,
             expected_exit_code_failure_message="ldconfig failed, check for error spew.",
@@ -1041,107 +979,8 @@ class DpdkTestpmd(Tool):
             self._testpmd_install_path = ""
         return path_check
 
-    def _split_testpmd_output(self) -> None:
-        search_str = "Port 0: device removal event"
-
-        device_removal_index = self._last_run_output.find(search_str)
-        assert_that(device_removal_index).described_as(
-            "Could not locate SRIOV rescind event in testpmd output"
-        ).is_not_equal_to(-1)
-
-        self._testpmd_output_before_rescind = self._last_run_output[
-            :device_removal_index
-        ]
-        after_rescind = self._last_run_output[device_removal_index:]
-        # Identify the device add event
-        hotplug_match = self._search_hotplug_regex.finditer(after_rescind)
-        matches_list = list(hotplug_match)
-        if not list(matches_list):
-            hotplug_alt_match = self._search_hotplug_regex_alt.finditer(after_rescind)
-            if hotplug_alt_match:
-                matches_list = list(hotplug_alt_match)
-            else:
-                command_dumped = "timeout: the monitored command dumped core"
-                if command_dumped in self._last_run_output:
-                    raise LisaException("Testpmd crashed after device removal.")
-
-        # pick the last match
-
-        if len(matches_list) > 0:
-            last_match = matches_list[-1]
-        else:
-            raise LisaException(
-                "Found no vf hotplug events in testpmd output. "
-                "Check output to verify if PPS drop occurred and port removal "
-                "event message matches the expected forms."
-            )
-
-        self.node.log.info(f"Identified hotplug event: {last_match.group(0)}")
-
-        before_reenable = after_rescind[: last_match.start()]
-        after_reenable = after_rescind[last_match.end() :]
-        self._testpmd_output_during_rescind = before_reenable
-        self._testpmd_output_after_reenable = after_reenable
-
-    def _get_pps_sriov_rescind(
-        self,
-        key_constant: str,
-    ) -> Tuple[int, int, int]:
-        if not all(
-            [
-                self._testpmd_output_during_rescind,
-                self._testpmd_output_after_reenable,
-                self._testpmd_output_before_rescind,
-            ]
-        ):
-            self._split_testpmd_output()
-
-        before_rescind = self.get_data_from_testpmd_output(
-            key_constant,
-            self._testpmd_output_before_rescind,
-        )
-        during_rescind = self.get_data_from_testpmd_output(
-            key_constant,
-            self._testpmd_output_during_rescind,
-        )
-        after_reenable = self.get_data_from_testpmd_output(
-            key_constant,
-            self._testpmd_output_after_reenable,
-        )
-        before, during, after = map(
-            _mean, [before_rescind, during_rescind, after_reenable]
-        )
+    def _get_pps_sriov_rescind(self, direction: str) -> Tuple[int, int, int]:
+        stats = self.stats
+        before, during, after = stats.get_rescind_means(direction)
+        self.node.log.info(f"Identified hotplug event: {stats.hotplug_event}")
         return before, during, after
-
-
-# filter functions for processing testpmd data
-def _discard_first_zeroes(data: List[int]) -> List[int]:
-    # NOTE: we occasionally get a 0 for the first pps result sample,
-    # it's annoying to factor it into the average when
-    # there are only like 10 samples so discard any
-    # leading 0's if they're present.
-
-    for i in range(len(data)):
-        if data[i] != 0:
-            return data[i:]
-
-    # leave list as-is if data is all zeroes
-    return data
-
-
-def _discard_first_and_last_sample(data: List[int]) -> List[int]:
-    # NOTE: first and last sample can be unreliable after switch messages
-    # We're sampling for an order-of-magnitude difference so it
-    # can mess up the average since we're using an unweighted mean
-
-    # discard first and last sample so long as there are enough to
-    # practically, we expect there to be > 20 unless rescind
-    # performance is hugely improved in the cloud
-    if len(data) < 3:
-        return data
-    else:
-        return data[1:-1]
-
-
-def _mean(data: List[int]) -> int:
-    return sum(data) // len(data)
@@ -2,8 +2,10 @@
 # Licensed under the MIT license.
 import inspect
 import pathlib
+from dataclasses import dataclass
+from decimal import Decimal
 from functools import partial
-from typing import Any, Dict, List, Optional, Union, cast
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union, cast
 
 from assertpy import assert_that
 from retry import retry
@@ -16,7 +18,10 @@ from lisa import (
     notifier,
     run_in_parallel,
 )
+from lisa.environment import ensure_tools
+from lisa.features import Disk
 from lisa.messages import (
+    DiskInterferencePerformanceMessage,
     DiskPerformanceMessage,
     DiskSetupType,
     DiskType,
@@ -38,18 +43,24 @@ from lisa.tools import (
     Lscpu,
     Mdadm,
     Netperf,
+    NodeMetrics,
+    NodeMetricsResult,
     Ntttcp,
     Sar,
     Sockperf,
     Ssh,
     Sysctl,
 )
+from lisa.tools.fio import get_aggregated_results
 from lisa.tools.ntttcp import (
     NTTTCP_TCP_CONCURRENCY,
     NTTTCP_TCP_CONCURRENCY_BSD,
     NTTTCP_UDP_CONCURRENCY,
+    NtttcpResult,
 )
 from lisa.util import LisaException
+from lisa.util.adaptive_sampling import AdaptiveSampler, average_messages
+from lisa.util.clock_sync import ClockSync
 from lisa.util.process import ExecutableResult, Process
 
 
@@ -71,33 +82,18 @@ def perf_disk(
     numjob: int = 0,
     overwrite: bool = False,
     cwd: Optional[pathlib.PurePath] = None,
+    sampler: Optional[AdaptiveSampler] = None,
 ) -> None:
-    fio_result_list: List[FIOResult] = []
+    """
+    sampler: if it's set, the sweep runs by short windows of its duration until
+        results are stable, instead of one run of the time.
+    """
     fio = node.tools[Fio]
-    numjobiterator = 0
-    for mode in FIOMODES:
-        iodepth = start_iodepth
-        numjobindex = 0
-        while iodepth <= max_iodepth:
-            if num_jobs:
-                numjob = num_jobs[numjobindex]
-            fio_result = fio.launch(
-                name=f"iteration{numjobiterator}",
-                filename=filename,
-                mode=mode.name,
-                time=time,
-                size_gb=size_mb,
-                block_size=f"{block_size}K",
-                iodepth=iodepth,
-                overwrite=overwrite,
-                numjob=numjob,
-                cwd=cwd,
-            )
-            fio_result_list.append(fio_result)
-            iodepth = iodepth * 2
-            numjobindex += 1
-            numjobiterator += 1
-
+    iodepths: List[int] = []
+    iodepth = start_iodepth
+    while iodepth <= max_iodepth:
+        iodepths.append(iodepth)
+        iodepth = iodepth * 2
     other_fields: Dict[str, Any] = {}
     other_fields["core_count"] = core_count
     other_fields["disk_count"] = disk_count
@@ -106,16 +102,91 @@ def perf_disk(
     other_fields["disk_type"] = disk_type
     if not test_name:
         test_name = inspect.stack()[1][3]
-    fio_messages: List[DiskPerformanceMessage] = fio.create_performance_messages(
-        fio_result_list,
-        test_name=test_name,
-        test_result=test_result,
-        other_fields=other_fields,
-    )
+
+    def _run_sweep(run_time: int) -> List[DiskPerformanceMessage]:
+        # all steps run by one fio process, so the results include bandwidth
+        # and latency percentiles, and there is no process overhead between
+        # steps.
+        fio_result_list: List[FIOResult] = fio.launch_sweep(
+            name="iteration",
+            filename=filename,
+            modes=[mode.name for mode in FIOMODES],
+            iodepths=iodepths,
+            numjobs=num_jobs,
+            numjob=numjob,
+            time=run_time,
+            size_gb=size_mb,
+            block_size=f"{block_size}K",
+            overwrite=overwrite,
+            cwd=cwd,
+        )
+        return fio.create_performance_messages(
+            fio_result_list,
+            test_name=test_name,
+            test_result=test_result,
+            other_fields=other_fields,
+        )
+
+    node_metrics = start_node_metrics(node)
+    try:
+        if sampler:
+            # the whole sweep is a window, and each step must be stable.
+            sampling = sampler.run(
+                partial(_run_sweep, sampler.window_seconds),
+                lambda messages: [_get_total_iops(x) for x in messages],
+            )
+            fio_messages = [average_messages(list(x)) for x in zip(*sampling.samples)]
+            for fio_message in fio_messages:
+                sampling.update_message(fio_message)
+        else:
+            fio_messages = _run_sweep(time)
+    finally:
+        metrics_result = stop_node_metrics(node_metrics)
+
     for fio_message in fio_messages:
+        if metrics_result:
+            metrics_result.update_message(fio_message)
         notifier.notify(fio_message)
 
 
+def _get_total_iops(message: DiskPerformanceMessage) -> float:
+    return float(
+        message.read_iops
+        + message.write_iops
+        + message.randread_iops
+        + message.randwrite_iops
+    )
+
+
+def start_node_metrics(node: Node, interval: float = 1) -> Optional[NodeMetrics]:
+    """
+    Start to sample node metrics. The metrics explain performance results, but
+    they are not required, so failures are logged only.
+    """
+    try:
+        node_metrics = node.tools[NodeMetrics]
+        node_metrics.start(interval=interval)
+    except Exception as identifier:
+        node.log.debug(f"failed to start node metrics: {identifier}")
+        return None
+    return node_metrics
+
+
+def stop_node_metrics(
+    node_metrics: Optional[NodeMetrics],
+) -> Optional[NodeMetricsResult]:
+    """
+    Stop sampling, and return metrics to summarize into performance messages.
+    """
+    if not node_metrics:
+        return None
+    try:
+        return node_metrics.stop()
+    except Exception as identifier:
+        node_metrics.node.log.debug(f"failed to collect node metrics: {identifier}")
+        return None
+
+
 def get_nic_datapath(node: Node) -> str:
     data_path: str = ""
     assert (
@@ -161,12 +232,310 @@ def reset_raid(node: Node, disk_list: List[str]) -> None:
     mdadm.create_raid(disk_list)
 
 
+@dataclass
+class StorageTarget:
+    node: Node
+    # the disk or file, which fio runs on. Multiple files are separated by ":".
+    filename: str
+    # the count of disks under the target, like disks of a raid.
+    disk_count: int = 1
+
+    @property
+    def name(self) -> str:
+        return f"node-{self.node.index}:{self.filename}"
+
+
+@dataclass
+class StorageSweepResult:
+    targets: List[StorageTarget]
+    # results of targets, they run at the same time.
+    target_results: List[List[FIOResult]]
+    # results of the first target, when it runs alone. It's empty, if the
+    # isolated run is disabled.
+    isolated_results: List[FIOResult]
+    # metrics by node index, they are sampled during the concurrent run.
+    node_metrics: Dict[int, Optional[NodeMetricsResult]]
+
+
+def get_storage_targets(
+    nodes: List[Node], use_raid: bool = False
+) -> List[StorageTarget]:
+    """
+    Partition data disks of nodes in parallel. Each partition is a target, or
+    each node is a target of raid0, if use_raid is True.
+    """
+
+    def _get_targets(node: Node) -> List[StorageTarget]:
+        data_disks = node.features[Disk].get_raw_data_disks()
+        assert_that(data_disks).described_as(
+            f"At least 1 data disk for fio testing on {node.name}."
+        ).is_not_empty()
+        partition_disks = reset_partitions(node, data_disks)
+        if use_raid:
+            reset_raid(node, partition_disks)
+            return [
+                StorageTarget(
+                    node=node, filename="/dev/md0", disk_count=len(partition_disks)
+                )
+            ]
+        return [StorageTarget(node=node, filename=x) for x in partition_disks]
+
+    targets_list = run_in_parallel([partial(_get_targets, node) for node in nodes])
+    return [target for targets in targets_list for target in targets]
+
+
+# the path of a job file, and the iodepth and numjob by job names.
+_JobFile = Tuple[pathlib.PurePath, Dict[str, Tuple[int, int]]]
+
+
+class StorageSweep:
+    """
+    Run a fio sweep on many targets at the same time. Targets are disks on one
+    or more nodes, which may share a storage backend. Job files are written
+    before the start, and fio processes start together by the clock sync.
+    Steps are time based, so the same step of all targets runs in the same
+    window. If the isolated run is enabled, the first target runs the sweep
+    alone at first, and it's the baseline of the interference from others.
+    """
+
+    def __init__(
+        self,
+        targets: List[StorageTarget],
+        modes: List[str],
+        iodepths: List[int],
+        numjob: int = 0,
+        numjobs: Optional[List[int]] = None,
+        block_size: int = 4,
+        time: int = 120,
+        size_mb: int = 0,
+        overwrite: bool = False,
+        measure_isolated: bool = True,
+        cwd: Optional[pathlib.PurePath] = None,
+    ) -> None:
+        assert targets, "at least one target is needed"
+        self._targets = targets
+        self._modes = modes
+        self._iodepths = iodepths
+        self._numjob = numjob
+        self._numjobs = numjobs
+        self._block_size = block_size
+        self._time = time
+        self._size_mb = size_mb
+        self._overwrite = overwrite
+        self._measure_isolated = measure_isolated
+        self._cwd = cwd
+        self._nodes: List[Node] = []
+        for target in targets:
+            if not any(x is target.node for x in self._nodes):
+                self._nodes.append(target.node)
+        self._clock_sync = ClockSync(self._nodes)
+
+    @property
+    def nodes(self) -> List[Node]:
+        return self._nodes
+
+    def run(self) -> StorageSweepResult:
+        # targets on the same node are written in one thread, so the tool is
+        # installed once on each node.
+        job_files_by_target: Dict[int, _JobFile] = {}
+        for job_files_of_node in run_in_parallel(
+            [partial(self._write_job_files, node) for node in self._nodes]
+        ):
+            job_files_by_target.update(job_files_of_node)
+        job_files = [job_files_by_target[index] for index in range(len(self._targets))]
+
+        isolated_results: List[FIOResult] = []
+        if self._measure_isolated and len(self._targets) > 1:
+            first_fio = self._targets[0].node.tools[Fio]
+            job_file, jobs = job_files[0]
+            try:
+                isolated_results = self._get_results(
+                    first_fio,
+                    first_fio.launch_job_file_async(job_file, self._cwd),
+                    jobs,
+                )
+            except Exception:
+                self._kill_fio([first_fio.node])
+                raise
+
+        metrics_list = [start_node_metrics(node) for node in self._nodes]
+        try:
+            # fio processes wait for the start time on nodes, so they start
+            # together.
+            self._clock_sync.schedule_start(lead_time=2 + 0.5 * len(self._targets))
+            processes = [
+                target.node.tools[Fio].launch_job_file_async(
+                    job_file,
+                    self._cwd,
+                    start_at=self._clock_sync.get_start_at(target.node),
+                )
+                for target, (job_file, _) in zip(self._targets, job_files)
+            ]
+            try:
+                target_results = [
+                    self._get_results(target.node.tools[Fio], process, jobs)
+                    for target, process, (_, jobs) in zip(
+                        self._targets, processes, job_files
+                    )
+                ]
+            except Exception:
+                # fio on other targets keeps running after a failure, and it
+                # disturbs following tests on shared disks.
+                self._kill_fio(self._nodes)
+                raise
+        finally:
+            node_metrics = {
+                node.index: stop_node_metrics(metrics)
+                for node, metrics in zip(self._nodes, metrics_list)
+            }
+
+        return StorageSweepResult(
+            targets=self._targets,
+            target_results=target_results,
+            isolated_results=isolated_results,
+            node_metrics=node_metrics,
+        )
+
+    def _write_job_files(self, node: Node) -> Dict[int, _JobFile]:
+        fio = node.tools[Fio]
+        job_files: Dict[int, _JobFile] = {}
+        for index, target in enumerate(self._targets):
+            if target.node is not node:
+                continue
+            job_files[index] = fio.write_sweep_job_file(
+                name=f"target{index}_",
+                filename=target.filename,
+                modes=self._modes,
+                iodepths=self._iodepths,
+                numjobs=self._numjobs,
+                numjob=self._numjob,
+                time=self._time,
+                block_size=f"{self._block_size}K",
+                size_gb=self._size_mb,
+                overwrite=self._overwrite,
+                time_based=True,
+            )
+        return job_files
+
+    def _kill_fio(self, nodes: List[Node]) -> None:
+        for node in nodes:
+            node.tools[Kill].by_name("fio", ignore_not_exist=True)
+
+    def _get_results(
+        self, fio: Fio, process: Process, jobs: Dict[str, Tuple[int, int]]
+    ) -> List[FIOResult]:
+        result = process.wait_result(
+            timeout=len(jobs) * (self._time + 60),
+            expected_exit_code=0,
+            expected_exit_code_failure_message=(
+                f"fail to run fio sweep on {fio.node.name}"
+            ),
+        )
+        return fio.get_results_from_json(result.stdout, jobs)
+
+
+def perf_storage_sweep(
+    targets: List[StorageTarget],
+    start_iodepth: int,
+    max_iodepth: int,
+    test_result: TestResult,
+    disk_setup_type: DiskSetupType = DiskSetupType.unknown,
+    disk_type: DiskType = DiskType.unknown,
+    test_name: str = "",
+    block_size: int = 4,
+    time: int = 120,
+    size_mb: int = 0,
+    numjob: int = 0,
+    overwrite: bool = False,
+    measure_isolated: bool = True,
+) -> None:
+    """
+    Run fio on all targets at the same time, and send messages of each target,
+    the total of all targets, and the interference between targets.
+    """
+    iodepths: List[int] = []
+    iodepth = start_iodepth
+    while iodepth <= max_iodepth:
+        iodepths.append(iodepth)
+        iodepth = iodepth * 2
+    if not test_name:
+        test_name = inspect.stack()[1][3]
+
+    sweep = StorageSweep(
+        targets,
+        modes=[mode.name for mode in FIOMODES],
+        iodepths=iodepths,
+        numjob=numjob,
+        block_size=block_size,
+        time=time,
+        size_mb=size_mb,
+        overwrite=overwrite,
+        measure_isolated=measure_isolated,
+    )
+    sweep_result = sweep.run()
+
+    other_fields: Dict[str, Any] = {
+        "block_size": block_size,
+        "disk_setup_type": disk_setup_type,
+        "disk_type": disk_type,
+    }
+    core_counts = {x.index: x.tools[Lscpu].get_core_count() for x in sweep.nodes}
+    messages: List[
+        Union[DiskPerformanceMessage, DiskInterferencePerformanceMessage]
+    ] = []
+    for target, results in zip(targets, sweep_result.target_results):
+        fio = target.node.tools[Fio]
+        target_messages = fio.create_performance_messages(
+            results,
+            test_name=test_name,
+            test_result=test_result,
+            other_fields={
+                **other_fields,
+                "core_count": core_counts[target.node.index],
+                "disk_count": target.disk_count,
+                "target": target.name,
+            },
+        )
+        metrics_result = sweep_result.node_metrics.get(target.node.index)
+        for message in target_messages:
+            if metrics_result:
+                metrics_result.update_message(message)
+        messages.extend(target_messages)
+
+    first_fio = targets[0].node.tools[Fio]
+    messages.extend(
+        first_fio.create_performance_messages(
+            get_aggregated_results(sweep_result.target_results),
+            test_name=test_name,
+            test_result=test_result,
+            other_fields={
+                **other_fields,
+                "disk_count": sum(x.disk_count for x in targets),
+                "target": "total",
+            },
+        )
+    )
+    messages.extend(
+        first_fio.create_interference_messages(
+            sweep_result.target_results,
+            sweep_result.isolated_results,
+            test_name=test_name,
+            test_result=test_result,
+            node_count=len(sweep.nodes),
+            other_fields=other_fields,
+        )
+    )
+    for message in messages:
+        notifier.notify(message)
+
+
 def perf_tcp_latency(test_result: TestResult) -> List[NetworkLatencyPerformanceMessage]:
     environment = test_result.environment
     assert environment, "fail to get environment from testresult"
 
     client = cast(RemoteNode, environment.nodes[0])
     server = cast(RemoteNode, environment.nodes[1])
+    environment.ensure_tools([Lagscope], nodes=[client, server])
     client_lagscope = client.tools[Lagscope]
     server_lagscope = server.tools[Lagscope]
     try:
@@ -206,9 +575,9 @@ def perf_tcp_pps(
         server = cast(RemoteNode, environment.nodes[1])
         client = cast(RemoteNode, environment.nodes[0])
 
-    client_netperf, server_netperf = run_in_parallel(
-        [lambda: client.tools[Netperf], lambda: server.tools[Netperf]]  # type: ignore
-    )
+    ensure_tools([Netperf, Sar], nodes=[client, server])
+    client_netperf = client.tools[Netperf]
+    server_netperf = server.tools[Netperf]
 
     cpu = client.tools[Lscpu]
     core_count = cpu.get_core_count()
@@ -232,6 +601,147 @@ def perf_tcp_pps(
     notifier.notify(pps_message)
 
 
+@dataclass
+class NtttcpStepResult:
+    connections: int
+    buffer_size: int
+    server_result: NtttcpResult
+    client_result: NtttcpResult
+    latency_us: Decimal
+    # metrics of the receiver, it's usually the bottleneck.
+    node_metrics: Optional[NodeMetricsResult] = None
+
+
+class NtttcpSweep:
+    """
+    Run steps of a connection sweep in one session. The lagscope server is
+    started once, and kept for all steps. The ntttcp receiver exits when the
+    test duration ends, and the ports count changes by steps, so it's started
+    for each step. Clients start together after the receiver is ready, so the
+    latency is measured in the same window of the traffic. The results are
+    yielded step by step.
+    """
+
+    _max_server_threads = 64
+
+    def __init__(
+        self,
+        server: RemoteNode,
+        client: RemoteNode,
+        server_nic_name: str,
+        client_nic_name: str,
+        dev_differentiator: str,
+        udp_mode: bool = False,
+        lagscope_server_ip: Optional[str] = None,
+        run_time_seconds: int = 10,
+    ) -> None:
+        self._server = server
+        self._client = client
+        self._server_nic_name = server_nic_name
+        self._client_nic_name = client_nic_name
+        self._dev_differentiator = dev_differentiator
+        self._udp_mode = udp_mode
+        self._lagscope_server_ip = (
+            lagscope_server_ip
+            if lagscope_server_ip is not None
+            else server.internal_address
+        )
+        self._run_time_seconds = run_time_seconds
+        self._lagscope_server: Optional[Process] = None
+        self._clock_sync = ClockSync([client])
+
+    def run(self, connections: List[int]) -> Iterator[NtttcpStepResult]:
+        for connection in connections:
+            yield self.run_step(connection)
+
+    def run_step(self, connection: int) -> NtttcpStepResult:
+        if not (self._lagscope_server and self._lagscope_server.is_running()):
+            self._lagscope_server = self._server.tools[Lagscope].run_as_server_async(
+                ip=self._lagscope_server_ip
+            )
+        return self._run_step(connection)
+
+    def _run_step(self, connection: int) -> NtttcpStepResult:
+        server = self._server
+        client = self._client
+        server_ntttcp = server.tools[Ntttcp]
+        client_ntttcp = client.tools[Ntttcp]
+        client_lagscope = client.tools[Lagscope]
+        if connection < self._max_server_threads:
+            ports_count = connection
+            threads_count = 1
+        else:
+            ports_count = self._max_server_threads
+            threads_count = int(connection / ports_count)
+        if 1 == threads_count and 1 == ports_count:
+            buffer_size = int(1048576 / 1024)
+        else:
+            buffer_size = int(65536 / 1024)
+        if self._udp_mode:
+            buffer_size = int(1024 / 1024)
+
+        server_metrics = start_node_metrics(server)
+        try:
+            # it returns after the receiver is ready.
+            server_process = server_ntttcp.run_as_server_async(
+                self._server_nic_name,
+                run_time_seconds=self._run_time_seconds,
+                server_ip=server.internal_address if isinstance(server.os, BSD) else "",
+                ports_count=ports_count,
+                buffer_size=buffer_size,
+                dev_differentiator=self._dev_differentiator,
+                udp_mode=self._udp_mode,
+            )
+            # lagscope and ntttcp clients start at the same time, so the latency
+            # is measured in the window of the traffic.
+            self._clock_sync.schedule_start(lead_time=2)
+            start_at = self._clock_sync.get_start_at(client)
+            client_lagscope_process = client_lagscope.run_as_client_async(
+                server_ip=server.internal_address,
+                ping_count=0,
+                run_time_seconds=self._run_time_seconds,
+                print_histogram=False,
+                print_percentile=False,
+                histogram_1st_interval_start_value=0,
+                length_of_histogram_intervals=0,
+                count_of_histogram_intervals=0,
+                dump_csv=False,
+                start_at=start_at,
+            )
+            client_ntttcp_result = client_ntttcp.run_as_client(
+                self._client_nic_name,
+                server.internal_address,
+                run_time_seconds=self._run_time_seconds,
+                buffer_size=buffer_size,
+                threads_count=threads_count,
+                ports_count=ports_count,
+                dev_differentiator=self._dev_differentiator,
+                udp_mode=self._udp_mode,
+                start_at=start_at,
+            )
+            # the receiver exits by itself after the sender completes, so it's
+            # killed only if it hangs.
+            server_ntttcp_result = server_process.wait_result(
+                timeout=self._run_time_seconds + 60
+            )
+            if server_ntttcp_result.is_timeout:
+                server.tools[Kill].by_name(server_ntttcp.command)
+        finally:
+            metrics_result = stop_node_metrics(server_metrics)
+        client_lagscope_result = client_lagscope_process.wait_result()
+
+        return NtttcpStepResult(
+            connections=connection,
+            buffer_size=buffer_size,
+            server_result=server_ntttcp.create_ntttcp_result(server_ntttcp_result),
+            client_result=client_ntttcp.create_ntttcp_result(
+                client_ntttcp_result, role="client"
+            ),
+            latency_us=client_lagscope.get_average(client_lagscope_result),
+            node_metrics=metrics_result,
+        )
+
+
 def perf_ntttcp(  # noqa: C901
     test_result: TestResult,
     server: Optional[RemoteNode] = None,
@@ -242,6 +752,7 @@ def perf_ntttcp(  # noqa: C901
     lagscope_server_ip: Optional[str] = None,
     server_nic_name: Optional[str] = None,
     client_nic_name: Optional[str] = None,
+    sampler: Optional[AdaptiveSampler] = None,
 ) -> List[Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]]:
     # Either server and client are set explicitly or we use the first two nodes
     # from the environment. We never combine the two options. We need to specify
@@ -270,16 +781,12 @@ def perf_ntttcp(  # noqa: C901
             else:
                 connections = NTTTCP_TCP_CONCURRENCY
 
-    client_ntttcp, server_ntttcp = run_in_parallel(
-        [lambda: client.tools[Ntttcp], lambda: server.tools[Ntttcp]]  # type: ignore
-    )
+    ensure_tools([Ntttcp, Lagscope], nodes=[client, server])
+    client_ntttcp = client.tools[Ntttcp]
+    server_ntttcp = server.tools[Ntttcp]
     try:
-        client_lagscope, server_lagscope = run_in_parallel(
-            [
-                lambda: client.tools[Lagscope],  # type: ignore
-                lambda: server.tools[Lagscope],  # type: ignore
-            ]
-        )
+        client_lagscope = client.tools[Lagscope]
+        server_lagscope = server.tools[Lagscope]
         # no need to set task max and reboot VM when connection less than 20480
         if max(connections) >= 20480 and not isinstance(server.os, BSD):
             set_task_max = True
@@ -323,88 +830,61 @@ def perf_ntttcp(  # noqa: C901
                 client_nic_name if client_nic_name else client.nics.default_nic
             )
             dev_differentiator = "Hypervisor callback interrupts"
-        server_lagscope.run_as_server_async(
-            ip=lagscope_server_ip
-            if lagscope_server_ip is not None
-            else server.internal_address
+        sweep = NtttcpSweep(
+            server=server,
+            client=client,
+            server_nic_name=server_nic_name,
+            client_nic_name=client_nic_name,
+            dev_differentiator=dev_differentiator,
+            udp_mode=udp_mode,
+            lagscope_server_ip=lagscope_server_ip,
+            run_time_seconds=sampler.window_seconds if sampler else 10,
         )
-        max_server_threads = 64
         perf_ntttcp_message_list: List[
             Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]
         ] = []
-        for test_thread in connections:
-            if test_thread < max_server_threads:
-                num_threads_p = test_thread
-                num_threads_n = 1
-            else:
-                num_threads_p = max_server_threads
-                num_threads_n = int(test_thread / num_threads_p)
-            if 1 == num_threads_n and 1 == num_threads_p:
-                buffer_size = int(1048576 / 1024)
-            else:
-                buffer_size = int(65536 / 1024)
-            if udp_mode:
-                buffer_size = int(1024 / 1024)
 
-            server_result = server_ntttcp.run_as_server_async(
-                server_nic_name,
-                server_ip=server.internal_address if isinstance(server.os, BSD) else "",
-                ports_count=num_threads_p,
-                buffer_size=buffer_size,
-                dev_differentiator=dev_differentiator,
-                udp_mode=udp_mode,
-            )
-            client_lagscope_process = client_lagscope.run_as_client_async(
-                server_ip=server.internal_address,
-                ping_count=0,
-                run_time_seconds=10,
-                print_histogram=False,
-                print_percentile=False,
-                histogram_1st_interval_start_value=0,
-                length_of_histogram_intervals=0,
-                count_of_histogram_intervals=0,
-                dump_csv=False,
-            )
-            client_ntttcp_result = client_ntttcp.run_as_client(
-                client_nic_name,
-                server.internal_address,
-                buffer_size=buffer_size,
-                threads_count=num_threads_n,
-                ports_count=num_threads_p,
-                dev_differentiator=dev_differentiator,
-                udp_mode=udp_mode,
-            )
-            server.tools[Kill].by_name(server_ntttcp.command)
-            server_ntttcp_result = server_result.wait_result()
-            server_result_temp = server_ntttcp.create_ntttcp_result(
-                server_ntttcp_result
-            )
-            client_result_temp = client_ntttcp.create_ntttcp_result(
-                client_ntttcp_result, role="client"
-            )
-            client_sar_result = client_lagscope_process.wait_result()
-            client_average_latency = client_lagscope.get_average(client_sar_result)
+        def _run_step(
+            connection: int,
+        ) -> Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]:
+            step = sweep.run_step(connection)
             if udp_mode:
                 ntttcp_message: Union[
                     NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage
                 ] = client_ntttcp.create_ntttcp_udp_performance_message(
-                    server_result_temp,
-                    client_result_temp,
-                    str(test_thread),
-                    buffer_size,
+                    step.server_result,
+                    step.client_result,
+                    str(step.connections),
+                    step.buffer_size,
                     test_case_name,
                     test_result,
                 )
             else:
                 ntttcp_message = client_ntttcp.create_ntttcp_tcp_performance_message(
-                    server_result_temp,
-                    client_result_temp,
-                    client_average_latency,
-                    str(test_thread),
-                    buffer_size,
+                    step.server_result,
+                    step.client_result,
+                    step.latency_us,
+                    str(step.connections),
+                    step.buffer_size,
                     test_case_name,
                     test_result,
                 )
+            if step.node_metrics:
+                step.node_metrics.update_message(ntttcp_message)
+            return ntttcp_message
+
+        # results are notified step by step, so they are kept, even if later
+        # steps fail.
+        for connection in connections:
+            if sampler:
+                sampling = sampler.run(
+                    partial(_run_step, connection),
+                    lambda message: [_get_throughput(message)],
+                )
+                ntttcp_message = average_messages(sampling.samples)
+                sampling.update_message(ntttcp_message)
+            else:
+                ntttcp_message = _run_step(connection)
             notifier.notify(ntttcp_message)
             perf_ntttcp_message_list.append(ntttcp_message)
     finally:
@@ -425,20 +905,30 @@ def perf_ntttcp(  # noqa: C901
     return perf_ntttcp_message_list
 
 
+def _get_throughput(
+    message: Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]
+) -> float:
+    if isinstance(message, NetworkUDPPerformanceMessage):
+        return float(message.rx_throughput_in_gbps)
+    # ntttcp sets the throughput, and iperf3 sets tx and rx.
+    return float(message.throughput_in_gbps or message.tx_throughput_in_gbps)
+
+
 def perf_iperf(
     test_result: TestResult,
     connections: List[int],
     buffer_length_list: List[int],
     udp_mode: bool = False,
+    sampler: Optional[AdaptiveSampler] = None,
 ) -> None:
     environment = test_result.environment
     assert environment, "fail to get environment from testresult"
 
     client = cast(RemoteNode, environment.nodes[0])
     server = cast(RemoteNode, environment.nodes[1])
-    client_iperf3, server_iperf3 = run_in_parallel(
-        [lambda: client.tools[Iperf3], lambda: server.tools[Iperf3]]
-    )
+    environment.ensure_tools([Iperf3], nodes=[client, server])
+    client_iperf3 = client.tools[Iperf3]
+    server_iperf3 = server.tools[Iperf3]
     test_case_name = inspect.stack()[1][3]
     iperf3_messages_list: List[Any] = []
     if udp_mode:
@@ -446,81 +936,79 @@ def perf_iperf(
             ssh = node.tools[Ssh]
             ssh.set_max_session()
             node.close()
+    clock_sync = ClockSync([client])
+    run_time_seconds = sampler.window_seconds if sampler else 10
+
+    def _run_step(
+        buffer_length: int, connection: int
+    ) -> Union[NetworkTCPPerformanceMessage, NetworkUDPPerformanceMessage]:
+        if connection < 64:
+            num_threads_p = connection
+            num_threads_n = 1
+        else:
+            num_threads_p = 64
+            num_threads_n = int(connection / 64)
+        ports = [750 + index for index in range(num_threads_n)]
+        server_iperf3_process_list = server_iperf3.run_as_servers_async(ports)
+        # clients are launched one by one, but start at the same time, so
+        # all instances are measured in the same window.
+        clock_sync.schedule_start(lead_time=2 + 0.5 * num_threads_n)
+        client_iperf3_process_list = client_iperf3.run_as_clients_async(
+            server.internal_address,
+            ports,
+            buffer_length=buffer_length,
+            run_time_seconds=run_time_seconds,
+            parallel_number=num_threads_p,
+            ip_version="4",
+            udp_mode=udp_mode,
+            start_at=clock_sync.get_start_at(client),
+        )
+        client_result_list: List[ExecutableResult] = [
+            x.wait_result() for x in client_iperf3_process_list
+        ]
+        server_result_list: List[ExecutableResult] = [
+            x.wait_result() for x in server_iperf3_process_list
+        ]
+        if udp_mode:
+            return client_iperf3.create_iperf_udp_performance_message(
+                server_result_list,
+                client_result_list,
+                buffer_length,
+                connection,
+                test_case_name,
+                test_result,
+            )
+        return client_iperf3.create_iperf_tcp_performance_message(
+            server_result_list,
+            client_result_list,
+            buffer_length,
+            connection,
+            test_case_name,
+            test_result,
+        )
+
     for buffer_length in buffer_length_list:
         for connection in connections:
-            server_iperf3_process_list: List[Process] = []
-            client_iperf3_process_list: List[Process] = []
-            client_result_list: List[ExecutableResult] = []
-            server_result_list: List[ExecutableResult] = []
-            if connection < 64:
-                num_threads_p = connection
-                num_threads_n = 1
-            else:
-                num_threads_p = 64
-                num_threads_n = int(connection / 64)
-            server_start_port = 750
-            current_server_port = server_start_port
-            current_server_iperf_instances = 0
-            while current_server_iperf_instances < num_threads_n:
-                current_server_iperf_instances += 1
-                server_iperf3_process_list.append(
-                    server_iperf3.run_as_server_async(
-                        current_server_port, "g", 10, True, True, False
-                    )
-                )
-                current_server_port += 1
-            client_start_port = 750
-            current_client_port = client_start_port
-            current_client_iperf_instances = 0
-            while current_client_iperf_instances < num_threads_n:
-                current_client_iperf_instances += 1
-                client_iperf3_process_list.append(
-                    client_iperf3.run_as_client_async(
-                        server.internal_address,
-                        output_json=True,
-                        report_periodic=1,
-                        report_unit="g",
-                        port=current_client_port,
-                        buffer_length=buffer_length,
-                        run_time_seconds=10,
-                        parallel_number=num_threads_p,
-                        ip_version="4",
-                        udp_mode=udp_mode,
-                    )
-                )
-                current_client_port += 1
-            for client_iperf3_process in client_iperf3_process_list:
-                client_result_list.append(client_iperf3_process.wait_result())
-            for server_iperf3_process in server_iperf3_process_list:
-                server_result_list.append(server_iperf3_process.wait_result())
-            if udp_mode:
-                iperf3_messages_list.append(
-                    client_iperf3.create_iperf_udp_performance_message(
-                        server_result_list,
-                        client_result_list,
-                        buffer_length,
-                        connection,
-                        test_case_name,
-                        test_result,
-                    )
+            if sampler:
+                sampling = sampler.run(
+                    partial(_run_step, buffer_length, connection),
+                    lambda message: [_get_throughput(message)],
                 )
+                iperf3_message = average_messages(sampling.samples)
+                sampling.update_message(iperf3_message)
             else:
-                iperf3_messages_list.append(
-                    client_iperf3.create_iperf_tcp_performance_message(
-                        server_result_list[0].stdout,
-                        client_result_list[0].stdout,
-                        buffer_length,
-                        connection,
-                        test_case_name,
-                        test_result,
-                    )
-                )
+                iperf3_message = _run_step(buffer_length, connection)
+            iperf3_messages_list.append(iperf3_message)
     for iperf3_message in iperf3_messages_list:
         notifier.notify(iperf3_message)
 
 
 def perf_sockperf(
-    test_result: TestResult, mode: str, test_case_name: str, set_busy_poll: bool = False
+    test_result: TestResult,
+    mode: str,
+    test_case_name: str,
+    set_busy_poll: bool = False,
+    sampler: Optional[AdaptiveSampler] = None,
 ) -> None:
     environment = test_result.environment
     assert environment, "fail to get environment from testresult"
@@ -539,7 +1027,7 @@ def perf_sockperf(
         for sysctl in sysctls:
             sysctl.enable_busy_polling("50")
 
-    run_in_parallel([lambda: client.tools[Sockperf], lambda: server.tools[Sockperf]])
+    environment.ensure_tools([Sockperf], nodes=[client, server])
 
     server_proc = server.tools[Sockperf].start_server_async(mode)
     # wait for sockperf to start, fail if it doesn't.
@@ -548,12 +1036,27 @@ def perf_sockperf(
             "sockperf: Warmup stage",
             timeout=30,
         )
-        client_output = client.tools[Sockperf].run_client(
-            mode, server.nics.get_primary_nic().ip_addr
-        )
-        client.tools[Sockperf].create_latency_performance_message(
-            client_output, test_case_name, test_result
-        )
+        client_sockperf = client.tools[Sockperf]
+        server_ip = server.nics.get_primary_nic().ip_addr
+        if sampler:
+            sampling = sampler.run(
+                lambda: client_sockperf.get_latency_performance_message(
+                    client_sockperf.run_client(
+                        mode, server_ip, run_time_seconds=sampler.window_seconds
+                    ),
+                    test_case_name,
+                    test_result,
+                ),
+                lambda message: [float(message.average_latency_us)],
+            )
+            message = average_messages(sampling.samples)
+            sampling.update_message(message)
+            notifier.notify(message)
+        else:
+            client_output = client_sockperf.run_client(mode, server_ip)
+            client_sockperf.create_latency_performance_message(
+                client_output, test_case_name, test_result
+            )
     finally:
         if server_proc.is_running():
             server_proc.kill()
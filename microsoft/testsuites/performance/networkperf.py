@@ -17,7 +17,19 @@ from lisa.environment import Environment, Node
 from lisa.features import Sriov, Synthetic
 from lisa.operating_system import BSD, Windows
 from lisa.testsuite import TestResult
-from lisa.tools import Sysctl
+from lisa.tools import (
+    Gcc,
+    Git,
+    Iperf3,
+    Kill,
+    Make,
+    Netperf,
+    Ntttcp,
+    Sar,
+    Sockperf,
+    Ssh,
+    Sysctl,
+)
 from lisa.tools.iperf3 import (
     IPERF_TCP_BUFFER_LENGTHS,
     IPERF_TCP_CONCURRENCY,
@@ -42,6 +54,7 @@ from microsoft.testsuites.performance.common import (
     description="""
     This test suite is to validate linux network performance.
     """,
+    tools=[Gcc, Git, Iperf3, Kill, Make, Netperf, Ntttcp, Sar, Sockperf, Ssh, Sysctl],
 )
 class NetworkPerformace(TestSuite):
     TIMEOUT = 12000
@@ -28,7 +28,9 @@ from lisa.testsuite import TestResult, node_requirement
 from lisa.tools import FileSystem, Lscpu, Mkfs, Mount, NFSClient, NFSServer, Sysctl
 from lisa.util import SkippedException
 from microsoft.testsuites.performance.common import (
+    get_storage_targets,
     perf_disk,
+    perf_storage_sweep,
     reset_partitions,
     reset_raid,
     stop_raid,
@@ -145,6 +147,41 @@ class StoragePerformance(TestSuite):
     def perf_premium_datadisks_io(self, node: Node, result: TestResult) -> None:
         self._perf_premium_datadisks(node, result, max_iodepth=64)
 
+    @TestCaseMetadata(
+        description="""
+        This test case uses fio to test data disks of all nodes at the same time
+        with 4K block size. It reports the performance of each disk, the total,
+        and the interference between disks and nodes, which share the storage
+        backend.
+        """,
+        priority=3,
+        timeout=TIME_OUT,
+        requirement=simple_requirement(
+            min_count=2,
+            disk=schema.DiskOptionSettings(
+                data_disk_type=schema.DiskType.PremiumSSDLRS,
+                os_disk_type=schema.DiskType.PremiumSSDLRS,
+                data_disk_iops=search_space.IntRange(min=5000),
+                data_disk_count=search_space.IntRange(min=4),
+            ),
+        ),
+    )
+    def perf_premium_datadisks_concurrent_4k(self, result: TestResult) -> None:
+        environment = result.environment
+        assert environment, "fail to get environment from testresult"
+
+        targets = get_storage_targets(environment.nodes.list())
+        perf_storage_sweep(
+            targets,
+            start_iodepth=1,
+            max_iodepth=64,
+            test_result=result,
+            disk_setup_type=DiskSetupType.raw,
+            disk_type=DiskType.premiumssd,
+            size_mb=8192,
+            overwrite=True,
+        )
+
     @TestCaseMetadata(
         description="""
         This test case uses fio to test performance of nfs server over TCP with
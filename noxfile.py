@@ -137,6 +137,42 @@ def mypy(session: nox.Session) -> None:
     session.run("mypy", "noxfile.py")
 
 
+# --- Benchmark ---
+
+
+@nox.session(python=CURRENT_PYTHON, tags=["benchmark"])
+def import_time(session: nox.Session) -> None:
+    """
+    Measure import time of the lisa CLI
+    Positional arguments are modules to measure, default lisa.main
+    Example:
+        nox -vs import_time -- lisa.main lisa.mixin_modules
+    """
+    session.install(*DEPENDENCIES)
+    modules = session.posargs or ["lisa.main"]
+
+    for module in modules:
+        # -X importtime writes one line per imported module to stderr in format:
+        # import time: self [us] | cumulative | imported package
+        output = session.run(
+            "python", "-X", "importtime", "-c", f"import {module}", silent=True
+        )
+        records = []
+        for line in str(output).splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            self_time, cumulative, name = line.split(":", 1)[1].split("|", 2)
+            records.append((int(cumulative), int(self_time), name.strip()))
+
+        records.sort(reverse=True)
+        total = max(x[0] for x in records) if records else 0
+        session.log(f"{module}: {total / 1000:.1f} ms, {len(records)} modules")
+        for cumulative_us, self_us, name in records[:20]:
+            session.log(
+                f"{cumulative_us / 1000:>10.1f} ms {self_us / 1000:>10.1f} ms  {name}"
+            )
+
+
 # --- Utility ---
 
 
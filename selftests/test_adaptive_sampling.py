@@ -0,0 +1,76 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import math
+from decimal import Decimal
+from typing import Iterator, List
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.messages import NetworkLatencyPerformanceMessage
+from lisa.util.adaptive_sampling import (
+    AdaptiveSampler,
+    average_messages,
+    get_relative_ci,
+    get_t_quantile,
+)
+
+
+def _create_sample(values: List[float]) -> Iterator[float]:
+    yield from values
+
+
+class AdaptiveSamplingTestCase(TestCase):
+    def test_t_quantile(self) -> None:
+        # the values are from the table of t distribution.
+        assert_that(get_t_quantile(0.95, 10)).is_close_to(2.228, 0.001)
+        assert_that(get_t_quantile(0.99, 5)).is_close_to(4.032, 0.001)
+
+    def test_relative_ci(self) -> None:
+        assert_that(get_relative_ci([100])).is_equal_to(math.inf)
+        assert_that(get_relative_ci([100, 100, 100])).is_equal_to(0)
+        # the stdev is 0.707, and t is 12.706 for freedom 1, so the half width
+        # is 12.706 * 0.707 / sqrt(2) = 6.353.
+        assert_that(get_relative_ci([99.5, 100.5])).is_close_to(6.353, 0.001)
+
+    def test_stable_stops_early(self) -> None:
+        sampler = AdaptiveSampler(relative_ci=1, min_samples=3, max_samples=10)
+        values = _create_sample([100, 100.1, 99.9, 100, 100])
+
+        result = sampler.run(lambda: next(values), lambda x: [x])
+
+        assert_that(result.is_stable).is_true()
+        assert_that(result.count).is_equal_to(3)
+
+    def test_noisy_stops_at_max(self) -> None:
+        sampler = AdaptiveSampler(relative_ci=1, min_samples=3, max_samples=5)
+        values = _create_sample([100, 50, 150, 20, 180, 100])
+
+        result = sampler.run(lambda: next(values), lambda x: [x])
+
+        assert_that(result.is_stable).is_false()
+        assert_that(result.count).is_equal_to(5)
+
+    def test_average_messages(self) -> None:
+        messages: List[NetworkLatencyPerformanceMessage] = []
+        for latency in [10, 20]:
+            message = NetworkLatencyPerformanceMessage()
+            message.tool = "sockperf"
+            message.average_latency_us = Decimal(latency)
+            messages.append(message)
+        result = average_messages(messages)
+
+        assert_that(result.average_latency_us).is_equal_to(Decimal(15))
+        assert_that(result.tool).is_equal_to("sockperf")
+        assert_that(messages[0].average_latency_us).is_equal_to(Decimal(10))
+
+    def test_update_message(self) -> None:
+        sampler = AdaptiveSampler(relative_ci=10, min_samples=2)
+        values = _create_sample([99.5, 100.5])
+        message = NetworkLatencyPerformanceMessage()
+
+        sampler.run(lambda: next(values), lambda x: [x]).update_message(message)
+
+        assert_that(message.sample_count).is_equal_to(2)
+        assert_that(message.confidence_interval_percent).is_equal_to(Decimal("6.35"))
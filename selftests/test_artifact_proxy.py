@@ -0,0 +1,96 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import functools
+import subprocess
+import tempfile
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path, PurePath
+from typing import Any
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa import schema
+from lisa.util import LisaException
+from lisa.util.artifact_proxy import ArtifactProxy
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        ...
+
+
+class ArtifactProxyTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._www_path = self._path / "www"
+        self._www_path.mkdir()
+        (self._www_path / "pkg-1.0.tar.gz").write_bytes(b"content of package")
+
+        handler = functools.partial(_QuietHandler, directory=str(self._www_path))
+        self._server = HTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+        self._url = f"http://127.0.0.1:{self._server.server_port}/pkg-1.0.tar.gz"
+
+    def tearDown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._temp_dir.cleanup()
+
+    def test_relative_path(self) -> None:
+        proxy = self._create_proxy()
+        assert_that(
+            proxy._get_relative_path("https://example.com:8080/a/../b/c.tgz")
+        ).is_equal_to(PurePath("example.com_8080", "a", "b", "c.tgz"))
+        assert_that(proxy._get_relative_path("https://example.com/")).is_equal_to(
+            PurePath("example.com", "index.html")
+        )
+        assert_that(str(proxy._get_relative_path("https://example.com/d?v=1"))).matches(
+            r"^example.com/d_[0-9a-f]{8}$"
+        )
+
+    def test_get_file_once(self) -> None:
+        proxy = self._create_proxy()
+        cached_file = proxy.get_file(self._url)
+        assert_that(cached_file.read_bytes()).is_equal_to(b"content of package")
+
+        # it's served from cache, after the source is removed.
+        (self._www_path / "pkg-1.0.tar.gz").unlink()
+        assert_that(proxy.get_file(self._url)).is_equal_to(cached_file)
+
+    def test_offline(self) -> None:
+        online_proxy = self._create_proxy()
+        online_proxy.get_file(self._url)
+
+        proxy = self._create_proxy(offline=True)
+        assert_that(proxy.get_file(self._url).exists()).is_true()
+        assert_that(proxy.get_file).raises(LisaException).when_called_with(
+            f"{self._url}.missing"
+        ).contains("offline")
+
+    def test_get_git_mirror(self) -> None:
+        repo_path = self._path / "repo"
+        repo_path.mkdir()
+        for command in [
+            ["init", "-q"],
+            ["-c", "user.name=ut", "-c", "user.email=ut@ut", "commit"]
+            + ["-q", "--allow-empty", "-m", "init"],
+        ]:
+            subprocess.run(["git"] + command, cwd=repo_path, check=True)
+
+        proxy = self._create_proxy()
+        mirror_path = proxy.get_git(f"file://{repo_path}")
+        assert_that(mirror_path.name).is_equal_to("repo.git")
+        assert_that(str(mirror_path / "HEAD")).exists()
+        # the existing mirror is updated in place.
+        assert_that(proxy.get_git(f"file://{repo_path}")).is_equal_to(mirror_path)
+
+    def _create_proxy(self, offline: bool = False) -> ArtifactProxy:
+        return ArtifactProxy(
+            schema.ArtifactProxy(path=str(self._path / "cache"), offline=offline)
+        )
@@ -0,0 +1,148 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import sys
+import tempfile
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa import schema
+from lisa.testselector import select_testcases
+from lisa.util import case_index, constants, package
+from selftests.test_testsuite import cleanup_cases_metadata
+
+_SUITE_1 = """
+from lisa import TestSuite, TestSuiteMetadata, TestCaseMetadata, simple_requirement
+
+
+@TestSuiteMetadata(
+    area="index_a1",
+    category="functional",
+    description="",
+    tags=["t1"],
+    requirement=simple_requirement(min_count=2),
+)
+class IndexSuite1(TestSuite):
+    @TestCaseMetadata(description="", priority=1)
+    def index_case1(self) -> None:
+        ...
+
+    @TestCaseMetadata("")
+    def index_case2(self) -> None:
+        ...
+"""
+
+_SUITE_2 = """
+import lisa
+
+
+@lisa.TestSuiteMetadata("index_a2", "functional", "", name="renamed")
+class IndexSuite2(lisa.TestSuite):
+    @lisa.TestCaseMetadata(description="", priority=0)
+    def index_case3(self) -> None:
+        ...
+"""
+
+_DYNAMIC_SUITE = """
+from lisa import TestSuite, TestSuiteMetadata
+
+AREA = "index_a3"
+
+
+@TestSuiteMetadata(area=AREA, category="functional", description="")
+class IndexSuite3(TestSuite):
+    ...
+"""
+
+
+class CaseIndexTestCase(TestCase):
+    def setUp(self) -> None:
+        cleanup_cases_metadata()
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._package_name = f"index_ut_{id(self)}"
+
+    def tearDown(self) -> None:
+        package.import_pending_modules()
+        cleanup_cases_metadata()
+        for name in list(sys.modules):
+            if name.startswith(self._package_name):
+                del sys.modules[name]
+        self._temp_dir.cleanup()
+
+    def test_parse_module(self) -> None:
+        module_index = case_index.parse_module(_SUITE_1.encode(), "s1.py", "h")
+        assert_that(module_index.can_defer).is_true()
+        suite = module_index.suites[0]
+        assert_that(suite.area).is_equal_to("index_a1")
+        assert_that(suite.tags).is_equal_to(["t1"])
+        assert_that(suite.requirement).is_equal_to("simple_requirement(min_count=2)")
+        assert_that([(x.name, x.priority) for x in suite.cases]).is_equal_to(
+            [("index_case1", 1), ("index_case2", 2)]
+        )
+
+        module_index = case_index.parse_module(_SUITE_2.encode(), "s2.py", "h")
+        assert_that(module_index.suites[0].name).is_equal_to("renamed")
+        assert_that(module_index.suites[0].area).is_equal_to("index_a2")
+
+    def test_dynamic_metadata_not_deferred(self) -> None:
+        module_index = case_index.parse_module(_DYNAMIC_SUITE.encode(), "s3.py", "h")
+        assert_that(module_index.can_defer).is_false()
+
+    def test_cache_reused_by_hash(self) -> None:
+        files = self._write_package()
+        cache_file = self._path / "cache" / "index.json"
+        first = case_index.load_index(self._path / "ext", files, cache_file)
+        assert_that(cache_file.exists()).is_true()
+
+        files[0].write_text(_SUITE_1.replace("index_case2", "index_case4"))
+        second = case_index.load_index(self._path / "ext", files, cache_file)
+        assert_that(second[files[1]]).is_equal_to(first[files[1]])
+        assert_that([x.name for x in second[files[0]].suites[0].cases]).contains(
+            "index_case4"
+        )
+
+    def test_import_selected_modules_only(self) -> None:
+        self._write_package()
+        package.import_package(
+            self._path / "ext",
+            self._package_name,
+            enable_log=False,
+            cache_path=self._path / "cache",
+        )
+        # the dynamic suite is imported, because it cannot be indexed.
+        assert_that(self._get_imported()).is_equal_to(["s3"])
+
+        filters = [
+            schema.TestCase(criteria=schema.Criteria(priority=0)),
+            schema.TestCase(
+                criteria=schema.Criteria(area="index_a3"),
+                select_action=constants.TESTCASE_SELECT_ACTION_EXCLUDE,
+            ),
+        ]
+        selected = select_testcases(filters)
+        assert_that([x.name for x in selected]).is_equal_to(["index_case3"])
+        assert_that(self._get_imported()).is_equal_to(["s2", "s3"])
+
+    def _write_package(self) -> List[Path]:
+        ext_path = self._path / "ext"
+        ext_path.mkdir()
+        files: List[Path] = []
+        for name, content in [
+            ("s1", _SUITE_1),
+            ("s2", _SUITE_2),
+            ("s3", _DYNAMIC_SUITE),
+        ]:
+            file = ext_path / f"{name}.py"
+            file.write_text(content)
+            files.append(file)
+        return files
+
+    def _get_imported(self) -> List[str]:
+        prefix = f"{self._package_name}."
+        return sorted(
+            x[len(prefix) :] for x in sys.modules if x.startswith(prefix)  # noqa: E203
+        )
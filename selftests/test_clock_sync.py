@@ -0,0 +1,38 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import time
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.node import local
+from lisa.util.clock_sync import ClockSync
+
+
+class ClockSyncTestCase(TestCase):
+    def test_start_together(self) -> None:
+        node = local()
+        if not node.is_posix:
+            self.skipTest("clock sync is supported on posix nodes only")
+        clock_sync = ClockSync([node], samples=3)
+        offset = clock_sync.get_offset(node)
+        # it's the same clock.
+        assert_that(abs(offset.offset)).is_less_than_or_equal_to(offset.round_trip)
+
+        start_time = clock_sync.schedule_start(lead_time=1)
+        start_at = clock_sync.get_start_at(node)
+        first = node.execute_async("date +%s.%N", start_at=start_at)
+        # commands without start_at are not delayed.
+        result = node.execute("echo ok")
+        assert_that(time.time()).is_less_than(start_time)
+        assert_that(result.stdout).is_equal_to("ok")
+        time.sleep(0.3)
+        second = node.execute_async("date +%s.%N", start_at=start_at)
+        started = [
+            clock_sync.to_controller_time(node, float(x.wait_result().stdout))
+            for x in [first, second]
+        ]
+
+        for timestamp in started:
+            assert_that(timestamp).is_close_to(start_time, 0.15)
@@ -0,0 +1,66 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.util import command_stats
+from lisa.util.command_stats import LatencyHistogram
+
+
+class LatencyHistogramTestCase(TestCase):
+    def test_percentiles(self) -> None:
+        histogram = LatencyHistogram()
+        for value in range(1, 101):
+            histogram.record(value / 100, output_bytes=10)
+
+        assert_that(histogram.count).is_equal_to(100)
+        assert_that(histogram.output_bytes).is_equal_to(1000)
+        assert_that(histogram.min).is_equal_to(0.01)
+        assert_that(histogram.max).is_equal_to(1)
+        assert_that(histogram.percentile(50)).is_close_to(0.5, 0.5 * 0.02)
+        assert_that(histogram.percentile(99)).is_close_to(0.99, 0.99 * 0.02)
+        assert_that(histogram.percentile(100)).is_equal_to(1)
+
+    def test_empty(self) -> None:
+        histogram = LatencyHistogram()
+        assert_that(histogram.percentile(50)).is_equal_to(0)
+        assert_that(histogram.average).is_equal_to(0)
+
+    def test_merge(self) -> None:
+        first = LatencyHistogram()
+        second = LatencyHistogram()
+        first.record(0.1)
+        second.record(2)
+        first.merge(second)
+
+        assert_that(first.count).is_equal_to(2)
+        assert_that(first.min).is_equal_to(0.1)
+        assert_that(first.max).is_equal_to(2)
+
+
+class CommandStatsTestCase(TestCase):
+    def setUp(self) -> None:
+        command_stats.reset()
+
+    def tearDown(self) -> None:
+        command_stats.reset()
+
+    def test_slowest_and_frequent(self) -> None:
+        for _ in range(5):
+            command_stats.record("node-0", "echo", "echo hello", 0.01)
+        command_stats.record("node-0", "", "sleep 3", 3)
+
+        statistics = command_stats.get_statistics()
+        assert_that(statistics).is_length(1)
+        node_stats = statistics[0]
+        assert_that(sorted(node_stats.tools.keys())).is_equal_to(
+            [command_stats.NODE_TOOL_NAME, "echo"]
+        )
+
+        slowest = command_stats.get_slowest_commands(node_stats, 1)
+        assert_that(slowest[0].command).is_equal_to("sleep 3")
+        frequent = command_stats.get_frequent_commands(node_stats, 1)
+        assert_that(frequent[0].command).is_equal_to("echo hello")
+        assert_that(frequent[0].count).is_equal_to(5)
@@ -0,0 +1,120 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from typing import List
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.util import LisaException
+from microsoft.testsuites.dpdk.dpdkstats import RX, TX, TestpmdStats, _Samples
+
+_REMOVAL = "Port 0: device removal event"
+_HOTPLUG = "EAL: Probe PCI driver: net_mlx4 (15b3:1004) device: e8ef:00:02.0 (socket 0)"
+
+
+def _statistics(rx_pps: int, tx_pps: int) -> List[str]:
+    return f"""
+  ######################## NIC statistics for port 0  ########################
+  RX-packets: 83464      RX-missed: 0          RX-bytes:  5008560
+  RX-errors: 0
+  RX-nombuf:  0
+  TX-packets: 83520      TX-errors: 0          TX-bytes:  5011200
+
+  Throughput (since last show)
+  Rx-pps:     {rx_pps:>8}          Rx-bps:    580178176
+  Tx-pps:     {tx_pps:>8}          Tx-bps:    580204800
+  ############################################################################
+""".splitlines()
+
+
+def _output(pps_list: List[int], events: List[List[str]]) -> List[str]:
+    lines: List[str] = ["Press enter to exit"]
+    for index, pps in enumerate(pps_list):
+        lines.extend(_statistics(pps, pps * 2))
+        if index < len(events):
+            lines.extend(events[index])
+    return lines
+
+
+class TestpmdStatsTestCase(TestCase):
+    def test_statistics(self) -> None:
+        stats = TestpmdStats()
+
+        stats.feed_lines(_output([0, 100, 200, 300, 400, 500], []))
+
+        # the leading zero is discarded, then the first and last samples.
+        assert_that(stats.get_raw_count(RX)).is_equal_to(6)
+        assert_that(stats.get_samples(RX)).is_equal_to([200, 300, 400])
+        assert_that(stats.get_mean(RX)).is_equal_to(300)
+        assert_that(stats.get_max(TX)).is_equal_to(800)
+        assert_that(stats.get_min(TX)).is_equal_to(400)
+        assert_that(stats.get_percentiles(RX, [50, 75])).is_equal_to([300, 350])
+
+    def test_rescind(self) -> None:
+        stats = TestpmdStats()
+        events: List[List[str]] = [[]] * 10
+        events[4] = [_REMOVAL]
+        events[9] = [
+            "EAL: PCI device e8ef:00:02.0 on NUMA socket 0",
+            _HOTPLUG,
+        ]
+
+        stats.feed_lines(
+            _output(
+                [0, 1000, 1000, 1000, 1000, 1000, 10, 10, 10, 10, 10]
+                + [1000, 1000, 1000, 900],
+                events,
+            )
+        )
+
+        assert_that(stats.get_rescind_means(RX)).is_equal_to((1000, 10, 1000))
+        assert_that(stats.get_rescind_means(TX)).is_equal_to((2000, 20, 2000))
+        # the standard form is preferred over the alternative form.
+        assert_that(stats.hotplug_event).is_equal_to(_HOTPLUG)
+
+    def test_rescind_without_hotplug(self) -> None:
+        stats = TestpmdStats()
+
+        stats.feed_lines(
+            _output(
+                [1000, 1000, 10],
+                [[], [_REMOVAL, "timeout: the monitored command dumped core"]],
+            )
+        )
+
+        assert_that(stats.is_crashed).is_true()
+        assert_that(stats.get_rescind_means).raises(LisaException).when_called_with(
+            RX
+        ).contains("crashed")
+
+    def test_empty(self) -> None:
+        stats = TestpmdStats()
+
+        stats.feed_lines(_output([0, 0, 0], []))
+
+        assert_that(stats.get_mean).raises(LisaException).when_called_with(RX).contains(
+            "all zeroes"
+        )
+
+    def test_wraparound(self) -> None:
+        samples = _Samples(capacity=4)
+
+        for value in range(1, 11):
+            samples.append(value)
+
+        # 1-4 are merged to 1.5, 3.5 when 5 comes, then 5-8 are saved by
+        # stride 2, and all are merged again when 10 comes. 9 and 10 are
+        # pending, until the stride of 4 is filled.
+        assert_that(samples.raw_count).is_equal_to(10)
+        assert_that(samples.stride).is_equal_to(4)
+        assert_that(samples.values).is_equal_to([2.5, 6.5])
+        assert_that(samples.get_index(6)).is_equal_to(1)
+        assert_that(samples.get_index(100)).is_equal_to(2)
+
+        for value in range(11, 15):
+            samples.append(value)
+
+        # the mean of raw samples is kept after merging.
+        assert_that(samples.values).is_equal_to([2.5, 6.5, 10.5])
+        assert_that(sum(samples.values) / len(samples.values)).is_equal_to(6.5)
@@ -12,8 +12,9 @@ from marshmallow import validate
 import lisa
 from lisa import constants, node, schema, search_space
 from lisa.environment import load_environments
+from lisa.executable import Tool
 from lisa.testsuite import simple_requirement
-from lisa.util import field_metadata
+from lisa.util import LisaException, SkippedException, field_metadata
 from lisa.util.logger import Logger
 
 CUSTOM_LOCAL = "custom_local"
@@ -114,6 +115,33 @@ class CustomRemoteNode(node.RemoteNode):
         return CustomRemoteNodeSchema
 
 
+class ReadyTool(Tool):
+    @property
+    def command(self) -> str:
+        return "ready"
+
+    @property
+    def can_install(self) -> bool:
+        return False
+
+    def _check_exists(self) -> bool:
+        return True
+
+
+class BrokenOnSecondTool(ReadyTool):
+    def _check_exists(self) -> bool:
+        if self.node.index == 1:
+            raise LisaException("broken tool")
+        return True
+
+
+class SkippedOnSecondTool(ReadyTool):
+    def _check_exists(self) -> bool:
+        if self.node.index == 1:
+            raise SkippedException("unsupported distro")
+        return True
+
+
 def generate_runbook(
     is_single_env: bool = False,
     local: bool = False,
@@ -291,3 +319,33 @@ class EnvironmentTestCase(TestCase):
                     self.assertEqual(r_n.custom_remote_field, CUSTOM_REMOTE)
                     done += 1
             self.assertEqual(2, done)
+
+    def test_ensure_tools(self) -> None:
+        runbook = schema.load_by_type(
+            schema.EnvironmentRoot,
+            {
+                constants.ENVIRONMENTS: [
+                    {
+                        "nodes": [
+                            {constants.TYPE: constants.ENVIRONMENTS_NODES_LOCAL},
+                            {constants.TYPE: constants.ENVIRONMENTS_NODES_LOCAL},
+                        ]
+                    }
+                ]
+            },
+        )
+        env = next(iter(load_environments(runbook).values()))
+        first_node, second_node = env.nodes.list()
+
+        elapsed = env.ensure_tools([ReadyTool])
+        self.assertEqual(["node-0", "node-1"], list(elapsed.keys()))
+
+        # the error is attributed to the failed node, after all nodes are done.
+        with self.assertRaisesRegex(LisaException, "1 of 2 nodes") as context:
+            env.ensure_tools([BrokenOnSecondTool])
+        self.assertIn("[node-1] broken tool", str(context.exception))
+        self.assertIn("brokenonsecondtool", first_node.tools._cache)
+
+        # the exception to skip the case is raised as it is.
+        with self.assertRaisesRegex(SkippedException, "unsupported distro"):
+            env.ensure_tools([SkippedOnSecondTool])
@@ -0,0 +1,170 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+from decimal import Decimal
+from typing import Any, Dict
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa import schema
+from lisa.environment import Environment
+from lisa.node import local
+from lisa.tools import Fio, FIOResult
+from lisa.tools.fio import get_aggregated_results, get_fairness_index
+from selftests.test_testsuite import generate_cases_result
+
+
+def _result(iops: int, latency: int, histogram: Dict[int, int]) -> FIOResult:
+    result = FIOResult()
+    result.mode = "randread"
+    result.iodepth = 4
+    result.qdepth = 8
+    result.iops = Decimal(iops)
+    result.bandwidth = Decimal(iops * 4)
+    result.latency = Decimal(latency)
+    result.latency_histogram = histogram
+    result.latency_percentiles = {"99": Decimal(max(histogram) / 1000)}
+    return result
+
+
+def _direction(iops: float, total_ios: int) -> Dict[str, Any]:
+    return {
+        "iops": iops,
+        "bw": 4000,
+        "total_ios": total_ios,
+        "lat_ns": {"mean": 150500.0},
+        "clat_ns": {
+            "mean": 140000.0,
+            "percentile": {
+                "50.000000": 120832,
+                "99.000000": 301056,
+                "99.990000": 1548288,
+            },
+            "bins": {"120832": 30, "301056": 2},
+        },
+    }
+
+
+class _Environment(Environment):
+    # the information is from nodes, so it's fixed without nodes.
+    def get_information(self, force_run: bool = True) -> Dict[str, str]:
+        return {"kernel_version": "5.15.0"}
+
+
+class FioTestCase(TestCase):
+    def setUp(self) -> None:
+        self._fio = Fio(local())
+
+    def test_results_from_json(self) -> None:
+        raw_output = {
+            "fio version": "fio-3.29",
+            "global options": {"rw": "randread", "iodepth": "4"},
+            "jobs": [
+                {
+                    "jobname": "iteration0",
+                    "job options": {"numjobs": "2"},
+                    "read": _direction(1000.5, 100),
+                    "write": _direction(0, 0),
+                },
+                {
+                    "jobname": "iteration1",
+                    "job options": {"rw": "rw", "iodepth": "8"},
+                    "read": _direction(500, 50),
+                    "write": _direction(600, 60),
+                },
+            ],
+        }
+        output = "note: some notes before json\n" + json.dumps(raw_output)
+
+        results = self._fio.get_results_from_json(output, jobs={"iteration0": (16, 4)})
+
+        assert_that([x.mode for x in results]).is_equal_to(
+            ["randread", "read", "write"]
+        )
+        assert_that([x.qdepth for x in results]).is_equal_to([64, 8, 8])
+        first = results[0]
+        assert_that(first.iops).is_equal_to(Decimal("1000.5"))
+        assert_that(first.bandwidth).is_equal_to(Decimal(4000))
+        assert_that(first.latency).is_equal_to(Decimal("150.5"))
+        assert_that(first.latency_percentiles).is_equal_to(
+            {
+                "50": Decimal("120.832"),
+                "99": Decimal("301.056"),
+                "99.99": Decimal("1548.288"),
+            }
+        )
+        assert_that(first.latency_histogram).is_equal_to({120832: 30, 301056: 2})
+
+    def test_aggregated_results(self) -> None:
+        results = get_aggregated_results(
+            [
+                [_result(3000, 100, {100000: 98, 200000: 2})],
+                [_result(1000, 300, {300000: 100})],
+            ]
+        )
+
+        assert_that(results).is_length(1)
+        total = results[0]
+        assert_that(total.iops).is_equal_to(Decimal(4000))
+        assert_that(total.bandwidth).is_equal_to(Decimal(16000))
+        # it's weighted by iops, (3000 * 100 + 1000 * 300) / 4000
+        assert_that(total.latency).is_equal_to(Decimal(150))
+        assert_that(total.latency_histogram).is_equal_to(
+            {100000: 98, 200000: 2, 300000: 100}
+        )
+        # it's from the merged histogram, not the max of targets.
+        assert_that(total.latency_percentiles["50"]).is_equal_to(Decimal(200))
+        assert_that(total.latency_percentiles["99"]).is_equal_to(Decimal(300))
+
+    def test_result_defaults(self) -> None:
+        result = FIOResult()
+        result.latency_percentiles["99"] = Decimal(1)
+        result.latency_histogram[1000] = 1
+
+        # the dicts are not shared by results.
+        assert_that(FIOResult().latency_percentiles).is_empty()
+        assert_that(FIOResult().latency_histogram).is_empty()
+
+    def test_fairness_index(self) -> None:
+        assert_that(get_fairness_index([100, 100, 100])).is_equal_to(1)
+        assert_that(get_fairness_index([100, 0, 0, 0])).is_equal_to(0.25)
+        assert_that(get_fairness_index([0, 0])).is_equal_to(0)
+
+    def test_interference_messages(self) -> None:
+        test_result = generate_cases_result()[0]
+        test_result.environment = _Environment(
+            is_predefined=True,
+            warn_as_error=False,
+            id_=0,
+            runbook=schema.Environment(nodes_requirement=[schema.NodeSpace()]),
+        )
+
+        messages = self._fio.create_interference_messages(
+            target_results=[
+                [_result(1000, 200, {200000: 100})],
+                [_result(3000, 100, {100000: 100})],
+                [_result(2000, 100, {100000: 100})],
+            ],
+            isolated_results=[_result(1250, 100, {100000: 100})],
+            test_name="interference",
+            test_result=test_result,
+            node_count=2,
+        )
+
+        assert_that(messages).is_length(1)
+        message = messages[0]
+        assert_that(message.test_case_name).is_equal_to("interference")
+        assert_that(message.node_count).is_equal_to(2)
+        assert_that(message.target_count).is_equal_to(3)
+        assert_that(message.numjob).is_equal_to(2)
+        assert_that(message.total_iops).is_equal_to(Decimal(6000))
+        assert_that(message.min_target_iops).is_equal_to(Decimal(1000))
+        assert_that(message.max_target_iops).is_equal_to(Decimal(3000))
+        # 6000 ^ 2 / (3 * (1000 ^ 2 + 3000 ^ 2 + 2000 ^ 2))
+        assert_that(message.fairness_index).is_equal_to(Decimal("0.8571"))
+        # the first target is the victim, it's compared with the isolated run.
+        assert_that(message.victim_iops).is_equal_to(Decimal(1000))
+        assert_that(message.iops_interference_percent).is_equal_to(Decimal(20))
+        assert_that(message.lat_p99_interference_percent).is_equal_to(Decimal(100))
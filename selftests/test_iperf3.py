@@ -0,0 +1,102 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.node import local
+from lisa.tools import Iperf3
+from lisa.tools.iperf3 import get_interval_totals
+
+
+def _tcp_output(interval_bps: List[List[float]], retransmits: int) -> str:
+    intervals: List[Dict[str, Any]] = []
+    for index, streams in enumerate(interval_bps):
+        intervals.append(
+            {
+                "streams": [
+                    {
+                        "bits_per_second": bps,
+                        "retransmits": 1,
+                        "snd_cwnd": 1024 * (index + 1),
+                    }
+                    for bps in streams
+                ],
+                "sum": {"end": index + 1.0, "omitted": False},
+            }
+        )
+    total = sum(sum(x) for x in interval_bps) / len(interval_bps)
+    raw_result = {
+        "intervals": intervals,
+        "end": {
+            "sum_sent": {"bits_per_second": total, "retransmits": retransmits},
+            "sum_received": {"bits_per_second": total - 1e8},
+        },
+    }
+    # iperf3 may print warnings before json.
+    return "warning: something\n" + json.dumps(raw_result, indent=1)
+
+
+class Iperf3TestCase(TestCase):
+    def setUp(self) -> None:
+        self._iperf3 = Iperf3(local())
+
+    def test_tcp_result(self) -> None:
+        result = self._iperf3.get_result_from_json(
+            _tcp_output([[1e9, 3e9], [2e9, 4e9]], retransmits=7)
+        )
+
+        assert_that(result.interval_ends).is_equal_to([1.0, 2.0])
+        assert_that(result.interval_sums).is_equal_to([4e9, 6e9])
+        assert_that(result.stream_averages).is_equal_to([1.5e9, 3.5e9])
+        assert_that(result.snd_cwnd).is_equal_to([[1024, 1024], [2048, 2048]])
+        assert_that(result.total_retransmits).is_equal_to(7)
+        assert_that(result.received_bits_per_second).is_equal_to(4.9e9)
+
+    def test_udp_result(self) -> None:
+        raw_result = {
+            "intervals": [
+                {
+                    "streams": [{"bits_per_second": 5e8, "packets": 10}],
+                    "sum": {"end": 1.0},
+                }
+            ],
+            "end": {"sum": {"bits_per_second": 5e8, "lost_percent": -0.5}},
+        }
+        output = json.dumps(raw_result).replace("-0.5", "-nan")
+
+        result = self._iperf3.get_result_from_json(output)
+
+        assert_that(result.bits_per_second).is_equal_to([[5e8]])
+        assert_that(result.retransmits).is_empty()
+        assert_that(result.lost_percent).is_equal_to(0)
+
+    def test_udp_result_with_sum_sent(self) -> None:
+        # iperf3 3.13 and later has sum_sent and sum_received of udp too.
+        raw_result = {
+            "start": {"test_start": {"protocol": "UDP"}},
+            "intervals": [],
+            "end": {
+                "sum": {"bits_per_second": 5e8, "lost_percent": 2.5},
+                "sum_sent": {"bits_per_second": 6e8, "lost_percent": 0},
+                "sum_received": {"bits_per_second": 4e8, "lost_percent": 2.5},
+            },
+        }
+
+        result = self._iperf3.get_result_from_json(json.dumps(raw_result))
+
+        assert_that(result.lost_percent).is_equal_to(2.5)
+        assert_that(result.sent_bits_per_second).is_equal_to(5e8)
+        assert_that(result.received_bits_per_second).is_equal_to(5e8)
+
+    def test_interval_totals(self) -> None:
+        results = [
+            self._iperf3.get_result_from_json(_tcp_output(x, 0))
+            for x in [[[1e9], [2e9], [3e9]], [[4e9], [5e9]]]
+        ]
+
+        # the last interval is in one process only, so it's dropped.
+        assert_that(get_interval_totals(results)).is_equal_to([5e9, 7e9])
@@ -0,0 +1,84 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import importlib.util
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import TestCase, skipUnless
+
+from assertpy import assert_that
+
+from lisa.tools.node_metrics import NodeMetricsResult, decode_node_metrics
+
+_has_numpy = importlib.util.find_spec("numpy") is not None
+_script = Path(__file__).parent.parent / "lisa/tools/scripts/node_metrics_sampler.py"
+
+
+@skipUnless(_has_numpy, "numpy is not installed")
+class NodeMetricsTestCase(TestCase):
+    @skipUnless(Path("/proc/stat").exists(), "/proc is not available")
+    def test_sample_and_decode(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_file = Path(temp_dir) / "metrics.bin"
+            process = subprocess.Popen(
+                [sys.executable, str(_script), str(data_file), "0.05", "4"]
+            )
+            time.sleep(0.6)
+            process.send_signal(signal.SIGTERM)
+            assert_that(process.wait(timeout=10)).is_equal_to(0)
+
+            result = decode_node_metrics(data_file.read_bytes())
+
+        # the ring buffer is wrapped, and samples are ordered by time.
+        assert_that(result.count).is_equal_to(4)
+        assert_that(list(result.timestamps)).is_sorted()
+        assert_that(result.names).contains("cpu.idle", "intr")
+        assert_that(result.get("cpu.idle").tolist()).is_sorted()
+
+    def test_summary(self) -> None:
+        import numpy  # type: ignore
+
+        names = [
+            "cpu.idle",
+            "cpu.softirq",
+            "cpu.user",
+            "disk.dm-0.reads",
+            "disk.sda.io_ticks",
+            "disk.sda.reads",
+            "interrupts.cpu0",
+            "interrupts.cpu1",
+            "memory.MemAvailable",
+            "net.eth0.rx_bytes",
+        ]
+        values = numpy.array(
+            [
+                [100, 10, 50, 0, 0, 0, 0, 0, 4096, 0],
+                [150, 30, 80, 900, 1000, 1000, 300, 100, 2048, 250_000_000],
+            ],
+            dtype=numpy.uint64,
+        )
+        result = NodeMetricsResult(
+            names=names,
+            kinds=[""] * len(names),
+            timestamps=numpy.array([10.0, 12.0]),
+            values=values,
+        )
+
+        summary = result.get_summary()
+
+        assert_that(summary["node_cpu_usage_percent"]).is_equal_to(Decimal("50.0"))
+        assert_that(summary["node_cpu_softirq_percent"]).is_equal_to(Decimal("20.0"))
+        assert_that(summary["node_interrupts_per_sec"]).is_equal_to(Decimal("200.0"))
+        assert_that(summary["node_interrupts_max_cpu_percent"]).is_equal_to(
+            Decimal("75.0")
+        )
+        assert_that(summary["node_net_rx_mbps"]).is_equal_to(Decimal("1000.0"))
+        # the virtual disk isn't counted.
+        assert_that(summary["node_disk_read_iops"]).is_equal_to(Decimal("500.0"))
+        assert_that(summary["node_disk_max_util_percent"]).is_equal_to(Decimal("50.0"))
+        assert_that(summary["node_memory_available_min_mb"]).is_equal_to(Decimal("2.0"))
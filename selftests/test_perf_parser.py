@@ -0,0 +1,129 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from decimal import Decimal
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.util.perf_parser import (
+    parse_lagscope,
+    parse_netstat,
+    parse_sar,
+    parse_sockperf,
+)
+
+SAR_OUTPUT = """Linux 5.15.0-1019-azure (node-0)  09/01/22  _x86_64_  (2 CPU)
+
+06:37:41 AM     IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s
+06:37:42 AM        lo      0.00      0.00      0.00      0.00      0.00      0.00
+06:37:42 AM      eth0   2856.00   2857.00    186.86    187.28      0.00      0.00
+
+06:37:42 AM     IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s
+06:37:43 AM        lo      0.00      0.00      0.00      0.00      0.00      0.00
+06:37:43 AM      eth0   3195.00   3194.00    209.04    209.33      0.00      0.00
+
+Average:        IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s
+Average:           lo      0.00      0.00      0.00      0.00      0.00      0.00
+Average:         eth0   3025.50   3025.50    197.95    198.31      0.00      0.00
+"""
+
+LAGSCOPE_OUTPUT = """lagscope 1.0.1
+---------------------------------------------------------
+02:11:12 INFO: Ping statistics for 10.0.0.5:
+02:11:12 INFO:    Number of successful Pings: 100
+02:11:12 INFO:    Minimum = 35.500us, Maximum = 120.250us, Average = 60.313us
+
+Interval(usec)   Frequency
+      0          0
+     30          20
+     45          50
+     60          20
+     75          10
+
+Percentile       Latency(us)
+     50%         52
+     75%         60
+     90%         75
+     95%         78
+     99%         110
+   99.9%         120
+"""
+
+SOCKPERF_OUTPUT = """sockperf: [Total Run] RunTime=1.100 sec; Warm up time=400 msec
+sockperf: ========= Printing statistics for Server No: 0
+sockperf: [Valid Duration] RunTime=1.000 sec; SentMessages=1283; ReceivedMessages=1283
+sockperf: ====> avg-rtt=297.328 (std-dev=47.318, mean-ad=36.026)
+sockperf: # dropped messages = 0; # duplicated messages = 0; # out-of-order = 0
+sockperf: Summary: Round trip is 297.328 usec
+sockperf: Total 1283 observations; each percentile contains 12.83 observations
+sockperf: ---> <MAX> observation =  921.497
+sockperf: ---> percentile 99.999 =  921.497
+sockperf: ---> percentile 99.990 =  921.497
+sockperf: ---> percentile 99.900 =  600.012
+sockperf: ---> percentile 99.000 =  500.000
+sockperf: ---> percentile 90.000 =  400.000
+sockperf: ---> percentile 75.000 =  320.000
+sockperf: ---> percentile 50.000 =  290.000
+sockperf: ---> percentile 25.000 =  260.000
+sockperf: ---> <MIN> observation =  218.770
+"""
+
+
+class PerfParserTestCase(TestCase):
+    def test_sar(self) -> None:
+        samples = parse_sar(SAR_OUTPUT, "eth0")
+
+        # the average lines are not samples.
+        assert_that(samples.rx).is_equal_to([2856.0, 3195.0])
+        assert_that(samples.rx_tx).is_equal_to([5713.0, 6389.0])
+        fields = samples.get_message_fields()
+        assert_that(fields["rx_pps_average"]).is_equal_to(Decimal("3025.5"))
+        assert_that(fields["tx_pps_minimum"]).is_equal_to(Decimal("2857.0"))
+        assert_that(fields["rx_pps_stdev"]).is_equal_to(Decimal("169.5"))
+        assert_that(fields["rx_tx_pps_median"]).is_equal_to(Decimal("6051.0"))
+        assert_that(parse_sar(SAR_OUTPUT, "eth1").rx).is_empty()
+
+    def test_netstat(self) -> None:
+        output = (
+            "            input            hn0           output\n"
+            "   packets  errs idrops      bytes    packets  errs      bytes colls\n"
+            "        16     0     0       3506         23     0       5473     0\n"
+            "        34     0     0       8253         50     0       8570     0\n"
+        )
+
+        samples = parse_netstat(output)
+
+        assert_that(samples.rx).is_equal_to([16.0, 34.0])
+        assert_that(samples.tx).is_equal_to([23.0, 50.0])
+
+    def test_lagscope(self) -> None:
+        distribution = parse_lagscope(LAGSCOPE_OUTPUT)
+
+        assert_that(distribution.count).is_equal_to(100)
+        assert_that(distribution.average).is_equal_to(60.313)
+        assert_that(distribution.percentiles[99.9]).is_equal_to(120)
+        assert_that(distribution.histogram_counts).is_equal_to([0, 20, 50, 20, 10])
+        # the reported percentile is used, others are from the histogram. The
+        # 45th is in the middle of the interval 45-60.
+        assert_that(distribution.get_percentiles([95, 45])).is_equal_to([78, 52.5])
+        # the last interval ends at the maximum.
+        assert_that(distribution.get_percentiles([98])[0]).is_close_to(111.2, 1e-6)
+        fields = distribution.get_message_fields()
+        assert_that(fields["latency99_percentile_us"]).is_equal_to(Decimal("110"))
+        assert_that(fields["min_latency_us"]).is_equal_to(Decimal("35.5"))
+
+    def test_sockperf(self) -> None:
+        distribution = parse_sockperf(SOCKPERF_OUTPUT)
+
+        assert_that(distribution.count).is_equal_to(1283)
+        assert_that(distribution.run_time_seconds).is_equal_to(1.0)
+        assert_that(distribution.stdev).is_equal_to(47.318)
+        assert_that(distribution.maximum).is_equal_to(921.497)
+        # it's interpolated between 90th and 99th percentiles.
+        assert_that(distribution.get_percentiles([99, 95])).is_equal_to(
+            [500.0, 400 + 100 * 5 / 9]
+        )
+        fields = distribution.get_message_fields()
+        assert_that(fields["latency99_9_percentile_us"]).is_equal_to(Decimal("600.012"))
+        assert_that(fields["latency_stdev_us"]).is_equal_to(Decimal("47.318"))
@@ -0,0 +1,108 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import List
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.messages import DiskPerformanceMessage, DiskSetupType
+from lisa.util.perf_store import PerfStore, parse_selector, welch_t_test
+
+
+def _create_message(
+    kernel_version: str, block_size: int, iops: float, lat_usec: float
+) -> DiskPerformanceMessage:
+    message = DiskPerformanceMessage()
+    message.tool = "fio"
+    message.vmsize = "Standard_D8s_v5"
+    message.kernel_version = kernel_version
+    message.test_case_name = "perf_premium_datadisks_4k"
+    message.disk_setup_type = DiskSetupType.raid0
+    message.block_size = block_size
+    message.randread_iops = Decimal(iops)
+    message.randread_lat_usec = Decimal(lat_usec)
+    return message
+
+
+class PerfStoreTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._store = PerfStore(Path(self._temp_dir.name) / "perf.sqlite")
+
+    def tearDown(self) -> None:
+        self._store.close()
+        self._temp_dir.cleanup()
+
+    def _save(
+        self, run_id: str, kernel_version: str, block_size: int, iops: List[float]
+    ) -> None:
+        for value in iops:
+            self._store.save(
+                _create_message(kernel_version, block_size, value, 100),
+                run_id=run_id,
+            )
+
+    def test_save_and_query(self) -> None:
+        self._save("run1", "5.15.0", 4, [1000])
+
+        rows = self._store.query(
+            "DiskPerformanceMessage", parse_selector("kernel_version=5.15.0")
+        )
+
+        assert_that(rows).is_length(1)
+        assert_that(rows[0]["run_id"]).is_equal_to("run1")
+        assert_that(rows[0]["randread_iops"]).is_equal_to(1000.0)
+        assert_that(rows[0]["disk_setup_type"]).is_equal_to("raid0")
+
+    def test_compare(self) -> None:
+        self._save("run1", "5.15.0", 4, [1000, 1010, 990, 1005])
+        # the other block size is a different group.
+        self._save("run1", "5.15.0", 1024, [100, 101, 99])
+        self._save("run2", "6.2.0", 4, [800, 810, 790])
+        self._save("run2", "6.2.0", 1024, [100, 102, 98])
+
+        comparisons = self._store.compare(
+            parse_selector("kernel_version=5.15.0"), parse_selector("run2")
+        )
+
+        regressions = [x for x in comparisons if x.is_regression]
+        assert_that(regressions).is_length(1)
+        assert_that(regressions[0].metric).is_equal_to("randread_iops")
+        assert_that(regressions[0].label).contains("block_size=4")
+        assert_that(regressions[0].change).is_close_to(-20.1, 0.1)
+        # the latency doesn't change.
+        latency = [x for x in comparisons if x.metric == "randread_lat_usec"]
+        assert_that(latency).is_length(2)
+        assert_that([x.is_regression for x in latency]).does_not_contain(True)
+
+    def test_compare_one_side_metric(self) -> None:
+        # the column is null in baseline rows, like it's added after them.
+        for value in [1000, 1010, 990]:
+            message = _create_message("5.15.0", 4, value, 100)
+            message.randwrite_iops = None  # type: ignore
+            self._store.save(message, run_id="run1")
+        for value in [1000, 1010]:
+            message = _create_message("6.2.0", 4, value, 100)
+            message.randwrite_iops = Decimal(500)
+            self._store.save(message, run_id="run2")
+
+        comparisons = self._store.compare(
+            parse_selector("run1"), parse_selector("run2")
+        )
+
+        metrics = [x.metric for x in comparisons]
+        assert_that(metrics).contains("randread_iops")
+        assert_that(metrics).does_not_contain("randwrite_iops")
+
+    def test_t_test(self) -> None:
+        assert_that(welch_t_test([10], [11])).is_none()
+        assert_that(welch_t_test([10, 10], [10])).is_equal_to(1.0)
+        # the mean is 0, the stdev is 1, and the freedom is 10. The sample is
+        # at t = 2, and p = 0.0734 in the table of t distribution.
+        baseline = [-1.0] * 5 + [1.0] * 5 + [0.0]
+        p_value = welch_t_test(baseline, [2 * (12 / 11) ** 0.5])
+        assert_that(p_value).is_close_to(0.0734, 0.0001)
@@ -0,0 +1,40 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.util import profiler
+
+
+def _busy_wait(seconds: float) -> None:
+    end = time.time() + seconds
+    while time.time() < end:
+        pass
+
+
+class ProfilerTestCase(TestCase):
+    def test_phase_without_profiler(self) -> None:
+        with profiler.phase(profiler.PHASE_TEST):
+            pass
+
+    def test_samples_by_phase(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_path:
+            profile_path = Path(temp_path)
+            profiler.start(interval=0.001)
+            try:
+                with profiler.phase(profiler.PHASE_DEPLOY):
+                    _busy_wait(0.2)
+            finally:
+                profiler.stop(profile_path)
+
+            assert_that(str(profile_path / "deploy.collapsed")).exists()
+            content = (profile_path / "deploy.collapsed").read_text()
+            assert_that(content).contains("MainThread;")
+            assert_that(content).contains("test_profiler:_busy_wait")
+            summary = (profile_path / "summary.txt").read_text()
+            assert_that(summary).contains("phase: deploy")
@@ -0,0 +1,203 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, List
+from unittest import TestCase, skipIf
+
+from assertpy import assert_that
+
+from lisa import LisaException, schema
+from lisa.util.shell import COMPRESSION_GZIP, COMPRESSION_NONE, LocalShell, SshShell
+
+
+class _LocalChannel:
+    """
+    It runs the command of exec channel on local, so the tar stream is tested
+    without SSH server.
+    """
+
+    def __init__(self, command: str) -> None:
+        self._process = subprocess.Popen(
+            ["sh", "-c", command],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def makefile(self, mode: str) -> IO[bytes]:
+        stream = self._process.stdin if "w" in mode else self._process.stdout
+        assert stream
+        return stream
+
+    def makefile_stderr(self, mode: str) -> IO[bytes]:
+        assert self._process.stderr
+        return self._process.stderr
+
+    def shutdown_write(self) -> None:
+        assert self._process.stdin
+        if not self._process.stdin.closed:
+            self._process.stdin.close()
+
+    def exit_status_ready(self) -> bool:
+        return self._process.poll() is not None
+
+    def recv_exit_status(self) -> int:
+        return self._process.wait()
+
+    def close(self) -> None:
+        self._process.wait()
+        for stream in [self._process.stdin, self._process.stdout, self._process.stderr]:
+            if stream:
+                stream.close()
+
+
+class _LocalSshShell(SshShell):
+    def _open_exec_channel(self, command: str, sudo: bool) -> Any:
+        return _LocalChannel(command)
+
+
+class _LocalSftpFile:
+    def __init__(self, path: str, client: "_LocalSftpClient") -> None:
+        self._file = open(path, "rb")
+        self._client = client
+
+    def __enter__(self) -> "_LocalSftpFile":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._file.close()
+
+    def stat(self) -> os.stat_result:
+        self._client.stat_count += 1
+        return os.fstat(self._file.fileno())
+
+    def prefetch(self, file_size: int) -> None:
+        ...
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+
+class _LocalSftpClient:
+    """
+    It has no stat method, so files can be stat by opened handles only.
+    """
+
+    def __init__(self) -> None:
+        self.stat_count = 0
+
+    def open(self, path: str, mode: str) -> _LocalSftpFile:
+        assert_that(mode).is_equal_to("rb")
+        return _LocalSftpFile(path, self)
+
+
+class _LocalSftpSshShell(SshShell):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.sftp_client = _LocalSftpClient()
+
+    def _get_sftp_client(self) -> Any:
+        return self.sftp_client
+
+
+class _FailedTarSshShell(_LocalSshShell):
+    """
+    tar returns 2 after the stream is completed, like a file cannot be read.
+    """
+
+    def _open_exec_channel(self, command: str, sudo: bool) -> Any:
+        return _LocalChannel(f'tar() {{ command tar "$@"; return 2; }}; {command}')
+
+
+@skipIf(sys.platform == "win32", "tar stream needs a Posix shell")
+class CopyTreeTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._root = Path(self._temp_dir.name)
+        self._source = self._root / "source"
+        (self._source / "sub" / "deep").mkdir(parents=True)
+        (self._source / "a.log").write_text("a" * 1000)
+        (self._source / "sub" / "b.txt").write_text("b")
+        (self._source / "sub" / "deep" / "c.log").write_text("c" * 10)
+
+        self._shell = _LocalSshShell(
+            schema.ConnectionInfo(
+                address="localhost",
+                username="copy_tree_ut_user",
+                password="copy_tree_ut_password",
+            )
+        )
+        self._shell.is_posix = True
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_copy_tree(self) -> None:
+        for compression in [COMPRESSION_GZIP, COMPRESSION_NONE]:
+            destination = self._root / f"upload_{compression}"
+            statistics = self._shell.copy_tree(
+                self._source, PurePosixPath(destination), compression=compression
+            )
+            assert_that(statistics.file_count).is_equal_to(3)
+            assert_that(statistics.size).is_equal_to(1011)
+            assert_that(self._list_files(destination)).is_equal_to(
+                ["a.log", "sub/b.txt", "sub/deep/c.log"]
+            )
+
+    def test_copy_tree_back_with_patterns(self) -> None:
+        destination = self._root / "download"
+        statistics = self._shell.copy_tree_back(
+            PurePosixPath(self._source), destination, patterns=["*.log"]
+        )
+        assert_that(statistics.file_count).is_equal_to(2)
+        assert_that(statistics.transferred_size).is_greater_than(0)
+        assert_that(self._list_files(destination)).is_equal_to(
+            ["a.log", "sub/deep/c.log"]
+        )
+        assert_that((destination / "a.log").read_text()).is_equal_to("a" * 1000)
+
+    def test_copy_tree_back_not_exist(self) -> None:
+        with self.assertRaises(LisaException) as context:
+            self._shell.copy_tree_back(
+                PurePosixPath(self._root / "not_exist"), self._root / "download"
+            )
+        assert_that(str(context.exception)).contains("exit code")
+
+    def test_copy_tree_back_tar_failure(self) -> None:
+        shell = _FailedTarSshShell(self._shell.connection_info)
+        shell.is_posix = True
+
+        # the error is raised, so the caller can fall back to other ways.
+        with self.assertRaises(LisaException) as context:
+            shell.copy_tree_back(PurePosixPath(self._source), self._root / "download")
+        assert_that(str(context.exception)).contains("exit code: 2")
+
+    def test_copy_back(self) -> None:
+        shell = _LocalSftpSshShell(self._shell.connection_info)
+        shell.is_posix = True
+        destination = self._root / "download" / "a.log"
+
+        shell.copy_back(PurePosixPath(self._source / "a.log"), destination)
+
+        assert_that(destination.read_text()).is_equal_to("a" * 1000)
+        # the file is stat by the opened handle only.
+        assert_that(shell.sftp_client.stat_count).is_equal_to(1)
+        assert_that(list(destination.parent.iterdir())).is_length(1)
+
+    def test_local_copy_tree(self) -> None:
+        destination = self._root / "local"
+        statistics = LocalShell().copy_tree(
+            self._source, destination, patterns=["*.txt"]
+        )
+        assert_that(statistics.file_count).is_equal_to(1)
+        assert_that(self._list_files(destination)).is_equal_to(["sub/b.txt"])
+
+    def _list_files(self, path: Path) -> List[str]:
+        return sorted(
+            x.relative_to(path).as_posix() for x in path.rglob("*") if x.is_file()
+        )
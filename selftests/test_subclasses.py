@@ -0,0 +1,42 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import subprocess
+import sys
+from unittest import TestCase
+
+from assertpy import assert_that
+
+import lisa.mixin_modules  # noqa: F401
+from lisa import schema
+from lisa.notifier import Notifier
+from lisa.util import LisaException
+from lisa.util.subclasses import Factory
+
+
+class LazyFactoryTestCase(TestCase):
+    def test_cli_import_is_lazy(self) -> None:
+        # run in a new process, because other tests may import these modules.
+        script = (
+            "import sys\n"
+            "import lisa.main\n"
+            "print(','.join(x for x in sys.modules if x.startswith((\n"
+            "    'lisa.notifiers', 'lisa.transformers', 'lisa.sut_orchestrator.',\n"
+            "    'lisa.combinators'))))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True
+        )
+        assert_that(result.returncode).described_as(result.stderr).is_equal_to(0)
+        assert_that(result.stdout.strip()).is_empty()
+
+    def test_import_by_type_name(self) -> None:
+        factory = Factory[Notifier](Notifier)
+        notifier = factory.create_by_runbook(schema.Notifier(type="text_result"))
+        assert_that(type(notifier).__module__).is_equal_to("lisa.notifiers.text_result")
+
+    def test_unknown_type_name(self) -> None:
+        factory = Factory[Notifier](Notifier)
+        with self.assertRaises(LisaException) as context:
+            factory.create_by_runbook(schema.Notifier(type="not_exist"))
+        assert_that(str(context.exception)).contains("'junit'")
@@ -150,3 +150,10 @@ class SelectorTestCase(TestCase):
         selected = select_and_check(self, runbook, ["ut1", "ut2"])
 
         self.assertListEqual([2, 3], [case.retry for case in selected])
+
+    def test_select_keep_included_order(self) -> None:
+        runbook = [
+            {constants.TESTCASE_CRITERIA: {"name": "mock_ut3"}},
+            {constants.TESTCASE_CRITERIA: {"area": "a.*", "priority": [0, 1, 2]}},
+        ]
+        select_and_check(self, runbook, ["ut3", "ut1", "ut2"])
@@ -0,0 +1,164 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Type, cast
+from unittest import TestCase, skipIf
+
+from assertpy import assert_that
+
+from lisa.executable import Tool, Tools
+from lisa.node import local
+from lisa.util.logger import get_logger
+from lisa.util.tool_manifest import (
+    METHOD_INSTALLED,
+    ToolManifest,
+    ToolRecord,
+    get_paths_checksum,
+)
+
+_INSTALLED_COMMAND = "lisa_tool_manifest_ut_installed"
+
+
+class _FakeNode:
+    log = get_logger("node", "tool_manifest_ut")
+
+
+class _EnabledManifest(ToolManifest):
+    @property
+    def is_enabled(self) -> bool:
+        # the manifest is disabled on local nodes, but the test uses it.
+        return True
+
+
+class _CountingTools(Tools):
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.resolved_commands: List[str] = []
+
+    def _resolve_commands(self, commands: List[str], sudo: bool) -> Dict[str, str]:
+        self.resolved_commands.extend(commands)
+        return super()._resolve_commands(commands, sudo)
+
+
+class _PresentTool(Tool):
+    @property
+    def command(self) -> str:
+        return "sh"
+
+    @property
+    def can_install(self) -> bool:
+        return False
+
+
+class _InstalledTool(Tool):
+    @property
+    def command(self) -> str:
+        return _INSTALLED_COMMAND
+
+    @property
+    def can_install(self) -> bool:
+        return True
+
+    def _install(self) -> bool:
+        return True
+
+
+class ToolManifestTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "tools" / "image.json"
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_record_and_remove(self) -> None:
+        manifest = self._create_manifest()
+        assert_that(manifest.load()).is_empty()
+
+        git = ToolRecord(command="git", path="/usr/bin/git")
+        make = ToolRecord(command="make", path="/usr/bin/make", method=METHOD_INSTALLED)
+        manifest.record("git", git)
+        # records of other nodes are merged.
+        self._create_manifest().record("make", make)
+        assert_that(manifest.load()).is_equal_to({"git": git, "make": make})
+
+        manifest.remove(["git"])
+        assert_that(manifest.load()).is_equal_to({"make": make})
+        assert_that(list(self._path.parent.iterdir())).is_length(1)
+
+        # the manifest isn't written, if records are not changed.
+        content = self._compact_manifest()
+        manifest.record("make", make)
+        manifest.remove(["git"])
+        assert_that(self._path.read_text()).is_equal_to(content)
+
+    def test_broken_manifest(self) -> None:
+        self._path.parent.mkdir(parents=True)
+        self._path.write_text("{broken")
+        assert_that(self._create_manifest().load()).is_empty()
+
+    def test_paths_checksum(self) -> None:
+        records = {
+            "git": ToolRecord(command="git", path="/usr/bin/git"),
+            "make": ToolRecord(command="make", path="/usr/bin/make"),
+        }
+        changed = dict(records)
+        changed["git"] = ToolRecord(command="git", path="/usr/local/bin/git")
+        assert_that(get_paths_checksum(records)).is_equal_to(
+            get_paths_checksum(dict(reversed(list(records.items()))))
+        )
+        assert_that(get_paths_checksum(records)).is_not_equal_to(
+            get_paths_checksum(changed)
+        )
+
+    @skipIf(sys.platform == "win32", "commands are resolved by a Posix shell")
+    def test_seed_tools(self) -> None:
+        manifest = self._create_manifest(_EnabledManifest)
+        sh_path = shutil.which("sh")
+        assert sh_path
+        present = ToolRecord(command="sh", path=sh_path)
+        installed = ToolRecord(
+            command=_INSTALLED_COMMAND,
+            path=f"/usr/local/bin/{_INSTALLED_COMMAND}",
+            method=METHOD_INSTALLED,
+        )
+        manifest.record("_presenttool", present)
+        manifest.record("_installedtool", installed)
+        content = self._compact_manifest()
+        # it's the same as loading the manifest of a new node from the image.
+        tools = _CountingTools(local())
+        tools._manifest = manifest
+        tools._records = manifest.load()
+        tools._seeds = tools._validate_records(tools._records)
+
+        assert_that(tools.get(_PresentTool).exists).is_true()
+        tools.get(_InstalledTool)
+
+        # the installed tool is missing on the new node, but it's not a drift,
+        # and it's not resolved or recorded again after installed.
+        assert_that(sorted(tools.resolved_commands)).is_equal_to(
+            sorted(["sh", _INSTALLED_COMMAND])
+        )
+        assert_that(tools._seeds).contains_key("_presenttool", "_installedtool")
+        assert_that(manifest.load()).is_equal_to(
+            {"_presenttool": present, "_installedtool": installed}
+        )
+        assert_that(self._path.read_text()).is_equal_to(content)
+
+    def _compact_manifest(self) -> str:
+        # it's written with indents, so a compact one is not written again.
+        content = json.dumps(json.loads(self._path.read_text()))
+        self._path.write_text(content)
+        return content
+
+    def _create_manifest(
+        self, manifest_type: Type[ToolManifest] = ToolManifest
+    ) -> ToolManifest:
+        manifest = manifest_type(cast(Any, _FakeNode()))
+        manifest._path = self._path
+        return manifest
@@ -0,0 +1,137 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Tuple
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from lisa.util import LisaException
+from lisa.util.logger import get_logger
+from lisa.util.transfer import PARTIAL_SUFFIX, ChunkedTransfer, get_local_sha256
+
+_CHUNK_SIZE = 1024
+
+
+class _LocalSftpFile:
+    def __init__(self, path: str, mode: str) -> None:
+        self._file = open(path, mode)
+
+    def __enter__(self) -> "_LocalSftpFile":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self._file.close()
+
+    def set_pipelined(self, pipelined: bool) -> None:
+        ...
+
+    def seek(self, offset: int) -> None:
+        self._file.seek(offset)
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+
+    def truncate(self, size: int) -> None:
+        self._file.truncate(size)
+
+    def readv(self, chunks: List[Tuple[int, int]]) -> Iterator[bytes]:
+        for offset, length in chunks:
+            self._file.seek(offset)
+            yield self._file.read(length)
+
+
+class _LocalSftpClient:
+    """
+    A SFTP client on local file system. It fails after the given count of
+    chunks are opened, to simulate a broken connection.
+    """
+
+    def __init__(self, test: "ChunkedTransferTestCase") -> None:
+        self._test = test
+
+    def open(self, path: str, mode: str) -> _LocalSftpFile:
+        if mode in ["rb", "r+b"]:
+            with self._test.lock:
+                if self._test.fail_after is not None:
+                    if self._test.fail_after <= 0:
+                        raise EOFError("connection is broken")
+                    self._test.fail_after -= 1
+        return _LocalSftpFile(path, mode)
+
+    def stat(self, path: str) -> os.stat_result:
+        return os.stat(path)
+
+    def remove(self, path: str) -> None:
+        os.remove(path)
+
+    def posix_rename(self, source: str, destination: str) -> None:
+        os.replace(source, destination)
+
+    def close(self) -> None:
+        ...
+
+
+class ChunkedTransferTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._source = self._path / "source.bin"
+        self._source.write_bytes(os.urandom(_CHUNK_SIZE * 5 + 100))
+        self.fail_after: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_upload(self) -> None:
+        destination = self._path / "node" / "destination.bin"
+        destination.parent.mkdir()
+        statistics = self._create_transfer().upload(
+            self._source, str(destination), key="ut"
+        )
+
+        assert_that(destination.read_bytes()).is_equal_to(self._source.read_bytes())
+        assert_that(statistics.size).is_equal_to(self._source.stat().st_size)
+        assert_that(list(destination.parent.iterdir())).is_length(1)
+
+    def test_download_resume(self) -> None:
+        destination = self._path / "local" / "destination.bin"
+        self.fail_after = 2
+        transfer = self._create_transfer(connection_count=1)
+        assert_that(transfer.download).raises(EOFError).when_called_with(
+            str(self._source), destination, "ut"
+        )
+        assert_that(destination.exists()).is_false()
+
+        # only the remaining chunks are transferred.
+        self.fail_after = None
+        statistics = transfer.download(str(self._source), destination, key="ut")
+        assert_that(statistics.transferred_size).is_equal_to(_CHUNK_SIZE * 3 + 100)
+        assert_that(destination.read_bytes()).is_equal_to(self._source.read_bytes())
+        assert_that(list((self._path / "journal").iterdir())).is_empty()
+
+    def test_checksum_mismatch(self) -> None:
+        destination = self._path / "destination.bin"
+        transfer = self._create_transfer(remote_sha256=lambda _: "0" * 64)
+        assert_that(transfer.upload).raises(LisaException).when_called_with(
+            self._source, str(destination), "ut"
+        ).contains("checksum mismatch")
+        assert_that(destination.exists()).is_false()
+        assert_that(Path(f"{destination}{PARTIAL_SUFFIX}").exists()).is_false()
+
+    def _create_transfer(
+        self, connection_count: int = 3, remote_sha256: Any = None
+    ) -> ChunkedTransfer:
+        return ChunkedTransfer(
+            sftp_opener=lambda: _LocalSftpClient(self),  # type: ignore
+            remote_sha256=remote_sha256 or (lambda x: get_local_sha256(Path(x))),
+            log=get_logger("transfer_ut"),
+            chunk_size=_CHUNK_SIZE,
+            connection_count=connection_count,
+            journal_path=self._path / "journal",
+        )
@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import functools
+import hashlib
+import sys
+import tempfile
+import threading
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path, PurePath
+from typing import Any
+from unittest import TestCase, skipIf
+
+from assertpy import assert_that
+
+from lisa.base_tools import Wget
+from lisa.node import local
+
+_FILE_SIZE = 100 * 1024
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args: Any) -> None:
+        ...
+
+
+class _TestWget(Wget):
+    # an entry has a file, a checksum file and the folder, so two entries are
+    # over the limit.
+    CACHE_SIZE_LIMIT = _FILE_SIZE * 3 // 2
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.tool_path = PurePath()
+
+    def get_tool_path(self, use_global: bool = False) -> PurePath:
+        return self.tool_path
+
+
+@skipIf(sys.platform == "win32", "the cache needs a Posix shell")
+class WgetCacheTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._www_path = self._path / "www"
+        self._www_path.mkdir()
+        self._target_path = self._path / "target"
+        self._target_path.mkdir()
+        for name in ["a.tar.gz", "b.tar.gz"]:
+            (self._www_path / name).write_bytes(name[0].encode() * _FILE_SIZE)
+
+        handler = functools.partial(_QuietHandler, directory=str(self._www_path))
+        self._server = HTTPServer(("127.0.0.1", 0), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.start()
+        self._url = f"http://127.0.0.1:{self._server.server_port}"
+
+        self._wget = _TestWget(local())
+        self._wget.tool_path = PurePath(self._path / "tool")
+        self._cache_path = self._path / "tool" / Wget.CACHE_FOLDER
+
+    def tearDown(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._temp_dir.cleanup()
+
+    def test_hit(self) -> None:
+        sha256 = hashlib.sha256(b"a" * _FILE_SIZE).hexdigest()
+        self._get("a.tar.gz", sha256=sha256)
+
+        # it's served from cache, after the source is removed.
+        (self._www_path / "a.tar.gz").unlink()
+        target = self._get("a.tar.gz", sha256=sha256)
+
+        assert_that(target.read_bytes()).is_equal_to(b"a" * _FILE_SIZE)
+        assert_that([x.name for x in self._cache_path.iterdir()]).is_equal_to([sha256])
+
+    def test_eviction(self) -> None:
+        self._get("a.tar.gz")
+        self._get("b.tar.gz")
+
+        # the least recently used entry is evicted.
+        entries = list(self._cache_path.iterdir())
+        assert_that(entries).is_length(1)
+        assert_that(list(entries[0].glob("*.tar.gz"))[0].name).is_equal_to("b.tar.gz")
+
+    def test_corrupted_entry(self) -> None:
+        self._get("a.tar.gz")
+        entry_path = next(self._cache_path.iterdir())
+        # the target is a hard link, so a new file is written to the entry.
+        cached_file = entry_path / "a.tar.gz"
+        cached_file.unlink()
+        cached_file.write_bytes(b"broken")
+
+        target = self._get("a.tar.gz")
+
+        assert_that(target.read_bytes()).is_equal_to(b"a" * _FILE_SIZE)
+        assert_that((entry_path / "a.tar.gz").read_bytes()).is_equal_to(
+            b"a" * _FILE_SIZE
+        )
+
+    def _get(self, name: str, sha256: str = "") -> Path:
+        return Path(
+            self._wget.get(
+                f"{self._url}/{name}",
+                file_path=str(self._target_path),
+                cache=True,
+                sha256=sha256,
+            )
+        )